@@ -16,10 +16,11 @@ from .interfaces import (
 )
 from .gateway import (
     AIGateway, AIRouter, AICache, CircuitBreakerConfig, 
-    ProviderConfig, CacheConfig, RoutingStrategy
+    ProviderConfig, CacheConfig, RoutingStrategy, RedisCacheBackend
 )
 from .adapters.agent_adapter import AgentAdapter, AgentConnectionConfig, AgentAppConfig
 from app.core.config import get_settings
+from app.core.redis_client import redis_manager
 
 logger = logging.getLogger(__name__)
 
@@ -45,15 +46,18 @@ class AIGatewayService:
             
             # 创建缓存
             cache_config = CacheConfig(
-                enabled=True,
-                ttl_seconds=300,
-                max_size=1000,
+                enabled=self.settings.AI_GATEWAY_CACHE_ENABLED,
+                ttl_seconds=self.settings.AI_GATEWAY_CACHE_TTL,
+                max_size=self.settings.AI_GATEWAY_CACHE_SIZE,
                 cache_scenarios=[
                     AIScenario.GENERAL_CHAT,
                     AIScenario.SENTIMENT_ANALYSIS
                 ]
             )
-            cache = AICache(cache_config)
+            shared_backend = None
+            if self.settings.AI_GATEWAY_CACHE_BACKEND == "redis":
+                shared_backend = RedisCacheBackend(redis_manager, max_size=cache_config.max_size)
+            cache = AICache(cache_config, shared_backend=shared_backend)
             
             # 创建熔断器配置
             circuit_config = CircuitBreakerConfig(
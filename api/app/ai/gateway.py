@@ -5,16 +5,20 @@ AI Gateway核心组件
 基于企业级微服务架构设计，确保高可用性和可观测性。
 """
 
+import json
 import time
 import logging
-from typing import Dict, List, Any, Optional, Type
-from dataclasses import dataclass, field
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Any, Optional, Tuple, Type
+from dataclasses import dataclass, field, fields
 from enum import Enum
 from datetime import datetime
 
+from app.core.redis_client import RedisClient
 from .interfaces import (
     AIRequest, AIResponse, AIScenario, AIProvider, AIServiceInterface,
-    AIProviderUnavailableError
+    AIProviderUnavailableError, SentimentResponse, SummaryResponse
 )
 
 logger = logging.getLogger(__name__)
@@ -127,28 +131,190 @@ class CircuitBreaker:
         self.half_open_calls = 0
 
 
+class CacheBackend(ABC):
+    """缓存后端接口"""
+
+    @abstractmethod
+    async def get(self, cache_key: str) -> Optional[AIResponse]:
+        ...
+
+    @abstractmethod
+    async def set(self, cache_key: str, response: AIResponse, ttl_seconds: int) -> None:
+        ...
+
+    async def get_with_ttl(self, cache_key: str) -> Optional[Tuple[AIResponse, Optional[float]]]:
+        """获取响应及剩余有效期（秒）；后端无法给出剩余有效期时为 None"""
+        response = await self.get(cache_key)
+        return None if response is None else (response, None)
+
+    @abstractmethod
+    async def size(self) -> int:
+        ...
+
+
+class InMemoryLRUBackend(CacheBackend):
+    """进程内 LRU 缓存，读写与淘汰均为 O(1)"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[float, AIResponse]]" = OrderedDict()
+
+    async def get(self, cache_key: str) -> Optional[AIResponse]:
+        entry = self._entries.get(cache_key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[cache_key]
+            return None
+        self._entries.move_to_end(cache_key)
+        return response
+
+    async def get_with_ttl(self, cache_key: str) -> Optional[Tuple[AIResponse, Optional[float]]]:
+        response = await self.get(cache_key)
+        if response is None:
+            return None
+        return response, self._entries[cache_key][0] - time.monotonic()
+
+    async def set(self, cache_key: str, response: AIResponse, ttl_seconds: int) -> None:
+        self._entries[cache_key] = (time.monotonic() + ttl_seconds, response)
+        self._entries.move_to_end(cache_key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    async def size(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend(CacheBackend):
+    """Redis 共享缓存，多进程/多实例间复用响应
+
+    每条响应存为带 TTL 的字符串键；另维护一个按过期时间排序的索引 ZSET
+    做条目计数与超限淘汰（最早过期的先淘汰）。
+    """
+
+    def __init__(self, redis_client: RedisClient, max_size: int, key_prefix: str = "ai:cache"):
+        self.redis_client = redis_client
+        self.max_size = max_size
+        self.key_prefix = key_prefix
+        self.index_key = f"{key_prefix}:index"
+
+    def _entry_key(self, cache_key: str) -> str:
+        return f"{self.key_prefix}:entry:{cache_key}"
+
+    async def get(self, cache_key: str) -> Optional[AIResponse]:
+        entry = await self.get_with_ttl(cache_key)
+        return None if entry is None else entry[0]
+
+    async def get_with_ttl(self, cache_key: str) -> Optional[Tuple[AIResponse, Optional[float]]]:
+        client = await self.redis_client.get_client()
+        async with client.pipeline(transaction=False) as pipe:
+            pipe.get(self._entry_key(cache_key))
+            pipe.pttl(self._entry_key(cache_key))
+            raw, ttl_ms = await pipe.execute()
+        if raw is None:
+            return None
+        try:
+            response = _decode_response(raw)
+        except Exception as e:
+            logger.warning(f"Discard undecodable cache entry {cache_key}: {e}")
+            await client.delete(self._entry_key(cache_key))
+            return None
+        # PTTL: -1 表示无过期时间，-2 表示键已不存在
+        return response, (ttl_ms / 1000 if ttl_ms is not None and ttl_ms >= 0 else None)
+
+    async def set(self, cache_key: str, response: AIResponse, ttl_seconds: int) -> None:
+        client = await self.redis_client.get_client()
+        now = time.time()
+        async with client.pipeline(transaction=True) as pipe:
+            pipe.set(self._entry_key(cache_key), _encode_response(response), ex=ttl_seconds)
+            pipe.zadd(self.index_key, {cache_key: now + ttl_seconds})
+            pipe.zremrangebyscore(self.index_key, "-inf", now)
+            pipe.zcard(self.index_key)
+            results = await pipe.execute()
+        overflow = results[-1] - self.max_size
+        if overflow > 0:
+            evicted = await client.zpopmin(self.index_key, overflow)
+            if evicted:
+                await client.delete(*[self._entry_key(_to_str(member)) for member, _ in evicted])
+
+    async def size(self) -> int:
+        client = await self.redis_client.get_client()
+        await client.zremrangebyscore(self.index_key, "-inf", time.time())
+        return await client.zcard(self.index_key)
+
+
+def _to_str(value: Any) -> str:
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+_RESPONSE_TYPES: Dict[str, Type[AIResponse]] = {
+    cls.__name__: cls for cls in (AIResponse, SummaryResponse, SentimentResponse)
+}
+
+
+def _encode_response(response: AIResponse) -> str:
+    """将响应序列化为 JSON（保留子类型与全部字段）"""
+    data: Dict[str, Any] = {}
+    for item in fields(response):
+        value = getattr(response, item.name)
+        if isinstance(value, Enum):
+            value = value.value
+        elif isinstance(value, datetime):
+            value = value.isoformat()
+        data[item.name] = value
+    return json.dumps({"type": type(response).__name__, "data": data}, ensure_ascii=False, default=str)
+
+
+def _decode_response(raw: Any) -> AIResponse:
+    payload = json.loads(raw)
+    cls = _RESPONSE_TYPES.get(payload.get("type"), AIResponse)
+    data = payload["data"]
+    data["provider"] = AIProvider(data["provider"])
+    data["scenario"] = AIScenario(data["scenario"])
+    if data.get("timestamp"):
+        data["timestamp"] = datetime.fromisoformat(data["timestamp"])
+    return cls(**data)
+
+
 class AICache:
-    """AI响应缓存"""
+    """AI响应缓存
+
+    进程内 LRU 作为一级缓存；配置 Redis 后端时作为二级共享缓存，
+    二级命中会按剩余有效期回填一级，不会延长条目寿命。
+    """
     
-    def __init__(self, config: CacheConfig):
+    def __init__(self, config: CacheConfig, shared_backend: Optional[CacheBackend] = None):
         self.config = config
-        self.cache: Dict[str, Dict[str, Any]] = {}
+        self.local = InMemoryLRUBackend(config.max_size)
+        self.shared = shared_backend
+        self.hits = 0
+        self.misses = 0
         
     async def get(self, cache_key: str) -> Optional[AIResponse]:
         """获取缓存响应"""
         if not self.config.enabled:
             return None
-            
-        if cache_key not in self.cache:
-            return None
-            
-        cache_entry = self.cache[cache_key]
-        if self._is_expired(cache_entry):
-            del self.cache[cache_key]
+        
+        response = await self.local.get(cache_key)
+        if response is None and self.shared is not None:
+            try:
+                entry = await self.shared.get_with_ttl(cache_key)
+            except Exception as e:
+                logger.warning(f"Shared cache get failed for key {cache_key}: {e}")
+                entry = None
+            if entry is not None:
+                response, remaining = entry
+                ttl_seconds = self.config.ttl_seconds if remaining is None else min(remaining, self.config.ttl_seconds)
+                if ttl_seconds > 0:
+                    await self.local.set(cache_key, response, ttl_seconds)
+        
+        if response is None:
+            self.misses += 1
             return None
-            
+        self.hits += 1
         logger.info(f"Cache hit for key: {cache_key}")
-        return cache_entry['response']
+        return response
     
     async def set(self, cache_key: str, response: AIResponse):
         """设置缓存响应"""
@@ -157,45 +323,29 @@ class AICache:
             
         if response.scenario not in self.config.cache_scenarios:
             return
-            
-        # 清理过期缓存
-        self._cleanup_expired()
         
-        # 检查缓存大小限制
-        if len(self.cache) >= self.config.max_size:
-            self._evict_oldest()
-            
-        self.cache[cache_key] = {
-            'response': response,
-            'timestamp': datetime.now(),
-            'access_count': 0
-        }
+        await self.local.set(cache_key, response, self.config.ttl_seconds)
+        if self.shared is not None:
+            try:
+                await self.shared.set(cache_key, response, self.config.ttl_seconds)
+            except Exception as e:
+                logger.warning(f"Shared cache set failed for key {cache_key}: {e}")
         
         logger.info(f"Cached response for key: {cache_key}")
     
-    def _is_expired(self, cache_entry: Dict[str, Any]) -> bool:
-        """检查缓存是否过期"""
-        timestamp = cache_entry['timestamp']
-        return (datetime.now() - timestamp).seconds > self.config.ttl_seconds
-    
-    def _cleanup_expired(self):
-        """清理过期缓存"""
-        expired_keys = [
-            key for key, entry in self.cache.items()
-            if self._is_expired(entry)
-        ]
-        for key in expired_keys:
-            del self.cache[key]
+    async def size(self) -> int:
+        """缓存条目数（有共享后端时以共享后端为准）"""
+        if self.shared is not None:
+            try:
+                return await self.shared.size()
+            except Exception as e:
+                logger.warning(f"Shared cache size failed: {e}")
+        return await self.local.size()
     
-    def _evict_oldest(self):
-        """移除最旧的缓存条目"""
-        if not self.cache:
-            return
-        oldest_key = min(
-            self.cache.keys(),
-            key=lambda k: self.cache[k]['timestamp']
-        )
-        del self.cache[oldest_key]
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
 
 
 class AIRouter:
@@ -485,13 +635,15 @@ class AIGateway:
             "gateway_status": "healthy",
             "providers": provider_health,
             "cache_stats": {
-                "size": len(self.cache.cache),
+                "size": await self.cache.size(),
                 "max_size": self.cache.config.max_size,
+                "backend": "redis" if self.cache.shared is not None else "memory",
+                "hits": self.cache.hits,
+                "misses": self.cache.misses,
                 "hit_rate": self._calculate_cache_hit_rate()
             }
         }
     
     def _calculate_cache_hit_rate(self) -> float:
         """计算缓存命中率"""
-        # 这里可以实现更复杂的命中率统计
-        return 0.85  # 示例值 
\ No newline at end of file
+        return round(self.cache.hit_rate, 4)
@@ -10,6 +10,8 @@ from typing import Dict, List, Any, Optional, Union
 from enum import Enum
 from dataclasses import dataclass, field
 from datetime import datetime
+import hashlib
+import json
 import uuid
 
 
@@ -70,17 +72,38 @@ class AIRequest:
     
     @property
     def cache_key(self) -> str:
-        """生成缓存键"""
-        # 安全处理message参数，支持字符串和字典类型
-        if isinstance(self.message, dict):
-            message_hash = hash(str(sorted(self.message.items())))
-        else:
-            message_hash = hash(str(self.message))
-        
-        # 安全处理parameters参数
-        params_hash = hash(str(self.parameters)) if self.parameters else hash("")
-        
-        return f"{self.scenario.value}:{message_hash}:{params_hash}"
+        """生成缓存键
+
+        对影响输出的请求字段做规范化 JSON 序列化后取 SHA-256，
+        保证不同进程、重启前后同一请求得到相同的键。上下文（用户、会话、
+        历史、画像、自定义变量）一并计入，避免共享缓存把一个用户的回答
+        返回给另一个用户。
+        """
+        context = None
+        if self.context is not None:
+            context = {
+                "user_id": self.context.user_id,
+                "session_id": self.context.session_id,
+                "conversation_history": self.context.conversation_history,
+                "user_profile": self.context.user_profile,
+                "custom_variables": self.context.custom_variables,
+            }
+        canonical = json.dumps(
+            {
+                "message": self.message,
+                "context": context,
+                "parameters": self.parameters or {},
+                "response_format": self.response_format.value,
+                "max_tokens": self.max_tokens,
+                "temperature": self.temperature,
+            },
+            sort_keys=True,
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=str,
+        )
+        digest = hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+        return f"{self.scenario.value}:{digest}"
 
 
 @dataclass
@@ -2,6 +2,8 @@
 
 from __future__ import annotations
 
+from typing import Callable
+
 from langchain_core.tools import tool
 from sqlalchemy.orm import Session
 
@@ -10,13 +12,30 @@ from app.ai.models.agent_knowledge_base import AgentKnowledgeBase
 from app.ai.rag.index_service import RagIndexService
 
 
-def build_rag_tool(db: Session, agent_config: AgentConfig, kb: AgentKnowledgeBase):
-    rag_service = RagIndexService(db)
+def build_rag_tool(
+    session_factory: Callable[[], Session],
+    agent_config: AgentConfig,
+    kb: AgentKnowledgeBase,
+):
+    """构建知识库检索工具。
+
+    只捕获配置与知识库 ID，检索时在独立会话中重新加载，工具可跨请求缓存复用。
+    """
+    agent_config_id = agent_config.id
+    kb_id = kb.id
 
     @tool("knowledge_retrieval")
     def knowledge_retrieval(query: str) -> str:
         """从 Agent 知识库检索与问题相关的上下文。"""
-        chunks = rag_service.retrieve(agent_config=agent_config, kb=kb, query=query)
+        db = session_factory()
+        try:
+            config = db.get(AgentConfig, agent_config_id)
+            knowledge_base = db.get(AgentKnowledgeBase, kb_id)
+            if config is None or knowledge_base is None:
+                return "未找到相关知识。"
+            chunks = RagIndexService(db).retrieve(agent_config=config, kb=knowledge_base, query=query)
+        finally:
+            db.close()
         if not chunks:
             return "未找到相关知识。"
         return "\n\n---\n\n".join(chunks)
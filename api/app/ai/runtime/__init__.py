@@ -1,6 +1,17 @@
 """Agent 运行时模块。"""
 
+from .agent_cache import AgentGraphCache, CompiledAgent, get_agent_graph_cache
 from .capabilities import AgentCapabilities
 from .llm_factory import LLMFactory
+from .task_registry import AgentTaskRegistry, RedisAgentTaskRegistry, get_agent_task_registry
 
-__all__ = ["AgentCapabilities", "LLMFactory"]
+__all__ = [
+    "AgentCapabilities",
+    "AgentGraphCache",
+    "AgentTaskRegistry",
+    "CompiledAgent",
+    "LLMFactory",
+    "RedisAgentTaskRegistry",
+    "get_agent_graph_cache",
+    "get_agent_task_registry",
+]
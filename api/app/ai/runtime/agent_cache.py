@@ -0,0 +1,77 @@
+"""已编译 Agent 的进程内版本化缓存。"""
+
+from __future__ import annotations
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, Optional
+
+
+@dataclass(frozen=True)
+class CompiledAgent:
+    """已编译的 Agent 图及其工具集。"""
+
+    version: str
+    agent: Any
+    tools: list
+
+
+class AgentGraphCache:
+    """按 Agent 配置 ID 缓存已编译 Agent 图，版本号变化即重建。
+
+    版本号由配置 updated_at、能力配置、工具组修订号与知识库修订号组成，
+    每个配置只保留最新版本；超出容量时淘汰最久未使用的配置。
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, CompiledAgent]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(
+        self,
+        agent_config_id: str,
+        version: str,
+        builder: Callable[[], CompiledAgent],
+    ) -> CompiledAgent:
+        with self._lock:
+            entry = self._entries.get(agent_config_id)
+            if entry is not None and entry.version == version:
+                self._entries.move_to_end(agent_config_id)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        # 构建在锁外进行：并发请求可能重复构建同一版本，结果等价，后写入者覆盖
+        entry = builder()
+        with self._lock:
+            self._entries[agent_config_id] = entry
+            self._entries.move_to_end(agent_config_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, agent_config_id: Optional[str] = None) -> None:
+        with self._lock:
+            if agent_config_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(agent_config_id, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+@lru_cache
+def get_agent_graph_cache() -> AgentGraphCache:
+    return AgentGraphCache()
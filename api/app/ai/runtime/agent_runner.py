@@ -2,9 +2,10 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
-from typing import Any, AsyncIterator, Dict, List, Optional
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
 
 from langchain.agents import create_agent
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
@@ -14,19 +15,23 @@ from app.ai.models.agent_config import AgentConfig
 from app.ai.models.agent_knowledge_base import AgentKnowledgeBase
 from app.ai.models.agent_message import AgentMessage
 from app.ai.rag.retriever_tool import build_rag_tool
+from app.ai.runtime.agent_cache import CompiledAgent, get_agent_graph_cache
 from app.ai.runtime.input_resolver import InputContextResolver
-from app.ai.runtime.mcp_tools import build_mcp_tools_for_groups
+from app.ai.runtime.mcp_tools import build_mcp_tools_for_groups, mcp_tool_groups_revision
 from app.ai.runtime.capabilities import AgentCapabilities
 from app.ai.runtime.llm_factory import LLMFactory
 from app.ai.runtime.sse_emitter import (
-    emit_agent_thought,
-    emit_error,
-    emit_message_chunk,
-    emit_message_end,
+    AgentStreamEvent,
+    AgentThoughtEvent,
+    ErrorEvent,
+    MessageChunkEvent,
+    MessageEndEvent,
+    encode_sse,
     new_task_id,
 )
-from app.ai.runtime.task_registry import AgentTaskRegistry
+from app.ai.runtime.task_registry import AgentTaskRegistry, get_agent_task_registry, iterate_until_cancelled
 from app.ai.utils.stream_buffer import StreamBuffer
+from app.common.deps.database import SessionLocal
 
 logger = logging.getLogger(__name__)
 
@@ -34,27 +39,77 @@ logger = logging.getLogger(__name__)
 class AgentRunner:
     """基于 langchain create_agent + langgraph 的流式 Agent 执行器。"""
 
-    def __init__(self, db: Session):
+    def __init__(
+        self,
+        db: Session,
+        session_factory: Optional[Callable[[], Session]] = None,
+        task_registry: Optional[AgentTaskRegistry] = None,
+    ):
         self.db = db
+        self.session_factory = session_factory or SessionLocal
         self.input_resolver = InputContextResolver(db)
+        self.agent_cache = get_agent_graph_cache()
+        self.task_registry = task_registry or get_agent_task_registry()
+
+    def _load_knowledge_base(self, capabilities: AgentCapabilities) -> Optional[AgentKnowledgeBase]:
+        if not (capabilities.enable_rag and capabilities.knowledge_base_id):
+            return None
+        return (
+            self.db.query(AgentKnowledgeBase)
+            .filter(
+                AgentKnowledgeBase.id == capabilities.knowledge_base_id,
+                AgentKnowledgeBase.enabled.is_(True),
+            )
+            .first()
+        )
 
-    def _build_tools(self, agent_config: AgentConfig, capabilities: AgentCapabilities) -> list:
+    def _build_tools(
+        self,
+        agent_config: AgentConfig,
+        capabilities: AgentCapabilities,
+        kb: Optional[AgentKnowledgeBase],
+    ) -> list:
         tools: list = []
         if capabilities.enable_tools and capabilities.mcp_tool_groups:
-            tools.extend(build_mcp_tools_for_groups(self.db, capabilities.mcp_tool_groups))
-        if capabilities.enable_rag and capabilities.knowledge_base_id:
-            kb = (
-                self.db.query(AgentKnowledgeBase)
-                .filter(
-                    AgentKnowledgeBase.id == capabilities.knowledge_base_id,
-                    AgentKnowledgeBase.enabled.is_(True),
-                )
-                .first()
+            tools.extend(
+                build_mcp_tools_for_groups(self.db, capabilities.mcp_tool_groups, session_factory=self.session_factory)
             )
-            if kb:
-                tools.append(build_rag_tool(self.db, agent_config, kb))
+        if kb is not None:
+            tools.append(build_rag_tool(self.session_factory, agent_config, kb))
         return tools
 
+    def _agent_version(
+        self,
+        agent_config: AgentConfig,
+        capabilities: AgentCapabilities,
+        kb: Optional[AgentKnowledgeBase],
+    ) -> str:
+        """缓存版本号：配置更新时间 + 能力配置 + 工具组修订号 + 知识库修订号。"""
+        tools_revision = "disabled"
+        if capabilities.enable_tools:
+            tools_revision = mcp_tool_groups_revision(self.db, capabilities.mcp_tool_groups)
+        kb_revision = f"{kb.id}:{kb.updated_at}" if kb is not None else "none"
+        capabilities_digest = hashlib.sha256(capabilities.model_dump_json().encode("utf-8")).hexdigest()[:16]
+        return "|".join(
+            [str(agent_config.updated_at), capabilities_digest, tools_revision, kb_revision]
+        )
+
+    def _get_compiled_agent(self, agent_config: AgentConfig, capabilities: AgentCapabilities) -> CompiledAgent:
+        kb = self._load_knowledge_base(capabilities) if capabilities.enable_tools else None
+        version = self._agent_version(agent_config, capabilities, kb)
+
+        def build() -> CompiledAgent:
+            llm = LLMFactory.create_chat_model(agent_config, capabilities, streaming=True)
+            tools = self._build_tools(agent_config, capabilities, kb) if capabilities.enable_tools else []
+            agent = create_agent(
+                model=llm,
+                tools=tools,
+                system_prompt=capabilities.system_prompt or "You are a helpful assistant.",
+            )
+            return CompiledAgent(version=version, agent=agent, tools=tools)
+
+        return self.agent_cache.get_or_build(agent_config.id, version, build)
+
     def _build_langchain_messages(
         self,
         history: List[AgentMessage],
@@ -83,27 +138,43 @@ class AgentRunner:
         message_id: str,
         inputs: Optional[Dict[str, Any]] = None,
     ) -> AsyncIterator[bytes]:
+        """SSE 字节流出口：在 stream_events 基础上逐条编码。"""
+        async for event in self.stream_events(
+            agent_config=agent_config,
+            capabilities=capabilities,
+            history=history,
+            query=query,
+            conversation_id=conversation_id,
+            message_id=message_id,
+            inputs=inputs,
+        ):
+            yield encode_sse(event)
+
+    async def stream_events(
+        self,
+        *,
+        agent_config: AgentConfig,
+        capabilities: AgentCapabilities,
+        history: List[AgentMessage],
+        query: str,
+        conversation_id: str,
+        message_id: str,
+        inputs: Optional[Dict[str, Any]] = None,
+    ) -> AsyncIterator[AgentStreamEvent]:
         task_id = new_task_id()
-        cancel_event = AgentTaskRegistry.register(task_id)
+        cancel_event = await self.task_registry.register(task_id)
         stream_buffer = StreamBuffer()
-        full_answer = ""
+        answer_parts: list[str] = []
 
         try:
-            llm = LLMFactory.create_chat_model(agent_config, capabilities, streaming=True)
-            tools = self._build_tools(agent_config, capabilities) if capabilities.enable_tools else []
-            agent = create_agent(
-                model=llm,
-                tools=tools,
-                system_prompt=capabilities.system_prompt or "You are a helpful assistant.",
-            )
+            agent = self._get_compiled_agent(agent_config, capabilities).agent
 
             lc_messages = self._build_langchain_messages(history, query, inputs)
             input_state = {"messages": lc_messages}
 
-            async for item in agent.astream(input_state, stream_mode=["messages"]):
-                if cancel_event.is_set():
-                    break
-
+            # 取消事件与下一块输出竞争，LLM 卡住时也能及时停止
+            stream = agent.astream(input_state, stream_mode=["messages"])
+            async for item in iterate_until_cancelled(stream, cancel_event):
                 msg_chunk = self._extract_message_chunk(item)
                 if msg_chunk is None or not hasattr(msg_chunk, "content"):
                     continue
@@ -118,17 +189,17 @@ class AgentRunner:
                 if not text_part:
                     continue
 
-                full_answer += text_part
+                answer_parts.append(text_part)
                 normal, think = stream_buffer.process(text_part)
                 if normal:
-                    yield emit_message_chunk(
+                    yield MessageChunkEvent(
                         answer=normal,
                         conversation_id=conversation_id,
                         message_id=message_id,
                         task_id=task_id,
                     )
                 if think:
-                    yield emit_agent_thought(
+                    yield AgentThoughtEvent(
                         thought=think,
                         conversation_id=conversation_id,
                         message_id=message_id,
@@ -137,31 +208,31 @@ class AgentRunner:
 
             normal_remaining, think_remaining = stream_buffer.flush()
             if normal_remaining:
-                yield emit_message_chunk(
+                yield MessageChunkEvent(
                     answer=normal_remaining,
                     conversation_id=conversation_id,
                     message_id=message_id,
                     task_id=task_id,
                 )
             if think_remaining:
-                yield emit_agent_thought(
+                yield AgentThoughtEvent(
                     thought=think_remaining,
                     conversation_id=conversation_id,
                     message_id=message_id,
                     task_id=task_id,
                 )
 
-            yield emit_message_end(
+            yield MessageEndEvent(
                 conversation_id=conversation_id,
                 message_id=message_id,
                 task_id=task_id,
-                metadata={"answer": full_answer},
+                metadata={"answer": "".join(answer_parts)},
             )
         except Exception as exc:
             logger.error("Agent 流式执行失败: %s", exc, exc_info=True)
-            yield emit_error(str(exc))
+            yield ErrorEvent(message=str(exc))
         finally:
-            AgentTaskRegistry.unregister(task_id)
+            await self.task_registry.unregister(task_id)
 
     @staticmethod
     def _extract_message_chunk(item: Any):
@@ -4,10 +4,12 @@ from __future__ import annotations
 
 import json
 import logging
-from typing import Any, List
+import threading
+from typing import Any, Callable, List
 
 from langchain_core.tools import StructuredTool
 from pydantic import BaseModel, Field, create_model
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
 from app.mcp.models.mcp import MCPTool, MCPToolGroup
@@ -15,6 +17,39 @@ from app.mcp.services.mcp_service import MCPToolExecutionService
 
 logger = logging.getLogger(__name__)
 
+# 参数模型缓存：(工具名, 规范化 schema) -> Pydantic 模型，避免每次请求重复 create_model
+_ARGS_MODEL_CACHE: dict[tuple[str, str], type[BaseModel]] = {}
+_ARGS_MODEL_LOCK = threading.Lock()
+
+
+def _cached_args_model(tool_name: str, schema: dict[str, Any]) -> type[BaseModel]:
+    key = (tool_name, json.dumps(schema, sort_keys=True, ensure_ascii=False, default=str))
+    with _ARGS_MODEL_LOCK:
+        model = _ARGS_MODEL_CACHE.get(key)
+        if model is None:
+            model = _schema_to_pydantic(tool_name, schema)
+            _ARGS_MODEL_CACHE[key] = model
+        return model
+
+
+def mcp_tool_groups_revision(db: Session, group_names: List[str]) -> str:
+    """工具组修订号：分组/工具数量与最近更新时间，任一变化即失效已缓存的工具集。"""
+    if not group_names:
+        return "none"
+    row = (
+        db.query(
+            func.count(func.distinct(MCPToolGroup.id)),
+            func.max(MCPToolGroup.updated_at),
+            func.count(MCPTool.id),
+            func.max(MCPTool.updated_at),
+        )
+        .select_from(MCPToolGroup)
+        .outerjoin(MCPTool, MCPTool.group_id == MCPToolGroup.id)
+        .filter(MCPToolGroup.name.in_(group_names))
+        .one()
+    )
+    return ":".join(str(item) for item in row)
+
 
 def _schema_to_pydantic(tool_name: str, schema: dict[str, Any]) -> type[BaseModel]:
     props = schema.get("properties") or {}
@@ -37,9 +72,17 @@ def _schema_to_pydantic(tool_name: str, schema: dict[str, Any]) -> type[BaseMode
     return create_model(f"MCP_{tool_name}_Args", **fields)
 
 
-def build_mcp_tools_for_groups(db: Session, group_names: List[str]) -> list[StructuredTool]:
+def build_mcp_tools_for_groups(
+    db: Session,
+    group_names: List[str],
+    session_factory: Callable[[], Session] | None = None,
+) -> list[StructuredTool]:
+    """构建工具组下的 LangChain 工具。
+
+    传入 session_factory 时，工具每次调用使用独立的短会话执行，
+    构建结果不依赖 db 的生命周期，可跨请求缓存复用。
+    """
     tools: list[StructuredTool] = []
-    execution = MCPToolExecutionService(db)
 
     for group_name in group_names:
         group = (
@@ -57,14 +100,14 @@ def build_mcp_tools_for_groups(db: Session, group_names: List[str]) -> list[Stru
             .all()
         )
         for mcp_tool in mcp_tools:
-            tools.append(_wrap_mcp_tool(db, execution, group.server_code, mcp_tool))
+            tools.append(_wrap_mcp_tool(db, session_factory, group.server_code, mcp_tool))
 
     return tools
 
 
 def _wrap_mcp_tool(
     db: Session,
-    execution: MCPToolExecutionService,
+    session_factory: Callable[[], Session] | None,
     server_code: str,
     mcp_tool: MCPTool,
 ) -> StructuredTool:
@@ -72,19 +115,24 @@ def _wrap_mcp_tool(
         "type": "object",
         "properties": {},
     }
-    args_model = _schema_to_pydantic(mcp_tool.tool_name, schema)
+    args_model = _cached_args_model(mcp_tool.tool_name, schema)
     tool_name = mcp_tool.tool_name
     description = mcp_tool.description or f"MCP 工具 {tool_name}"
 
     async def _run(**kwargs: Any) -> str:
         kwargs.pop("_placeholder", None)
         kwargs = {k: v for k, v in kwargs.items() if v is not None}
-        result = await execution.execute_tool(
-            server_code=server_code,
-            tool_name=tool_name,
-            arguments=kwargs,
-            caller_app_id="langgraph_agent",
-        )
+        session = session_factory() if session_factory else db
+        try:
+            result = await MCPToolExecutionService(session).execute_tool(
+                server_code=server_code,
+                tool_name=tool_name,
+                arguments=kwargs,
+                caller_app_id="langgraph_agent",
+            )
+        finally:
+            if session is not db:
+                session.close()
         content = result.get("content") if isinstance(result, dict) else result
         if isinstance(content, list):
             texts = [c.get("text", "") for c in content if isinstance(c, dict)]
@@ -1,26 +1,120 @@
-"""SSE 事件发射器（保持前端协议兼容）。"""
+"""SSE 事件模型与编码（保持前端协议兼容）。
+
+运行时内部传递结构化事件，只在响应出口处调用 ``encode_sse`` 编码一次；
+安装了 orjson 时使用 orjson，否则回退到标准库 json。
+"""
 
 from __future__ import annotations
 
 import json
 import uuid
+from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Union
+
+try:  # pragma: no cover - 取决于运行环境
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
 
 
 def new_task_id() -> str:
     return str(uuid.uuid4())
 
 
+def _now_ts() -> int:
+    return int(datetime.now().timestamp())
+
+
+@dataclass(frozen=True)
+class MessageChunkEvent:
+    answer: str
+    conversation_id: str
+    message_id: str
+    task_id: str
+    event: str = "message"
+    created_at: int = field(default_factory=_now_ts)
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            "event": self.event,
+            "answer": self.answer,
+            "conversation_id": self.conversation_id,
+            "message_id": self.message_id,
+            "task_id": self.task_id,
+            "id": self.message_id,
+            "created_at": self.created_at,
+        }
+
+
+@dataclass(frozen=True)
+class AgentThoughtEvent:
+    thought: str
+    conversation_id: str
+    message_id: str
+    task_id: str
+    created_at: int = field(default_factory=_now_ts)
+
+    def to_payload(self) -> Dict[str, Any]:
+        return {
+            "event": "agent_thought",
+            "thought": self.thought,
+            "conversation_id": self.conversation_id,
+            "message_id": self.message_id,
+            "task_id": self.task_id,
+            "id": self.message_id,
+            "created_at": self.created_at,
+        }
+
+
+@dataclass(frozen=True)
+class MessageEndEvent:
+    conversation_id: str
+    message_id: str
+    task_id: str
+    metadata: Optional[Dict[str, Any]] = None
+
+    def to_payload(self) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {
+            "event": "message_end",
+            "conversation_id": self.conversation_id,
+            "message_id": self.message_id,
+            "task_id": self.task_id,
+            "id": self.message_id,
+        }
+        if self.metadata:
+            payload["metadata"] = self.metadata
+        return payload
+
+
+@dataclass(frozen=True)
+class ErrorEvent:
+    message: str
+    status: Optional[int] = None
+
+    def to_payload(self) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"event": "error", "message": self.message}
+        if self.status is not None:
+            payload["status"] = self.status
+        return payload
+
+
+AgentStreamEvent = Union[MessageChunkEvent, AgentThoughtEvent, MessageEndEvent, ErrorEvent]
+
+
+def encode_sse(event: AgentStreamEvent) -> bytes:
+    """将结构化事件编码为一条 SSE ``data:`` 帧。"""
+    return emit_event(event.to_payload())
+
+
 def emit_event(payload: Dict[str, Any]) -> bytes:
+    if orjson is not None:
+        return b"data: " + orjson.dumps(payload) + b"\n\n"
     return f"data: {json.dumps(payload, ensure_ascii=False)}\n\n".encode("utf-8")
 
 
 def emit_error(message: str, *, status: Optional[int] = None) -> bytes:
-    payload: Dict[str, Any] = {"event": "error", "message": message}
-    if status is not None:
-        payload["status"] = status
-    return emit_event(payload)
+    return encode_sse(ErrorEvent(message=message, status=status))
 
 
 def emit_message_chunk(
@@ -31,16 +125,14 @@ def emit_message_chunk(
     task_id: str,
     event: str = "message",
 ) -> bytes:
-    return emit_event(
-        {
-            "event": event,
-            "answer": answer,
-            "conversation_id": conversation_id,
-            "message_id": message_id,
-            "task_id": task_id,
-            "id": message_id,
-            "created_at": int(datetime.now().timestamp()),
-        }
+    return encode_sse(
+        MessageChunkEvent(
+            answer=answer,
+            conversation_id=conversation_id,
+            message_id=message_id,
+            task_id=task_id,
+            event=event,
+        )
     )
 
 
@@ -51,16 +143,8 @@ def emit_agent_thought(
     message_id: str,
     task_id: str,
 ) -> bytes:
-    return emit_event(
-        {
-            "event": "agent_thought",
-            "thought": thought,
-            "conversation_id": conversation_id,
-            "message_id": message_id,
-            "task_id": task_id,
-            "id": message_id,
-            "created_at": int(datetime.now().timestamp()),
-        }
+    return encode_sse(
+        AgentThoughtEvent(thought=thought, conversation_id=conversation_id, message_id=message_id, task_id=task_id)
     )
 
 
@@ -71,13 +155,6 @@ def emit_message_end(
     task_id: str,
     metadata: Optional[Dict[str, Any]] = None,
 ) -> bytes:
-    payload: Dict[str, Any] = {
-        "event": "message_end",
-        "conversation_id": conversation_id,
-        "message_id": message_id,
-        "task_id": task_id,
-        "id": message_id,
-    }
-    if metadata:
-        payload["metadata"] = metadata
-    return emit_event(payload)
+    return encode_sse(
+        MessageEndEvent(conversation_id=conversation_id, message_id=message_id, task_id=task_id, metadata=metadata)
+    )
@@ -1,35 +1,228 @@
-"""流式 Agent 任务取消注册表。"""
+"""流式 Agent 任务取消注册表。
+
+``AgentTaskRegistry`` 只在当前进程内生效；多 worker 部署时使用
+``RedisAgentTaskRegistry``：任务归属写入带心跳 TTL 的 Redis 键，
+取消请求通过控制频道广播给持有该任务的 worker。
+"""
 
 from __future__ import annotations
 
 import asyncio
-from typing import Dict
+import logging
+import uuid
+from contextlib import suppress
+from functools import lru_cache
+from typing import AsyncIterator, Dict, Optional, TypeVar
+
+from app.core.config import get_settings
+from app.core.redis_client import RedisClient, redis_manager
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
 
 
 class AgentTaskRegistry:
-    """管理可取消的 Agent 流式任务。"""
+    """管理当前进程内可取消的 Agent 流式任务。"""
 
-    _cancel_events: Dict[str, asyncio.Event] = {}
+    def __init__(self) -> None:
+        self._cancel_events: Dict[str, asyncio.Event] = {}
 
-    @classmethod
-    def register(cls, task_id: str) -> asyncio.Event:
+    async def register(self, task_id: str) -> asyncio.Event:
         event = asyncio.Event()
-        cls._cancel_events[task_id] = event
+        self._cancel_events[task_id] = event
         return event
 
-    @classmethod
-    def cancel(cls, task_id: str) -> bool:
-        event = cls._cancel_events.get(task_id)
+    async def cancel(self, task_id: str) -> bool:
+        event = self._cancel_events.get(task_id)
         if not event:
             return False
         event.set()
         return True
 
-    @classmethod
-    def unregister(cls, task_id: str) -> None:
-        cls._cancel_events.pop(task_id, None)
+    async def unregister(self, task_id: str) -> None:
+        self._cancel_events.pop(task_id, None)
 
-    @classmethod
-    def is_cancelled(cls, task_id: str) -> bool:
-        event = cls._cancel_events.get(task_id)
+    def is_cancelled(self, task_id: str) -> bool:
+        event = self._cancel_events.get(task_id)
         return bool(event and event.is_set())
+
+    def local_task_ids(self) -> list[str]:
+        return list(self._cancel_events)
+
+    async def close(self) -> None:
+        self._cancel_events.clear()
+
+
+class RedisAgentTaskRegistry(AgentTaskRegistry):
+    """跨 worker 的任务注册表。
+
+    - 注册任务时写入 ``{owner_key_prefix}:{task_id} -> instance_id``，后台心跳每
+      ``heartbeat_ttl / 3`` 秒续期；worker 崩溃后归属键随 TTL 自动过期。
+    - 取消时若任务在本进程则直接置位，否则确认归属键存在后向控制频道发布任务 ID，
+      持有该任务的 worker 由监听协程置位本地取消事件。
+    - Redis 不可用时退化为进程内行为，不影响流式请求本身。
+    """
+
+    CONTROL_CHANNEL = "ai:agent_tasks:cancel"
+    OWNER_KEY_PREFIX = "ai:agent_tasks:owner"
+
+    def __init__(
+        self,
+        redis_client: RedisClient,
+        *,
+        heartbeat_ttl: int = 30,
+        instance_id: Optional[str] = None,
+    ) -> None:
+        super().__init__()
+        self.redis_client = redis_client
+        self.heartbeat_ttl = heartbeat_ttl
+        self.instance_id = instance_id or str(uuid.uuid4())
+        self.remote_cancels_received = 0
+        self._pubsub = None
+        self._listener_task: Optional[asyncio.Task] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._start_lock: Optional[asyncio.Lock] = None
+
+    def owner_key(self, task_id: str) -> str:
+        return f"{self.OWNER_KEY_PREFIX}:{task_id}"
+
+    async def register(self, task_id: str) -> asyncio.Event:
+        event = await super().register(task_id)
+        try:
+            # 先完成订阅再写归属键，保证其它 worker 看到归属时取消消息不会丢失
+            await self._ensure_started()
+            client = await self.redis_client.get_client()
+            await client.set(self.owner_key(task_id), self.instance_id, ex=self.heartbeat_ttl)
+        except Exception as e:
+            logger.warning(f"登记 Agent 任务归属失败，仅支持本进程取消: task_id={task_id}, error={e}")
+        return event
+
+    async def cancel(self, task_id: str) -> bool:
+        if await super().cancel(task_id):
+            return True
+        try:
+            if await self.owner_of(task_id) is None:
+                return False
+            await self.redis_client.publish(self.CONTROL_CHANNEL, task_id)
+            return True
+        except Exception as e:
+            logger.error(f"广播 Agent 任务取消失败: task_id={task_id}, error={e}")
+            return False
+
+    async def unregister(self, task_id: str) -> None:
+        await super().unregister(task_id)
+        try:
+            client = await self.redis_client.get_client()
+            await client.delete(self.owner_key(task_id))
+        except Exception as e:
+            logger.warning(f"清理 Agent 任务归属失败: task_id={task_id}, error={e}")
+
+    async def owner_of(self, task_id: str) -> Optional[str]:
+        client = await self.redis_client.get_client()
+        owner = await client.get(self.owner_key(task_id))
+        if isinstance(owner, bytes):
+            owner = owner.decode("utf-8")
+        return owner
+
+    async def close(self) -> None:
+        for task in (self._listener_task, self._heartbeat_task):
+            if task:
+                task.cancel()
+                with suppress(asyncio.CancelledError):
+                    await task
+        self._listener_task = None
+        self._heartbeat_task = None
+        if self._pubsub is not None:
+            with suppress(Exception):
+                await self._pubsub.aclose()
+            self._pubsub = None
+        await super().close()
+
+    async def _ensure_started(self) -> None:
+        if self._listener_task is not None and not self._listener_task.done():
+            return
+        if self._start_lock is None:
+            self._start_lock = asyncio.Lock()
+        async with self._start_lock:
+            if self._listener_task is not None and not self._listener_task.done():
+                return
+            client = await self.redis_client.get_client()
+            self._pubsub = client.pubsub()
+            await self._pubsub.subscribe(self.CONTROL_CHANNEL)
+            self._listener_task = asyncio.create_task(self._cancel_listener())
+            self._heartbeat_task = asyncio.create_task(self._heartbeat_loop())
+            logger.info(f"Agent 任务取消监听已启动 [实例ID: {self.instance_id}]")
+
+    async def _cancel_listener(self) -> None:
+        pubsub = self._pubsub
+        while True:
+            try:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message and message.get("type") == "message":
+                    task_id = message["data"]
+                    if isinstance(task_id, bytes):
+                        task_id = task_id.decode("utf-8")
+                    event = self._cancel_events.get(task_id)
+                    if event is not None:
+                        self.remote_cancels_received += 1
+                        event.set()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Agent 任务取消监听异常: {e}")
+                await asyncio.sleep(1)
+
+    async def _heartbeat_loop(self) -> None:
+        interval = max(self.heartbeat_ttl / 3, 0.1)
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                task_ids = self.local_task_ids()
+                if not task_ids:
+                    continue
+                client = await self.redis_client.get_client()
+                async with client.pipeline(transaction=False) as pipe:
+                    for task_id in task_ids:
+                        pipe.expire(self.owner_key(task_id), self.heartbeat_ttl)
+                    await pipe.execute()
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.warning(f"Agent 任务心跳续期失败: {e}")
+
+
+async def iterate_until_cancelled(stream: AsyncIterator[T], cancel_event: asyncio.Event) -> AsyncIterator[T]:
+    """逐项转发异步流，取消事件置位后立即停止，即使上游正阻塞在下一项上。"""
+    iterator = stream.__aiter__()
+    cancel_waiter = asyncio.ensure_future(cancel_event.wait())
+    try:
+        while True:
+            next_item = asyncio.ensure_future(iterator.__anext__())
+            done, _ = await asyncio.wait({next_item, cancel_waiter}, return_when=asyncio.FIRST_COMPLETED)
+            if next_item not in done:
+                next_item.cancel()
+                with suppress(asyncio.CancelledError, StopAsyncIteration, Exception):
+                    await next_item
+                return
+            try:
+                item = next_item.result()
+            except StopAsyncIteration:
+                return
+            yield item
+            if cancel_event.is_set():
+                return
+    finally:
+        cancel_waiter.cancel()
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            with suppress(Exception):
+                await aclose()
+
+
+@lru_cache
+def get_agent_task_registry() -> AgentTaskRegistry:
+    settings = get_settings()
+    if settings.AGENT_TASK_REGISTRY_BACKEND == "redis":
+        return RedisAgentTaskRegistry(redis_manager, heartbeat_ttl=settings.AGENT_TASK_HEARTBEAT_TTL)
+    return AgentTaskRegistry()
@@ -143,7 +143,7 @@ class AgentChatService:
         user_id: str,
     ) -> Dict[str, Any]:
         self.runtime._load_agent_config(agent_config_id)
-        return self.runtime.stop_message_generation(task_id)
+        return await self.runtime.stop_message_generation(task_id)
 
     async def audio_to_text(
         self,
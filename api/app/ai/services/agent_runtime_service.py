@@ -13,8 +13,8 @@ from app.ai.models.agent_config import AgentConfig
 from app.ai.models.agent_message import AgentMessage
 from app.ai.runtime.agent_runner import AgentRunner
 from app.ai.runtime.capabilities import AgentCapabilities
+from app.ai.runtime.sse_emitter import MessageChunkEvent, encode_sse
 from app.ai.runtime.structured_runner import StructuredLLMRunner
-from app.ai.runtime.task_registry import AgentTaskRegistry
 from app.ai.services.conversation_service import ConversationService
 from app.common.deps.uuid_utils import generate_agent_message_id
 from app.common.services.file_service import FileService
@@ -76,9 +76,9 @@ class AgentRuntimeService:
         history = [m for m in history if not (m.role == "user" and m.content == message)][-19:]
 
         assistant_message_id = generate_agent_message_id()
-        full_answer_parts: list[str] = []
+        answer_parts: list[str] = []
 
-        async for chunk in self.runner.stream_chat(
+        async for event in self.runner.stream_events(
             agent_config=config,
             capabilities=capabilities,
             history=history,
@@ -87,18 +87,11 @@ class AgentRuntimeService:
             message_id=assistant_message_id,
             inputs=inputs,
         ):
-            chunk_str = chunk.decode("utf-8")
-            if '"event": "message"' in chunk_str or '"event": "agent_message"' in chunk_str:
-                try:
-                    data_line = chunk_str.split("data: ", 1)[1].strip()
-                    payload = json.loads(data_line.split("\n")[0])
-                    if payload.get("answer"):
-                        full_answer_parts.append(payload["answer"])
-                except Exception:
-                    pass
-            yield chunk
-
-        answer_text = "".join(full_answer_parts)
+            if isinstance(event, MessageChunkEvent) and event.answer:
+                answer_parts.append(event.answer)
+            yield encode_sse(event)
+
+        answer_text = "".join(answer_parts)
         if answer_text:
             self.conversations.add_message(
                 conversation_id=conv.id,
@@ -194,8 +187,8 @@ class AgentRuntimeService:
             pass
         return []
 
-    def stop_message_generation(self, task_id: str) -> Dict[str, Any]:
-        ok = AgentTaskRegistry.cancel(task_id)
+    async def stop_message_generation(self, task_id: str) -> Dict[str, Any]:
+        ok = await self.runner.task_registry.cancel(task_id)
         return {"result": "success" if ok else "not_found"}
 
     async def audio_to_text(self, agent_config_id: str, audio_file: Any, user_id: str) -> str:
@@ -28,6 +28,10 @@ class StreamBuffer:
             - normal_content: 正常内容（不包含思考过程）
             - think_content: 思考过程内容（流式输出，可能为空）
         """
+        # 快速路径：缓冲区为空且新块不含 '<' 时不可能出现（或截断）标签，整块直接输出
+        if not self.buffer and "<" not in chunk:
+            return ("", chunk) if self.in_reasoning_tag else (chunk, "")
+        
         self.buffer += chunk
         normal_output = []
         think_output = []
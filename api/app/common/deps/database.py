@@ -1,10 +1,13 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.orm.session import Session
-from sqlalchemy.pool import NullPool
-from typing import Generator, Callable, TypeVar, Any
+from sqlalchemy.pool import QueuePool
+from typing import Generator, Callable, TypeVar, Any, Dict
 import logging
-from functools import wraps
+import threading
+import time
+from functools import lru_cache, wraps
 
 F = TypeVar('F', bound=Callable[..., Any])
 
@@ -16,12 +19,156 @@ settings = get_settings()
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# PostgreSQL或其他数据库配置
-engine = create_engine(
-    settings.DATABASE_URL, 
-    poolclass=NullPool,
-    connect_args={"check_same_thread": False} if settings.DATABASE_URL.startswith("sqlite") else {}
-)
+# 各类进程的连接池默认规格：
+# - api: Web 请求与 MCP 调用，并发高、单次短
+# - worker: datahub worker 心跳与任务执行，并发取决于回填线程数
+# - pipeline: 客户洞察等后台管道，与 API 同进程运行，独立小池避免挤占请求连接
+ENGINE_PROFILES: Dict[str, Dict[str, int]] = {
+    "api": {"pool_size": 10, "max_overflow": 20},
+    "worker": {"pool_size": 5, "max_overflow": 5},
+    "pipeline": {"pool_size": 2, "max_overflow": 3},
+}
+
+
+class PoolMetrics:
+    """连接池指标：签出次数、新建连接数、等待耗时与超时次数。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, elapsed: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.wait_seconds_total += elapsed
+            self.wait_seconds_max = max(self.wait_seconds_max, elapsed)
+            if timed_out:
+                self.timeouts += 1
+
+    def incr(self, name: str) -> None:
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "checkins": self.checkins,
+                "connects": self.connects,
+                "timeouts": self.timeouts,
+                "wait_seconds_total": round(self.wait_seconds_total, 6),
+                "wait_seconds_max": round(self.wait_seconds_max, 6),
+                "wait_seconds_avg": round(self.wait_seconds_total / self.checkouts, 6) if self.checkouts else 0.0,
+            }
+
+
+class InstrumentedQueuePool(QueuePool):
+    """记录获取连接等待时间的 QueuePool。"""
+
+    metrics: PoolMetrics
+
+    def _do_get(self):  # type: ignore[override]
+        started = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except (exc.TimeoutError, TimeoutError):
+            self.metrics.record_wait(time.perf_counter() - started, timed_out=True)
+            raise
+        except Exception:
+            # 建连失败等其他错误只计等待耗时，不算作池等待超时
+            self.metrics.record_wait(time.perf_counter() - started)
+            raise
+        self.metrics.record_wait(time.perf_counter() - started)
+        return connection
+
+    def recreate(self):  # type: ignore[override]
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+def create_profile_engine(profile: str, database_url: str | None = None) -> Engine:
+    """按 profile 创建带连接池的引擎；内存 SQLite 无法跨连接共享，保持 SQLAlchemy 默认池。"""
+    if profile not in ENGINE_PROFILES:
+        raise ValueError(f"unknown database engine profile: {profile}")
+    url = database_url or settings.DATABASE_URL
+    is_sqlite = url.startswith("sqlite")
+    connect_args = {"check_same_thread": False} if is_sqlite else {}
+    if is_sqlite and (":memory:" in url or url.rstrip("/") == "sqlite:"):
+        return create_engine(url, connect_args=connect_args)
+
+    options = ENGINE_PROFILES[profile]
+    engine_ = create_engine(
+        url,
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE if settings.DB_POOL_SIZE is not None else options["pool_size"],
+        max_overflow=(
+            settings.DB_POOL_MAX_OVERFLOW if settings.DB_POOL_MAX_OVERFLOW is not None else options["max_overflow"]
+        ),
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+    metrics = PoolMetrics()
+    engine_.pool.metrics = metrics  # type: ignore[attr-defined]
+    event.listen(engine_, "checkout", lambda *_: metrics.incr("checkouts"))
+    event.listen(engine_, "checkin", lambda *_: metrics.incr("checkins"))
+    event.listen(engine_, "connect", lambda *_: metrics.incr("connects"))
+    return engine_
+
+
+_engines: Dict[str, Engine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(profile: str) -> Engine:
+    """获取指定 profile 的进程内共享引擎。"""
+    with _engines_lock:
+        if profile not in _engines:
+            _engines[profile] = create_profile_engine(profile)
+        return _engines[profile]
+
+
+@lru_cache
+def get_session_factory(profile: str) -> sessionmaker:
+    """获取绑定到指定 profile 引擎的会话工厂。"""
+    if profile == settings.DB_POOL_PROFILE:
+        return SessionLocal
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine(profile))
+
+
+def use_engine_profile(profile: str) -> None:
+    """将本进程默认的 SessionLocal 切换到指定 profile（worker 等独立进程启动时调用）。"""
+    SessionLocal.configure(bind=get_engine(profile))
+
+
+def get_pool_metrics() -> Dict[str, Dict[str, Any]]:
+    """返回本进程已创建引擎的连接池状态与指标。"""
+    with _engines_lock:
+        engines = dict(_engines)
+    result: Dict[str, Dict[str, Any]] = {}
+    for profile, engine_ in engines.items():
+        pool = engine_.pool
+        metrics = getattr(pool, "metrics", None)
+        if metrics is None:
+            continue
+        result[profile] = {
+            "pool_size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            # QueuePool.overflow() 在池未填满时为负数（-pool_size 起步），对外只报告实际溢出的连接数
+            "overflow": max(0, pool.overflow()),
+            **metrics.snapshot(),
+        }
+    return result
+
+
+engine = get_engine(settings.DB_POOL_PROFILE)
 
 # 创建会话工厂
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -2,8 +2,9 @@
 Minio客户端配置和工具类
 """
 import logging
+from datetime import datetime
 from functools import lru_cache
-from typing import Optional
+from typing import Iterator, Optional
 from minio import Minio
 from minio.error import S3Error
 
@@ -125,6 +126,13 @@ class MinioClient:
         except S3Error:
             return False
 
+    def get_object_etag(self, object_name: str) -> Optional[str]:
+        """读取对象 ETag，不存在时返回 None。"""
+        try:
+            return self.client.stat_object(self.bucket_name, object_name).etag
+        except S3Error:
+            return None
+
     def get_object_bytes(self, object_name: str) -> bytes:
         """读取对象二进制内容。"""
         try:
@@ -138,6 +146,13 @@ class MinioClient:
             logger.error(f"读取对象失败: {object_name}, {e}")
             raise
     
+    def list_objects(self, prefix: str) -> Iterator[tuple[str, Optional[datetime]]]:
+        """递归列出前缀下的对象，逐个产出 (对象名, 最后修改时间)。"""
+        for item in self.client.list_objects(self.bucket_name, prefix=prefix, recursive=True):
+            if item.is_dir:
+                continue
+            yield item.object_name, item.last_modified
+
     def get_file_url(self, object_name: str, expires: int = 3600) -> Optional[str]:
         """
         获取文件的预签名URL
@@ -3,13 +3,16 @@ WebSocket连接管理器 - 负责连接生命周期管理
 """
 import asyncio
 import logging
-from typing import Dict, Set, Optional, Any
+from typing import Awaitable, Callable, Dict, List, Set, Optional, Any
 from datetime import datetime
 import uuid
 from fastapi import WebSocket
 
 logger = logging.getLogger(__name__)
 
+# 用户级连接事件回调：(event_type, user_id)，event_type 为 user_connected / user_disconnected
+UserEventHandler = Callable[[str, str], Awaitable[None]]
+
 
 class ConnectionLimitExceeded(Exception):
     """连接数量超限异常"""
@@ -28,12 +31,26 @@ class ConnectionManager:
         self.connection_metadata: Dict[WebSocket, Dict[str, Any]] = {}  # WebSocket -> 元数据
         self.websocket_to_connection_id: Dict[WebSocket, str] = {}      # WebSocket -> connection_id
         
+        # 用户首个连接建立 / 最后一个连接断开时的回调
+        self._user_event_handlers: List[UserEventHandler] = []
+        
         # 并发控制
         self._lock = asyncio.Lock()
         
         # 实例标识
         self.instance_id = str(uuid.uuid4())[:8]
     
+    def add_user_event_handler(self, handler: UserEventHandler) -> None:
+        """注册用户级连接事件回调"""
+        self._user_event_handlers.append(handler)
+    
+    async def _emit_user_event(self, event_type: str, user_id: str) -> None:
+        for handler in self._user_event_handlers:
+            try:
+                await handler(event_type, user_id)
+            except Exception as e:
+                logger.error(f"用户连接事件回调失败: event={event_type}, user_id={user_id}, error={e}")
+    
     async def connect(self, user_id: str, websocket: WebSocket, 
                      metadata: Optional[Dict[str, Any]] = None, 
                      connection_id: Optional[str] = None) -> str:
@@ -55,7 +72,8 @@ class ConnectionManager:
                     connection_id = f"{user_id}_{self.instance_id}_{int(datetime.now().timestamp() * 1000)}"
                 
                 # 添加到连接管理
-                if user_id not in self.connections_by_user:
+                is_first_connection = user_id not in self.connections_by_user
+                if is_first_connection:
                     self.connections_by_user[user_id] = set()
                 self.connections_by_user[user_id].add(websocket)
                 
@@ -73,6 +91,9 @@ class ConnectionManager:
                     "metadata": metadata or {}
                 }
                 
+                if is_first_connection:
+                    await self._emit_user_event("user_connected", user_id)
+                
                 logger.info(f"连接建立成功: user_id={user_id}, connection_id={connection_id}")
                 return connection_id
                 
@@ -96,14 +117,19 @@ class ConnectionManager:
             if websocket in self.websocket_to_connection_id:
                 del self.websocket_to_connection_id[websocket]
             
+            user_gone = False
             if user_id in self.connections_by_user:
                 self.connections_by_user[user_id].discard(websocket)
                 if not self.connections_by_user[user_id]:
                     del self.connections_by_user[user_id]
+                    user_gone = True
             
             # 清理元数据
             del self.connection_metadata[websocket]
             
+            if user_gone:
+                await self._emit_user_event("user_disconnected", user_id)
+            
             logger.info(f"连接断开: user_id={user_id}, connection_id={connection_id}")
             return connection_id
             
@@ -4,6 +4,7 @@
 import asyncio
 import json
 import logging
+import zlib
 from typing import Dict, Any, Optional, Set
 from datetime import datetime
 from fastapi import WebSocket
@@ -29,7 +30,8 @@ class MessageRouter:
     def __init__(self, redis_client: RedisClient, 
                  max_message_size: int = 1024 * 1024,  # 1MB
                  rate_limit_window: int = 60,  # 秒
-                 rate_limit_max_messages: int = 100):
+                 rate_limit_max_messages: int = 100,
+                 shard_count: int = 256):
         self.redis_client = redis_client
         self.max_message_size = max_message_size
         self.rate_limit_window = rate_limit_window
@@ -39,12 +41,21 @@ class MessageRouter:
         self.message_counters: Dict[str, Dict[str, int]] = {}  # user_id -> {timestamp: count}
         
         # Redis频道配置
+        # 按用户发送的消息发布到用户所在分片频道，实例只订阅本地有连接用户的分片；
+        # 只知道连接ID的设备消息仍走全局广播频道
         self.broadcast_channel = "ws:broadcast"
         self.presence_channel = "ws:presence"
+        self.shard_channel_prefix = "ws:shard"
+        self.shard_count = max(1, shard_count)
         
         # 实例标识
         self.instance_id = f"router_{datetime.now().timestamp()}"
     
+    def channel_for_user(self, user_id: str) -> str:
+        """用户消息所在的分片频道（crc32 取模，跨进程稳定）"""
+        shard = zlib.crc32(user_id.encode("utf-8")) % self.shard_count
+        return f"{self.shard_channel_prefix}:{shard}"
+    
     def _make_serializable(self, obj: Any) -> Any:
         """确保对象是可序列化的"""
         if isinstance(obj, dict):
@@ -117,11 +128,12 @@ class MessageRouter:
                 "timestamp": datetime.now().isoformat()
             }
             
-            # 发布到Redis
+            # 发布到目标用户的分片频道
             # 注意：Redis Pub/Sub的特性是发布者不会收到自己发布的消息
             # 所以如果目标用户在当前实例，需要在调用此方法前先检查并直接发送
-            await self.redis_client.publish(self.broadcast_channel, json.dumps(message))
-            logger.info(f"[路由] 消息已发布到Redis: user_id={user_id}, action={payload.get('action')}, message_id={payload.get('data', {}).get('id')}, instance_id={self.instance_id}, channel={self.broadcast_channel}")
+            channel = self.channel_for_user(user_id)
+            await self.redis_client.publish(channel, json.dumps(message))
+            logger.info(f"[路由] 消息已发布到Redis: user_id={user_id}, action={payload.get('action')}, message_id={payload.get('data', {}).get('id')}, instance_id={self.instance_id}, channel={channel}")
             
         except Exception as e:
             logger.error(f"[路由] 发送消息到用户失败: user_id={user_id}, error={e}", exc_info=True)
@@ -164,7 +176,7 @@ class MessageRouter:
                 "timestamp": datetime.now().isoformat()
             }
             
-            await self.redis_client.publish(self.broadcast_channel, json.dumps(message))
+            await self.redis_client.publish(self.channel_for_user(user_id), json.dumps(message))
             logger.debug(f"消息已发布到Redis（按设备类型）: user_id={user_id}, device_type={device_type}")
             
         except Exception as e:
@@ -30,7 +30,8 @@ class WebSocketCoordinator:
                  max_connections_per_user: int = 5,
                  max_message_size: int = 1024 * 1024,  # 1MB
                  rate_limit_window: int = 60,  # 秒
-                 rate_limit_max_messages: int = 100):
+                 rate_limit_max_messages: int = 100,
+                 shard_count: int = 256):
         
         # 初始化各个专门的管理器
         self.connection_manager = ConnectionManager(max_connections_per_user)
@@ -38,7 +39,8 @@ class WebSocketCoordinator:
             redis_client, 
             max_message_size, 
             rate_limit_window, 
-            rate_limit_max_messages
+            rate_limit_max_messages,
+            shard_count,
         )
         self.presence_manager = PresenceManager(redis_client)
         
@@ -53,12 +55,27 @@ class WebSocketCoordinator:
         self.presence_task: Optional[asyncio.Task] = None
         self.cleanup_task: Optional[asyncio.Task] = None
         
+        # 分片订阅：频道 -> 本地有连接的用户，随用户上下线增减订阅
+        self._pubsub = None
+        self._shard_users: Dict[str, Set[str]] = {}
+        self._subscription_lock = asyncio.Lock()
+        self.connection_manager.add_user_event_handler(self._on_user_event)
+        
+        # 本实例处理过的广播消息数
+        self.broadcast_messages_processed = 0
+        
         # 锁，用于保护并发操作
         self._lock = asyncio.Lock()
     
     async def initialize(self):
         """初始化协调器，启动Redis监听器"""
         try:
+            # 先建立订阅，再启动监听器，保证 initialize 返回后分片订阅即时生效
+            redis_client = await self.redis_client.get_client()
+            self._pubsub = redis_client.pubsub()
+            async with self._subscription_lock:
+                await self._pubsub.subscribe(self.message_router.broadcast_channel, *self._shard_users.keys())
+            
             # 启动消息广播监听器
             self.pubsub_task = asyncio.create_task(self._broadcast_listener())
             
@@ -90,6 +107,10 @@ class WebSocketCoordinator:
                     except asyncio.CancelledError:
                         pass
             
+            if self._pubsub is not None:
+                await self._pubsub.aclose()
+                self._pubsub = None
+            
             # 清理所有本地连接的在线状态
             for user_id in list(self.connection_manager.connections_by_user.keys()):
                 await self.presence_manager.remove_user_from_online(user_id)
@@ -98,33 +119,54 @@ class WebSocketCoordinator:
         except Exception as e:
             logger.error(f"清理WebSocket协调器失败: {e}")
     
+    async def _on_user_event(self, event_type: str, user_id: str):
+        """用户首个连接建立时订阅其分片频道，最后一个连接断开时退订"""
+        channel = self.message_router.channel_for_user(user_id)
+        async with self._subscription_lock:
+            users = self._shard_users.setdefault(channel, set())
+            if event_type == "user_connected":
+                users.add(user_id)
+                if len(users) == 1 and self._pubsub is not None:
+                    await self._pubsub.subscribe(channel)
+                    logger.debug(f"[分片订阅] 订阅 {channel}, 实例ID={self.instance_id}")
+            elif event_type == "user_disconnected":
+                users.discard(user_id)
+                if not users:
+                    del self._shard_users[channel]
+                    if self._pubsub is not None:
+                        await self._pubsub.unsubscribe(channel)
+                        logger.debug(f"[分片订阅] 退订 {channel}, 实例ID={self.instance_id}")
+    
+    def get_subscribed_shards(self) -> Set[str]:
+        """当前实例订阅中的分片频道"""
+        return set(self._shard_users.keys())
+    
     async def _broadcast_listener(self):
-        """监听广播频道的后台任务"""
-        redis_client = await self.redis_client.get_client()
-        async with redis_client.pubsub() as pubsub:
-            await pubsub.subscribe(self.message_router.broadcast_channel)
-            logger.info(f"[监听器] 开始监听广播频道: {self.message_router.broadcast_channel}, 实例ID={self.instance_id}")
-            
-            while True:
-                try:
-                    message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
-                    if message:
-                        logger.debug(f"[监听器] 收到Redis消息: type={message.get('type')}, channel={message.get('channel')}")
-                        if message.get("type") == "message":
-                            try:
-                                data = json.loads(message["data"])
-                                logger.info(f"[监听器] 解析广播消息: target_user_id={data.get('target_user_id')}, instance_id={data.get('instance_id')}, 当前实例={self.instance_id}")
-                                await self._handle_broadcast_message(data)
-                            except json.JSONDecodeError as e:
-                                logger.error(f"[监听器] JSON解析失败: {e}, raw_data={message.get('data')}")
-                            except Exception as e:
-                                logger.error(f"[监听器] 处理广播消息异常: {e}", exc_info=True)
-                except asyncio.CancelledError:
-                    logger.info("[监听器] 广播监听器已取消")
-                    break
-                except Exception as e:
-                    logger.error(f"[监听器] 广播监听器异常: {e}", exc_info=True)
-                    await asyncio.sleep(1)
+        """监听广播频道与本地用户分片频道的后台任务"""
+        pubsub = self._pubsub
+        logger.info(f"[监听器] 开始监听广播频道: {self.message_router.broadcast_channel}, 实例ID={self.instance_id}")
+        
+        while True:
+            try:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message:
+                    logger.debug(f"[监听器] 收到Redis消息: type={message.get('type')}, channel={message.get('channel')}")
+                    if message.get("type") == "message":
+                        self.broadcast_messages_processed += 1
+                        try:
+                            data = json.loads(message["data"])
+                            logger.debug(f"[监听器] 解析广播消息: target_user_id={data.get('target_user_id')}, instance_id={data.get('instance_id')}, 当前实例={self.instance_id}")
+                            await self._handle_broadcast_message(data)
+                        except json.JSONDecodeError as e:
+                            logger.error(f"[监听器] JSON解析失败: {e}, raw_data={message.get('data')}")
+                        except Exception as e:
+                            logger.error(f"[监听器] 处理广播消息异常: {e}", exc_info=True)
+            except asyncio.CancelledError:
+                logger.info("[监听器] 广播监听器已取消")
+                break
+            except Exception as e:
+                logger.error(f"[监听器] 广播监听器异常: {e}", exc_info=True)
+                await asyncio.sleep(1)
     
     async def _presence_listener(self):
         """监听在线状态变化的后台任务"""
@@ -197,6 +239,9 @@ class WebSocketCoordinator:
             
             # 按用户ID和设备类型发送
             target_user_id = parsed_data.get("target_user_id")
+            if target_user_id and not self.connection_manager.is_user_connected(target_user_id):
+                # 同一分片的其他用户在本实例，目标用户不在，直接丢弃
+                return
             target_device_type = parsed_data.get("target_device_type")
             if target_user_id and target_device_type:
                 await self._send_to_local_user_device_type(target_user_id, target_device_type, payload)
@@ -433,6 +478,8 @@ class WebSocketCoordinator:
                 "instance_id": self.instance_id,
                 "local_connections": self.connection_manager.get_total_connection_count(),
                 "local_users": self.connection_manager.get_total_user_count(),
+                "subscribed_shards": len(self._shard_users),
+                "broadcast_messages_processed": self.broadcast_messages_processed,
                 "presence": presence_stats,
                 "timestamp": datetime.now().isoformat()
             }
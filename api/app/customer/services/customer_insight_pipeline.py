@@ -12,14 +12,15 @@
 import asyncio
 import logging
 
-from app.common.deps.database import SessionLocal
+from app.common.deps.database import get_session_factory
 from app.customer.services.customer_insight_ai_service import CustomerInsightAIService
 
 logger = logging.getLogger(__name__)
 
 
 async def _run_customer_insight_job(customer_id: str, conversation_id: str, message_id: str) -> None:
-    db = SessionLocal()
+    # 后台管道使用独立的小连接池，避免挤占 API 请求连接
+    db = get_session_factory("pipeline")()
     try:
         service = CustomerInsightAIService(db=db)
         await service.analyze_and_persist_from_message(
@@ -26,3 +26,51 @@ DATASET_LABELS: Final[dict[str, str]] = {
 
 def get_dataset_label(dataset_key: str) -> str:
     return DATASET_LABELS.get(dataset_key, dataset_key)
+
+
+# 各数据集的质量规则集，由 app.datahub.quality 按列向量化执行。
+# - check: positive（列值需 > 0，按行计数）、required（不可为空/空串/0）、
+#   missing_values（所有单元格中的 null/""/"NaN"）、not_greater（首列不得大于次列）、unique（组合列不得重复）
+# - 得分 = 100 - 问题数 / 行数 × score_scale；问题数不超过 max(p1_min_issues, int(行数 × p1_ratio)) 为 p1，否则 p0
+QUALITY_RULE_SETS: Final[dict[str, dict]] = {
+    "market_daily": {
+        "rules": [
+            {
+                "rule": "price_positive_check",
+                "check": "positive",
+                "columns": ["open", "high", "low", "close"],
+                "message": "存在价格小于等于0的记录",
+            },
+        ],
+        "score_scale": 100.0,
+        "p1_min_issues": 1,
+        "p1_ratio": 0.05,
+    },
+    "security_master": {
+        "rules": [
+            {"rule": "symbol_required", "check": "required", "columns": ["symbol"]},
+            {"rule": "name_required", "check": "required", "columns": ["name"]},
+        ],
+        "score_scale": 100.0,
+        "p1_min_issues": 1,
+        "p1_ratio": 0.1,
+    },
+    "trading_calendar": {
+        "rules": [
+            {"rule": "trade_date_required", "check": "required", "columns": ["trade_date"]},
+        ],
+        "score_scale": 100.0,
+        "p1_min_issues": 1,
+        "p1_ratio": 0.1,
+    },
+    # 扩展数据集按缺失单元格计分：每个缺失值扣 1 / 行数 分
+    **{
+        dataset: {
+            "rules": [{"rule": "missing_values", "check": "missing_values"}],
+            "score_scale": 1.0,
+            "p1_min_issues": 5,
+            "p1_ratio": 0.1,
+        }
+        for dataset in EXTENDED_DATASETS
+    },
+}
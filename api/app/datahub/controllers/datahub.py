@@ -8,11 +8,13 @@ from app.identity_access.deps import get_current_admin
 from app.identity_access.models.user import User
 from app.datahub.deps import (
     get_context_export_service,
+    get_datahub_board_snapshot_service,
     get_datahub_metadata_service,
     get_datahub_service,
     get_datahub_watchlist_service,
     get_daily_brief_service,
     get_market_daily_read_service,
+    get_security_master_read_service,
 )
 from app.datahub.schemas.daily_brief import (
     DailyBriefContextInfo,
@@ -43,15 +45,18 @@ from app.datahub.schemas.datahub import (
     DatahubWatchlistUpdate,
     DatahubWatchlistSymbolSummary,
     MarketDailyBarInfo,
+    SecurityMasterSearchItem,
     WatchlistBoardResponse,
 )
 from app.datahub.services import (
     ContextExportService,
     DailyBriefService,
+    DatahubBoardSnapshotService,
     DatahubMetadataService,
     DatahubService,
     DatahubWatchlistService,
     MarketDailyReadService,
+    SecurityMasterReadService,
 )
 
 router = APIRouter()
@@ -94,8 +99,8 @@ def purge_job_runs(
     service: DatahubService = Depends(get_datahub_service),
     _: User = Depends(get_current_admin),
 ) -> ApiResponse[PurgeJobRunsResult]:
-    deleted = service.purge_job_runs(status=payload.status, limit=payload.limit)
-    return ApiResponse.success(data=PurgeJobRunsResult(deleted_count=deleted), message="purge job runs success")
+    data = service.purge_job_runs(status=payload.status, limit=payload.limit)
+    return ApiResponse.success(data=data, message="purge job runs success")
 
 
 @router.post("/jobs/backfill", response_model=ApiResponse[DatahubJobRunInfo], status_code=status.HTTP_201_CREATED)
@@ -265,6 +270,7 @@ def scan_market_daily_missing(
     end_date: date = Query(...),
     reference_date: date | None = Query(None),
     limit: int = Query(500, ge=1, le=5000),
+    resume: bool = Query(True, description="从未完成的扫描检查点继续"),
     service: DatahubService = Depends(get_datahub_service),
     _: User = Depends(get_current_admin),
 ) -> ApiResponse[MarketDailyMissingScanResult]:
@@ -273,6 +279,7 @@ def scan_market_daily_missing(
         end_date=end_date,
         reference_date=reference_date,
         limit=limit,
+        resume=resume,
     )
     return ApiResponse.success(data=data, message="scan market daily missing success")
 
@@ -289,6 +296,7 @@ def fill_market_daily_missing(
         reference_date=payload.reference_date,
         max_symbols=payload.max_symbols,
         batch_size=payload.batch_size,
+        max_run_cost=payload.max_run_cost,
     )
     return ApiResponse.success(data=data, message="fill market daily missing queued")
 
@@ -393,7 +401,7 @@ def delete_watchlist_item(
 @router.get("/watchlist/board", response_model=ApiResponse[WatchlistBoardResponse])
 def get_watchlist_board(
     limit_days: int = Query(30, ge=5, le=365),
-    service: DatahubWatchlistService = Depends(get_datahub_watchlist_service),
+    service: DatahubBoardSnapshotService = Depends(get_datahub_board_snapshot_service),
     _: User = Depends(get_current_admin),
 ) -> ApiResponse[WatchlistBoardResponse]:
     return ApiResponse.success(data=service.get_board(limit_days=limit_days), message="get watchlist board success")
@@ -412,6 +420,19 @@ def get_market_daily_bars(
     return ApiResponse.success(data=data, message="get market daily bars success")
 
 
+@router.get("/security-master/search", response_model=ApiResponse[list[SecurityMasterSearchItem]])
+def search_security_master(
+    q: str = Query(..., min_length=1, description="代码或名称前缀"),
+    exchange: str | None = Query(None, description="交易所：SSE/SZSE 或 SH/SZ"),
+    limit: int = Query(20, ge=1, le=200),
+    service: SecurityMasterReadService = Depends(get_security_master_read_service),
+    _: User = Depends(get_current_admin),
+) -> ApiResponse[list[SecurityMasterSearchItem]]:
+    rows = service.search(q, exchange=exchange, limit=limit)
+    data = [SecurityMasterSearchItem.model_validate(row) for row in rows]
+    return ApiResponse.success(data=data, message="search security master success")
+
+
 @router.get("/watchlist/symbol/{symbol}/summary", response_model=ApiResponse[DatahubWatchlistSymbolSummary])
 def get_watchlist_symbol_summary(
     symbol: str,
@@ -1,17 +1,21 @@
 from .datahub_deps import (
     get_context_export_service,
+    get_datahub_board_snapshot_service,
     get_datahub_metadata_service,
     get_datahub_service,
     get_datahub_watchlist_service,
     get_daily_brief_service,
     get_market_daily_read_service,
+    get_security_master_read_service,
 )
 
 __all__ = [
     "get_datahub_service",
     "get_datahub_metadata_service",
     "get_datahub_watchlist_service",
+    "get_datahub_board_snapshot_service",
     "get_market_daily_read_service",
+    "get_security_master_read_service",
     "get_daily_brief_service",
     "get_context_export_service",
 ]
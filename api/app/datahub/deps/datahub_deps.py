@@ -5,10 +5,12 @@ from app.common.deps import get_db
 from app.datahub.services import (
     ContextExportService,
     DailyBriefService,
+    DatahubBoardSnapshotService,
     DatahubMetadataService,
     DatahubService,
     DatahubWatchlistService,
     MarketDailyReadService,
+    SecurityMasterReadService,
 )
 
 
@@ -24,10 +26,18 @@ def get_datahub_watchlist_service(db: Session = Depends(get_db)) -> DatahubWatch
     return DatahubWatchlistService(db)
 
 
+def get_datahub_board_snapshot_service(db: Session = Depends(get_db)) -> DatahubBoardSnapshotService:
+    return DatahubBoardSnapshotService(db)
+
+
 def get_market_daily_read_service(db: Session = Depends(get_db)) -> MarketDailyReadService:
     return MarketDailyReadService(db)
 
 
+def get_security_master_read_service(db: Session = Depends(get_db)) -> SecurityMasterReadService:
+    return SecurityMasterReadService(db)
+
+
 def get_daily_brief_service(db: Session = Depends(get_db)) -> DailyBriefService:
     return DailyBriefService(db=db)
 
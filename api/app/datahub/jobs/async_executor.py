@@ -1,9 +1,11 @@
 import logging
 
 from app.common.deps.database import SessionLocal
+from app.datahub.enums import DatahubTaskStatus
 from app.datahub.schemas.datahub import TriggerBackfillRequest, TriggerDailyIncrementalRequest
 from app.datahub.models import DatahubJobRun
 from app.datahub.services import (
+    DatahubBoardSnapshotService,
     DatahubService,
     ExtendedDatasetSyncService,
     MarketDailyBackfillService,
@@ -15,6 +17,20 @@ from app.datahub.services import (
 logger = logging.getLogger(__name__)
 
 
+def _refresh_board_snapshots(service: DatahubService, *, recompute: bool) -> None:
+    """作业结束后更新自选股看板快照：market_daily 日线增量成功时重算，其余作业结束时仅标记失效。"""
+    db = service.db
+    try:
+        board_service = DatahubBoardSnapshotService(db)
+        if recompute:
+            board_service.refresh()
+        else:
+            board_service.invalidate()
+    except Exception as exc:
+        db.rollback()
+        logger.warning("自选股看板快照更新失败: %s", exc, exc_info=True)
+
+
 def _execute_backfill_with_db(run_id: str, payload_data: dict, service: DatahubService) -> None:
     db = service.db
     try:
@@ -36,14 +52,18 @@ def _execute_backfill_with_db(run_id: str, payload_data: dict, service: DatahubS
     except Exception as exc:
         logger.error("Backfill background execution failed: %s", exc, exc_info=True)
         service.mark_run_failed(run_id, str(exc))
+    finally:
+        _refresh_board_snapshots(service, recompute=False)
 
 
 def _execute_daily_with_db(run_id: str, payload_data: dict, service: DatahubService) -> None:
     db = service.db
+    recompute = False
     try:
         payload = TriggerDailyIncrementalRequest.model_validate(payload_data)
         if payload.dataset == "market_daily":
             MarketDailyIncrementalService(db).execute(run_id, payload)
+            recompute = _run_succeeded(db, run_id)
             return
         if payload.dataset == "security_master":
             SecurityMasterSyncService(db).execute_daily_incremental(run_id, payload)
@@ -59,6 +79,13 @@ def _execute_daily_with_db(run_id: str, payload_data: dict, service: DatahubServ
     except Exception as exc:
         logger.error("Daily incremental background execution failed: %s", exc, exc_info=True)
         service.mark_run_failed(run_id, str(exc))
+    finally:
+        _refresh_board_snapshots(service, recompute=recompute)
+
+
+def _run_succeeded(db, run_id: str) -> bool:
+    status = db.query(DatahubJobRun.status).filter(DatahubJobRun.id == run_id).scalar()
+    return status == DatahubTaskStatus.SUCCESS.value
 
 
 def execute_run_by_id(run_id: str) -> None:
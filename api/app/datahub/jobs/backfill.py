@@ -2,9 +2,9 @@ import argparse
 import logging
 from typing import Sequence
 
-from app.common.deps.database import SessionLocal
+from app.common.deps.database import SessionLocal, use_engine_profile
 from app.core.api import BusinessException
-from app.datahub.jobs.async_executor import execute_backfill_in_background
+from app.datahub.jobs.worker import DatahubWorker, cli_worker_name
 from app.datahub.schemas.datahub import TriggerBackfillRequest
 from app.datahub.services import DatahubService
 
@@ -18,6 +18,7 @@ def main(argv: Sequence[str] | None = None) -> None:
     parser.add_argument("--end", required=True, dest="end_date")
     parser.add_argument("--symbol", required=False)
     args = parser.parse_args(argv)
+    use_engine_profile("worker")
 
     db = SessionLocal()
     try:
@@ -28,10 +29,16 @@ def main(argv: Sequence[str] | None = None) -> None:
             end_date=args.end_date,
             symbol=args.symbol,
         )
-        run = service.create_backfill_job(request, trigger_source="cli")
+        worker = DatahubWorker(worker_name=cli_worker_name())
+        run = service.create_backfill_job(
+            request,
+            trigger_source="cli",
+            claimed_by=worker.worker_name,
+            lease_seconds=worker.lease_seconds,
+        )
         logger.info("Created backfill run: %s", run.id)
 
-        execute_backfill_in_background(run.id, request.model_dump(mode="python"))
+        worker.run_claimed(run.id)
         logger.info("%s backfill finished: %s", request.dataset, run.id)
     except BusinessException as exc:
         logger.error("backfill 业务错误: %s", exc.message, exc_info=True)
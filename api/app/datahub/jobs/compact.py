@@ -0,0 +1,60 @@
+import argparse
+import logging
+from datetime import date
+from typing import Sequence
+
+from app.common.deps.database import SessionLocal, use_engine_profile
+from app.core.api import BusinessException
+from app.datahub.services import MarketDailyCompactionService
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="DataHub market_daily 按月分区迁移/合并")
+    parser.add_argument("--start", required=True, dest="start_date", type=date.fromisoformat)
+    parser.add_argument("--end", required=True, dest="end_date", type=date.fromisoformat)
+    parser.add_argument("--symbol", action="append", dest="symbols", help="可重复传入；缺省为全部已有水位的 symbol")
+    parser.add_argument(
+        "--prune-superseded",
+        action="store_true",
+        dest="prune_superseded",
+        help="合并后删除日期范围被最新批次完全覆盖的单 symbol 对象与旧月度对象（默认保留）",
+    )
+    args = parser.parse_args(argv)
+    use_engine_profile("worker")
+
+    db = SessionLocal()
+    try:
+        service = MarketDailyCompactionService(db)
+        # 按自然年分段合并，控制单次内存占用
+        for year in range(args.start_date.year, args.end_date.year + 1):
+            chunk_start = max(args.start_date, date(year, 1, 1))
+            chunk_end = min(args.end_date, date(year, 12, 31))
+            result = service.compact(
+                start_date=chunk_start,
+                end_date=chunk_end,
+                symbols=args.symbols,
+                prune_superseded=args.prune_superseded,
+            )
+            logger.info(
+                "market_daily compacted %s~%s: symbols=%s months=%s rows=%s pruned=%s",
+                chunk_start,
+                chunk_end,
+                result.symbol_count,
+                result.month_count,
+                result.row_count,
+                result.pruned_objects,
+            )
+    except BusinessException as exc:
+        logger.error("compact 业务错误: %s", exc.message, exc_info=True)
+        raise
+    except Exception as exc:
+        logger.error("compact 失败: %s", exc, exc_info=True)
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,9 @@ import argparse
 import logging
 from typing import Sequence
 
-from app.common.deps.database import SessionLocal
+from app.common.deps.database import SessionLocal, use_engine_profile
 from app.core.api import BusinessException
-from app.datahub.jobs.async_executor import execute_daily_incremental_in_background
+from app.datahub.jobs.worker import DatahubWorker, cli_worker_name
 from app.datahub.schemas.datahub import TriggerDailyIncrementalRequest
 from app.datahub.services import DatahubService
 
@@ -17,6 +17,7 @@ def main(argv: Sequence[str] | None = None) -> None:
     parser.add_argument("--symbol", required=False)
     parser.add_argument("--window-days", required=False, type=int, default=7, dest="window_days")
     args = parser.parse_args(argv)
+    use_engine_profile("worker")
 
     db = SessionLocal()
     try:
@@ -26,12 +27,15 @@ def main(argv: Sequence[str] | None = None) -> None:
             symbol=args.symbol,
             window_days=args.window_days,
         )
+        worker = DatahubWorker(worker_name=cli_worker_name())
         run = service.create_daily_incremental_job(
             request,
             trigger_source="cli",
+            claimed_by=worker.worker_name,
+            lease_seconds=worker.lease_seconds,
         )
         logger.info("Created daily incremental run: %s", run.id)
-        execute_daily_incremental_in_background(run.id, request.model_dump(mode="python"))
+        worker.run_claimed(run.id)
         logger.info("%s daily incremental finished: %s", request.dataset, run.id)
     except BusinessException as exc:
         logger.error("daily incremental 业务错误: %s", exc.message, exc_info=True)
@@ -0,0 +1,73 @@
+import argparse
+import logging
+from datetime import date
+from typing import Sequence
+
+from app.common.deps.database import SessionLocal, use_engine_profile
+from app.core.api import BusinessException
+from app.datahub.services import DatahubService, MarketDailyGapService
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="DataHub market_daily 缺口扫描与补数（基于对象索引与交易日历）")
+    parser.add_argument("--start", required=True, dest="start_date", type=date.fromisoformat)
+    parser.add_argument("--end", required=True, dest="end_date", type=date.fromisoformat)
+    parser.add_argument("--no-resume", action="store_false", dest="resume", help="忽略未完成的扫描检查点，重新扫描")
+    parser.add_argument("--max-symbols", type=int, default=5000, dest="max_symbols")
+    parser.add_argument("--max-run-cost", type=int, default=None, dest="max_run_cost", help="单个回填作业的预估成本上限")
+    parser.add_argument("--dry-run", action="store_true", dest="dry_run", help="只扫描并输出作业规划，不创建回填作业")
+    args = parser.parse_args(argv)
+    use_engine_profile("worker")
+
+    db = SessionLocal()
+    try:
+        if not args.dry_run:
+            result = DatahubService(db).fill_market_daily_missing(
+                start_date=args.start_date,
+                end_date=args.end_date,
+                max_symbols=args.max_symbols,
+                batch_size=1000,
+                max_run_cost=args.max_run_cost,
+                resume=args.resume,
+            )
+            logger.info("market_daily gap fill queued: runs=%s symbols=%s", result.created_runs, result.filled_symbols)
+            return
+        gap_service = MarketDailyGapService(db)
+        scan = gap_service.scan(start_date=args.start_date, end_date=args.end_date, resume=args.resume)
+        logger.info(
+            "market_daily gap scan %s~%s: symbols=%s missing_symbols=%s missing_days=%s ranges=%s resumed_from=%s",
+            args.start_date,
+            args.end_date,
+            scan.expected_count,
+            scan.missing_symbol_count,
+            scan.missing_days,
+            len(scan.ranges),
+            scan.resumed_from,
+        )
+        runs = gap_service.plan_fill_runs(
+            scan.ranges,
+            gap_service.load_trading_days(args.start_date, args.end_date),
+            max_run_cost=args.max_run_cost,
+        )
+        for run in runs:
+            logger.info(
+                "planned run %s~%s symbols=%s estimated_cost=%s",
+                run.start_date,
+                run.end_date,
+                len(run.symbols),
+                run.estimated_cost,
+            )
+    except BusinessException as exc:
+        logger.error("gap_fill 业务错误: %s", exc.message, exc_info=True)
+        raise
+    except Exception as exc:
+        logger.error("gap_fill 失败: %s", exc, exc_info=True)
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import argparse
+import logging
+from typing import Sequence
+
+from app.common.deps.database import SessionLocal, use_engine_profile
+from app.datahub.services import DatahubMetricsRollupService
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="DataHub 作业指标小时汇总")
+    parser.add_argument(
+        "--backfill",
+        action="store_true",
+        dest="backfill",
+        help="按现存作业重建汇总表（早于最早现存作业的小时行保留）",
+    )
+    args = parser.parse_args(argv)
+    use_engine_profile("worker")
+
+    db = SessionLocal()
+    try:
+        service = DatahubMetricsRollupService(db)
+        rolled = service.backfill() if args.backfill else service.refresh()
+        logger.info("datahub metrics rollup%s runs=%s", " (backfill)" if args.backfill else "", rolled)
+    except Exception as exc:
+        logger.error("metrics_rollup 失败: %s", exc, exc_info=True)
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
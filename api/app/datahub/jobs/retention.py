@@ -0,0 +1,49 @@
+import argparse
+import logging
+from typing import Sequence
+
+from app.common.deps.database import SessionLocal, use_engine_profile
+from app.datahub.services import DatahubRetentionService
+
+logger = logging.getLogger(__name__)
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="DataHub 作业记录保留策略与孤儿对象清理")
+    parser.add_argument("--keep-days", type=int, default=None, dest="keep_days", help="缺省取 DATAHUB_JOB_RUN_RETENTION_DAYS")
+    parser.add_argument("--chunk-size", type=int, default=None, dest="chunk_size", help="每块删除的行数")
+    parser.add_argument(
+        "--sweep-orphans",
+        action="store_true",
+        dest="sweep_orphans",
+        help="同时删除未被对象索引引用的标准层批次对象",
+    )
+    parser.add_argument("--dry-run", action="store_true", dest="dry_run", help="只统计，不删除")
+    args = parser.parse_args(argv)
+    use_engine_profile("worker")
+
+    db = SessionLocal()
+    try:
+        result = DatahubRetentionService(db, chunk_size=args.chunk_size).apply_retention(
+            keep_days=args.keep_days,
+            sweep_orphans=args.sweep_orphans,
+            dry_run=args.dry_run,
+        )
+        logger.info(
+            "datahub retention%s cutoff=%s runs=%s tasks=%s orphan_objects=%s deleted_objects=%s",
+            " (dry-run)" if args.dry_run else "",
+            result.cutoff.isoformat(),
+            result.deleted_runs,
+            result.deleted_tasks,
+            result.orphan_objects,
+            result.deleted_objects,
+        )
+    except Exception as exc:
+        logger.error("retention 失败: %s", exc, exc_info=True)
+        raise
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
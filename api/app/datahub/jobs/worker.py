@@ -1,74 +1,358 @@
 import argparse
 import logging
+import multiprocessing
+import os
+import select
+import signal
+import socket
+import threading
 import time
+from typing import Callable, Optional
 
-from app.common.deps.database import SessionLocal
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app.common.deps.database import SessionLocal, use_engine_profile
+from app.core.config import get_settings
 from app.datahub.jobs.async_executor import execute_run_by_id
-from app.datahub.services import DatahubService
+from app.datahub.services import DatahubMetricsRollupService, DatahubService
 
 logger = logging.getLogger(__name__)
 
 
+class RunWakeup:
+    """空闲等待：PostgreSQL 下 LISTEN 新作业通知，收到即唤醒；其他数据库退化为定时轮询。"""
+
+    def __init__(self, engine: Optional[Engine] = None, channel: str = DatahubService.RUN_NOTIFY_CHANNEL):
+        self.engine = engine
+        self.channel = channel
+        self._connection = None
+        self._interrupt = threading.Event()
+
+    def wait(self, timeout: float) -> bool:
+        """等待新作业通知，返回是否在超时前被唤醒。"""
+        connection = self._listen()
+        if connection is None:
+            return self._interrupt.wait(timeout)
+        driver_connection = connection.driver_connection
+        try:
+            ready, _, _ = select.select([driver_connection], [], [], timeout)
+            if not ready:
+                return False
+            driver_connection.poll()
+            woken = bool(driver_connection.notifies)
+            driver_connection.notifies.clear()
+            return woken
+        except Exception as exc:
+            logger.warning("DataHub 作业通知连接异常，退化为轮询: %s", exc)
+            self.close()
+            return self._interrupt.wait(timeout)
+
+    def interrupt(self) -> None:
+        self._interrupt.set()
+
+    def close(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+
+    def _listen(self):
+        if self.engine is None or self.engine.dialect.name != "postgresql" or self._interrupt.is_set():
+            return None
+        if self._connection is None:
+            try:
+                connection = self.engine.raw_connection()
+                # 脱离连接池：autocommit 与 LISTEN 状态只留在这条专用连接上，close() 时真正关闭
+                connection.detach()
+                connection.driver_connection.set_session(autocommit=True)
+                cursor = connection.cursor()
+                cursor.execute(f'LISTEN "{self.channel}"')
+                cursor.close()
+                self._connection = connection
+            except Exception as exc:
+                logger.warning("DataHub 作业通知 LISTEN 失败，退化为轮询: %s", exc)
+                return None
+        return self._connection
+
+
+class DatahubWorker:
+    """单个执行进程：认领作业、顺序执行，并由独立心跳线程在同一会话内写心跳、续租约。
+
+    每隔 ``metrics_rollup_seconds`` 在认领间隙增量刷新一次作业指标小时汇总。
+    ``request_stop`` 只停止认领新作业，心跳继续为在途作业续租，直到其执行结束并释放后才由 ``stop`` 停止。
+    """
+
+    def __init__(
+        self,
+        *,
+        worker_name: str,
+        batch_size: int = 1,
+        poll_seconds: float = 5,
+        lease_seconds: int = 60,
+        session_factory: Callable[[], Session] = SessionLocal,
+        executor: Callable[[str], None] = execute_run_by_id,
+        wakeup: Optional[RunWakeup] = None,
+        metrics_rollup_seconds: Optional[float] = None,
+    ):
+        self.worker_name = worker_name
+        self.batch_size = max(1, batch_size)
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.session_factory = session_factory
+        self.executor = executor
+        self.wakeup = wakeup or RunWakeup()
+        self.metrics_rollup_seconds = (
+            metrics_rollup_seconds
+            if metrics_rollup_seconds is not None
+            else get_settings().DATAHUB_METRICS_ROLLUP_INTERVAL_SECONDS
+        )
+        self._next_rollup_at = 0.0
+        self._stop = threading.Event()
+        self._heartbeat_stop = threading.Event()
+        self._beat_now = threading.Event()
+        self._state_lock = threading.Lock()
+        self._status = "idle"
+        self._held_run_ids: list[str] = []
+        self._last_run_id: Optional[str] = None
+        self._last_error: Optional[str] = None
+        self._processed_delta = 0
+        self._heartbeat_thread: Optional[threading.Thread] = None
+
+    def run_forever(self) -> None:
+        self._start_heartbeat()
+        claim_db = self.session_factory()
+        try:
+            while not self._stop.is_set():
+                executed = self.run_once(claim_db)
+                self.rollup_metrics(claim_db)
+                if executed == 0:
+                    self.wakeup.wait(self.poll_seconds)
+        finally:
+            claim_db.close()
+            self.stop()
+
+    def run_once(self, claim_db: Session) -> int:
+        """认领并执行一批作业，返回执行的作业数。"""
+        service = DatahubService(claim_db)
+        run_ids = service.claim_runs(
+            worker_name=self.worker_name,
+            limit=self.batch_size,
+            lease_seconds=self.lease_seconds,
+        )
+        self._update_state(held_run_ids=list(run_ids))
+        for run_id in run_ids:
+            if self._stop.is_set():
+                break
+            self._update_state(status="running", last_run_id=run_id, last_error=None)
+            try:
+                self.executor(run_id)
+                self._update_state(status="idle", processed=1)
+            except Exception as exc:
+                self._update_state(status="error", last_error=str(exc))
+                logger.error("Worker process run failed run_id=%s error=%s", run_id, exc, exc_info=True)
+            finally:
+                with self._state_lock:
+                    self._held_run_ids.remove(run_id)
+                service.release_run(run_id=run_id, worker_name=self.worker_name)
+        # 提前退出时未执行的作业待租约过期后由其他 Worker 接手
+        self._update_state(held_run_ids=[])
+        return len(run_ids)
+
+    def run_claimed(self, run_id: str) -> None:
+        """执行已由本 Worker 名义认领的作业（CLI 就地执行），执行期间由心跳线程续租约。"""
+        self._start_heartbeat()
+        self._update_state(status="running", last_run_id=run_id, last_error=None, held_run_ids=[run_id])
+        db = self.session_factory()
+        try:
+            self.executor(run_id)
+            self._update_state(status="idle", processed=1, held_run_ids=[])
+        except Exception as exc:
+            self._update_state(status="error", last_error=str(exc), held_run_ids=[])
+            raise
+        finally:
+            # 先停心跳再释放租约，避免心跳线程在释放之后又续上租约
+            self.stop()
+            try:
+                DatahubService(db).release_run(run_id=run_id, worker_name=self.worker_name)
+            finally:
+                db.close()
+
+    def rollup_metrics(self, db: Session) -> None:
+        """到期时把新结束的作业汇总进指标小时表；失败只记日志，不影响作业执行。"""
+        if self.metrics_rollup_seconds <= 0 or time.monotonic() < self._next_rollup_at:
+            return
+        self._next_rollup_at = time.monotonic() + self.metrics_rollup_seconds
+        try:
+            rolled = DatahubMetricsRollupService(db).refresh()
+            if rolled:
+                logger.info("DataHub 指标汇总 worker=%s runs=%s", self.worker_name, rolled)
+        except Exception as exc:
+            db.rollback()
+            logger.warning("DataHub 指标汇总失败 worker=%s: %s", self.worker_name, exc)
+
+    def request_stop(self) -> None:
+        """停止认领与轮询新作业（SIGTERM）；在途作业继续执行，心跳照常续租。"""
+        self._stop.set()
+        self.wakeup.interrupt()
+
+    def stop(self) -> None:
+        self.request_stop()
+        self._heartbeat_stop.set()
+        self._beat_now.set()
+        if self._heartbeat_thread is not None and self._heartbeat_thread is not threading.current_thread():
+            self._heartbeat_thread.join(timeout=5)
+        self.wakeup.close()
+
+    def _update_state(
+        self,
+        *,
+        status: Optional[str] = None,
+        last_run_id: Optional[str] = None,
+        last_error: Optional[str] = None,
+        processed: int = 0,
+        held_run_ids: Optional[list[str]] = None,
+    ) -> None:
+        with self._state_lock:
+            if status is not None:
+                self._status = status
+                self._last_error = last_error
+            if last_run_id is not None:
+                self._last_run_id = last_run_id
+            if held_run_ids is not None:
+                self._held_run_ids = held_run_ids
+            self._processed_delta += processed
+        if status is not None:
+            self._beat_now.set()
+
+    def _start_heartbeat(self) -> None:
+        self._heartbeat_thread = threading.Thread(
+            target=self._heartbeat_loop,
+            name=f"datahub-heartbeat-{self.worker_name}",
+            daemon=True,
+        )
+        self._heartbeat_thread.start()
+
+    def _heartbeat_loop(self) -> None:
+        interval = max(1.0, self.lease_seconds / 3)
+        db = self.session_factory()
+        try:
+            while True:
+                self._beat(db)
+                if self._heartbeat_stop.is_set():
+                    return
+                self._beat_now.wait(interval)
+                self._beat_now.clear()
+        finally:
+            db.close()
+
+    def _beat(self, db: Session) -> None:
+        with self._state_lock:
+            status, last_run_id, last_error = self._status, self._last_run_id, self._last_error
+            held_run_ids = list(self._held_run_ids)
+            processed, self._processed_delta = self._processed_delta, 0
+        try:
+            DatahubService(db).upsert_worker_heartbeat(
+                worker_name=self.worker_name,
+                status=status,
+                last_run_id=last_run_id,
+                last_error=last_error,
+                processed_delta=processed,
+                renew_run_ids=held_run_ids,
+                lease_seconds=self.lease_seconds,
+            )
+        except Exception as exc:
+            db.rollback()
+            with self._state_lock:
+                self._processed_delta += processed
+            logger.warning("DataHub worker 心跳写入失败 worker=%s: %s", self.worker_name, exc)
+
+
+def cli_worker_name() -> str:
+    """CLI 就地执行作业时使用的认领者名称（主机名 + 进程号）。"""
+    return f"cli-{socket.gethostname()}-{os.getpid()}"
+
+
+def _run_worker_process(worker_name: str, batch_size: int, poll_seconds: float, lease_seconds: int) -> None:
+    use_engine_profile("worker")
+    worker = DatahubWorker(
+        worker_name=worker_name,
+        batch_size=batch_size,
+        poll_seconds=poll_seconds,
+        lease_seconds=lease_seconds,
+        wakeup=RunWakeup(SessionLocal.kw["bind"]),
+    )
+    # 只停止认领；run_forever 在在途作业释放后自行停止心跳
+    signal.signal(signal.SIGTERM, lambda *_: worker.request_stop())
+    worker.run_forever()
+
+
+def supervise(*, processes: int, worker_name: str, batch_size: int, poll_seconds: float, lease_seconds: int) -> None:
+    """启动 ``processes`` 个执行进程，异常退出的子进程自动拉起；收到 SIGTERM/SIGINT 时一并停止。"""
+    context = multiprocessing.get_context("spawn")
+    stopping = threading.Event()
+
+    def child_name(index: int) -> str:
+        # 首个子进程沿用原 Worker 名称，健康看板的默认查询保持有效
+        return worker_name if index == 0 else f"{worker_name}-{index}"
+
+    def spawn(index: int):
+        process = context.Process(
+            target=_run_worker_process,
+            args=(child_name(index), batch_size, poll_seconds, lease_seconds),
+            name=child_name(index),
+        )
+        process.start()
+        return process
+
+    def request_stop(*_) -> None:
+        stopping.set()
+
+    signal.signal(signal.SIGTERM, request_stop)
+    signal.signal(signal.SIGINT, request_stop)
+
+    children = {index: spawn(index) for index in range(processes)}
+    while not stopping.wait(1):
+        for index, process in list(children.items()):
+            if not process.is_alive():
+                logger.warning("DataHub worker 子进程退出 name=%s exitcode=%s，重新拉起", process.name, process.exitcode)
+                children[index] = spawn(index)
+
+    for process in children.values():
+        process.terminate()
+    for process in children.values():
+        process.join(timeout=lease_seconds)
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="DataHub worker loop")
     parser.add_argument("--poll-seconds", type=int, default=5, dest="poll_seconds")
-    parser.add_argument("--batch-size", type=int, default=5, dest="batch_size")
+    parser.add_argument("--batch-size", type=int, default=1, dest="batch_size")
     parser.add_argument("--worker-name", type=str, default="datahub-default-worker", dest="worker_name")
+    parser.add_argument("--processes", type=int, default=1, dest="processes")
+    parser.add_argument("--lease-seconds", type=int, default=60, dest="lease_seconds")
     args = parser.parse_args()
 
     logger.info(
-        "DataHub worker started, worker_name=%s poll_seconds=%s batch_size=%s",
+        "DataHub worker started, worker_name=%s processes=%s poll_seconds=%s batch_size=%s lease_seconds=%s",
         args.worker_name,
+        args.processes,
         args.poll_seconds,
         args.batch_size,
+        args.lease_seconds,
+    )
+    if args.processes <= 1:
+        _run_worker_process(args.worker_name, args.batch_size, args.poll_seconds, args.lease_seconds)
+        return
+    supervise(
+        processes=args.processes,
+        worker_name=args.worker_name,
+        batch_size=args.batch_size,
+        poll_seconds=args.poll_seconds,
+        lease_seconds=args.lease_seconds,
     )
-    while True:
-        db = SessionLocal()
-        try:
-            service = DatahubService(db)
-            service.upsert_worker_heartbeat(worker_name=args.worker_name, status="idle")
-            run_ids = service.list_pending_run_ids(limit=args.batch_size)
-        finally:
-            db.close()
-
-        if not run_ids:
-            time.sleep(args.poll_seconds)
-            continue
-
-        for run_id in run_ids:
-            db = SessionLocal()
-            try:
-                DatahubService(db).upsert_worker_heartbeat(
-                    worker_name=args.worker_name,
-                    status="running",
-                    last_run_id=run_id,
-                )
-            finally:
-                db.close()
-            try:
-                execute_run_by_id(run_id)
-                db = SessionLocal()
-                try:
-                    DatahubService(db).upsert_worker_heartbeat(
-                        worker_name=args.worker_name,
-                        status="idle",
-                        last_run_id=run_id,
-                        increment_processed=True,
-                    )
-                finally:
-                    db.close()
-            except Exception as exc:
-                db = SessionLocal()
-                try:
-                    DatahubService(db).upsert_worker_heartbeat(
-                        worker_name=args.worker_name,
-                        status="error",
-                        last_run_id=run_id,
-                        last_error=str(exc),
-                    )
-                finally:
-                    db.close()
-                logger.error("Worker process run failed run_id=%s error=%s", run_id, exc, exc_info=True)
 
 
 if __name__ == "__main__":
@@ -2,8 +2,10 @@
 DataHub 模块数据库模型导出
 """
 
+from .board_snapshot import DatahubBoardSnapshot
 from .dataset import DatahubDatasetCatalog, DatahubDatasetWatermark
 from .job import DatahubJobRun, DatahubJobTask
+from .metrics_rollup import DatahubJobMetricsHourly, DatahubMetricsRollupState
 from .object_index import DatahubObjectIndex
 from .provider_health import DatahubProviderHealth
 from .quality_report import DatahubQualityReport
@@ -11,10 +13,13 @@ from .watchlist import DatahubWatchlistItem
 from .worker_heartbeat import DatahubWorkerHeartbeat
 
 __all__ = [
+    "DatahubBoardSnapshot",
     "DatahubDatasetCatalog",
     "DatahubDatasetWatermark",
+    "DatahubJobMetricsHourly",
     "DatahubJobRun",
     "DatahubJobTask",
+    "DatahubMetricsRollupState",
     "DatahubObjectIndex",
     "DatahubProviderHealth",
     "DatahubQualityReport",
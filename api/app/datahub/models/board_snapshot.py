@@ -0,0 +1,18 @@
+from sqlalchemy import JSON, Boolean, Column, Date, DateTime, Integer, UniqueConstraint
+
+from app.common.models.base_model import BaseModel
+
+
+class DatahubBoardSnapshot(BaseModel):
+    __tablename__ = "datahub_board_snapshots"
+    __table_args__ = (
+        UniqueConstraint("limit_days", name="uq_datahub_board_snapshots_limit_days"),
+        {"comment": "DataHub 自选股看板物化快照"},
+    )
+
+    limit_days = Column(Integer, nullable=False, comment="看板回看天数")
+    version = Column(Integer, nullable=False, default=0, comment="版本号：每次失效 +1，重算按版本条件写回")
+    is_stale = Column(Boolean, nullable=False, default=True, comment="是否待重算")
+    as_of_date = Column(Date, nullable=True, comment="快照计算所在自然日")
+    payload = Column(JSON, nullable=True, comment="看板内容")
+    computed_at = Column(DateTime(timezone=True), nullable=True, comment="最近计算时间")
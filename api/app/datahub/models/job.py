@@ -9,6 +9,8 @@ class DatahubJobRun(BaseModel):
         Index("idx_datahub_job_runs_job_type", "job_type"),
         Index("idx_datahub_job_runs_status", "status"),
         Index("idx_datahub_job_runs_dataset", "dataset"),
+        Index("idx_datahub_job_runs_status_created_at", "status", "created_at"),
+        Index("idx_datahub_job_runs_finished_at", "finished_at"),
         {"comment": "DataHub 作业运行记录"},
     )
 
@@ -23,6 +25,8 @@ class DatahubJobRun(BaseModel):
     task_success = Column(Integer, nullable=False, default=0, comment="成功任务数")
     task_failed = Column(Integer, nullable=False, default=0, comment="失败任务数")
     error_message = Column(Text, nullable=True, comment="错误信息")
+    claimed_by = Column(String(100), nullable=True, comment="认领该作业的 Worker")
+    lease_expires_at = Column(DateTime(timezone=True), nullable=True, comment="认领租约到期时间")
 
 
 class DatahubJobTask(BaseModel):
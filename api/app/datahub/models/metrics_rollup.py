@@ -0,0 +1,44 @@
+from sqlalchemy import JSON, Column, DateTime, Float, Index, Integer, String, UniqueConstraint
+
+from app.common.models.base_model import BaseModel
+
+
+class DatahubJobMetricsHourly(BaseModel):
+    __tablename__ = "datahub_job_metrics_hourly"
+    __table_args__ = (
+        UniqueConstraint(
+            "metric",
+            "bucket_start",
+            "dataset",
+            "status",
+            "provider",
+            "error_class",
+            name="uq_datahub_job_metrics_hourly_key",
+        ),
+        Index("idx_datahub_job_metrics_hourly_metric_bucket", "metric", "bucket_start"),
+        {"comment": "DataHub 作业/子任务小时级指标汇总"},
+    )
+
+    metric = Column(String(20), nullable=False, comment="指标对象：run/task")
+    bucket_start = Column(DateTime(timezone=True), nullable=False, comment="所属小时（按作业创建时间取整）")
+    dataset = Column(String(100), nullable=False, default="", comment="数据集")
+    status = Column(String(20), nullable=False, comment="终态")
+    provider = Column(String(50), nullable=False, default="", comment="数据源（由错误信息识别，未知为空）")
+    error_class = Column(String(50), nullable=False, default="", comment="错误分类，无错误为空")
+    item_count = Column(Integer, nullable=False, default=0, comment="记录数")
+    duration_count = Column(Integer, nullable=False, default=0, comment="有耗时的记录数")
+    duration_sum = Column(Float, nullable=False, default=0.0, comment="耗时合计（秒）")
+    duration_max = Column(Float, nullable=False, default=0.0, comment="最大耗时（秒）")
+    duration_histogram = Column(JSON, nullable=True, comment="耗时对数分桶计数，用于估算分位数")
+
+
+class DatahubMetricsRollupState(BaseModel):
+    __tablename__ = "datahub_metrics_rollup_state"
+    __table_args__ = (
+        UniqueConstraint("name", name="uq_datahub_metrics_rollup_state_name"),
+        {"comment": "DataHub 指标汇总水位"},
+    )
+
+    name = Column(String(50), nullable=False, comment="汇总名称")
+    watermark = Column(DateTime(timezone=True), nullable=True, comment="已汇总的作业结束时间上界")
+    version = Column(Integer, nullable=False, default=0, comment="版本号：每次推进 +1，按版本条件写回")
@@ -1,5 +1,15 @@
 from .baostock_provider import BaoStockProvider
+from .baostock_session import BaoStockSessionManager, get_baostock_session_manager
 from .eastmoney_provider import EastMoneyProvider
 from .base import BaseProvider
+from .response_cache import ProviderResponseCache, get_provider_response_cache
 
-__all__ = ["BaseProvider", "BaoStockProvider", "EastMoneyProvider"]
+__all__ = [
+    "BaseProvider",
+    "BaoStockProvider",
+    "BaoStockSessionManager",
+    "EastMoneyProvider",
+    "ProviderResponseCache",
+    "get_baostock_session_manager",
+    "get_provider_response_cache",
+]
@@ -1,117 +1,156 @@
-from datetime import date, datetime
+from datetime import date
 from typing import Any
 
 from app.core.api import BusinessException, ErrorCode
 from app.datahub.providers.base import BaseProvider
+from app.datahub.providers.baostock_session import (
+    BaoStockQueryResult,
+    BaoStockSessionManager,
+    get_baostock_session_manager,
+)
 from app.datahub.normalize import normalize_symbol
 
 
 class BaoStockProvider(BaseProvider):
     provider_name = "baostock"
 
+    DAILY_FIELDS = ("date", "code", "open", "high", "low", "close", "volume", "amount", "turn")
+
+    def __init__(self, session_manager: BaoStockSessionManager | None = None):
+        self.session_manager = session_manager or get_baostock_session_manager()
+
     def get_daily_bars(self, symbol: str, start_date: date, end_date: date) -> list[dict[str, Any]]:
-        bs = self._import_baostock()
         bs_symbol = self._to_baostock_symbol(symbol)
-        self._login(bs)
-        try:
-            query_result = bs.query_history_k_data_plus(
+        result = self.session_manager.query(
+            lambda bs: bs.query_history_k_data_plus(
                 bs_symbol,
-                "date,code,open,high,low,close,volume,amount,turn",
+                ",".join(self.DAILY_FIELDS),
                 start_date=start_date.strftime("%Y-%m-%d"),
                 end_date=end_date.strftime("%Y-%m-%d"),
                 frequency="d",
                 adjustflag="2",
             )
-            if query_result.error_code != "0":
-                raise BusinessException(
-                    f"baostock 查询失败: {query_result.error_msg}",
-                    code=ErrorCode.NETWORK_ERROR,
-                )
-
-            rows: list[dict[str, Any]] = []
-            while query_result.next():
-                record = query_result.get_row_data()
-                rows.append(
-                    {
-                        "symbol": normalize_symbol(symbol),
-                        "trade_date": datetime.strptime(record[0], "%Y-%m-%d").date(),
-                        "open": self._to_float(record[2]),
-                        "high": self._to_float(record[3]),
-                        "low": self._to_float(record[4]),
-                        "close": self._to_float(record[5]),
-                        "volume": self._to_float(record[6]),
-                        "amount": self._to_float(record[7]),
-                        "turnover_rate": self._to_float(record[8]),
-                    }
-                )
-            return rows
-        finally:
-            bs.logout()
+        )
+        self._raise_for_error(result, "baostock 查询失败")
+        return self._parse_daily_bars(result.records, normalize_symbol(symbol))
 
     def get_security_master(self, day: date | None = None) -> list[dict[str, Any]]:
-        bs = self._import_baostock()
-        self._login(bs)
-        try:
-            target_day = day or date.today()
-            query_result = bs.query_all_stock(day=target_day.strftime("%Y-%m-%d"))
-            if query_result.error_code != "0":
-                raise BusinessException(
-                    f"baostock 查询证券主数据失败: {query_result.error_msg} (day={target_day})",
-                    code=ErrorCode.NETWORK_ERROR,
-                )
-            rows: list[dict[str, Any]] = []
-            while query_result.next():
-                record = query_result.get_row_data()
-                code = record[0] if len(record) > 0 else ""
-                rows.append(
-                    {
-                        "symbol": self._from_baostock_symbol(code),
-                        "exchange": self._exchange_from_baostock_symbol(code),
-                        "name": record[1] if len(record) > 1 else "",
-                        "list_date": self._to_optional_date(record[3] if len(record) > 3 else ""),
-                        "delist_date": self._to_optional_date(record[4] if len(record) > 4 else ""),
-                        "status": "active" if (record[2] if len(record) > 2 else "1") == "1" else "inactive",
-                        "industry": None,
-                        "source_provider": self.provider_name,
-                    }
-                )
-            return rows
-        finally:
-            bs.logout()
+        target_day = day or date.today()
+        result = self.session_manager.query(lambda bs: bs.query_all_stock(day=target_day.strftime("%Y-%m-%d")))
+        self._raise_for_error(result, "baostock 查询证券主数据失败", suffix=f" (day={target_day})")
+        return self._parse_security_master(result.records)
 
     def get_trading_calendar(self, start_date: date, end_date: date) -> list[dict[str, Any]]:
-        bs = self._import_baostock()
-        self._login(bs)
-        try:
-            query_result = bs.query_trade_dates(
+        result = self.session_manager.query(
+            lambda bs: bs.query_trade_dates(
                 start_date=start_date.strftime("%Y-%m-%d"),
                 end_date=end_date.strftime("%Y-%m-%d"),
             )
-            if query_result.error_code != "0":
-                raise BusinessException(
-                    f"baostock 查询交易日历失败: {query_result.error_msg}",
-                    code=ErrorCode.NETWORK_ERROR,
-                )
-
-            rows: list[dict[str, Any]] = []
-            while query_result.next():
-                record = query_result.get_row_data()
-                trade_date = self._to_optional_date(record[0] if len(record) > 0 else "")
-                if trade_date is None:
-                    continue
-                rows.append(
-                    {
-                        "exchange": "SSE",
-                        "trade_date": trade_date,
-                        "is_open": (record[1] if len(record) > 1 else "0") == "1",
-                        "previous_trade_date": self._to_optional_date(record[2] if len(record) > 2 else ""),
-                        "next_trade_date": None,
-                        "source_provider": self.provider_name,
-                    }
-                )
-            return rows
-        finally:
-            bs.logout()
+        )
+        self._raise_for_error(result, "baostock 查询交易日历失败")
+        return self._parse_trading_calendar(result.records)
+
+    @staticmethod
+    def _raise_for_error(result: BaoStockQueryResult, message: str, *, suffix: str = "") -> None:
+        if result.error_code != "0":
+            raise BusinessException(f"{message}: {result.error_msg}{suffix}", code=ErrorCode.NETWORK_ERROR)
+
+    @staticmethod
+    def _columns(records: list[list[str]], width: int) -> list[list[str | None]]:
+        """按列转置记录，缺失的尾部字段补 None。"""
+        padded = [record if len(record) >= width else [*record, *[None] * (width - len(record))] for record in records]
+        return [list(column) for column in zip(*padded)]
+
+    @staticmethod
+    def _string_array(values: list[str | None]):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        array = pa.array(values, pa.string())
+        return pc.if_else(pc.equal(array, ""), pa.scalar(None, pa.string()), array)
+
+    @classmethod
+    def _date_column(cls, values: list[str | None]):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        return pc.cast(cls._string_array(values), pa.date32())
+
+    @classmethod
+    def _float_column(cls, values: list[str | None]):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        return pc.fill_null(pc.cast(cls._string_array(values), pa.float64()), 0.0)
+
+    @classmethod
+    def _parse_daily_bars(cls, records: list[list[str]], symbol: str) -> list[dict[str, Any]]:
+        if not records:
+            return []
+        columns = cls._columns(records, len(cls.DAILY_FIELDS))
+        trade_dates = cls._date_column(columns[0])
+        if trade_dates.null_count:
+            raise ValueError("baostock 日线存在空交易日期")
+        # 经 numpy 一次性物化为 Python 对象，比逐个 Arrow 标量转换快一个量级
+        opens, highs, lows, closes, volumes, amounts, turns = (
+            cls._float_column(columns[index]).to_numpy(zero_copy_only=False).tolist() for index in range(2, 9)
+        )
+        return [
+            {
+                "symbol": symbol,
+                "trade_date": trade_date,
+                "open": open_,
+                "high": high,
+                "low": low,
+                "close": close,
+                "volume": volume,
+                "amount": amount,
+                "turnover_rate": turn,
+            }
+            for trade_date, open_, high, low, close, volume, amount, turn in zip(
+                trade_dates.to_numpy(zero_copy_only=False).tolist(), opens, highs, lows, closes, volumes, amounts, turns
+            )
+        ]
+
+    @classmethod
+    def _parse_security_master(cls, records: list[list[str]]) -> list[dict[str, Any]]:
+        if not records:
+            return []
+        codes, names, statuses, list_dates, delist_dates = cls._columns(records, 5)
+        list_dates = cls._date_column(list_dates).to_pylist()
+        delist_dates = cls._date_column(delist_dates).to_pylist()
+        return [
+            {
+                "symbol": cls._from_baostock_symbol(code or ""),
+                "exchange": cls._exchange_from_baostock_symbol(code or ""),
+                "name": name if name is not None else "",
+                "list_date": list_date,
+                "delist_date": delist_date,
+                "status": "active" if (status if status is not None else "1") == "1" else "inactive",
+                "industry": None,
+                "source_provider": cls.provider_name,
+            }
+            for code, name, status, list_date, delist_date in zip(codes, names, statuses, list_dates, delist_dates)
+        ]
+
+    @classmethod
+    def _parse_trading_calendar(cls, records: list[list[str]]) -> list[dict[str, Any]]:
+        if not records:
+            return []
+        trade_dates, is_open, previous = cls._columns(records, 3)
+        previous_dates = cls._date_column(previous).to_pylist()
+        return [
+            {
+                "exchange": "SSE",
+                "trade_date": trade_date,
+                "is_open": flag == "1",
+                "previous_trade_date": previous_date,
+                "next_trade_date": None,
+                "source_provider": cls.provider_name,
+            }
+            for trade_date, flag, previous_date in zip(cls._date_column(trade_dates).to_pylist(), is_open, previous_dates)
+            if trade_date is not None
+        ]
 
     @staticmethod
     def _to_baostock_symbol(symbol: str) -> str:
@@ -126,40 +165,6 @@ class BaoStockProvider(BaseProvider):
             return f"sh.{code}"
         raise BusinessException(f"不支持的交易所代码: {symbol}", code=ErrorCode.VALIDATION_ERROR)
 
-    @staticmethod
-    def _to_float(value: str) -> float:
-        if value == "" or value is None:
-            return 0.0
-        return float(value)
-
-    @staticmethod
-    def _import_baostock():
-        try:
-            import baostock as bs
-        except ModuleNotFoundError as exc:  # pragma: no cover
-            missing = getattr(exc, "name", None) or str(exc)
-            raise BusinessException(
-                "缺少数据采集依赖（baostock / pandas 等）。请在 api 目录执行: pip install -r requirements.txt",
-                code=ErrorCode.SYSTEM_ERROR,
-                details={"missing_module": missing},
-            ) from exc
-        except Exception as exc:  # pragma: no cover
-            raise BusinessException(
-                f"加载 baostock 失败: {exc}",
-                code=ErrorCode.SYSTEM_ERROR,
-                details={"error": str(exc)},
-            ) from exc
-        return bs
-
-    @staticmethod
-    def _login(bs) -> None:
-        login_result = bs.login()
-        if login_result.error_code != "0":
-            raise BusinessException(
-                f"baostock 登录失败: {login_result.error_msg}",
-                code=ErrorCode.NETWORK_ERROR,
-            )
-
     @staticmethod
     def _from_baostock_symbol(symbol: str) -> str:
         if "." not in symbol:
@@ -179,9 +184,3 @@ class BaoStockProvider(BaseProvider):
         if symbol.lower().startswith("sh."):
             return "SSE"
         return "UNKNOWN"
-
-    @staticmethod
-    def _to_optional_date(value: str | None) -> date | None:
-        if not value:
-            return None
-        return datetime.strptime(value, "%Y-%m-%d").date()
@@ -0,0 +1,171 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import threading
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable
+
+from app.core.api import BusinessException, ErrorCode
+from app.core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# 会话失效或网络异常：重新登录后重试
+RECONNECT_ERROR_CODES = frozenset(
+    {
+        "10001001",  # 用户未登陆
+        "10002001",  # 网络错误
+        "10002002",  # 网络连接失败
+        "10002003",  # 网络连接超时
+        "10002004",  # 网络接收时连接断开
+        "10002005",  # 网络发送失败
+        "10002006",  # 网络发送超时
+        "10002007",  # 网络接收错误
+        "10002008",  # 网络接收超时
+    }
+)
+
+
+def import_baostock():
+    try:
+        import baostock as bs
+    except ModuleNotFoundError as exc:  # pragma: no cover
+        missing = getattr(exc, "name", None) or str(exc)
+        raise BusinessException(
+            "缺少数据采集依赖（baostock / pandas 等）。请在 api 目录执行: pip install -r requirements.txt",
+            code=ErrorCode.SYSTEM_ERROR,
+            details={"missing_module": missing},
+        ) from exc
+    except Exception as exc:  # pragma: no cover
+        raise BusinessException(
+            f"加载 baostock 失败: {exc}",
+            code=ErrorCode.SYSTEM_ERROR,
+            details={"error": str(exc)},
+        ) from exc
+    return bs
+
+
+@dataclass
+class BaoStockQueryResult:
+    """已在会话锁内取完全部分页的查询结果。"""
+
+    error_code: str
+    error_msg: str
+    records: list[list[str]] = field(default_factory=list)
+
+
+class BaoStockSessionManager:
+    """进程内复用的 baostock 登录会话。
+
+    baostock 将 socket 与 user_id 保存在模块级全局变量中，同一进程内的线程实际共用一条连接，
+    因此无法按线程各自登录：这里保持一个已登录会话，并用一把锁串行化登录、查询与翻页。
+    会话空闲超过 ``max_idle_seconds`` 视为不健康并重新登录；查询返回会话/网络类错误码
+    或抛出连接异常时重新登录后重试。
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Any] = import_baostock,
+        *,
+        max_idle_seconds: float = 300.0,
+        max_retries: int = 1,
+    ):
+        self._loader = loader
+        self.max_idle_seconds = max_idle_seconds
+        self.max_retries = max_retries
+        self._lock = threading.RLock()
+        self._bs = None
+        self._logged_in = False
+        self._last_used = 0.0
+        self.logins = 0
+        self.reconnects = 0
+        self.queries = 0
+
+    def query(self, operation: Callable[[Any], Any]) -> BaoStockQueryResult:
+        """在已登录会话上执行 ``operation(bs)``，并在锁内取完所有分页记录。"""
+        with self._lock:
+            attempt = 0
+            while True:
+                bs = self._ensure_session()
+                try:
+                    result = operation(bs)
+                    records: list[list[str]] = []
+                    if result.error_code == "0":
+                        while result.next():
+                            records.append(result.get_row_data())
+                except (OSError, EOFError) as exc:
+                    if attempt >= self.max_retries:
+                        self._drop_session()
+                        raise BusinessException(f"baostock 连接异常: {exc}", code=ErrorCode.NETWORK_ERROR) from exc
+                    logger.warning("baostock 连接异常，重新登录后重试: %s", exc)
+                    self._reconnect()
+                    attempt += 1
+                    continue
+
+                if result.error_code in RECONNECT_ERROR_CODES and attempt < self.max_retries:
+                    logger.warning("baostock 会话失效(%s)，重新登录后重试: %s", result.error_code, result.error_msg)
+                    self._reconnect()
+                    attempt += 1
+                    continue
+
+                self.queries += 1
+                self._last_used = time.monotonic()
+                return BaoStockQueryResult(
+                    error_code=str(result.error_code),
+                    error_msg=str(result.error_msg),
+                    records=records,
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            self._drop_session()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "logged_in": int(self._logged_in),
+                "logins": self.logins,
+                "reconnects": self.reconnects,
+                "queries": self.queries,
+            }
+
+    def _ensure_session(self):
+        if self._bs is None:
+            self._bs = self._loader()
+        if self._logged_in and time.monotonic() - self._last_used > self.max_idle_seconds:
+            logger.info("baostock 会话空闲超过 %.0fs，重新登录", self.max_idle_seconds)
+            self._drop_session()
+        if not self._logged_in:
+            login_result = self._bs.login()
+            if login_result.error_code != "0":
+                raise BusinessException(
+                    f"baostock 登录失败: {login_result.error_msg}",
+                    code=ErrorCode.NETWORK_ERROR,
+                )
+            self.logins += 1
+            self._logged_in = True
+            self._last_used = time.monotonic()
+        return self._bs
+
+    def _reconnect(self) -> None:
+        self.reconnects += 1
+        self._drop_session()
+
+    def _drop_session(self) -> None:
+        if self._logged_in and self._bs is not None:
+            try:
+                self._bs.logout()
+            except Exception as exc:
+                logger.debug("baostock 登出失败: %s", exc)
+        self._logged_in = False
+
+
+@lru_cache()
+def get_baostock_session_manager() -> BaoStockSessionManager:
+    """获取进程级共享 baostock 会话，进程退出时登出。"""
+    manager = BaoStockSessionManager(max_idle_seconds=get_settings().DATAHUB_BAOSTOCK_SESSION_MAX_IDLE_SECONDS)
+    atexit.register(manager.close)
+    return manager
@@ -10,7 +10,14 @@ class BaseProvider(ABC):
     def get_daily_bars(self, symbol: str, start_date: date, end_date: date) -> list[dict[str, Any]]:
         raise NotImplementedError
 
-    def get_money_flow(self, symbol: str, start_date: date, end_date: date) -> list[dict[str, Any]]:
+    def get_money_flow(
+        self,
+        symbol: str,
+        start_date: date,
+        end_date: date,
+        *,
+        since: Optional[date] = None,
+    ) -> list[dict[str, Any]]:
         return []
 
     def get_sector_list(self) -> list[dict[str, Any]]:
@@ -19,7 +26,14 @@ class BaseProvider(ABC):
     def get_sector_members(self, sector_code: str, asof_date: Optional[date] = None) -> list[dict[str, Any]]:
         return []
 
-    def get_financial_statement(self, symbol: str, start_date: date, end_date: date) -> list[dict[str, Any]]:
+    def get_financial_statement(
+        self,
+        symbol: str,
+        start_date: date,
+        end_date: date,
+        *,
+        since: Optional[date] = None,
+    ) -> list[dict[str, Any]]:
         return []
 
     def get_security_master(self, day: Optional[date] = None) -> list[dict[str, Any]]:
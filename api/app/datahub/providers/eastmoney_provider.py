@@ -1,16 +1,34 @@
-from datetime import date
-from typing import Any
+from datetime import date, timedelta
+from typing import Any, Callable
 
 from app.core.api import BusinessException, ErrorCode
 from app.datahub.normalize import normalize_symbol
 from app.datahub.providers.base import BaseProvider
+from app.datahub.providers.response_cache import ProviderResponseCache, get_provider_response_cache
 
 
 class EastMoneyProvider(BaseProvider):
-    """基于 akshare 东方财富接口的 market_daily Provider。"""
+    """基于 akshare 东方财富接口的 market_daily Provider。
+
+    资金流与财务摘要接口不支持按日期查询，原始响应按 (接口, symbol, 报告期) 缓存；
+    传入 ``since``（增量起点）时只转换其后的新行（财务摘要按公告日期，缺公告日期的行保留），转换按列向量化完成。
+    """
 
     provider_name = "eastmoney"
 
+    MONEY_FLOW_COLUMNS = {
+        "main_net_inflow": ("主力净流入-净额", "主力净流入净额"),
+        "large_net_inflow": ("超大单净流入-净额", "大单净流入-净额"),
+        "medium_net_inflow": ("中单净流入-净额",),
+        "small_net_inflow": ("小单净流入-净额",),
+    }
+    FINANCIAL_META_COLUMNS = frozenset({"选项", "报告期", "公告日期", "最新公告日期"})
+    EMPTY_VALUES = ("", "-", "--", "nan", "None")
+
+    def __init__(self, response_cache: ProviderResponseCache | None = None):
+        self.response_cache = response_cache or get_provider_response_cache()
+        self.rows_processed = 0
+
     def get_daily_bars(self, symbol: str, start_date: date, end_date: date) -> list[dict[str, Any]]:
         ak = self._import_akshare()
         normalized_symbol = normalize_symbol(symbol)
@@ -53,37 +71,42 @@ class EastMoneyProvider(BaseProvider):
             )
         return rows
 
-    def get_money_flow(self, symbol: str, start_date: date, end_date: date) -> list[dict[str, Any]]:
+    def get_money_flow(
+        self,
+        symbol: str,
+        start_date: date,
+        end_date: date,
+        *,
+        since: date | None = None,
+    ) -> list[dict[str, Any]]:
+        import pandas as pd
+
         ak = self._import_akshare()
         normalized_symbol = normalize_symbol(symbol)
         stock, market = self._to_stock_and_market(normalized_symbol)
-        try:
-            frame = ak.stock_individual_fund_flow(stock=stock, market=market)
-        except Exception as exc:
-            raise BusinessException(
-                f"eastmoney 资金流查询失败: {exc}",
-                code=ErrorCode.NETWORK_ERROR,
-            ) from exc
+        frame = self._fetch_cached(
+            ("money_flow", normalized_symbol, end_date.isoformat()),
+            lambda: ak.stock_individual_fund_flow(stock=stock, market=market),
+            "eastmoney 资金流查询失败",
+        )
         if frame is None or frame.empty:
             return []
 
-        rows: list[dict[str, Any]] = []
-        for item in frame.to_dict("records"):
-            trade_date_raw = self._pick(item, "日期", "trade_date")
-            trade_date = self._to_date(trade_date_raw)
-            if trade_date is None or trade_date < start_date or trade_date > end_date:
-                continue
-            rows.append(
-                {
-                    "symbol": normalized_symbol,
-                    "trade_date": trade_date,
-                    "main_net_inflow": self._to_float(self._pick(item, "主力净流入-净额", "主力净流入净额")),
-                    "large_net_inflow": self._to_float(self._pick(item, "超大单净流入-净额", "大单净流入-净额")),
-                    "medium_net_inflow": self._to_float(self._pick(item, "中单净流入-净额")),
-                    "small_net_inflow": self._to_float(self._pick(item, "小单净流入-净额")),
-                }
-            )
-        return rows
+        lower = max(start_date, since + timedelta(days=1)) if since else start_date
+        trade_dates = self._to_timestamp_series(self._pick_column(frame, "日期", "trade_date"))
+        mask = trade_dates.notna() & (trade_dates >= pd.Timestamp(lower)) & (trade_dates <= pd.Timestamp(end_date))
+        selected = frame.loc[mask]
+        self.rows_processed += len(selected)
+        if selected.empty:
+            return []
+
+        result = pd.DataFrame(
+            {"symbol": normalized_symbol, "trade_date": trade_dates[mask].dt.date},
+            index=selected.index,
+        )
+        for name, candidates in self.MONEY_FLOW_COLUMNS.items():
+            result[name] = self._to_float_series(self._pick_column(selected, *candidates))
+        return result.to_dict("records")
 
     def get_sector_list(self) -> list[dict[str, Any]]:
         ak = self._import_akshare()
@@ -135,40 +158,115 @@ class EastMoneyProvider(BaseProvider):
             )
         return rows
 
-    def get_financial_statement(self, symbol: str, start_date: date, end_date: date) -> list[dict[str, Any]]:
+    def get_financial_statement(
+        self,
+        symbol: str,
+        start_date: date,
+        end_date: date,
+        *,
+        since: date | None = None,
+    ) -> list[dict[str, Any]]:
+        import pandas as pd
+
         ak = self._import_akshare()
         normalized_symbol = normalize_symbol(symbol)
         code = self._to_eastmoney_symbol(normalized_symbol)
-        try:
-            frame = ak.stock_financial_abstract(symbol=code)
-        except Exception as exc:
-            raise BusinessException(
-                f"eastmoney 财务摘要查询失败: {exc}",
-                code=ErrorCode.NETWORK_ERROR,
-            ) from exc
+        frame = self._fetch_cached(
+            ("financial_statement", normalized_symbol, self._report_period(end_date)),
+            lambda: ak.stock_financial_abstract(symbol=code),
+            "eastmoney 财务摘要查询失败",
+        )
         if frame is None or frame.empty:
             return []
 
-        records: list[dict[str, Any]] = []
-        for item in frame.to_dict("records"):
-            report_date = self._to_date(self._pick(item, "报告期", "report_date"))
-            if report_date is None or report_date < start_date or report_date > end_date:
-                continue
-            pub_date = self._to_date(self._pick(item, "公告日期", "最新公告日期")) or report_date
-            for key, value in item.items():
-                if key in {"选项", "报告期", "公告日期", "最新公告日期"}:
-                    continue
-                records.append(
-                    {
-                        "symbol": normalized_symbol,
-                        "report_date": report_date,
-                        "pub_date": pub_date,
-                        "metric_name": str(key),
-                        "metric_value": self._to_float(value),
-                        "metric_group": "financial_abstract",
-                    }
-                )
-        return records
+        report_dates = self._to_timestamp_series(self._pick_column(frame, "报告期", "report_date"))
+        raw_pub_dates = self._to_timestamp_series(self._pick_column(frame, "公告日期", "最新公告日期"))
+        pub_dates = raw_pub_dates.fillna(report_dates)
+        mask = report_dates.notna() & (report_dates >= pd.Timestamp(start_date)) & (report_dates <= pd.Timestamp(end_date))
+        if since:
+            # 以公告日期判断增量：报告期早于水位、但在水位之后才披露的报告也需要采集；
+            # 缺公告日期的行无法判断是否新披露，一律保留
+            mask &= raw_pub_dates.isna() | (raw_pub_dates > pd.Timestamp(since))
+        selected = frame.loc[mask]
+        self.rows_processed += len(selected)
+        metric_columns = [column for column in frame.columns if column not in self.FINANCIAL_META_COLUMNS]
+        if selected.empty or not metric_columns:
+            return []
+
+        wide = selected[metric_columns].copy()
+        wide.columns = [str(column) for column in metric_columns]
+        wide.insert(0, "pub_date", pub_dates[mask].dt.date)
+        wide.insert(0, "report_date", report_dates[mask].dt.date)
+        wide.insert(0, "_row", range(len(wide)))
+        melted = wide.melt(
+            id_vars=["_row", "report_date", "pub_date"],
+            var_name="metric_name",
+            value_name="metric_value",
+        ).sort_values("_row", kind="stable")
+        return pd.DataFrame(
+            {
+                "symbol": normalized_symbol,
+                "report_date": melted["report_date"],
+                "pub_date": melted["pub_date"],
+                "metric_name": melted["metric_name"],
+                "metric_value": self._to_float_series(melted["metric_value"]),
+                "metric_group": "financial_abstract",
+            }
+        ).to_dict("records")
+
+    def _fetch_cached(self, key: tuple, fetch: Callable[[], Any], error_message: str):
+        def load():
+            try:
+                return fetch()
+            except Exception as exc:
+                raise BusinessException(f"{error_message}: {exc}", code=ErrorCode.NETWORK_ERROR) from exc
+
+        return self.response_cache.get_or_fetch(key, load)
+
+    @staticmethod
+    def _report_period(day: date) -> str:
+        return f"{day.year}Q{(day.month - 1) // 3 + 1}"
+
+    @staticmethod
+    def _pick_column(frame, *keys: str):
+        import pandas as pd
+
+        for key in keys:
+            if key in frame.columns:
+                return frame[key]
+        return pd.Series([None] * len(frame), index=frame.index, dtype=object)
+
+    @classmethod
+    def _to_float_series(cls, series):
+        """与 ``_to_float`` 口径一致的列式转换：千分位/百分号剥离，空值与占位符记 0。"""
+        import pandas as pd
+
+        if pd.api.types.is_bool_dtype(series.dtype):
+            return series.astype("float64")
+        numeric = pd.to_numeric(series, errors="coerce")
+        if pd.api.types.is_numeric_dtype(series.dtype):
+            return numeric.astype("float64").fillna(0.0)
+        # 数值与纯数字字符串已直接转换，只有带千分位/百分号/占位符的文本需要清洗
+        needs_text = numeric.isna() & series.notna()
+        if needs_text.any():
+            text = series[needs_text].astype(str).str.strip()
+            text = text.str.replace(",", "", regex=False).str.replace("%", "", regex=False)
+            text = text.where(~text.isin(cls.EMPTY_VALUES), "0")
+            numeric = numeric.astype("float64")
+            numeric[needs_text] = pd.to_numeric(text, errors="coerce")
+        return numeric.astype("float64").fillna(0.0)
+
+    @staticmethod
+    def _to_timestamp_series(series):
+        """与 ``_to_date`` 口径一致的列式日期解析，无法解析的值为 NaT。"""
+        import pandas as pd
+
+        if pd.api.types.is_datetime64_any_dtype(series.dtype):
+            return series.dt.tz_localize(None).dt.normalize() if series.dt.tz is not None else series.dt.normalize()
+        text = series.astype(str).str.strip().str.replace("/", "-", regex=False)
+        compact = text.str.fullmatch(r"\d{8}")
+        text = text.where(~compact, text.str.slice(0, 4) + "-" + text.str.slice(4, 6) + "-" + text.str.slice(6, 8))
+        return pd.to_datetime(text.str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
 
     @staticmethod
     def _to_eastmoney_symbol(symbol: str) -> str:
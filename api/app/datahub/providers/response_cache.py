@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable, Hashable
+
+from app.core.config import get_settings
+
+
+class ProviderResponseCache:
+    """Provider 原始响应的进程内 TTL 缓存，按 (接口, symbol, 报告期) 命中，超出容量按 LRU 淘汰。
+
+    缓存的响应对象由多个调用方共享，调用方只读不改。
+    """
+
+    def __init__(self, *, max_entries: int = 512, ttl_seconds: float = 900.0):
+        self.max_entries = max(0, int(max_entries))
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_fetch(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        value = fetch()
+        if self.max_entries == 0:
+            return value
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+@lru_cache()
+def get_provider_response_cache() -> ProviderResponseCache:
+    """获取进程级共享 Provider 响应缓存单例。"""
+    settings = get_settings()
+    return ProviderResponseCache(
+        max_entries=settings.DATAHUB_PROVIDER_CACHE_MAX_ENTRIES,
+        ttl_seconds=settings.DATAHUB_PROVIDER_CACHE_TTL_SECONDS,
+    )
@@ -0,0 +1,205 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Callable, Optional, Union
+
+from app.core.api import BusinessException, ErrorCode
+from app.datahub.catalog import QUALITY_RULE_SETS
+
+if TYPE_CHECKING:  # pragma: no cover
+    import pyarrow as pa
+
+QualityResult = tuple[float, list[dict[str, Any]], str]
+
+
+@dataclass(frozen=True)
+class QualityRule:
+    """单条质量规则：``check`` 为检查类型，``columns`` 为参与检查的列（为空表示全部列）。"""
+
+    rule: str
+    check: str
+    columns: tuple[str, ...] = ()
+    message: Optional[str] = None
+
+
+@dataclass(frozen=True)
+class QualityRuleSet:
+    rules: tuple[QualityRule, ...]
+    score_scale: float = 100.0
+    p1_min_issues: int = 1
+    p1_ratio: float = 0.05
+
+    @classmethod
+    def from_config(cls, config: dict[str, Any]) -> "QualityRuleSet":
+        rules = tuple(
+            QualityRule(
+                rule=item["rule"],
+                check=item["check"],
+                columns=tuple(item.get("columns") or ()),
+                message=item.get("message"),
+            )
+            for item in config["rules"]
+        )
+        for rule in rules:
+            if rule.check not in _CHECKS:
+                raise ValueError(f"unknown quality check: {rule.check}")
+        return cls(
+            rules=rules,
+            score_scale=float(config.get("score_scale", 100.0)),
+            p1_min_issues=int(config.get("p1_min_issues", 1)),
+            p1_ratio=float(config.get("p1_ratio", 0.05)),
+        )
+
+
+@lru_cache(maxsize=None)
+def get_quality_rule_set(dataset: str) -> QualityRuleSet:
+    """获取 catalog 中登记的数据集质量规则集。"""
+    config = QUALITY_RULE_SETS.get(dataset)
+    if config is None:
+        raise BusinessException(f"数据集 {dataset} 未登记质量规则", code=ErrorCode.SYSTEM_ERROR)
+    return QualityRuleSet.from_config(config)
+
+
+def to_arrow_table(rows: list[dict[str, Any]]) -> "pa.Table":
+    """行记录转 Arrow 表；同一列混合多种类型时该列按字符串保存（None 保持为 null）。"""
+    pa = _import_pyarrow()
+    try:
+        return pa.Table.from_pylist(rows)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        pass
+    columns: dict[str, Any] = {}
+    for name in dict.fromkeys(key for row in rows for key in row):
+        values = [row.get(name) for row in rows]
+        try:
+            columns[name] = pa.array(values)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            columns[name] = pa.array([None if value is None else str(value) for value in values], type=pa.string())
+    return pa.table(columns)
+
+
+def evaluate_quality(
+    dataset: Union[str, QualityRuleSet],
+    data: Union["pa.Table", list[dict[str, Any]]],
+) -> QualityResult:
+    """按规则集对整表做列式质量检查，返回 ``(score, issues, severity)``，可直接交给 ``write_report``。"""
+    rule_set = get_quality_rule_set(dataset) if isinstance(dataset, str) else dataset
+    table = data if not isinstance(data, list) else to_arrow_table(data)
+    total = table.num_rows
+
+    issues: list[dict[str, Any]] = []
+    issue_count = 0
+    for rule in rule_set.rules:
+        count = _CHECKS[rule.check](table, rule.columns)
+        if count <= 0:
+            continue
+        issue_count += count
+        issue: dict[str, Any] = {"rule": rule.rule}
+        if rule.message:
+            issue["message"] = rule.message
+        issue["count"] = count
+        issues.append(issue)
+
+    score = max(0.0, 100.0 - (issue_count / max(total, 1)) * rule_set.score_scale)
+    if issue_count == 0:
+        return score, issues, "p2"
+    if issue_count <= max(rule_set.p1_min_issues, int(total * rule_set.p1_ratio)):
+        return score, issues, "p1"
+    return score, issues, "p0"
+
+
+def _import_pyarrow():
+    try:
+        import pyarrow as pa
+    except Exception as exc:  # pragma: no cover
+        raise BusinessException(
+            "缺少 pyarrow 依赖，无法执行质量检查",
+            code=ErrorCode.SYSTEM_ERROR,
+            details={"error": str(exc)},
+        ) from exc
+    return pa
+
+
+def _sum(mask) -> int:
+    import pyarrow.compute as pc
+
+    return int(pc.sum(mask).as_py() or 0)
+
+
+def _count_non_positive(table: "pa.Table", columns: tuple[str, ...]) -> int:
+    """任一列 <= 0 或为空的行数；缺少的列视为整列无效。"""
+    import pyarrow.compute as pc
+
+    if any(name not in table.column_names for name in columns):
+        return table.num_rows
+    mask = None
+    for name in columns:
+        invalid = pc.fill_null(pc.less_equal(table[name], 0), True)
+        mask = invalid if mask is None else pc.or_(mask, invalid)
+    return _sum(mask) if mask is not None else 0
+
+
+def _count_required_missing(table: "pa.Table", columns: tuple[str, ...]) -> int:
+    """任一列为空值的行数：null、空字符串、0 或 False 均视为缺失。"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    if any(name not in table.column_names for name in columns):
+        return table.num_rows
+    mask = None
+    for name in columns:
+        column = table[name]
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            missing = pc.equal(column, "")
+        elif pa.types.is_integer(column.type) or pa.types.is_floating(column.type):
+            missing = pc.equal(column, 0)
+        elif pa.types.is_boolean(column.type):
+            missing = pc.invert(column)
+        else:
+            missing = pc.is_null(column)
+        missing = pc.fill_null(missing, True)
+        mask = missing if mask is None else pc.or_(mask, missing)
+    return _sum(mask) if mask is not None else 0
+
+
+def _count_missing_values(table: "pa.Table", columns: tuple[str, ...]) -> int:
+    """缺失单元格数：null，以及字符串列中的 "" 与 "NaN"。"""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    count = 0
+    for name in columns or tuple(table.column_names):
+        if name not in table.column_names:
+            continue
+        column = table[name]
+        count += column.null_count
+        if pa.types.is_string(column.type) or pa.types.is_large_string(column.type):
+            count += _sum(pc.is_in(column, value_set=pa.array(["", "NaN"], type=column.type)))
+    return count
+
+
+def _count_greater(table: "pa.Table", columns: tuple[str, ...]) -> int:
+    """首列大于次列的行数（如 low > high 的价格倒挂），任一侧为空的行不计入。"""
+    import pyarrow.compute as pc
+
+    left, right = columns
+    if left not in table.column_names or right not in table.column_names:
+        return 0
+    return _sum(pc.greater(table[left], table[right]))
+
+
+def _count_duplicates(table: "pa.Table", columns: tuple[str, ...]) -> int:
+    """组合列重复出现的多余行数（如同一 symbol 的重复 trade_date）。"""
+    if any(name not in table.column_names for name in columns) or table.num_rows == 0:
+        return 0
+    distinct = table.select(list(columns)).group_by(list(columns)).aggregate([]).num_rows
+    return table.num_rows - distinct
+
+
+_CHECKS: dict[str, Callable[["pa.Table", tuple[str, ...]], int]] = {
+    "positive": _count_non_positive,
+    "required": _count_required_missing,
+    "missing_values": _count_missing_values,
+    "not_greater": _count_greater,
+    "unique": _count_duplicates,
+}
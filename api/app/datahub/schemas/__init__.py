@@ -9,6 +9,7 @@ from .datahub import (
     MarketDailyMissingScanResult,
     FillMarketDailyMissingRequest,
     FillMarketDailyMissingResult,
+    MarketDailyCompactionResult,
     PurgeJobRunsRequest,
     PurgeJobRunsResult,
     DatahubObjectIndexInfo,
@@ -31,6 +32,7 @@ __all__ = [
     "MarketDailyMissingScanResult",
     "FillMarketDailyMissingRequest",
     "FillMarketDailyMissingResult",
+    "MarketDailyCompactionResult",
     "PurgeJobRunsRequest",
     "PurgeJobRunsResult",
     "DatahubObjectIndexInfo",
@@ -1,7 +1,7 @@
 from datetime import date, datetime
 from typing import Optional
 
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, ConfigDict, Field, model_validator
 
 
 class DatahubDatasetInfo(BaseModel):
@@ -38,6 +38,15 @@ class PurgeJobRunsRequest(BaseModel):
 
 class PurgeJobRunsResult(BaseModel):
     deleted_count: int
+    deleted_task_count: int = 0
+
+
+class DatahubRetentionResult(BaseModel):
+    cutoff: datetime
+    deleted_runs: int
+    deleted_tasks: int
+    orphan_objects: int = 0
+    deleted_objects: int = 0
 
 
 class DatahubFailureGroupInfo(BaseModel):
@@ -65,6 +74,31 @@ class RetryFailedTasksResult(BaseModel):
     retried_symbols: list[str] = Field(default_factory=list)
 
 
+class MarketDailyGapRange(BaseModel):
+    symbol: str
+    start_date: date
+    end_date: date
+    trading_days: int
+
+
+class MarketDailyGapScanResult(BaseModel):
+    start_date: date
+    end_date: date
+    trading_days: int
+    expected_count: int
+    missing_symbol_count: int
+    missing_days: int
+    ranges: list[MarketDailyGapRange] = Field(default_factory=list)
+    resumed_from: int = 0
+
+
+class MarketDailyGapFillRun(BaseModel):
+    start_date: date
+    end_date: date
+    symbols: list[str] = Field(default_factory=list)
+    estimated_cost: int
+
+
 class MarketDailyMissingScanResult(BaseModel):
     dataset: str = "market_daily"
     start_date: date
@@ -74,6 +108,8 @@ class MarketDailyMissingScanResult(BaseModel):
     existing_count: int
     missing_count: int
     missing_symbols: list[str] = Field(default_factory=list)
+    missing_days: int = 0
+    missing_ranges: list[MarketDailyGapRange] = Field(default_factory=list)
 
 
 class FillMarketDailyMissingRequest(BaseModel):
@@ -81,13 +117,25 @@ class FillMarketDailyMissingRequest(BaseModel):
     end_date: date
     reference_date: Optional[date] = None
     max_symbols: int = Field(500, ge=1, le=5000)
-    batch_size: int = Field(200, ge=1, le=1000)
+    batch_size: int = Field(200, ge=1, le=1000, description="单个作业的 symbol 数上限")
+    max_run_cost: Optional[int] = Field(None, ge=1, description="单个作业的预估抓取成本上限，缺省取配置")
 
 
 class FillMarketDailyMissingResult(BaseModel):
     created_runs: int
     filled_symbols: int
     symbols: list[str] = Field(default_factory=list)
+    runs: list[MarketDailyGapFillRun] = Field(default_factory=list)
+
+
+class MarketDailyCompactionResult(BaseModel):
+    start_date: date
+    end_date: date
+    symbol_count: int
+    month_count: int
+    row_count: int
+    object_keys: list[str] = Field(default_factory=list)
+    pruned_objects: int = 0
 
 
 class DatahubJobTaskInfo(BaseModel):
@@ -173,6 +221,9 @@ class DatahubMetricsSummaryInfo(BaseModel):
     p0_quality_count: int
     provider_cooldown_count: int
     provider_degraded_count: int
+    task_status_counts: dict[str, int] = Field(default_factory=dict)
+    failed_tasks_by_error_class: dict[str, int] = Field(default_factory=dict)
+    failed_tasks_by_provider: dict[str, int] = Field(default_factory=dict)
 
 
 class TriggerBackfillRequest(BaseModel):
@@ -181,6 +232,7 @@ class TriggerBackfillRequest(BaseModel):
     end_date: date = Field(..., description="结束日期")
     symbol: Optional[str] = Field(None, description="证券代码，可选")
     symbols: Optional[list[str]] = Field(None, description="证券代码列表，可选，优先于 symbol")
+    merge_latest: bool = Field(False, description="合并进 symbol 当前 latest 对象后再发布（缺口补数用）")
 
     @model_validator(mode="after")
     def validate_symbol_fields(self) -> "TriggerBackfillRequest":
@@ -267,6 +319,17 @@ class WatchlistBoardRow(BaseModel):
     has_data: bool = False
 
 
+class SecurityMasterSearchItem(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    symbol: str
+    name: str
+    exchange: Optional[str] = None
+    status: Optional[str] = None
+
+
 class WatchlistBoardResponse(BaseModel):
     limit_days: int
     rows: list[WatchlistBoardRow] = Field(default_factory=list)
+    snapshot_version: Optional[int] = Field(None, description="物化快照版本号，直接计算时为空")
+    computed_at: Optional[datetime] = Field(None, description="物化快照计算时间")
@@ -3,15 +3,21 @@ DataHub 服务导出
 """
 
 from .datahub_service import DatahubService
+from .board_snapshot_service import DatahubBoardSnapshotService
 from .context_export_service import ContextExportService
 from .daily_brief_service import DailyBriefService
 from .extended_dataset_sync_service import ExtendedDatasetSyncService
 from .market_daily_backfill_service import MarketDailyBackfillService
+from .market_daily_compaction_service import MarketDailyCompactionService
+from .market_daily_gap_service import MarketDailyGapService
 from .market_daily_incremental_service import MarketDailyIncrementalService
 from .metadata_service import DatahubMetadataService
+from .metrics_rollup_service import DatahubMetricsRollupService
 from .provider_health_service import DatahubProviderHealthService
 from .quality_service import DatahubQualityService
+from .retention_service import DatahubRetentionService
 from .router_service import DatahubRouterService
+from .security_master_read_service import SecurityMasterReadService
 from .security_master_sync_service import SecurityMasterSyncService
 from .trading_calendar_sync_service import TradingCalendarSyncService
 from .storage_service import DatahubStorageService
@@ -20,15 +26,21 @@ from .watchlist_service import DatahubWatchlistService
 
 __all__ = [
     "DatahubService",
+    "DatahubBoardSnapshotService",
     "ContextExportService",
     "DailyBriefService",
     "ExtendedDatasetSyncService",
     "MarketDailyBackfillService",
+    "MarketDailyCompactionService",
+    "MarketDailyGapService",
     "MarketDailyIncrementalService",
     "DatahubMetadataService",
+    "DatahubMetricsRollupService",
     "DatahubProviderHealthService",
     "DatahubQualityService",
+    "DatahubRetentionService",
     "DatahubRouterService",
+    "SecurityMasterReadService",
     "SecurityMasterSyncService",
     "DatahubStorageService",
     "TradingCalendarSyncService",
@@ -0,0 +1,96 @@
+from __future__ import annotations
+
+import logging
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlalchemy import update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.datahub.models import DatahubBoardSnapshot
+from app.datahub.schemas.datahub import WatchlistBoardResponse
+from app.datahub.services.watchlist_service import DatahubWatchlistService, invalidate_board_snapshots
+
+logger = logging.getLogger(__name__)
+
+
+class DatahubBoardSnapshotService:
+    """自选股看板物化快照。
+
+    读路径按 ``limit_days`` 唯一键读取一行已计算好的看板；自选股变更时快照被标记失效并递增版本号，
+    日线增量作业完成后重新计算。重算按开始时的版本号条件写回，期间若再次失效则保留失效标记，
+    由下一次读取重新计算，避免把旧数据标记为最新。
+    """
+
+    def __init__(self, db: Session, watchlist_service: Optional[DatahubWatchlistService] = None):
+        self.db = db
+        self.watchlist_service = watchlist_service or DatahubWatchlistService(db)
+
+    def get_board(self, *, limit_days: int = 30) -> WatchlistBoardResponse:
+        row = self._get_row(limit_days)
+        if row is not None and self._is_fresh(row):
+            return self._to_response(row)
+        return self._rebuild(limit_days, row)
+
+    def refresh(self) -> int:
+        """重新计算所有已物化的看板，返回重算的快照数。"""
+        limit_days_list = [value for (value,) in self.db.query(DatahubBoardSnapshot.limit_days).all()]
+        for limit_days in limit_days_list:
+            self._rebuild(limit_days, self._get_row(limit_days))
+        return len(limit_days_list)
+
+    def invalidate(self) -> int:
+        count = invalidate_board_snapshots(self.db)
+        self.db.commit()
+        return count
+
+    def _rebuild(self, limit_days: int, row: Optional[DatahubBoardSnapshot]) -> WatchlistBoardResponse:
+        if row is None:
+            row = self._create_row(limit_days)
+        snapshot_id, version = row.id, row.version
+        board = self.watchlist_service.get_board(limit_days=limit_days)
+        computed_at = datetime.now(timezone.utc)
+        result = self.db.execute(
+            update(DatahubBoardSnapshot)
+            .where(DatahubBoardSnapshot.id == snapshot_id, DatahubBoardSnapshot.version == version)
+            .values(
+                payload=board.model_dump(mode="json", exclude={"snapshot_version", "computed_at"}),
+                is_stale=False,
+                as_of_date=date.today(),
+                computed_at=computed_at,
+            )
+        )
+        self.db.commit()
+        if result.rowcount == 0:
+            logger.info("看板快照计算期间已失效，保留待重算标记 limit_days=%s", limit_days)
+            return board
+        return board.model_copy(update={"snapshot_version": version, "computed_at": computed_at})
+
+    def _create_row(self, limit_days: int) -> DatahubBoardSnapshot:
+        row = DatahubBoardSnapshot(limit_days=limit_days, version=0, is_stale=True)
+        self.db.add(row)
+        try:
+            self.db.commit()
+        except IntegrityError:
+            # 并发请求已创建同一快照行
+            self.db.rollback()
+            existing = self._get_row(limit_days)
+            if existing is None:
+                raise
+            return existing
+        return row
+
+    def _get_row(self, limit_days: int) -> Optional[DatahubBoardSnapshot]:
+        return self.db.query(DatahubBoardSnapshot).filter(DatahubBoardSnapshot.limit_days == limit_days).first()
+
+    @staticmethod
+    def _is_fresh(row: DatahubBoardSnapshot) -> bool:
+        # 跨自然日后看板窗口随之移动，当天首次读取时重算
+        return not row.is_stale and row.payload is not None and row.as_of_date == date.today()
+
+    @staticmethod
+    def _to_response(row: DatahubBoardSnapshot) -> WatchlistBoardResponse:
+        return WatchlistBoardResponse.model_validate(
+            {**row.payload, "snapshot_version": row.version, "computed_at": row.computed_at}
+        )
@@ -16,6 +16,7 @@ from app.datahub.schemas.daily_brief import (
     DailyBriefWatchlistItemInfo,
 )
 from app.datahub.schemas.datahub import TriggerDailyIncrementalRequest, WatchlistBoardResponse, WatchlistBoardRow
+from app.datahub.services.board_snapshot_service import DatahubBoardSnapshotService
 from app.datahub.services.datahub_service import DatahubService
 from app.datahub.services.watchlist_service import DatahubWatchlistService
 
@@ -28,17 +29,28 @@ class DailyBriefService:
         db: Session | None = None,
         datahub_service: DatahubService | None = None,
         watchlist_service: DatahubWatchlistService | None = None,
+        board_service: DatahubBoardSnapshotService | None = None,
     ):
         if db is None and (datahub_service is None or watchlist_service is None):
             raise ValueError("db 或显式 service 依赖至少提供一种")
         self.db = db
         self.datahub_service = datahub_service or DatahubService(db)  # type: ignore[arg-type]
         self.watchlist_service = watchlist_service or DatahubWatchlistService(db)  # type: ignore[arg-type]
+        # 看板读取走物化快照；未提供 db 时（如显式注入的替身）直接使用 watchlist_service
+        if board_service is None and db is not None:
+            board_service = DatahubBoardSnapshotService(db, watchlist_service=self.watchlist_service)
+        self.board_service = board_service or self.watchlist_service
 
-    def get_readiness(self, *, as_of_date: date | None = None) -> DailyBriefReadinessInfo:
+    def get_readiness(
+        self,
+        *,
+        as_of_date: date | None = None,
+        board: WatchlistBoardResponse | None = None,
+    ) -> DailyBriefReadinessInfo:
         target_date = as_of_date or date.today()
         heartbeat = self.datahub_service.get_worker_heartbeat()
-        board = self.watchlist_service.get_board(limit_days=10)
+        if board is None:
+            board = self.board_service.get_board(limit_days=10)
         latest_trade_date = self._latest_trade_date(board)
         missing_count = sum(1 for row in board.rows if not row.has_data)
         warnings: list[str] = []
@@ -79,8 +91,8 @@ class DailyBriefService:
 
     def get_today_context(self, *, as_of_date: date | None = None) -> DailyBriefContextInfo:
         target_date = as_of_date or date.today()
-        board = self.watchlist_service.get_board(limit_days=10)
-        readiness = self.get_readiness(as_of_date=target_date)
+        board = self.board_service.get_board(limit_days=10)
+        readiness = self.get_readiness(as_of_date=target_date, board=board)
         watchlist = [self._to_watchlist_item(row, readiness.latest_trade_date) for row in board.rows]
         risk_flags = self._build_risk_flags(watchlist)
         return DailyBriefContextInfo(
@@ -1,9 +1,10 @@
 from collections import defaultdict
 from datetime import date, datetime, timedelta, timezone
-import math
 
+from sqlalchemy import and_, case, func, or_, text, update
 from sqlalchemy.orm import Session
 
+from app.core.api import BusinessException, ErrorCode
 from app.datahub.models import (
     DatahubDatasetCatalog,
     DatahubJobRun,
@@ -22,6 +23,7 @@ from app.datahub.schemas.datahub import (
     FillMarketDailyMissingResult,
     DatahubObjectIndexInfo,
     MarketDailyMissingScanResult,
+    PurgeJobRunsResult,
     RetryFailedTasksResult,
     DatahubQualityReportInfo,
     DatahubProviderHealthInfo,
@@ -33,7 +35,9 @@ from app.datahub.schemas.datahub import (
 from app.datahub.catalog import get_dataset_label
 from app.datahub.enums import DatahubTaskStatus
 from app.datahub.normalize import normalize_symbol
-from app.datahub.providers import BaoStockProvider
+from app.datahub.services.market_daily_gap_service import MarketDailyGapService
+from app.datahub.services.metrics_rollup_service import DatahubMetricsRollupService
+from app.datahub.services.retention_service import DatahubRetentionService
 
 
 class DatahubService:
@@ -54,6 +58,9 @@ class DatahubService:
         "financial_summary",
     }
 
+    # 新作业创建后通过 PostgreSQL NOTIFY 唤醒空闲 Worker
+    RUN_NOTIFY_CHANNEL = "datahub_job_runs"
+
     def __init__(self, db: Session):
         self.db = db
 
@@ -233,51 +240,45 @@ class DatahubService:
         return items
 
     def get_metrics_summary(self, *, window_days: int = 7) -> DatahubMetricsSummaryInfo:
+        """窗口指标：作业与子任务取自小时汇总表（叠加未汇总的尾部），质量与数据源状态在库内聚合。"""
         now = datetime.now(timezone.utc)
         window_start = now - timedelta(days=window_days)
-        runs = self.db.query(DatahubJobRun).filter(DatahubJobRun.created_at >= window_start).all()
-        total_runs = len(runs)
-        success_runs = sum(1 for row in runs if row.status == DatahubTaskStatus.SUCCESS.value)
-        failed_runs = sum(1 for row in runs if row.status == DatahubTaskStatus.FAILED.value)
-        running_runs = sum(1 for row in runs if row.status == DatahubTaskStatus.RUNNING.value)
+        window = DatahubMetricsRollupService(self.db).summarize(window_start=window_start)
+        total_runs = window.total_runs
+        success_runs = window.run_status_counts[DatahubTaskStatus.SUCCESS.value]
         success_rate = (success_runs / total_runs) if total_runs > 0 else 0.0
 
-        durations: list[float] = []
-        for row in runs:
-            if row.started_at and row.finished_at:
-                durations.append(max(0.0, (row.finished_at - row.started_at).total_seconds()))
-        avg_duration = (sum(durations) / len(durations)) if durations else 0.0
-        p95_duration = 0.0
-        if durations:
-            ordered = sorted(durations)
-            p95_index = min(len(ordered) - 1, max(0, math.ceil(len(ordered) * 0.95) - 1))
-            p95_duration = ordered[p95_index]
-
-        quality_rows = self.db.query(DatahubQualityReport).filter(DatahubQualityReport.created_at >= window_start).all()
-        avg_quality_score = (
-            sum(row.quality_score for row in quality_rows) / len(quality_rows)
-            if quality_rows
-            else 0.0
+        avg_quality_score, p0_quality_count = (
+            self.db.query(
+                func.avg(DatahubQualityReport.quality_score),
+                func.count(case((DatahubQualityReport.severity == "p0", 1))),
+            )
+            .filter(DatahubQualityReport.created_at >= window_start)
+            .one()
+        )
+        provider_status_counts = dict(
+            self.db.query(DatahubProviderHealth.status, func.count(DatahubProviderHealth.id))
+            .filter(DatahubProviderHealth.status.in_(("cooldown", "degraded")))
+            .group_by(DatahubProviderHealth.status)
+            .all()
         )
-        p0_quality_count = sum(1 for row in quality_rows if row.severity == "p0")
-
-        provider_rows = self.db.query(DatahubProviderHealth).all()
-        cooldown_count = sum(1 for row in provider_rows if row.status == "cooldown")
-        degraded_count = sum(1 for row in provider_rows if row.status == "degraded")
 
         return DatahubMetricsSummaryInfo(
             window_days=window_days,
             total_runs=total_runs,
             success_runs=success_runs,
-            failed_runs=failed_runs,
-            running_runs=running_runs,
+            failed_runs=window.run_status_counts[DatahubTaskStatus.FAILED.value],
+            running_runs=window.run_status_counts[DatahubTaskStatus.RUNNING.value],
             success_rate=success_rate,
-            avg_duration_seconds=avg_duration,
-            p95_duration_seconds=p95_duration,
-            avg_quality_score=avg_quality_score,
+            avg_duration_seconds=window.avg_duration_seconds,
+            p95_duration_seconds=window.duration_percentile(0.95),
+            avg_quality_score=float(avg_quality_score or 0.0),
             p0_quality_count=p0_quality_count,
-            provider_cooldown_count=cooldown_count,
-            provider_degraded_count=degraded_count,
+            provider_cooldown_count=provider_status_counts.get("cooldown", 0),
+            provider_degraded_count=provider_status_counts.get("degraded", 0),
+            task_status_counts=dict(window.task_status_counts),
+            failed_tasks_by_error_class=dict(window.failed_tasks_by_error_class),
+            failed_tasks_by_provider=dict(window.failed_tasks_by_provider),
         )
 
     def upsert_worker_heartbeat(
@@ -288,7 +289,14 @@ class DatahubService:
         last_run_id: str | None = None,
         increment_processed: bool = False,
         last_error: str | None = None,
+        processed_delta: int = 0,
+        renew_run_ids: list[str] | None = None,
+        lease_seconds: int | None = None,
     ) -> None:
+        """写入 Worker 心跳；传入 ``renew_run_ids`` 时在同一事务内续期这些作业的认领租约。"""
+        processed = processed_delta + (1 if increment_processed else 0)
+        if renew_run_ids and lease_seconds:
+            self._renew_run_leases(worker_name=worker_name, run_ids=renew_run_ids, lease_seconds=lease_seconds)
         row = self.db.query(DatahubWorkerHeartbeat).filter(DatahubWorkerHeartbeat.worker_name == worker_name).first()
         if row is None:
             row = DatahubWorkerHeartbeat(
@@ -296,7 +304,7 @@ class DatahubService:
                 status=status,
                 last_heartbeat_at=datetime.now(timezone.utc),
                 last_run_id=last_run_id,
-                processed_count=1 if increment_processed else 0,
+                processed_count=processed,
                 last_error=last_error,
             )
             self.db.add(row)
@@ -306,8 +314,8 @@ class DatahubService:
         row.status = status
         row.last_heartbeat_at = datetime.now(timezone.utc)
         row.last_run_id = last_run_id or row.last_run_id
-        if increment_processed:
-            row.processed_count = row.processed_count + 1
+        if processed:
+            row.processed_count = row.processed_count + processed
         row.last_error = last_error
         self.db.commit()
 
@@ -336,7 +344,14 @@ class DatahubService:
             offline_threshold_seconds=offline_threshold_seconds,
         )
 
-    def create_backfill_job(self, payload: TriggerBackfillRequest, trigger_source: str = "api") -> DatahubJobRunInfo:
+    def create_backfill_job(
+        self,
+        payload: TriggerBackfillRequest,
+        trigger_source: str = "api",
+        claimed_by: str | None = None,
+        lease_seconds: int = 60,
+    ) -> DatahubJobRunInfo:
+        """创建回填作业；给出 ``claimed_by`` 时作业创建即被其认领（CLI 就地执行），不再通知 Worker。"""
         if payload.dataset not in self.SUPPORTED_BACKFILL_DATASETS:
             raise BusinessException(
                 f"当前不支持 backfill dataset: {payload.dataset}",
@@ -371,6 +386,7 @@ class DatahubService:
             attempts=0,
         )
         self.db.add(task)
+        self._hold_or_notify(job_run, claimed_by=claimed_by, lease_seconds=lease_seconds)
         self.db.commit()
         self.db.refresh(job_run)
         return self._to_job_info(job_run)
@@ -379,7 +395,10 @@ class DatahubService:
         self,
         payload: TriggerDailyIncrementalRequest,
         trigger_source: str = "api",
+        claimed_by: str | None = None,
+        lease_seconds: int = 60,
     ) -> DatahubJobRunInfo:
+        """创建日增量作业；``claimed_by`` 语义同 :meth:`create_backfill_job`。"""
         if payload.dataset not in self.SUPPORTED_DAILY_DATASETS:
             raise BusinessException(
                 f"当前不支持 daily_incremental dataset: {payload.dataset}",
@@ -397,6 +416,8 @@ class DatahubService:
             task_failed=0,
         )
         self.db.add(job_run)
+        self.db.flush()
+        self._hold_or_notify(job_run, claimed_by=claimed_by, lease_seconds=lease_seconds)
         self.db.commit()
         self.db.refresh(job_run)
         return self._to_job_info(job_run)
@@ -420,6 +441,81 @@ class DatahubService:
         )
         return [row.id for row in rows]
 
+    def claim_runs(self, *, worker_name: str, limit: int, lease_seconds: int) -> list[str]:
+        """原子认领待执行作业，返回认领成功的作业 ID。
+
+        可认领：pending 且未被认领或租约已过期；以及由 Worker 认领后 running、但租约已过期
+        （认领者已崩溃）的作业。PostgreSQL 下以 ``FOR UPDATE SKIP LOCKED`` 选取候选行，并发 Worker
+        互不阻塞；逐行条件更新作为比较并交换，保证在不支持行锁的数据库上同一作业也只会被认领一次。
+        """
+        now = datetime.now(timezone.utc)
+        claimable = self._claimable_condition(now)
+        candidates = (
+            self.db.query(DatahubJobRun.id)
+            .filter(claimable)
+            .order_by(DatahubJobRun.created_at.asc())
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        claimed: list[str] = []
+        lease_expires_at = now + timedelta(seconds=lease_seconds)
+        for row in candidates:
+            result = self.db.execute(
+                update(DatahubJobRun)
+                .where(DatahubJobRun.id == row.id, claimable)
+                .values(claimed_by=worker_name, lease_expires_at=lease_expires_at)
+                .execution_options(synchronize_session=False)
+            )
+            if result.rowcount == 1:
+                claimed.append(row.id)
+        self.db.commit()
+        return claimed
+
+    def release_run(self, *, run_id: str, worker_name: str) -> None:
+        """作业执行结束后释放租约；认领者信息保留用于排查。"""
+        self.db.execute(
+            update(DatahubJobRun)
+            .where(DatahubJobRun.id == run_id, DatahubJobRun.claimed_by == worker_name)
+            .values(lease_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+
+    def _renew_run_leases(self, *, worker_name: str, run_ids: list[str], lease_seconds: int) -> None:
+        self.db.execute(
+            update(DatahubJobRun)
+            .where(DatahubJobRun.id.in_(run_ids), DatahubJobRun.claimed_by == worker_name)
+            .values(lease_expires_at=datetime.now(timezone.utc) + timedelta(seconds=lease_seconds))
+            .execution_options(synchronize_session=False)
+        )
+
+    @staticmethod
+    def _claimable_condition(now: datetime):
+        lease_free = or_(DatahubJobRun.lease_expires_at.is_(None), DatahubJobRun.lease_expires_at < now)
+        return or_(
+            and_(DatahubJobRun.status == DatahubTaskStatus.PENDING.value, lease_free),
+            and_(
+                DatahubJobRun.status == DatahubTaskStatus.RUNNING.value,
+                DatahubJobRun.claimed_by.isnot(None),
+                DatahubJobRun.lease_expires_at < now,
+            ),
+        )
+
+    def _hold_or_notify(self, job_run: DatahubJobRun, *, claimed_by: str | None, lease_seconds: int) -> None:
+        if claimed_by is None:
+            self._notify_run_created(job_run.id)
+            return
+        # 与作业同一事务写入认领者与租约，Worker 在租约有效期内不会再认领
+        job_run.claimed_by = claimed_by
+        job_run.lease_expires_at = datetime.now(timezone.utc) + timedelta(seconds=lease_seconds)
+
+    def _notify_run_created(self, run_id: str) -> None:
+        # NOTIFY 随事务提交才投递，Worker 被唤醒时作业已可见
+        if self.db.get_bind().dialect.name != "postgresql":
+            return
+        self.db.execute(text("SELECT pg_notify(:channel, :run_id)"), {"channel": self.RUN_NOTIFY_CHANNEL, "run_id": run_id})
+
     def delete_job_run(self, run_id: str) -> None:
         row = self.db.query(DatahubJobRun).filter(DatahubJobRun.id == run_id).first()
         if row is None:
@@ -429,24 +525,15 @@ class DatahubService:
         self.db.delete(row)
         self.db.commit()
 
-    def purge_job_runs(self, *, status: str, limit: int) -> int:
+    def purge_job_runs(self, *, status: str, limit: int) -> PurgeJobRunsResult:
         if status == DatahubTaskStatus.RUNNING.value:
             raise BusinessException("不支持删除 running 状态的作业批量记录", code=ErrorCode.VALIDATION_ERROR)
         allowed = {s.value for s in DatahubTaskStatus}
         if status not in allowed:
             raise BusinessException(f"无效的 status: {status}", code=ErrorCode.VALIDATION_ERROR)
 
-        rows = (
-            self.db.query(DatahubJobRun)
-            .filter(DatahubJobRun.status == status)
-            .order_by(DatahubJobRun.created_at.asc())
-            .limit(limit)
-            .all()
-        )
-        for row in rows:
-            self.db.delete(row)
-        self.db.commit()
-        return len(rows)
+        deleted_runs, deleted_tasks = DatahubRetentionService(self.db).purge_runs(statuses=[status], limit=limit)
+        return PurgeJobRunsResult(deleted_count=deleted_runs, deleted_task_count=deleted_tasks)
 
     def get_run_failure_detail(self, run_id: str, limit: int = 200) -> DatahubRunFailureDetailInfo:
         run = self.db.query(DatahubJobRun).filter(DatahubJobRun.id == run_id).first()
@@ -516,52 +603,57 @@ class DatahubService:
         if strategy not in {"immediate", "by_error"}:
             raise BusinessException("不支持的重试策略", code=ErrorCode.VALIDATION_ERROR)
 
-        failed_tasks = (
-            self.db.query(DatahubJobTask)
-            .filter(
-                DatahubJobTask.job_run_id == run_id,
-                DatahubJobTask.status == DatahubTaskStatus.FAILED.value,
-            )
-            .order_by(DatahubJobTask.created_at.asc())
+        failed = and_(
+            DatahubJobTask.job_run_id == run_id,
+            DatahubJobTask.status == DatahubTaskStatus.FAILED.value,
+        )
+        skipped = (
+            self.db.query(func.count(DatahubJobTask.id))
+            .filter(failed, DatahubJobTask.attempts >= max_retry_attempts)
+            .scalar()
+        )
+        retryable = and_(failed, DatahubJobTask.attempts < max_retry_attempts)
+        group_columns = [DatahubJobTask.dataset, DatahubJobTask.start_date, DatahubJobTask.end_date]
+        if strategy == "by_error":
+            group_columns.append(func.coalesce(DatahubJobTask.last_error, "unknown"))
+        groups = (
+            self.db.query(*group_columns, func.count(DatahubJobTask.id))
+            .filter(retryable)
+            .group_by(*group_columns)
+            .order_by(func.min(DatahubJobTask.created_at))
             .all()
         )
-        if not failed_tasks:
-            return RetryFailedTasksResult(created_runs=0, skipped_tasks=0, retried_tasks=0, retried_symbols=[])
-
-        filtered_tasks: list[DatahubJobTask] = []
-        skipped = 0
-        for task in failed_tasks:
-            if task.attempts >= max_retry_attempts:
-                skipped += 1
-                continue
-            filtered_tasks.append(task)
-
-        grouped: dict[tuple[str, date | None, date | None, str], list[DatahubJobTask]] = defaultdict(list)
-        for task in filtered_tasks:
-            error_key = task.last_error or "unknown"
-            key = (
-                task.dataset,
-                task.start_date,
-                task.end_date,
-                error_key if strategy == "by_error" else "all",
-            )
-            grouped[key].append(task)
 
         created_runs = 0
+        retried_tasks = 0
         retried_symbols: list[str] = []
-        for (_, start_date, end_date, _), tasks in grouped.items():
+        for group in groups:
+            count = group[-1]
+            retried_tasks += count
+            start_date, end_date = group[1], group[2]
             if start_date is None or end_date is None:
-                skipped += len(tasks)
+                skipped += count
                 continue
-            symbols = sorted({normalize_symbol(task.symbol) for task in tasks if task.symbol})
+            symbol_rows = (
+                self.db.query(DatahubJobTask.symbol)
+                .filter(
+                    retryable,
+                    DatahubJobTask.symbol.is_not(None),
+                    *(column == value for column, value in zip(group_columns, group[:-1])),
+                )
+                .distinct()
+                .all()
+            )
+            symbols = sorted({normalize_symbol(row.symbol) for row in symbol_rows if row.symbol})
             if not symbols:
-                skipped += len(tasks)
+                skipped += count
                 continue
             payload = TriggerBackfillRequest(
                 dataset="market_daily",
                 start_date=start_date,
                 end_date=end_date,
                 symbols=symbols,
+                merge_latest=bool((run.job_params or {}).get("merge_latest")),
             )
             self.create_backfill_job(payload, trigger_source=f"retry:{run_id}")
             created_runs += 1
@@ -570,7 +662,7 @@ class DatahubService:
         return RetryFailedTasksResult(
             created_runs=created_runs,
             skipped_tasks=skipped,
-            retried_tasks=len(filtered_tasks),
+            retried_tasks=retried_tasks,
             retried_symbols=sorted(set(retried_symbols)),
         )
 
@@ -581,41 +673,21 @@ class DatahubService:
         end_date: date,
         reference_date: date | None = None,
         limit: int = 500,
+        resume: bool = True,
     ) -> MarketDailyMissingScanResult:
-        provider = BaoStockProvider()
-        ref_date = reference_date or end_date
-        rows = provider.get_security_master(day=ref_date)
-        expected_symbols = sorted(
-            {
-                normalize_symbol(row_symbol)
-                for row in rows
-                for row_symbol in [row.get("symbol")]
-                if row_symbol and row.get("status") == "active"
-            }
-        )
-        existing_symbols = {
-            normalize_symbol(item[0])
-            for item in (
-                self.db.query(DatahubObjectIndex.symbol)
-                .filter(
-                    DatahubObjectIndex.dataset == "market_daily",
-                    DatahubObjectIndex.start_date == start_date,
-                    DatahubObjectIndex.end_date == end_date,
-                    DatahubObjectIndex.symbol.isnot(None),
-                )
-                .all()
-            )
-            if item[0]
-        }
-        missing_symbols = sorted([symbol for symbol in expected_symbols if symbol not in existing_symbols])
+        """按对象索引与交易日历扫描缺口（不调用数据源）；reference_date 仅回显，证券范围取当前 security_master 快照。"""
+        scan = MarketDailyGapService(self.db).scan(start_date=start_date, end_date=end_date, resume=resume)
+        missing_symbols = sorted({item.symbol for item in scan.ranges})
         return MarketDailyMissingScanResult(
             start_date=start_date,
             end_date=end_date,
-            reference_date=ref_date,
-            expected_count=len(expected_symbols),
-            existing_count=len(existing_symbols),
+            reference_date=reference_date or end_date,
+            expected_count=scan.expected_count,
+            existing_count=scan.expected_count - len(missing_symbols),
             missing_count=len(missing_symbols),
             missing_symbols=missing_symbols[:limit],
+            missing_days=scan.missing_days,
+            missing_ranges=scan.ranges[:limit],
         )
 
     def fill_market_daily_missing(
@@ -626,32 +698,36 @@ class DatahubService:
         reference_date: date | None = None,
         max_symbols: int = 500,
         batch_size: int = 200,
+        max_run_cost: int | None = None,
+        resume: bool = True,
     ) -> FillMarketDailyMissingResult:
-        scan = self.scan_market_daily_missing(
-            start_date=start_date,
-            end_date=end_date,
-            reference_date=reference_date,
-            limit=max_symbols,
-        )
-        symbols = scan.missing_symbols[:max_symbols]
+        gap_service = MarketDailyGapService(self.db)
+        scan = gap_service.scan(start_date=start_date, end_date=end_date, resume=resume)
+        symbols = sorted({item.symbol for item in scan.ranges})[:max_symbols]
         if not symbols:
             return FillMarketDailyMissingResult(created_runs=0, filled_symbols=0, symbols=[])
 
-        created_runs = 0
-        for i in range(0, len(symbols), batch_size):
-            chunk = symbols[i : i + batch_size]
+        selected = set(symbols)
+        runs = gap_service.plan_fill_runs(
+            [item for item in scan.ranges if item.symbol in selected],
+            gap_service.load_trading_days(start_date, end_date),
+            max_run_cost=max_run_cost,
+            max_symbols_per_run=batch_size,
+        )
+        for run in runs:
             payload = TriggerBackfillRequest(
                 dataset="market_daily",
-                start_date=start_date,
-                end_date=end_date,
-                symbols=chunk,
+                start_date=run.start_date,
+                end_date=run.end_date,
+                symbols=run.symbols,
+                merge_latest=True,
             )
             self.create_backfill_job(payload, trigger_source="auto-fill-missing")
-            created_runs += 1
         return FillMarketDailyMissingResult(
-            created_runs=created_runs,
+            created_runs=len(runs),
             filled_symbols=len(symbols),
             symbols=symbols,
+            runs=runs,
         )
 
     @staticmethod
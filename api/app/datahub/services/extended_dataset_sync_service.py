@@ -11,18 +11,31 @@ from app.datahub.enums import DatahubTaskStatus
 from app.datahub.models import DatahubDatasetWatermark, DatahubJobRun, DatahubJobTask, DatahubObjectIndex
 from app.datahub.normalize import normalize_symbol
 from app.datahub.providers import BaoStockProvider, EastMoneyProvider
+from app.datahub.quality import evaluate_quality, to_arrow_table
 from app.datahub.schemas.datahub import TriggerBackfillRequest, TriggerDailyIncrementalRequest
 from app.datahub.services.market_daily_backfill_service import MarketDailyBackfillService
 from app.datahub.services.provider_health_service import DatahubProviderHealthService
 from app.datahub.services.quality_service import DatahubQualityService
 from app.datahub.services.router_service import DatahubRouterService
+from app.datahub.services.snapshot_read_service import SnapshotDatasetReadService
 from app.datahub.services.storage_service import DatahubStorageService
+from app.datahub.services.sync_unit_of_work import SyncUnitOfWork
 from app.datahub.storage import MinioParquetStore
 
 
 class ExtendedDatasetSyncService:
     SUPPORTED_DATASETS = {"money_flow", "sector_members", "financial_summary"}
     SNAPSHOT_DATASETS = {"sector_members"}
+    # 支持按水位增量采集的数据集 -> 行主键（首列为窗口日期字段）
+    INCREMENTAL_KEYS = {
+        "money_flow": ("trade_date",),
+        "financial_summary": ("report_date", "metric_name"),
+    }
+    # 增量回看天数：源站会补发、修订水位附近的行，重叠窗口内的行每次重新采集并覆盖上次对象
+    INCREMENTAL_OVERLAP_DAYS = {
+        "money_flow": 7,
+        "financial_summary": 30,
+    }
 
     def __init__(self, db: Session):
         self.db = db
@@ -31,8 +44,9 @@ class ExtendedDatasetSyncService:
             "eastmoney": EastMoneyProvider(),
         }
         self.router_service = DatahubRouterService()
-        self.storage_service = DatahubStorageService(db)
-        self.quality_service = DatahubQualityService(db)
+        self.unit_of_work = SyncUnitOfWork(db)
+        self.storage_service = DatahubStorageService(db, self.unit_of_work)
+        self.quality_service = DatahubQualityService(db, self.unit_of_work)
         self.provider_health_service = DatahubProviderHealthService(db)
 
     def execute_backfill(self, run_id: str, payload: TriggerBackfillRequest) -> None:
@@ -92,6 +106,8 @@ class ExtendedDatasetSyncService:
             except Exception as exc:
                 self._mark_task_failed(task, str(exc))
                 failed += 1
+            self.unit_of_work.maybe_flush()
+        self.unit_of_work.flush()
         self._finish_run(run, success=success, failed=failed)
         if failed > 0:
             raise BusinessException(
@@ -108,7 +124,21 @@ class ExtendedDatasetSyncService:
         end_date: date,
         batch_prefix: str,
     ) -> tuple[float, str, bool, date, bool]:
-        rows, provider_name = self._load_rows(dataset=dataset, symbol=symbol, start_date=start_date, end_date=end_date)
+        since, previous_rows = self._load_incremental_base(
+            dataset=dataset,
+            symbol=symbol,
+            start_date=start_date,
+            end_date=end_date,
+        )
+        rows, provider_name = self._load_rows(
+            dataset=dataset,
+            symbol=symbol,
+            start_date=start_date,
+            end_date=end_date,
+            since=since,
+        )
+        if since is not None:
+            rows = self._merge_incremental(dataset=dataset, previous_rows=previous_rows, new_rows=rows)
         if not rows:
             snapshot = self._get_stable_snapshot(dataset=dataset, symbol=symbol, required_end_date=end_date)
             if snapshot is not None:
@@ -130,11 +160,12 @@ class ExtendedDatasetSyncService:
                 return score, object_key, True, snapshot_date, False
             raise BusinessException(f"{dataset} 未获取到有效数据", code=ErrorCode.BUSINESS_ERROR)
 
-        parquet_bytes = MarketDailyBackfillService._to_parquet_bytes(rows)
+        table = to_arrow_table(rows)
+        parquet_bytes = MarketDailyBackfillService._to_parquet_bytes(table)
         object_key = self._build_object_key(dataset=dataset, symbol=symbol, end_date=end_date, batch_prefix=batch_prefix)
         MinioParquetStore().put_bytes(object_key=object_key, data=parquet_bytes, content_type="application/octet-stream")
 
-        quality_score, issues, severity = self._quality_check(rows)
+        quality_score, issues, severity = evaluate_quality(dataset, table)
         self.storage_service.upsert_object_index(
             bucket=get_settings().MINIO_BUCKET_NAME,
             object_key=object_key,
@@ -177,6 +208,7 @@ class ExtendedDatasetSyncService:
         symbol: str | None,
         start_date: date,
         end_date: date,
+        since: date | None = None,
     ) -> tuple[list[dict], str]:
         priorities = self.router_service.get_provider_priority(dataset)
         errors: list[str] = []
@@ -197,7 +229,9 @@ class ExtendedDatasetSyncService:
                     rows = self.router_service.run_with_policy(
                         dataset=dataset,
                         provider=provider_name,
-                        operation=lambda: provider.get_money_flow(symbol=symbol, start_date=start_date, end_date=end_date),
+                        operation=lambda: provider.get_money_flow(
+                            symbol=symbol, start_date=start_date, end_date=end_date, since=since
+                        ),
                     )
                 elif dataset == "sector_members":
                     rows = self._load_sector_members(provider_name=provider_name, provider=provider, asof_date=end_date)
@@ -207,7 +241,9 @@ class ExtendedDatasetSyncService:
                     rows = self.router_service.run_with_policy(
                         dataset=dataset,
                         provider=provider_name,
-                        operation=lambda: provider.get_financial_statement(symbol=symbol, start_date=start_date, end_date=end_date),
+                        operation=lambda: provider.get_financial_statement(
+                            symbol=symbol, start_date=start_date, end_date=end_date, since=since
+                        ),
                     )
                 else:
                     rows = []
@@ -215,7 +251,7 @@ class ExtendedDatasetSyncService:
                 self.provider_health_service.record_failure(provider=provider_name, dataset=dataset, error=str(exc))
                 errors.append(f"{provider_name} 失败: {exc}")
                 continue
-            if not rows:
+            if not rows and since is None:
                 self.provider_health_service.record_failure(provider=provider_name, dataset=dataset, error="查询结果为空")
                 errors.append(f"{provider_name} 返回空数据")
                 continue
@@ -223,6 +259,52 @@ class ExtendedDatasetSyncService:
             return rows, provider_name
         raise BusinessException(f"{dataset} provider 获取失败: {' | '.join(errors)}", code=ErrorCode.BUSINESS_ERROR)
 
+    def _load_incremental_base(
+        self,
+        *,
+        dataset: str,
+        symbol: str | None,
+        start_date: date,
+        end_date: date,
+    ) -> tuple[date | None, list[dict]]:
+        """上次发布对象覆盖本次窗口起点时，返回 (增量起点, 上次对象中窗口内的行)，否则 (None, []) 走全量采集。
+
+        增量起点为水位日期回看 ``INCREMENTAL_OVERLAP_DAYS`` 天，迟到或修订的行在重叠窗口内被重新采集。
+        """
+        if dataset not in self.INCREMENTAL_KEYS or symbol is None:
+            return None, []
+        watermark = (
+            self.db.query(DatahubDatasetWatermark)
+            .filter(DatahubDatasetWatermark.dataset == dataset, DatahubDatasetWatermark.symbol == symbol)
+            .first()
+        )
+        if watermark is None or not watermark.last_object_key or watermark.last_success_date is None:
+            return None, []
+        indexed = (
+            self.db.query(DatahubObjectIndex.start_date)
+            .filter(DatahubObjectIndex.object_key == watermark.last_object_key)
+            .first()
+        )
+        if indexed is None or indexed.start_date is None or indexed.start_date > start_date:
+            return None, []
+        try:
+            previous_rows = SnapshotDatasetReadService._read_parquet_rows(watermark.last_object_key)
+        except Exception:
+            return None, []
+        date_field = self.INCREMENTAL_KEYS[dataset][0]
+        window_rows = [
+            row for row in previous_rows if row.get(date_field) is not None and start_date <= row[date_field] <= end_date
+        ]
+        since = min(watermark.last_success_date, end_date) - timedelta(days=self.INCREMENTAL_OVERLAP_DAYS[dataset])
+        return since, window_rows
+
+    def _merge_incremental(self, *, dataset: str, previous_rows: list[dict], new_rows: list[dict]) -> list[dict]:
+        """按行主键合并，增量行覆盖上次对象中的同键行。"""
+        key_fields = self.INCREMENTAL_KEYS[dataset]
+        merged = {tuple(row.get(field) for field in key_fields): row for row in previous_rows}
+        merged.update({tuple(row.get(field) for field in key_fields): row for row in new_rows})
+        return list(merged.values())
+
     def _load_sector_members(self, *, provider_name: str, provider, asof_date: date) -> list[dict]:
         sectors = self.router_service.run_with_policy(
             dataset="sector_members",
@@ -349,41 +431,14 @@ class ExtendedDatasetSyncService:
         object_key: str,
         batch_prefix: str,
     ) -> None:
-        watermark_symbol = "__ALL__" if symbol is None else symbol
-        row = (
-            self.db.query(DatahubDatasetWatermark)
-            .filter(
-                DatahubDatasetWatermark.dataset == dataset,
-                DatahubDatasetWatermark.symbol == watermark_symbol,
-            )
-            .first()
+        self.unit_of_work.add_watermark(
+            dataset=dataset,
+            symbol="__ALL__" if symbol is None else symbol,
+            last_success_date=end_date,
+            last_quality_score=quality_score,
+            last_object_key=object_key,
+            last_batch_id=f"{batch_prefix}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}",
         )
-        if row is None:
-            row = DatahubDatasetWatermark(dataset=dataset, symbol=watermark_symbol)
-            self.db.add(row)
-        row.last_success_date = end_date
-        row.last_quality_score = quality_score
-        row.last_object_key = object_key
-        row.last_batch_id = f"{batch_prefix}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
-        self.db.commit()
-
-    @staticmethod
-    def _quality_check(rows: list[dict]) -> tuple[float, list[dict], str]:
-        total = len(rows)
-        missing = 0
-        for item in rows:
-            for value in item.values():
-                if value in (None, "", "NaN"):
-                    missing += 1
-        score = max(0.0, 100.0 - (missing / max(total, 1)))
-        issues = [{"rule": "missing_values", "count": missing}] if missing > 0 else []
-        if missing == 0:
-            severity = "p2"
-        elif missing <= max(5, total // 10):
-            severity = "p1"
-        else:
-            severity = "p0"
-        return score, issues, severity
 
     @staticmethod
     def _build_object_key(*, dataset: str, symbol: str | None, end_date: date, batch_prefix: str) -> str:
@@ -413,20 +468,18 @@ class ExtendedDatasetSyncService:
         self.db.commit()
 
     def _mark_task_running(self, task: DatahubJobTask) -> None:
-        task.status = DatahubTaskStatus.RUNNING.value
-        task.locked_at = datetime.now(timezone.utc)
-        task.attempts = task.attempts + 1
-        self.db.commit()
+        self.unit_of_work.add_task_transition(
+            task,
+            status=DatahubTaskStatus.RUNNING.value,
+            locked_at=datetime.now(timezone.utc),
+            attempts=task.attempts + 1,
+        )
 
     def _mark_task_success(self, task: DatahubJobTask) -> None:
-        task.status = DatahubTaskStatus.SUCCESS.value
-        task.last_error = None
-        self.db.commit()
+        self.unit_of_work.add_task_transition(task, status=DatahubTaskStatus.SUCCESS.value, last_error=None)
 
     def _mark_task_failed(self, task: DatahubJobTask, message: str) -> None:
-        task.status = DatahubTaskStatus.FAILED.value
-        task.last_error = message[:2000]
-        self.db.commit()
+        self.unit_of_work.add_task_transition(task, status=DatahubTaskStatus.FAILED.value, last_error=message[:2000])
 
     def _require_run(self, run_id: str) -> DatahubJobRun:
         row = self.db.query(DatahubJobRun).filter(DatahubJobRun.id == run_id).first()
@@ -1,37 +1,80 @@
 from __future__ import annotations
 
 import hashlib
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import date, datetime, timedelta, timezone
 from io import BytesIO
+from typing import TYPE_CHECKING, Callable, Union
 
 from sqlalchemy.orm import Session
 
+from app.common.deps.database import SessionLocal
 from app.core.api import BusinessException, ErrorCode
 from app.core.config import get_settings
 from app.datahub.enums import DatahubTaskStatus
 from app.datahub.models import DatahubObjectIndex
 from app.datahub.models import DatahubDatasetWatermark, DatahubJobRun, DatahubJobTask
 from app.datahub.normalize import normalize_symbol
+from app.datahub.quality import evaluate_quality, to_arrow_table
 from app.datahub.providers import BaoStockProvider, EastMoneyProvider
 from app.datahub.schemas.datahub import TriggerBackfillRequest
+from app.datahub.services.market_daily_compaction_service import MarketDailyCompactionService
+from app.datahub.services.object_key_resolver import ObjectKeyResolver
 from app.datahub.services.router_service import DatahubRouterService
 from app.datahub.services.provider_health_service import DatahubProviderHealthService
 from app.datahub.services.quality_service import DatahubQualityService
 from app.datahub.services.storage_service import DatahubStorageService
+from app.datahub.services.sync_unit_of_work import SyncUnitOfWork
 from app.datahub.storage import MinioParquetStore
 
+if TYPE_CHECKING:  # pragma: no cover
+    import pyarrow as pa
+
+logger = logging.getLogger(__name__)
+
+SymbolResult = tuple[float, str, bool, date, bool]
+
 
 class MarketDailyBackfillService:
-    def __init__(self, db: Session):
+    # baostock 客户端为进程内全局会话，非线程安全，必须串行访问
+    PROVIDER_CONCURRENCY_LIMITS = {
+        "baostock": 1,
+        "eastmoney": 4,
+    }
+
+    def __init__(
+        self,
+        db: Session,
+        *,
+        max_workers: int | None = None,
+        provider_limits: dict[str, int] | None = None,
+        session_factory: Callable[[], Session] | None = None,
+        unit_of_work: SyncUnitOfWork | None = None,
+    ):
         self.db = db
         self.providers = {
             "baostock": BaoStockProvider(),
             "eastmoney": EastMoneyProvider(),
         }
         self.router_service = DatahubRouterService()
-        self.storage_service = DatahubStorageService(db)
-        self.quality_service = DatahubQualityService(db)
+        # 任务状态、对象索引、质量报告与水位统一经写缓冲批量落库
+        self.unit_of_work = unit_of_work or SyncUnitOfWork(db)
+        self.storage_service = DatahubStorageService(db, self.unit_of_work)
+        self.quality_service = DatahubQualityService(db, self.unit_of_work)
         self.provider_health_service = DatahubProviderHealthService(db)
+        self.max_workers = max(1, max_workers or get_settings().DATAHUB_BACKFILL_MAX_WORKERS)
+        self.session_factory = session_factory or SessionLocal
+        limits = {**self.PROVIDER_CONCURRENCY_LIMITS, **(provider_limits or {})}
+        self.provider_slots = {
+            name: threading.BoundedSemaphore(max(1, limit)) for name, limit in limits.items()
+        }
+        self._worker_local = threading.local()
+        self._worker_sessions: list[Session] = []
+        self._worker_sessions_lock = threading.Lock()
+        self._published_symbols: list[str] = []
 
     def execute(self, run_id: str, payload: TriggerBackfillRequest) -> None:
         job_run = self._require_run(run_id)
@@ -45,33 +88,19 @@ class MarketDailyBackfillService:
             end_date=payload.end_date,
         )
 
+        # 续跑：上次执行中已落库成功的 symbol 不再重复抓取
+        completed = sum(1 for task in tasks if task.status == DatahubTaskStatus.SUCCESS.value)
         self._prepare_run(job_run, total=len(tasks))
 
-        success = 0
-        failed = 0
-        for task in tasks:
-            self._mark_task_running(task)
-            try:
-                task_symbol = task.symbol or ""
-                quality_score, object_key, is_fallback, watermark_date, can_publish = self.process_symbol(
-                    symbol=task_symbol,
-                    start_date=payload.start_date,
-                    end_date=payload.end_date,
-                    batch_prefix="backfill",
-                )
-                if not is_fallback and can_publish:
-                    self._upsert_watermark(
-                        symbol=task_symbol,
-                        end_date=watermark_date,
-                        quality_score=quality_score,
-                        object_key=object_key,
-                        batch_prefix="backfill",
-                    )
-                self._mark_task_success(task)
-                success += 1
-            except Exception as exc:
-                self._mark_task_failed(task, str(exc))
-                failed += 1
+        success, failed = self.run_symbol_tasks(
+            [task for task in tasks if task.status != DatahubTaskStatus.SUCCESS.value],
+            start_date=payload.start_date,
+            end_date=payload.end_date,
+            batch_prefix="backfill",
+            merge_latest=payload.merge_latest,
+        )
+        success += completed
+        self.compact_published_symbols(start_date=payload.start_date, end_date=payload.end_date)
 
         self._finish_run(job_run, success=success, failed=failed)
         if failed > 0:
@@ -80,6 +109,180 @@ class MarketDailyBackfillService:
                 code=ErrorCode.BUSINESS_ERROR,
             )
 
+    def run_symbol_tasks(
+        self,
+        tasks: list[DatahubJobTask],
+        *,
+        start_date: date,
+        end_date: date,
+        batch_prefix: str,
+        merge_latest: bool = False,
+    ) -> tuple[int, int]:
+        """执行 symbol 子任务，返回 (success, failed)。
+
+        max_workers > 1 时 provider 抓取、质检、Parquet 编码与上传在线程池中并发执行，
+        每个线程持有独立 Session；任务状态与水位只由当前线程（单写者）登记到写缓冲，
+        缓冲按行数或时间阈值批量落库，全部任务结束时再整体落库一次。
+        """
+        self._published_symbols = []
+        if self.max_workers <= 1 or len(tasks) <= 1:
+            success = 0
+            failed = 0
+            for task in tasks:
+                self._mark_task_running(task)
+                try:
+                    outcome: Union[SymbolResult, Exception] = self.process_symbol(
+                        symbol=task.symbol or "",
+                        start_date=start_date,
+                        end_date=end_date,
+                        batch_prefix=batch_prefix,
+                        merge_latest=merge_latest,
+                    )
+                except Exception as exc:
+                    outcome = exc
+                if self._apply_symbol_outcome(task, outcome, batch_prefix=batch_prefix):
+                    success += 1
+                else:
+                    failed += 1
+                self.unit_of_work.maybe_flush()
+            self.unit_of_work.flush()
+            return success, failed
+
+        events: queue.Queue[tuple[str, str, Union[SymbolResult, Exception, None]]] = queue.Queue()
+        tasks_by_id = {task.id: task for task in tasks}
+        success = 0
+        failed = 0
+        try:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(tasks)),
+                thread_name_prefix="datahub-backfill",
+            ) as executor:
+                for task in tasks:
+                    executor.submit(
+                        self._process_symbol_in_worker,
+                        task_id=task.id,
+                        symbol=task.symbol or "",
+                        start_date=start_date,
+                        end_date=end_date,
+                        batch_prefix=batch_prefix,
+                        merge_latest=merge_latest,
+                        events=events,
+                    )
+                remaining = len(tasks)
+                while remaining > 0:
+                    kind, task_id, outcome = events.get()
+                    task = tasks_by_id[task_id]
+                    if kind == "running":
+                        self._mark_task_running(task)
+                    else:
+                        remaining -= 1
+                        if self._apply_symbol_outcome(task, outcome, batch_prefix=batch_prefix):  # type: ignore[arg-type]
+                            success += 1
+                        else:
+                            failed += 1
+                    self.unit_of_work.maybe_flush()
+        finally:
+            self._close_worker_sessions()
+        self.unit_of_work.flush()
+        return success, failed
+
+    def _process_symbol_in_worker(
+        self,
+        *,
+        task_id: str,
+        symbol: str,
+        start_date: date,
+        end_date: date,
+        batch_prefix: str,
+        merge_latest: bool,
+        events: "queue.Queue[tuple[str, str, Union[SymbolResult, Exception, None]]]",
+    ) -> None:
+        events.put(("running", task_id, None))
+        worker: MarketDailyBackfillService | None = None
+        try:
+            worker = self._get_worker_service()
+            outcome: Union[SymbolResult, Exception] = worker.process_symbol(
+                symbol=symbol,
+                start_date=start_date,
+                end_date=end_date,
+                batch_prefix=batch_prefix,
+                merge_latest=merge_latest,
+            )
+        except Exception as exc:
+            if worker is not None:
+                worker.db.rollback()
+            outcome = exc
+        events.put(("done", task_id, outcome))
+
+    def _get_worker_service(self) -> "MarketDailyBackfillService":
+        worker = getattr(self._worker_local, "service", None)
+        if worker is not None:
+            return worker
+        db = self.session_factory()
+        with self._worker_sessions_lock:
+            self._worker_sessions.append(db)
+        # 工作线程只登记到主线程的写缓冲，由主线程统一落库
+        worker = MarketDailyBackfillService(
+            db,
+            max_workers=1,
+            session_factory=self.session_factory,
+            unit_of_work=self.unit_of_work,
+        )
+        worker.providers = self.providers
+        worker.router_service = self.router_service
+        worker.provider_slots = self.provider_slots
+        self._worker_local.service = worker
+        return worker
+
+    def _close_worker_sessions(self) -> None:
+        with self._worker_sessions_lock:
+            sessions, self._worker_sessions = self._worker_sessions, []
+        for db in sessions:
+            db.close()
+        self._worker_local = threading.local()
+
+    def _apply_symbol_outcome(
+        self,
+        task: DatahubJobTask,
+        outcome: Union[SymbolResult, Exception],
+        *,
+        batch_prefix: str,
+    ) -> bool:
+        if isinstance(outcome, Exception):
+            self._mark_task_failed(task, str(outcome))
+            return False
+        try:
+            quality_score, object_key, is_fallback, watermark_date, can_publish = outcome
+            if not is_fallback and can_publish:
+                self._upsert_watermark(
+                    symbol=task.symbol or "",
+                    end_date=watermark_date,
+                    quality_score=quality_score,
+                    object_key=object_key,
+                    batch_prefix=batch_prefix,
+                )
+                self._published_symbols.append(task.symbol or "")
+            self._mark_task_success(task)
+            return True
+        except Exception as exc:
+            self.db.rollback()
+            self._mark_task_failed(task, str(exc))
+            return False
+
+    def compact_published_symbols(self, *, start_date: date, end_date: date) -> None:
+        """monthly 布局下，将本次发布的 symbol 合并进按月多 symbol 分区；失败时读取端自动回退单 symbol 对象。"""
+        if get_settings().DATAHUB_MARKET_DAILY_LAYOUT != "monthly" or not self._published_symbols:
+            return
+        try:
+            MarketDailyCompactionService(self.db).compact(
+                start_date=start_date,
+                end_date=end_date,
+                symbols=self._published_symbols,
+            )
+        except Exception as exc:
+            self.db.rollback()
+            logger.warning("market_daily 按月分区合并失败: %s", exc, exc_info=True)
+
     def process_symbol(
         self,
         *,
@@ -87,7 +290,13 @@ class MarketDailyBackfillService:
         start_date: date,
         end_date: date,
         batch_prefix: str,
-    ) -> tuple[float, str, bool, date, bool]:
+        merge_latest: bool = False,
+    ) -> SymbolResult:
+        """抓取并发布单个 symbol 的窗口日线。
+
+        ``merge_latest`` 时（缺口补数）抓到的行合并进该 symbol 当前 latest 对象后再发布，
+        同一交易日以新抓取的为准；发布区间与水位取合并后的覆盖范围，不会回退。
+        """
         priorities = self.router_service.get_provider_priority("market_daily")
         errors: list[str] = []
         rows: list[dict] | None = None
@@ -123,11 +332,12 @@ class MarketDailyBackfillService:
                 errors.append(f"{provider} 处于熔断冷却")
                 continue
             try:
-                rows = self.router_service.run_with_policy(
-                    dataset="market_daily",
-                    provider=provider,
-                    operation=lambda: provider_client.get_daily_bars(symbol, start_date, end_date),
-                )
+                with self.provider_slots.setdefault(provider, threading.BoundedSemaphore(1)):
+                    rows = self.router_service.run_with_policy(
+                        dataset="market_daily",
+                        provider=provider,
+                        operation=lambda: provider_client.get_daily_bars(symbol, start_date, end_date),
+                    )
             except Exception as exc:
                 self.provider_health_service.record_failure(
                     provider=provider,
@@ -152,12 +362,17 @@ class MarketDailyBackfillService:
             reason = " | ".join(errors) if errors else "未获取到任何 market_daily 数据"
             raise BusinessException(f"market_daily 获取失败: {reason}", code=ErrorCode.BUSINESS_ERROR)
 
-        parquet_bytes = self._to_parquet_bytes(rows)
+        table = to_arrow_table(rows)
+        covered_start, covered_end = start_date, end_date
+        if merge_latest:
+            table = self._merge_with_latest(symbol, table)
+            covered_start, covered_end = self._covered_range(table, start_date, end_date)
+        parquet_bytes = self._to_parquet_bytes(table)
         object_key = self._build_object_key(symbol=symbol, end_date=end_date, batch_prefix=batch_prefix)
         store = MinioParquetStore()
         store.put_bytes(object_key=object_key, data=parquet_bytes, content_type="application/octet-stream")
 
-        quality_score, issues, severity = self._quality_check(rows)
+        quality_score, issues, severity = evaluate_quality("market_daily", table)
         bucket = get_settings().MINIO_BUCKET_NAME
         self.storage_service.upsert_object_index(
             bucket=bucket,
@@ -166,9 +381,9 @@ class MarketDailyBackfillService:
             layer="normalized",
             provider=source_provider,
             symbol=symbol,
-            start_date=start_date,
-            end_date=end_date,
-            row_count=len(rows),
+            start_date=covered_start,
+            end_date=covered_end,
+            row_count=table.num_rows,
             schema_version="1.0",
             content_hash=hashlib.sha256(parquet_bytes).hexdigest(),
             quality_score=quality_score,
@@ -190,10 +405,39 @@ class MarketDailyBackfillService:
                 object_key=object_key,
                 schema_version="1.0",
                 quality_score=quality_score,
-                start_date=start_date,
-                end_date=end_date,
+                start_date=covered_start,
+                end_date=covered_end,
             )
-        return quality_score, object_key, False, end_date, can_publish
+        return quality_score, object_key, False, covered_end, can_publish
+
+    def _merge_with_latest(self, symbol: str, table: "pa.Table") -> "pa.Table":
+        """把新抓取的行合并进 symbol 当前 latest 对象：同一交易日以新行为准，按 trade_date 升序。"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        store = MinioParquetStore()
+        current = ObjectKeyResolver(self.db, "market_daily", store=store).read(
+            symbol, lambda object_key: pq.read_table(BytesIO(store.get_bytes(object_key)))
+        )
+        if current is None or current.num_rows == 0:
+            return table
+        kept = current.filter(pc.invert(pc.is_in(current.column("trade_date"), value_set=table.column("trade_date"))))
+        if kept.num_rows == 0:
+            return table
+        kept = kept.select([name for name in table.column_names if name in kept.column_names])
+        merged = pa.concat_tables([kept, table], promote_options="default")
+        return merged.sort_by([("trade_date", "ascending")])
+
+    @staticmethod
+    def _covered_range(table: "pa.Table", start_date: date, end_date: date) -> tuple[date, date]:
+        import pyarrow.compute as pc
+
+        bounds = pc.min_max(table.column("trade_date")).as_py()
+        first, last = bounds["min"], bounds["max"]
+        if isinstance(first, datetime):
+            first, last = first.date(), last.date()
+        return min(start_date, first or start_date), max(end_date, last or end_date)
 
     def _upsert_watermark(
         self,
@@ -204,27 +448,18 @@ class MarketDailyBackfillService:
         object_key: str,
         batch_prefix: str,
     ) -> None:
-        row = (
-            self.db.query(DatahubDatasetWatermark)
-            .filter(
-                DatahubDatasetWatermark.dataset == "market_daily",
-                DatahubDatasetWatermark.symbol == symbol,
-            )
-            .first()
+        self.unit_of_work.add_watermark(
+            dataset="market_daily",
+            symbol=symbol,
+            last_success_date=end_date,
+            last_quality_score=quality_score,
+            last_object_key=object_key,
+            last_batch_id=f"{batch_prefix}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}",
         )
-        if row is None:
-            row = DatahubDatasetWatermark(dataset="market_daily", symbol=symbol)
-            self.db.add(row)
-        row.last_success_date = end_date
-        row.last_quality_score = quality_score
-        row.last_object_key = object_key
-        row.last_batch_id = f"{batch_prefix}-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S')}"
-        self.db.commit()
 
     @staticmethod
-    def _to_parquet_bytes(rows: list[dict]) -> bytes:
+    def _to_parquet_bytes(rows: Union[list[dict], pa.Table]) -> bytes:
         try:
-            import pyarrow as pa
             import pyarrow.parquet as pq
         except Exception as exc:  # pragma: no cover
             raise BusinessException(
@@ -233,36 +468,11 @@ class MarketDailyBackfillService:
                 details={"error": str(exc)},
             ) from exc
 
-        table = pa.Table.from_pylist(rows)
+        table = to_arrow_table(rows) if isinstance(rows, list) else rows
         sink = BytesIO()
         pq.write_table(table, sink, compression="snappy")
         return sink.getvalue()
 
-    @staticmethod
-    def _quality_check(rows: list[dict]) -> tuple[float, list[dict], str]:
-        issues: list[dict] = []
-        invalid_price_count = 0
-        for row in rows:
-            if row["open"] <= 0 or row["high"] <= 0 or row["low"] <= 0 or row["close"] <= 0:
-                invalid_price_count += 1
-
-        if invalid_price_count > 0:
-            issues.append(
-                {
-                    "rule": "price_positive_check",
-                    "message": "存在价格小于等于0的记录",
-                    "count": invalid_price_count,
-                }
-            )
-
-        total = len(rows)
-        score = max(0.0, 100.0 - (invalid_price_count / total) * 100.0)
-        if invalid_price_count == 0:
-            return score, issues, "p2"
-        if invalid_price_count <= max(1, int(total * 0.05)):
-            return score, issues, "p1"
-        return score, issues, "p0"
-
     @staticmethod
     def _build_object_key(*, symbol: str, end_date: date, batch_prefix: str) -> str:
         batch_id = datetime.now(timezone.utc).strftime("%Y%m%d%H%M%S")
@@ -354,6 +564,16 @@ class MarketDailyBackfillService:
         start_date: date,
         end_date: date,
     ) -> list[DatahubJobTask]:
+        existing = self.db.query(DatahubJobTask).filter(DatahubJobTask.job_run_id == run_id).all()
+        # 新作业只有触发时创建的占位任务；多于一个或已执行过，说明是中断后重新执行
+        if len(existing) > 1 or any(task.attempts > 0 for task in existing):
+            return self._resume_tasks(
+                run_id=run_id,
+                existing=existing,
+                symbols=symbols,
+                start_date=start_date,
+                end_date=end_date,
+            )
         placeholder_task.dataset = "market_daily"
         placeholder_task.symbol = symbols[0]
         placeholder_task.start_date = start_date
@@ -381,6 +601,35 @@ class MarketDailyBackfillService:
             self.db.refresh(task)
         return tasks
 
+    def _resume_tasks(
+        self,
+        *,
+        run_id: str,
+        existing: list[DatahubJobTask],
+        symbols: list[str],
+        start_date: date,
+        end_date: date,
+    ) -> list[DatahubJobTask]:
+        """作业中断后重新执行：沿用已落库的子任务（success 的由调用方跳过），缺失的 symbol 补建任务。"""
+        by_symbol = {task.symbol: task for task in existing if task.symbol}
+        tasks: list[DatahubJobTask] = []
+        for symbol in symbols:
+            task = by_symbol.get(symbol)
+            if task is None:
+                task = DatahubJobTask(
+                    job_run_id=run_id,
+                    dataset="market_daily",
+                    symbol=symbol,
+                    start_date=start_date,
+                    end_date=end_date,
+                    status=DatahubTaskStatus.PENDING.value,
+                    attempts=0,
+                )
+                self.db.add(task)
+            tasks.append(task)
+        self.db.commit()
+        return tasks
+
     def _require_run(self, run_id: str) -> DatahubJobRun:
         row = self.db.query(DatahubJobRun).filter(DatahubJobRun.id == run_id).first()
         if row is None:
@@ -403,20 +652,18 @@ class MarketDailyBackfillService:
         self.db.commit()
 
     def _mark_task_running(self, task: DatahubJobTask) -> None:
-        task.status = DatahubTaskStatus.RUNNING.value
-        task.locked_at = datetime.now(timezone.utc)
-        task.attempts = task.attempts + 1
-        self.db.commit()
+        self.unit_of_work.add_task_transition(
+            task,
+            status=DatahubTaskStatus.RUNNING.value,
+            locked_at=datetime.now(timezone.utc),
+            attempts=task.attempts + 1,
+        )
 
     def _mark_task_success(self, task: DatahubJobTask) -> None:
-        task.status = DatahubTaskStatus.SUCCESS.value
-        task.last_error = None
-        self.db.commit()
+        self.unit_of_work.add_task_transition(task, status=DatahubTaskStatus.SUCCESS.value, last_error=None)
 
     def _mark_task_failed(self, task: DatahubJobTask, message: str) -> None:
-        task.status = DatahubTaskStatus.FAILED.value
-        task.last_error = message[:2000]
-        self.db.commit()
+        self.unit_of_work.add_task_transition(task, status=DatahubTaskStatus.FAILED.value, last_error=message[:2000])
 
     def _finish_run(self, job_run: DatahubJobRun, *, success: int, failed: int) -> None:
         job_run.task_success = success
@@ -0,0 +1,338 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from datetime import date, datetime, timedelta, timezone
+from io import BytesIO
+from typing import Any
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.api import BusinessException, ErrorCode
+from app.core.config import get_settings
+from app.datahub.models import DatahubDatasetWatermark, DatahubObjectIndex
+from app.datahub.normalize import normalize_symbol
+from app.datahub.schemas.datahub import MarketDailyCompactionResult
+from app.datahub.services.market_daily_read_service import MarketDailyReadService
+from app.datahub.services.storage_service import DatahubStorageService
+from app.datahub.storage import MinioParquetStore, get_manifest_cache
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDailyCompactionService:
+    """将按 symbol、按批次写入的 market_daily 小文件合并为按月多 symbol 分区。
+
+    每个月份一个 Parquet 对象，按 (symbol, trade_date) 排序并写入行组统计；
+    月度 manifest 记录 symbol -> 行偏移/行数，以及合并时该 symbol 的来源对象，
+    读取端据此判断分区是否已覆盖 symbol 的最新批次。
+
+    单 symbol 的最新对象仍是写入端的基准（增量合并、补数、新鲜度判断都以它为准）；
+    ``prune_superseded`` 时（仅由 compact 任务显式开启）清理日期范围被最新对象完全覆盖的历史批次
+    与本次替换下来的旧月度对象。
+
+    同一月份的读-改-写以该月的水位行（``MONTHLY_WATERMARK_DATASET``）行锁串行：水位行记录当前
+    月度对象并与对象索引同事务提交，提交后再次持锁确认仍是当前对象才发布 manifest；
+    manifest 落后于水位行时（发布前中断），以水位行指向的对象为准重建合并基准。
+    """
+
+    ROW_GROUP_SIZE = 16384
+    MONTHLY_WATERMARK_DATASET = "market_daily_monthly"
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.store = MinioParquetStore()
+        self.reader = MarketDailyReadService(db)
+        self.storage_service = DatahubStorageService(db)
+
+    def compact(
+        self,
+        *,
+        start_date: date,
+        end_date: date,
+        symbols: list[str] | None = None,
+        prune_superseded: bool = False,
+    ) -> MarketDailyCompactionResult:
+        if start_date > end_date:
+            raise BusinessException("start_date 不能晚于 end_date", code=ErrorCode.VALIDATION_ERROR)
+        target_symbols = self._resolve_symbols(symbols)
+        months = MarketDailyReadService.iter_months(start_date, end_date)
+
+        sources: dict[str, str] = {}
+        month_parts: dict[tuple[int, int], list[Any]] = {month: [] for month in months}
+        for symbol in target_symbols:
+            object_key = self.reader.resolve_object_key(symbol)
+            if not object_key:
+                continue
+            sources[symbol] = object_key
+            table = self.reader.read_table(object_key)
+            for year, month in months:
+                part = self._slice_month(table, year, month)
+                month_parts[(year, month)].append((symbol, part))
+
+        object_keys: list[str] = []
+        superseded_months: list[str] = []
+        row_count = 0
+        for (year, month), parts in month_parts.items():
+            if not sources:
+                break
+            written = self._write_month(year=year, month=month, parts=parts, sources=sources)
+            if written is None:
+                continue
+            object_key, rows, previous_key = written
+            object_keys.append(object_key)
+            row_count += rows
+            if previous_key:
+                superseded_months.append(previous_key)
+
+        pruned = self._prune_superseded(sources, superseded_months) if prune_superseded else 0
+        return MarketDailyCompactionResult(
+            start_date=start_date,
+            end_date=end_date,
+            symbol_count=len(sources),
+            month_count=len(object_keys),
+            row_count=row_count,
+            object_keys=object_keys,
+            pruned_objects=pruned,
+        )
+
+    def _resolve_symbols(self, symbols: list[str] | None) -> list[str]:
+        if symbols:
+            return sorted({normalize_symbol(item) for item in symbols if item})
+        rows = (
+            self.db.query(DatahubDatasetWatermark.symbol)
+            .filter(
+                DatahubDatasetWatermark.dataset == "market_daily",
+                DatahubDatasetWatermark.symbol.isnot(None),
+            )
+            .all()
+        )
+        return sorted({row.symbol for row in rows if row.symbol})
+
+    @staticmethod
+    def _slice_month(table, year: int, month: int):
+        import pyarrow.compute as pc
+
+        month_start = date(year, month, 1)
+        next_month = date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)
+        dates = table.column("trade_date")
+        return table.filter(pc.and_(pc.greater_equal(dates, month_start), pc.less(dates, next_month)))
+
+    def _write_month(
+        self,
+        *,
+        year: int,
+        month: int,
+        parts: list[tuple[str, Any]],
+        sources: dict[str, str],
+    ) -> tuple[str, int, str | None] | None:
+        """合并写入一个月份，返回 (新对象, 行数, 被替代的旧对象)；合并后无数据时不写入并返回 None。"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.parquet as pq
+
+        lock_row = self._lock_month(year, month)
+        tables = []
+        previous = self._current_month(lock_row, year, month)
+        previous_symbols: dict[str, Any] = {}
+        if previous is not None:
+            previous_table = self.reader.read_monthly_table(previous["object_key"])
+            keep = [symbol for symbol in previous.get("symbols", {}) if symbol not in sources]
+            if keep:
+                tables.append(previous_table.filter(pc.is_in(previous_table.column("symbol"), pa.array(keep))))
+                previous_symbols = {symbol: previous["symbols"][symbol] for symbol in keep}
+        for symbol, part in parts:
+            tables.append(part.add_column(0, "symbol", pa.array([symbol] * part.num_rows, pa.string())))
+
+        schema = MarketDailyReadService.bar_schema().insert(0, pa.field("symbol", pa.string()))
+        merged = pa.concat_tables([table.select(schema.names).cast(schema) for table in tables]) if tables else schema.empty_table()
+        if merged.num_rows == 0:
+            self.db.rollback()
+            return None
+        merged = merged.take(
+            pc.sort_indices(merged, sort_keys=[("symbol", "ascending"), ("trade_date", "ascending")])
+        )
+
+        sink = BytesIO()
+        pq.write_table(
+            merged,
+            sink,
+            compression="snappy",
+            row_group_size=self.ROW_GROUP_SIZE,
+            write_statistics=True,
+        )
+        parquet_bytes = sink.getvalue()
+        batch_id = f"compact-{datetime.now(timezone.utc).strftime('%Y%m%d%H%M%S%f')}"
+        object_key = f"{MarketDailyReadService.MONTHLY_LAYOUT_PREFIX}/year={year}/month={month:02d}/batch_id={batch_id}.parquet"
+        self.store.put_bytes(object_key=object_key, data=parquet_bytes, content_type="application/octet-stream")
+
+        symbol_entries = self._symbol_row_ranges(merged)
+        manifest_symbols: dict[str, Any] = {}
+        for symbol in sorted(set(previous_symbols) | set(sources)):
+            offset, length = symbol_entries.get(symbol, (0, 0))
+            manifest_symbols[symbol] = {
+                "source_object_key": sources.get(symbol) or previous_symbols[symbol].get("source_object_key"),
+                "offset": offset,
+                "length": length,
+            }
+
+        month_start = date(year, month, 1)
+        month_end = (date(year + 1, 1, 1) if month == 12 else date(year, month + 1, 1)) - timedelta(days=1)
+        lock_row.last_object_key = object_key
+        lock_row.last_batch_id = batch_id
+        lock_row.last_success_date = month_end
+        # 对象索引与水位行同事务提交（同时释放行锁），之后才发布 manifest
+        self.storage_service.upsert_object_index(
+            bucket=get_settings().MINIO_BUCKET_NAME,
+            object_key=object_key,
+            dataset="market_daily",
+            layer="normalized",
+            provider="compaction",
+            symbol=None,
+            start_date=month_start,
+            end_date=month_end,
+            row_count=merged.num_rows,
+            schema_version="1.0",
+            content_hash=hashlib.sha256(parquet_bytes).hexdigest(),
+        )
+        self._publish_month_manifest(
+            year,
+            month,
+            {
+                "dataset": "market_daily",
+                "layout": "monthly",
+                "year": year,
+                "month": month,
+                "object_key": object_key,
+                "batch_id": batch_id,
+                "row_count": merged.num_rows,
+                "symbols": manifest_symbols,
+            },
+        )
+        return object_key, merged.num_rows, previous["object_key"] if previous is not None else None
+
+    def _current_month(self, lock_row: DatahubDatasetWatermark, year: int, month: int) -> dict[str, Any] | None:
+        """持锁读取当前月度分区；manifest 未指向水位行记录的对象时，按该对象重建（来源对象未知）。"""
+        manifest_key = MarketDailyReadService.monthly_manifest_key(year, month)
+        # 绕过进程内缓存重读，避免基于过期 manifest 覆盖其他进程刚写入的 symbol
+        get_manifest_cache().invalidate(manifest_key)
+        manifest = self.reader.load_monthly_manifest(year, month)
+        current_key = lock_row.last_object_key
+        if current_key is None or (manifest is not None and manifest.get("object_key") == current_key):
+            return manifest
+        table = self.reader.read_monthly_table(current_key)
+        return {
+            "object_key": current_key,
+            "symbols": {
+                symbol: {"source_object_key": None, "offset": offset, "length": length}
+                for symbol, (offset, length) in self._symbol_row_ranges(table).items()
+            },
+        }
+
+    def _publish_month_manifest(self, year: int, month: int, manifest: dict[str, Any]) -> None:
+        """再次持锁，月度对象仍为水位行记录的当前对象时才发布 manifest，避免覆盖更新的合并结果。"""
+        lock_row = self._lock_month(year, month)
+        if lock_row.last_object_key != manifest["object_key"]:
+            self.db.rollback()
+            logger.info("market_daily %s-%02d 月度分区已被更新的合并替代，跳过发布", year, month)
+            return
+        manifest_key = MarketDailyReadService.monthly_manifest_key(year, month)
+        self.store.put_bytes(
+            object_key=manifest_key,
+            data=json.dumps(manifest, ensure_ascii=True).encode("utf-8"),
+            content_type="application/json",
+        )
+        get_manifest_cache().invalidate(manifest_key)
+        self.db.commit()
+
+    def _lock_month(self, year: int, month: int) -> DatahubDatasetWatermark:
+        """以 ``SELECT ... FOR UPDATE`` 锁定月度分区水位行（不存在时先创建），锁持有到本月写入提交。"""
+        query = (
+            self.db.query(DatahubDatasetWatermark)
+            .filter(
+                DatahubDatasetWatermark.dataset == self.MONTHLY_WATERMARK_DATASET,
+                DatahubDatasetWatermark.symbol == f"{year}-{month:02d}",
+            )
+            .with_for_update()
+        )
+        row = query.first()
+        if row is None:
+            self.db.add(DatahubDatasetWatermark(dataset=self.MONTHLY_WATERMARK_DATASET, symbol=f"{year}-{month:02d}"))
+            try:
+                self.db.commit()
+            except IntegrityError:
+                # 并发创建同一月份的水位行，以已存在的为准
+                self.db.rollback()
+            row = query.first()
+        return row
+
+    @staticmethod
+    def _symbol_row_ranges(table) -> dict[str, tuple[int, int]]:
+        import pyarrow.compute as pc
+
+        ranges: dict[str, tuple[int, int]] = {}
+        if table.num_rows == 0:
+            return ranges
+        offset = 0
+        counts = {item["values"].as_py(): item["counts"].as_py() for item in pc.value_counts(table.column("symbol"))}
+        for symbol in sorted(counts):
+            ranges[symbol] = (offset, counts[symbol])
+            offset += counts[symbol]
+        return ranges
+
+    def _prune_superseded(self, sources: dict[str, str], superseded_months: list[str]) -> int:
+        """删除日期范围被最新批次完全覆盖、且未被水位引用的单 symbol 对象，以及本次被替换下来的旧月度对象。"""
+        referenced = {
+            row.last_object_key
+            for row in (
+                self.db.query(DatahubDatasetWatermark.last_object_key)
+                .filter(DatahubDatasetWatermark.dataset == "market_daily")
+                .all()
+            )
+            if row.last_object_key
+        }
+        pruned = 0
+        for symbol, latest_key in sources.items():
+            latest = self.db.query(DatahubObjectIndex).filter(DatahubObjectIndex.object_key == latest_key).first()
+            if latest is None or latest.start_date is None or latest.end_date is None:
+                continue
+            rows = (
+                self.db.query(DatahubObjectIndex)
+                .filter(
+                    DatahubObjectIndex.dataset == "market_daily",
+                    DatahubObjectIndex.symbol == symbol,
+                    DatahubObjectIndex.object_key != latest_key,
+                )
+                .all()
+            )
+            # 只删除被最新对象完全覆盖的批次，日常增量写出的窄对象不会替代更宽的历史回填
+            covered = [
+                row
+                for row in rows
+                if row.start_date is not None
+                and row.end_date is not None
+                and row.start_date >= latest.start_date
+                and row.end_date <= latest.end_date
+            ]
+            pruned += self._delete_objects(covered, referenced)
+        if superseded_months:
+            rows = self.db.query(DatahubObjectIndex).filter(DatahubObjectIndex.object_key.in_(superseded_months)).all()
+            pruned += self._delete_objects(rows, referenced)
+        self.db.commit()
+        return pruned
+
+    def _delete_objects(self, rows: list[DatahubObjectIndex], referenced: set[str]) -> int:
+        deleted = 0
+        for row in rows:
+            if row.object_key in referenced:
+                continue
+            try:
+                self.store.delete(row.object_key)
+            except Exception as exc:
+                logger.warning("删除过期 market_daily 对象失败 object_key=%s error=%s", row.object_key, exc)
+                continue
+            self.db.delete(row)
+            deleted += 1
+        return deleted
@@ -0,0 +1,379 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from io import BytesIO
+from typing import Any, Iterable
+
+from sqlalchemy.orm import Session
+
+from app.core.api import BusinessException, ErrorCode
+from app.core.config import get_settings
+from app.datahub.models import DatahubDatasetWatermark, DatahubObjectIndex
+from app.datahub.normalize import normalize_symbol
+from app.datahub.schemas.datahub import (
+    MarketDailyGapFillRun,
+    MarketDailyGapRange,
+    MarketDailyGapScanResult,
+)
+from app.datahub.services.snapshot_read_service import SnapshotDatasetReadService
+from app.datahub.storage import MinioParquetStore, extract_batch_id, get_parquet_table_cache
+
+logger = logging.getLogger(__name__)
+
+
+class MarketDailyGapService:
+    """基于对象索引与交易日历扫描 market_daily 缺口，不调用任何数据源。
+
+    期望范围取 security_master 快照（上市/退市日期截断）与交易日历的交集，覆盖范围取读取端实际
+    提供的数据，即水位指向的 latest 对象；两者按「symbol × 交易日」矩阵做列式反连接，
+    缺失交易日合并为最少的连续区间。扫描按 symbol 分块推进，每块结束写一次 MinIO 检查点，
+    中断后以相同参数重跑会从检查点继续。
+    """
+
+    SCAN_CHUNK_SYMBOLS = 500
+    # 一次源站请求的固定开销，折算为等价交易日行数
+    REQUEST_OVERHEAD_DAYS = 20
+    CHECKPOINT_PREFIX = "datahub/meta/gap_scan/dataset=market_daily"
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.store = MinioParquetStore()
+
+    def scan(
+        self,
+        *,
+        start_date: date,
+        end_date: date,
+        symbols: Iterable[str] | None = None,
+        resume: bool = True,
+    ) -> MarketDailyGapScanResult:
+        if start_date > end_date:
+            raise BusinessException("start_date 不能晚于 end_date", code=ErrorCode.VALIDATION_ERROR)
+        trading_days = self.load_trading_days(start_date, end_date)
+        universe = self._load_universe(start_date, end_date, symbols)
+        ordered = sorted(universe)
+        checkpoint_key = self.checkpoint_key(start_date, end_date, symbols)
+        fingerprint = self._fingerprint(ordered, universe, trading_days)
+
+        checkpoint = self._read_checkpoint(checkpoint_key) if resume else None
+        if checkpoint and (checkpoint.get("fingerprint") != fingerprint or checkpoint.get("completed")):
+            checkpoint = None
+        cursor = int(checkpoint["cursor"]) if checkpoint else 0
+        ranges: list[list[Any]] = list(checkpoint["ranges"]) if checkpoint else []
+        resumed_from = cursor
+
+        for offset in range(cursor, len(ordered), self.SCAN_CHUNK_SYMBOLS):
+            chunk = ordered[offset : offset + self.SCAN_CHUNK_SYMBOLS]
+            for symbol, first, last in self._scan_chunk(chunk, universe, trading_days):
+                ranges.append([symbol, trading_days[first].isoformat(), trading_days[last].isoformat(), last - first + 1])
+            cursor = offset + len(chunk)
+            self._write_checkpoint(
+                checkpoint_key,
+                fingerprint=fingerprint,
+                cursor=cursor,
+                ranges=ranges,
+                completed=cursor >= len(ordered),
+            )
+        if not ordered:
+            self._write_checkpoint(checkpoint_key, fingerprint=fingerprint, cursor=0, ranges=[], completed=True)
+
+        gap_ranges = [
+            MarketDailyGapRange(
+                symbol=symbol,
+                start_date=date.fromisoformat(first),
+                end_date=date.fromisoformat(last),
+                trading_days=int(days),
+            )
+            for symbol, first, last, days in ranges
+        ]
+        return MarketDailyGapScanResult(
+            start_date=start_date,
+            end_date=end_date,
+            trading_days=len(trading_days),
+            expected_count=len(ordered),
+            missing_symbol_count=len({item.symbol for item in gap_ranges}),
+            missing_days=sum(item.trading_days for item in gap_ranges),
+            ranges=gap_ranges,
+            resumed_from=resumed_from,
+        )
+
+    def plan_fill_runs(
+        self,
+        ranges: list[MarketDailyGapRange],
+        trading_days: list[date],
+        *,
+        max_run_cost: int | None = None,
+        max_symbols_per_run: int | None = None,
+    ) -> list[MarketDailyGapFillRun]:
+        """把缺口区间打包为回填作业：按预估抓取成本（请求开销 + 交易日行数）而不是固定 symbol 数切分。
+
+        补数结果要合并进 symbol 的 latest 对象，同一 symbol 分散到多个作业并发执行会互相覆盖，
+        因此每个 symbol 的全部缺口合并为一个请求窗口；回填作业只接受单一时间窗，按窗口分组后再按成本预算装箱。
+        """
+        budget = max_run_cost or get_settings().DATAHUB_GAP_FILL_RUN_COST_BUDGET
+        day_index = {day: index for index, day in enumerate(trading_days)}
+
+        windows: dict[tuple[date, date], list[str]] = defaultdict(list)
+        bounds: dict[str, tuple[date, date]] = {}
+        for item in ranges:
+            first, last = bounds.get(item.symbol, (item.start_date, item.end_date))
+            bounds[item.symbol] = (min(first, item.start_date), max(last, item.end_date))
+        for symbol, window in bounds.items():
+            windows[window].append(symbol)
+
+        runs: list[MarketDailyGapFillRun] = []
+        for (window_start, window_end), symbols in sorted(windows.items()):
+            per_symbol = self.REQUEST_OVERHEAD_DAYS + day_index[window_end] - day_index[window_start] + 1
+            size = max(1, budget // per_symbol)
+            if max_symbols_per_run:
+                size = min(size, max_symbols_per_run)
+            ordered = sorted(symbols)
+            for offset in range(0, len(ordered), size):
+                chunk = ordered[offset : offset + size]
+                runs.append(
+                    MarketDailyGapFillRun(
+                        start_date=window_start,
+                        end_date=window_end,
+                        symbols=chunk,
+                        estimated_cost=per_symbol * len(chunk),
+                    )
+                )
+        return runs
+
+    def load_trading_days(self, start_date: date, end_date: date) -> list[date]:
+        """从已入库的 trading_calendar 对象拼出窗口内的交易日；日历未完整覆盖窗口时拒绝扫描。"""
+        import pyarrow.compute as pc
+
+        rows = (
+            self.db.query(DatahubObjectIndex.object_key, DatahubObjectIndex.start_date, DatahubObjectIndex.end_date)
+            .filter(
+                DatahubObjectIndex.dataset == "trading_calendar",
+                DatahubObjectIndex.start_date <= end_date,
+                DatahubObjectIndex.end_date >= start_date,
+            )
+            .order_by(DatahubObjectIndex.start_date.asc())
+            .all()
+        )
+        covered_until = start_date - timedelta(days=1)
+        for row in rows:
+            if row.start_date > covered_until + timedelta(days=1):
+                break
+            covered_until = max(covered_until, row.end_date)
+        if covered_until < end_date:
+            raise BusinessException(
+                f"交易日历未覆盖扫描窗口 {start_date}~{end_date}，请先回填 trading_calendar",
+                code=ErrorCode.BUSINESS_ERROR,
+            )
+
+        days: set[date | None] = set()
+        for row in rows:
+            table = self._read_table(row.object_key)
+            if "is_open" in table.column_names:
+                table = table.filter(pc.equal(table.column("is_open"), True))
+            days.update(SnapshotDatasetReadService._to_date(value) for value in table.column("trade_date").to_pylist())
+        days.discard(None)
+        return sorted(day for day in days if start_date <= day <= end_date)
+
+    @classmethod
+    def checkpoint_key(cls, start_date: date, end_date: date, symbols: Iterable[str] | None = None) -> str:
+        scope = "all"
+        if symbols is not None:
+            joined = ",".join(sorted({normalize_symbol(symbol) for symbol in symbols if symbol}))
+            scope = hashlib.sha256(joined.encode("utf-8")).hexdigest()[:16]
+        return f"{cls.CHECKPOINT_PREFIX}/{start_date.isoformat()}_{end_date.isoformat()}_{scope}.json"
+
+    def _scan_chunk(
+        self,
+        chunk: list[str],
+        universe: dict[str, tuple[date, date]],
+        trading_days: list[date],
+    ) -> list[tuple[str, int, int]]:
+        """对一块 symbol 做反连接：期望矩阵减去覆盖矩阵，返回 (symbol, 起始交易日下标, 结束交易日下标)。"""
+        import numpy as np
+
+        total_days = len(trading_days)
+        if total_days == 0 or not chunk:
+            return []
+        calendar = np.array(trading_days, dtype="datetime64[D]")
+
+        bounds = np.array([universe[symbol] for symbol in chunk], dtype="datetime64[D]")
+        expected_lo = np.searchsorted(calendar, bounds[:, 0], side="left")
+        expected_hi = np.searchsorted(calendar, bounds[:, 1], side="right")
+
+        is_covered = self._served_matrix(chunk, calendar)
+
+        columns = np.arange(total_days)
+        expected = (columns >= expected_lo[:, None]) & (columns < expected_hi[:, None])
+        missing = expected & ~is_covered
+
+        padded = np.zeros((len(chunk), total_days + 2), dtype=np.int8)
+        padded[:, 1:-1] = missing
+        edges = np.diff(padded, axis=1)
+        run_rows, run_starts = np.nonzero(edges == 1)
+        _, run_ends = np.nonzero(edges == -1)
+        return [
+            (chunk[row], int(first), int(last) - 1)
+            for row, first, last in zip(run_rows.tolist(), run_starts.tolist(), run_ends.tolist())
+        ]
+
+    def _served_matrix(self, chunk: list[str], calendar):
+        """覆盖矩阵取读取端实际提供的数据：每个 symbol 只看水位指向的 latest 对象。
+
+        对象索引登记的区间落在扫描窗口内且行数不少于区间内交易日数时视为区间内无洞，
+        否则读取该对象的 trade_date 列逐日比对；未发布的批次对象不计入覆盖。
+        """
+        import numpy as np
+        import pyarrow.parquet as pq
+
+        total_days = len(calendar)
+        is_covered = np.zeros((len(chunk), total_days), dtype=bool)
+        positions = {symbol: index for index, symbol in enumerate(chunk)}
+        latest = dict(
+            self.db.query(DatahubDatasetWatermark.symbol, DatahubDatasetWatermark.last_object_key)
+            .filter(
+                DatahubDatasetWatermark.dataset == "market_daily",
+                DatahubDatasetWatermark.symbol.in_(chunk),
+                DatahubDatasetWatermark.last_object_key.isnot(None),
+            )
+            .all()
+        )
+        if not latest:
+            return is_covered
+        indexed = {
+            row.object_key: row
+            for row in self.db.query(
+                DatahubObjectIndex.object_key,
+                DatahubObjectIndex.start_date,
+                DatahubObjectIndex.end_date,
+                DatahubObjectIndex.row_count,
+            ).filter(DatahubObjectIndex.object_key.in_(list(latest.values())))
+        }
+        window_start, window_end = calendar[0], calendar[-1]
+        for symbol, object_key in latest.items():
+            row = positions[symbol]
+            entry = indexed.get(object_key)
+            if entry is not None and entry.start_date and entry.end_date:
+                lo = int(np.searchsorted(calendar, np.datetime64(entry.start_date, "D"), side="left"))
+                hi = int(np.searchsorted(calendar, np.datetime64(entry.end_date, "D"), side="right"))
+                inside = window_start <= np.datetime64(entry.start_date, "D") and np.datetime64(entry.end_date, "D") <= window_end
+                if inside and (entry.row_count or 0) >= hi - lo:
+                    is_covered[row, lo:hi] = True
+                    continue
+            try:
+                table = pq.read_table(BytesIO(self.store.get_bytes(object_key)), columns=["trade_date"])
+            except Exception as exc:
+                logger.warning("读取 market_daily latest 对象失败 symbol=%s key=%s error=%s", symbol, object_key, exc)
+                continue
+            days = np.array(
+                [day for day in map(SnapshotDatasetReadService._to_date, table.column("trade_date").to_pylist()) if day],
+                dtype="datetime64[D]",
+            )
+            if days.size == 0:
+                continue
+            found = np.searchsorted(calendar, days, side="left")
+            valid = found < total_days
+            found = found[valid]
+            found = found[calendar[found] == days[valid]]
+            is_covered[row, found] = True
+        return is_covered
+
+    def _load_universe(
+        self,
+        start_date: date,
+        end_date: date,
+        symbols: Iterable[str] | None,
+    ) -> dict[str, tuple[date, date]]:
+        """symbol -> 期望覆盖的 [起, 止] 自然日，取 security_master 快照的上市/退市日期截断扫描窗口。"""
+        table = SnapshotDatasetReadService(self.db, "security_master").load_table(
+            columns=["symbol", "status", "list_date", "delist_date"]
+        )
+        listed: dict[str, tuple[date | None, date | None, str | None]] = {}
+        if table is not None:
+            columns = {name: table.column(name).to_pylist() for name in table.column_names}
+            count = table.num_rows
+            for raw_symbol, status, list_date, delist_date in zip(
+                columns.get("symbol", [None] * count),
+                columns.get("status", [None] * count),
+                columns.get("list_date", [None] * count),
+                columns.get("delist_date", [None] * count),
+            ):
+                symbol = normalize_symbol(str(raw_symbol or ""))
+                if symbol:
+                    listed[symbol] = (
+                        SnapshotDatasetReadService._to_date(list_date),
+                        SnapshotDatasetReadService._to_date(delist_date),
+                        status,
+                    )
+
+        if symbols is not None:
+            targets = {normalize_symbol(symbol) for symbol in symbols if symbol}
+        else:
+            # 未退市且状态非 active 的证券（如暂停上市）不纳入期望范围
+            targets = {
+                symbol
+                for symbol, (_, delist_date, status) in listed.items()
+                if status == "active" or delist_date is not None
+            }
+
+        universe: dict[str, tuple[date, date]] = {}
+        for symbol in targets:
+            list_date, delist_date, _ = listed.get(symbol, (None, None, None))
+            first = max(start_date, list_date) if list_date else start_date
+            last = min(end_date, delist_date) if delist_date else end_date
+            if first <= last:
+                universe[symbol] = (first, last)
+        return universe
+
+    def _read_table(self, object_key: str):
+        import pyarrow.parquet as pq
+
+        version = extract_batch_id(object_key) or self.store.get_etag(object_key) or ""
+        return get_parquet_table_cache().get_or_load(
+            object_key,
+            version,
+            lambda: pq.read_table(BytesIO(self.store.get_bytes(object_key))),
+        )
+
+    @staticmethod
+    def _fingerprint(ordered: list[str], universe: dict[str, tuple[date, date]], trading_days: list[date]) -> str:
+        digest = hashlib.sha256()
+        for symbol in ordered:
+            first, last = universe[symbol]
+            digest.update(f"{symbol}:{first.isoformat()}:{last.isoformat()};".encode("utf-8"))
+        digest.update(",".join(day.isoformat() for day in trading_days).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _read_checkpoint(self, checkpoint_key: str) -> dict[str, Any] | None:
+        try:
+            if not self.store.exists(checkpoint_key):
+                return None
+            return json.loads(self.store.get_bytes(checkpoint_key).decode("utf-8"))
+        except Exception as exc:
+            logger.warning("读取 market_daily 缺口扫描检查点失败 key=%s error=%s", checkpoint_key, exc)
+            return None
+
+    def _write_checkpoint(
+        self,
+        checkpoint_key: str,
+        *,
+        fingerprint: str,
+        cursor: int,
+        ranges: list[list[Any]],
+        completed: bool,
+    ) -> None:
+        payload = {
+            "fingerprint": fingerprint,
+            "cursor": cursor,
+            "completed": completed,
+            "ranges": ranges,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        self.store.put_bytes(
+            object_key=checkpoint_key,
+            data=json.dumps(payload, ensure_ascii=True).encode("utf-8"),
+            content_type="application/json",
+        )
@@ -10,8 +10,8 @@ from app.datahub.services.market_daily_backfill_service import MarketDailyBackfi
 
 
 class MarketDailyIncrementalService(MarketDailyBackfillService):
-    def __init__(self, db: Session):
-        super().__init__(db)
+    def __init__(self, db: Session, **kwargs):
+        super().__init__(db, **kwargs)
 
     def execute(self, run_id: str, payload: TriggerDailyIncrementalRequest) -> None:
         if payload.dataset != "market_daily":
@@ -25,31 +25,13 @@ class MarketDailyIncrementalService(MarketDailyBackfillService):
         self._prepare_run(job_run, len(symbols))
         tasks = self._create_tasks(run_id, symbols, start_date, end_date)
 
-        success = 0
-        failed = 0
-
-        for task in tasks:
-            self._mark_task_running(task)
-            try:
-                quality_score, object_key, is_fallback, watermark_date, can_publish = self.process_symbol(
-                    symbol=task.symbol,
-                    start_date=start_date,
-                    end_date=end_date,
-                    batch_prefix="daily",
-                )
-                if not is_fallback and can_publish:
-                    self._upsert_watermark(
-                        symbol=task.symbol,
-                        end_date=watermark_date,
-                        quality_score=quality_score,
-                        object_key=object_key,
-                        batch_prefix="daily",
-                    )
-                self._mark_task_success(task)
-                success += 1
-            except Exception as exc:
-                self._mark_task_failed(task, str(exc))
-                failed += 1
+        success, failed = self.run_symbol_tasks(
+            tasks,
+            start_date=start_date,
+            end_date=end_date,
+            batch_prefix="daily",
+        )
+        self.compact_published_symbols(start_date=start_date, end_date=end_date)
 
         self._finish_run(job_run, success=success, failed=failed)
         if failed > 0:
@@ -105,22 +87,6 @@ class MarketDailyIncrementalService(MarketDailyBackfillService):
             self.db.refresh(task)
         return tasks
 
-    def _mark_task_running(self, task: DatahubJobTask) -> None:
-        task.status = DatahubTaskStatus.RUNNING.value
-        task.locked_at = datetime.now(timezone.utc)
-        task.attempts = task.attempts + 1
-        self.db.commit()
-
-    def _mark_task_success(self, task: DatahubJobTask) -> None:
-        task.status = DatahubTaskStatus.SUCCESS.value
-        task.last_error = None
-        self.db.commit()
-
-    def _mark_task_failed(self, task: DatahubJobTask, message: str) -> None:
-        task.status = DatahubTaskStatus.FAILED.value
-        task.last_error = message[:2000]
-        self.db.commit()
-
     def _finish_run(self, job_run: DatahubJobRun, *, success: int, failed: int) -> None:
         job_run.task_success = success
         job_run.task_failed = failed
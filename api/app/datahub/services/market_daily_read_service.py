@@ -1,123 +1,297 @@
 from __future__ import annotations
 
-import json
-from datetime import date, datetime
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
 from io import BytesIO
-from typing import Any
+from typing import Any, Iterable
 
 from sqlalchemy.orm import Session
 
-from app.datahub.models import DatahubDatasetWatermark, DatahubObjectIndex
+from app.core.config import get_settings
+from app.datahub.models import DatahubDatasetWatermark
 from app.datahub.normalize import normalize_symbol
-from app.datahub.storage import MinioParquetStore
+from app.datahub.services.object_key_resolver import ObjectKeyResolver
+from app.datahub.storage import MinioParquetStore, extract_batch_id, get_manifest_cache, get_parquet_table_cache
+
+logger = logging.getLogger(__name__)
 
 
 class MarketDailyReadService:
     """从 MinIO 标准层读取 market_daily 日线数据。"""
 
+    BAR_PRICE_COLUMNS = ("open", "high", "low", "close", "volume", "amount")
+    BAR_COLUMNS = ("trade_date", *BAR_PRICE_COLUMNS, "turnover_rate")
+    MONTHLY_LAYOUT_PREFIX = "datahub/normalized/dataset=market_daily/layout=monthly"
+    RESOLVE_CHUNK_SIZE = 500
+
     def __init__(self, db: Session):
         self.db = db
         self.store = MinioParquetStore()
 
     def get_bars(self, *, symbol: str, start_date: date, end_date: date) -> list[dict[str, Any]]:
         normalized = normalize_symbol(symbol)
-        object_key = self._resolve_object_key(normalized)
-        if not object_key:
+        table = self._get_bar_table(normalized, start_date, end_date)
+        if table is None:
             return []
+        return self._to_bar_dicts(table, normalized)
 
-        rows = self._read_parquet_rows(object_key)
-        filtered: list[dict[str, Any]] = []
-        for row in rows:
-            trade_date = self._to_date(row.get("trade_date"))
-            if trade_date is None:
-                continue
-            if trade_date < start_date or trade_date > end_date:
-                continue
-            filtered.append(self._normalize_bar_row(row, normalized, trade_date))
+    def get_bars_many(
+        self,
+        *,
+        symbols: Iterable[str],
+        start_date: date,
+        end_date: date,
+    ) -> dict[str, list[dict[str, Any]]]:
+        """批量读取多个 symbol 的窗口日线，返回 symbol -> bars（与逐个 get_bars 结果一致）。"""
+        tables = self.get_bar_tables_many(symbols=symbols, start_date=start_date, end_date=end_date)
+        return {symbol: self._to_bar_dicts(table, symbol) for symbol, table in tables.items()}
+
+    def get_bar_tables_many(self, *, symbols: Iterable[str], start_date: date, end_date: date) -> dict[str, Any]:
+        """批量读取窗口日线 Arrow 表（按 trade_date 升序），无数据的 symbol 不出现在结果中。
+
+        对象路径一次查询水位表解析，对象在有界线程池中并发下载；
+        无水位或对象已失效的 symbol 回退到逐个解析，其他读取错误记录告警后同样回退（由逐个读取抛出）。
+        """
+        normalized = list(dict.fromkeys(normalize_symbol(symbol) for symbol in symbols if symbol))
+        if not normalized:
+            return {}
+        object_keys = self.resolve_object_keys(normalized)
 
-        filtered.sort(key=lambda item: item["trade_date"])
-        return filtered
+        monthly_manifests = None
+        if get_settings().DATAHUB_MARKET_DAILY_LAYOUT == "monthly":
+            monthly_manifests = self._load_monthly_manifests(start_date, end_date)
+
+        def load(symbol: str):
+            object_key = object_keys[symbol]
+            try:
+                table = None
+                if monthly_manifests is not None:
+                    table = self._read_monthly_window(
+                        symbol, object_key, start_date, end_date, manifests=monthly_manifests
+                    )
+                if table is None:
+                    table = self.read_table(object_key)
+            except Exception:
+                # 对象已被清理/裁剪删除属于预期的失效路径；对象仍存在则是真实读取错误
+                if self.store.exists(object_key):
+                    logger.warning("批量读取 market_daily 失败 symbol=%s object_key=%s", symbol, object_key, exc_info=True)
+                return None
+            return self._filter_window(table, start_date, end_date)
+
+        resolved = [symbol for symbol in normalized if symbol in object_keys]
+        loaded: dict[str, Any] = {}
+        if resolved:
+            max_workers = max(1, min(get_settings().DATAHUB_READ_MAX_WORKERS, len(resolved)))
+            with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="datahub-read") as executor:
+                loaded = dict(zip(resolved, executor.map(load, resolved)))
+
+        result: dict[str, Any] = {}
+        for symbol in normalized:
+            table = loaded.get(symbol)
+            if table is None:
+                # Session 不跨线程共享，回退路径在调用线程内顺序执行
+                table = self._get_bar_table(symbol, start_date, end_date)
+            if table is not None and table.num_rows:
+                result[symbol] = table
+        return result
 
     def get_latest_bar(self, *, symbol: str) -> dict[str, Any] | None:
+        import pyarrow.compute as pc
+
         normalized = normalize_symbol(symbol)
-        object_key = self._resolve_object_key(normalized)
-        if not object_key:
+        table = self._resolver().read(normalized, self.read_table)
+        if table is None or table.num_rows == 0:
             return None
+        dates = table.column("trade_date")
+        index = pc.index(dates, pc.max(dates)).as_py()
+        bars = self._to_bar_dicts(table.slice(index, 1), normalized)
+        return bars[0] if bars else None
 
-        rows = self._read_parquet_rows(object_key)
-        latest: dict[str, Any] | None = None
-        latest_date: date | None = None
-        for row in rows:
-            trade_date = self._to_date(row.get("trade_date"))
-            if trade_date is None:
-                continue
-            if latest_date is None or trade_date > latest_date:
-                latest_date = trade_date
-                latest = self._normalize_bar_row(row, normalized, trade_date)
-        return latest
-
-    def _resolve_object_key(self, symbol: str) -> str | None:
-        manifest_key = f"datahub/normalized/dataset=market_daily/latest/symbol={symbol}.json"
-        if self.store.exists(manifest_key):
-            payload = json.loads(self.store.get_bytes(manifest_key).decode("utf-8"))
-            object_key = payload.get("object_key")
-            if object_key and self.store.exists(object_key):
-                return str(object_key)
-
-        watermark = (
-            self.db.query(DatahubDatasetWatermark)
-            .filter(
-                DatahubDatasetWatermark.dataset == "market_daily",
-                DatahubDatasetWatermark.symbol == symbol,
+    def _get_bar_table(self, symbol: str, start_date: date, end_date: date):
+        monthly = get_settings().DATAHUB_MARKET_DAILY_LAYOUT == "monthly"
+
+        def read(object_key: str):
+            table = self._read_monthly_window(symbol, object_key, start_date, end_date) if monthly else None
+            return table if table is not None else self.read_table(object_key)
+
+        table = self._resolver().read(symbol, read)
+        if table is None:
+            return None
+        return self._filter_window(table, start_date, end_date)
+
+    @staticmethod
+    def _filter_window(table, start_date: date, end_date: date):
+        import pyarrow.compute as pc
+
+        dates = table.column("trade_date")
+        return table.filter(pc.and_(pc.greater_equal(dates, start_date), pc.less_equal(dates, end_date)))
+
+    def resolve_object_keys(self, symbols: list[str]) -> dict[str, str]:
+        """按水位表批量解析已发布对象路径（发布时水位与 latest manifest 同步写入同一对象）。"""
+        object_keys: dict[str, str] = {}
+        for offset in range(0, len(symbols), self.RESOLVE_CHUNK_SIZE):
+            chunk = symbols[offset : offset + self.RESOLVE_CHUNK_SIZE]
+            rows = (
+                self.db.query(DatahubDatasetWatermark.symbol, DatahubDatasetWatermark.last_object_key)
+                .filter(
+                    DatahubDatasetWatermark.dataset == "market_daily",
+                    DatahubDatasetWatermark.symbol.in_(chunk),
+                )
+                .all()
             )
-            .first()
+            object_keys.update({row.symbol: row.last_object_key for row in rows if row.last_object_key})
+        return object_keys
+
+    def resolve_object_key(self, symbol: str) -> str | None:
+        """解析 symbol 当前已发布的对象路径，无数据时返回 None。"""
+        return self._resolver().resolve(symbol)
+
+    def _resolver(self) -> ObjectKeyResolver:
+        return ObjectKeyResolver(self.db, "market_daily", store=self.store)
+
+    @classmethod
+    def monthly_manifest_key(cls, year: int, month: int) -> str:
+        return f"{cls.MONTHLY_LAYOUT_PREFIX}/latest/year={year}/month={month:02d}.json"
+
+    @staticmethod
+    def iter_months(start_date: date, end_date: date) -> list[tuple[int, int]]:
+        months: list[tuple[int, int]] = []
+        year, month = start_date.year, start_date.month
+        while (year, month) <= (end_date.year, end_date.month):
+            months.append((year, month))
+            year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+        return months
+
+    def load_monthly_manifest(self, year: int, month: int) -> dict[str, Any] | None:
+        return get_manifest_cache().get(self.monthly_manifest_key(year, month), self.store)
+
+    def _load_monthly_manifests(self, start_date: date, end_date: date) -> dict[tuple[int, int], Any]:
+        """一次性加载窗口内各月 manifest，并预热对应的月度分区表。"""
+        manifests: dict[tuple[int, int], Any] = {}
+        for year, month in self.iter_months(start_date, end_date):
+            manifest = self.load_monthly_manifest(year, month)
+            manifests[(year, month)] = manifest
+            if manifest is not None:
+                self.read_monthly_table(manifest["object_key"])
+        return manifests
+
+    def _read_monthly_window(
+        self,
+        symbol: str,
+        source_object_key: str,
+        start_date: date,
+        end_date: date,
+        *,
+        manifests: dict[tuple[int, int], Any] | None = None,
+    ):
+        """从按月多 symbol 分区读取窗口；任一月份未覆盖该 symbol 的最新批次时返回 None 回退到单 symbol 对象。"""
+        import pyarrow as pa
+
+        parts = []
+        for year, month in self.iter_months(start_date, end_date):
+            if manifests is not None:
+                manifest = manifests.get((year, month))
+            else:
+                manifest = self.load_monthly_manifest(year, month)
+            if manifest is None:
+                return None
+            entry = (manifest.get("symbols") or {}).get(symbol)
+            if entry is None or entry.get("source_object_key") != source_object_key:
+                return None
+            if not entry.get("length"):
+                continue
+            month_table = self.read_monthly_table(manifest["object_key"])
+            parts.append(month_table.slice(entry["offset"], entry["length"]).drop_columns(["symbol"]))
+        if not parts:
+            return self.bar_schema().empty_table()
+        return pa.concat_tables(parts)
+
+    def read_monthly_table(self, object_key: str):
+        """读取按月分区对象（已按 symbol、trade_date 排序并标准化）。"""
+        import pyarrow.parquet as pq
+
+        return get_parquet_table_cache().get_or_load(
+            object_key,
+            extract_batch_id(object_key) or self.store.get_etag(object_key) or "",
+            lambda: pq.read_table(BytesIO(self.store.get_bytes(object_key))),
         )
-        if watermark and watermark.last_object_key and self.store.exists(watermark.last_object_key):
-            return watermark.last_object_key
-
-        indexed = (
-            self.db.query(DatahubObjectIndex)
-            .filter(
-                DatahubObjectIndex.dataset == "market_daily",
-                DatahubObjectIndex.symbol == symbol,
-            )
-            .order_by(DatahubObjectIndex.end_date.desc().nullslast(), DatahubObjectIndex.created_at.desc())
-            .first()
+
+    @classmethod
+    def bar_schema(cls):
+        import pyarrow as pa
+
+        return pa.schema(
+            [("trade_date", pa.date32())]
+            + [(name, pa.float64()) for name in cls.BAR_PRICE_COLUMNS]
+            + [("turnover_rate", pa.float64())]
         )
-        if indexed and self.store.exists(indexed.object_key):
-            return indexed.object_key
-        return None
 
-    @staticmethod
-    def _read_parquet_rows(object_key: str) -> list[dict[str, Any]]:
+    def read_table(self, object_key: str):
+        """读取已标准化的日线表；同一对象版本在进程内只下载、解码、标准化一次。"""
+        version = extract_batch_id(object_key) or self.store.get_etag(object_key) or ""
+        return get_parquet_table_cache().get_or_load(
+            object_key,
+            version,
+            lambda: self._load_normalized_table(self.store.get_bytes(object_key)),
+        )
+
+    @classmethod
+    def _load_normalized_table(cls, raw: bytes):
+        """仅解码日线所需列，并以列式 cast 完成类型标准化，结果按 trade_date 稳定排序。"""
+        import pyarrow as pa
+        import pyarrow.compute as pc
         import pyarrow.parquet as pq
 
-        raw = MinioParquetStore().get_bytes(object_key)
-        table = pq.read_table(BytesIO(raw))
-        return table.to_pylist()
+        parquet_file = pq.ParquetFile(BytesIO(raw))
+        present = [name for name in cls.BAR_COLUMNS if name in parquet_file.schema_arrow.names]
+        source = parquet_file.read(columns=present)
+        num_rows = source.num_rows
+
+        def column(name: str):
+            if name in present:
+                return source.column(name).combine_chunks()
+            return pa.nulls(num_rows)
+
+        arrays = {"trade_date": cls._to_date_array(column("trade_date"))}
+        for name in cls.BAR_PRICE_COLUMNS:
+            arrays[name] = pc.fill_null(cls._to_float_array(column(name)), 0.0)
+        arrays["turnover_rate"] = cls._to_float_array(column("turnover_rate"))
+
+        table = pa.table(arrays)
+        table = table.filter(pc.is_valid(table.column("trade_date")))
+        return table.take(pc.sort_indices(table, sort_keys=[("trade_date", "ascending")]))
 
     @staticmethod
-    def _to_date(value: Any) -> date | None:
-        if value is None:
-            return None
-        if isinstance(value, date) and not isinstance(value, datetime):
-            return value
-        if isinstance(value, datetime):
-            return value.date()
-        if isinstance(value, str):
-            return datetime.strptime(value[:10], "%Y-%m-%d").date()
-        return None
+    def _to_date_array(values):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if pa.types.is_date32(values.type):
+            return values
+        if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+            values = pc.utf8_slice_codeunits(values, 0, 10)
+            values = pc.if_else(pc.equal(values, ""), pa.scalar(None, values.type), values)
+        elif pa.types.is_timestamp(values.type):
+            return pc.cast(values, pa.date32())
+        elif not (pa.types.is_date(values.type) or pa.types.is_null(values.type)):
+            return pa.nulls(len(values), pa.date32())
+        return pc.cast(values, pa.date32())
 
     @staticmethod
-    def _normalize_bar_row(row: dict[str, Any], symbol: str, trade_date: date) -> dict[str, Any]:
-        return {
-            "symbol": symbol,
-            "trade_date": trade_date,
-            "open": float(row.get("open") or 0),
-            "high": float(row.get("high") or 0),
-            "low": float(row.get("low") or 0),
-            "close": float(row.get("close") or 0),
-            "volume": float(row.get("volume") or 0),
-            "amount": float(row.get("amount") or 0),
-            "turnover_rate": float(row.get("turnover_rate") or 0) if row.get("turnover_rate") not in (None, "") else None,
-        }
+    def _to_float_array(values):
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+            values = pc.if_else(pc.equal(values, ""), pa.scalar(None, values.type), values)
+        return pc.cast(values, pa.float64())
+
+    @staticmethod
+    def _to_bar_dicts(table, symbol: str) -> list[dict[str, Any]]:
+        """只对最终返回窗口物化 Python dict。"""
+        import pyarrow as pa
+
+        if table.num_rows == 0:
+            return []
+        return table.add_column(0, "symbol", pa.array([symbol] * table.num_rows, pa.string())).to_pylist()
@@ -0,0 +1,413 @@
+from __future__ import annotations
+
+import logging
+import math
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.orm import Session
+
+from app.core.config import get_settings
+from app.datahub.enums import DatahubTaskStatus
+from app.datahub.models import (
+    DatahubJobMetricsHourly,
+    DatahubJobRun,
+    DatahubJobTask,
+    DatahubMetricsRollupState,
+)
+
+logger = logging.getLogger(__name__)
+
+METRIC_RUN = "run"
+METRIC_TASK = "task"
+
+KNOWN_PROVIDERS = ("baostock", "eastmoney", "minio_cache")
+# 按顺序匹配，命中即归类；未命中的错误归为 other
+ERROR_CLASS_PATTERNS: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("partial_failed", ("partial_failed",)),
+    ("cooldown", ("熔断", "cooldown")),
+    ("timeout", ("超时", "timeout", "timed out")),
+    ("empty_result", ("结果为空", "无可用")),
+    ("not_supported", ("未接入", "不支持")),
+    ("network", ("连接", "connection", "network")),
+)
+ERROR_CLASS_OTHER = "other"
+
+# 耗时直方图：第 i 桶上界为 BASE * GROWTH**i 秒，分位数估算相对误差不超过 GROWTH - 1
+HISTOGRAM_BASE_SECONDS = 0.01
+HISTOGRAM_GROWTH = 1.05
+
+
+def classify_error(message: Optional[str]) -> tuple[str, str]:
+    """从错误信息识别 (数据源, 错误分类)。
+
+    回退链路的错误形如 ``baostock 获取失败: ... | eastmoney 处于熔断冷却``，取最先出现的数据源
+    及其所在片段归类；无错误返回 ``("", "")``。
+    """
+    if not message:
+        return "", ""
+    lowered = message.lower()
+    provider = ""
+    segment = lowered
+    positions = [(lowered.find(name), name) for name in KNOWN_PROVIDERS if name in lowered]
+    if positions:
+        start, provider = min(positions)
+        segment = lowered[start:].split(" | ", 1)[0]
+    for error_class, needles in ERROR_CLASS_PATTERNS:
+        if any(needle in segment for needle in needles):
+            return provider, error_class
+    return provider, ERROR_CLASS_OTHER
+
+
+def histogram_bucket(seconds: float) -> int:
+    if seconds <= HISTOGRAM_BASE_SECONDS:
+        return 0
+    return max(0, math.ceil(math.log(seconds / HISTOGRAM_BASE_SECONDS) / math.log(HISTOGRAM_GROWTH) - 1e-9))
+
+
+def estimate_percentile(histogram: Counter, duration_max: float, q: float) -> float:
+    """按直方图估算分位数，与 ``sorted(durations)[ceil(n*q)-1]`` 同口径，结果不低于真实值且不超过最大耗时。"""
+    total = sum(histogram.values())
+    if total <= 0:
+        return 0.0
+    rank = min(total, max(1, math.ceil(total * q)))
+    seen = 0
+    for index in sorted(histogram):
+        seen += histogram[index]
+        if seen >= rank:
+            return min(duration_max, HISTOGRAM_BASE_SECONDS * HISTOGRAM_GROWTH**index)
+    return duration_max
+
+
+def hour_floor(value: datetime) -> datetime:
+    return value.replace(minute=0, second=0, microsecond=0)
+
+
+@dataclass
+class DurationAggregate:
+    item_count: int = 0
+    duration_count: int = 0
+    duration_sum: float = 0.0
+    duration_max: float = 0.0
+    histogram: Counter = field(default_factory=Counter)
+
+    def add(self, count: int = 1, seconds: Optional[float] = None) -> None:
+        self.item_count += count
+        if seconds is None:
+            return
+        self.duration_count += 1
+        self.duration_sum += seconds
+        self.duration_max = max(self.duration_max, seconds)
+        self.histogram[histogram_bucket(seconds)] += 1
+
+    def merge(self, other: DurationAggregate) -> None:
+        self.item_count += other.item_count
+        self.duration_count += other.duration_count
+        self.duration_sum += other.duration_sum
+        self.duration_max = max(self.duration_max, other.duration_max)
+        self.histogram.update(other.histogram)
+
+
+@dataclass
+class JobMetricsWindow:
+    """一个时间窗内的作业/子任务指标（窗口按作业创建时间划分）。"""
+
+    run_status_counts: Counter = field(default_factory=Counter)
+    durations: DurationAggregate = field(default_factory=DurationAggregate)
+    task_status_counts: Counter = field(default_factory=Counter)
+    failed_tasks_by_error_class: Counter = field(default_factory=Counter)
+    failed_tasks_by_provider: Counter = field(default_factory=Counter)
+
+    @property
+    def total_runs(self) -> int:
+        return sum(self.run_status_counts.values())
+
+    @property
+    def avg_duration_seconds(self) -> float:
+        if self.durations.duration_count == 0:
+            return 0.0
+        return self.durations.duration_sum / self.durations.duration_count
+
+    def duration_percentile(self, q: float) -> float:
+        return estimate_percentile(self.durations.histogram, self.durations.duration_max, q)
+
+    def add_task(self, status: str, provider: str, error_class: str, count: int) -> None:
+        self.task_status_counts[status] += count
+        if status == DatahubTaskStatus.FAILED.value:
+            self.failed_tasks_by_error_class[error_class or ERROR_CLASS_OTHER] += count
+            if provider:
+                self.failed_tasks_by_provider[provider] += count
+
+
+RollupKey = tuple[str, datetime, str, str, str, str]
+
+
+class DatahubMetricsRollupService:
+    """作业指标小时级汇总。
+
+    已结束的作业及其子任务按「作业创建所在小时 × 数据集 × 状态 × 数据源 × 错误分类」累加进
+    ``datahub_job_metrics_hourly``，增量边界为作业 ``finished_at`` 水位：每轮只汇总水位之后、
+    ``lag`` 之前结束的作业，先按版本条件推进水位再写入增量，多个 Worker 并发刷新时只有一个生效。
+    窗口汇总读取窗口内的小时行，再叠加水位之后结束、尚未结束以及首个不完整小时内的少量作业，
+    代价只与窗口长度和未汇总尾部有关，与历史总量无关。
+    """
+
+    STATE_NAME = "job_metrics"
+    FINISHED_STATUSES = (
+        DatahubTaskStatus.SUCCESS.value,
+        DatahubTaskStatus.FAILED.value,
+        DatahubTaskStatus.SKIPPED.value,
+    )
+    TASK_QUERY_CHUNK = 500
+
+    def __init__(self, db: Session, *, lag: Optional[timedelta] = None, step: Optional[timedelta] = None):
+        settings = get_settings()
+        self.db = db
+        self.lag = lag if lag is not None else timedelta(seconds=settings.DATAHUB_METRICS_ROLLUP_LAG_SECONDS)
+        self.step = step if step is not None else timedelta(hours=settings.DATAHUB_METRICS_ROLLUP_STEP_HOURS)
+
+    def refresh(self, *, now: Optional[datetime] = None) -> int:
+        """把水位之后结束的作业汇总进小时表，按 ``step`` 分段提交，返回本次汇总的作业数。"""
+        upper = (now or datetime.now(timezone.utc)) - self.lag
+        state = self._get_state()
+        lower = state.watermark
+        if lower is None:
+            first_finished = self.db.execute(
+                select(func.min(DatahubJobRun.finished_at)).where(DatahubJobRun.status.in_(self.FINISHED_STATUSES))
+            ).scalar()
+            if first_finished is None:
+                self._advance(state, upper, {})
+                return 0
+            lower = first_finished - timedelta(microseconds=1)
+        rolled = 0
+        while _before(lower, upper):
+            chunk_upper = lower + self.step if _before(lower + self.step, upper) else upper
+            deltas, run_count = self._aggregate_finished(lower, chunk_upper)
+            if not self._advance(state, chunk_upper, deltas):
+                logger.info("DataHub 指标汇总水位已被其他进程推进，本轮跳过")
+                return rolled
+            rolled += run_count
+            lower = chunk_upper
+        return rolled
+
+    def backfill(self, *, now: Optional[datetime] = None) -> int:
+        """按现存作业重建汇总表，返回汇总的作业数。
+
+        保留策略按创建时间由旧到新删除作业，小时行比现存最早作业更早的部分已无源数据可重建，原样保留；
+        自该作业所在小时起删除小时行并清空水位，再按 ``step`` 分段重新汇总现存的已结束作业。
+        """
+        oldest = self.db.execute(
+            select(func.min(func.coalesce(DatahubJobRun.created_at, DatahubJobRun.finished_at))).where(
+                DatahubJobRun.status.in_(self.FINISHED_STATUSES)
+            )
+        ).scalar()
+        if oldest is not None:
+            self.db.execute(
+                delete(DatahubJobMetricsHourly)
+                .where(DatahubJobMetricsHourly.bucket_start >= hour_floor(oldest))
+                .execution_options(synchronize_session=False)
+            )
+        self.db.execute(
+            update(DatahubMetricsRollupState)
+            .where(DatahubMetricsRollupState.name == self.STATE_NAME)
+            .values(watermark=None, version=DatahubMetricsRollupState.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.commit()
+        return self.refresh(now=now)
+
+    def summarize(self, *, window_start: datetime) -> JobMetricsWindow:
+        """汇总创建时间不早于 ``window_start`` 的作业与子任务。"""
+        window = JobMetricsWindow()
+        first_full_hour = hour_floor(window_start)
+        if first_full_hour < window_start:
+            first_full_hour += timedelta(hours=1)
+        state = self.db.query(DatahubMetricsRollupState).filter(DatahubMetricsRollupState.name == self.STATE_NAME).first()
+        watermark = state.watermark if state is not None else None
+
+        if watermark is not None:
+            rows = self.db.execute(
+                select(DatahubJobMetricsHourly).where(DatahubJobMetricsHourly.bucket_start >= first_full_hour)
+            ).scalars()
+            for row in rows:
+                if row.metric == METRIC_RUN:
+                    window.run_status_counts[row.status] += row.item_count
+                    window.durations.merge(_row_aggregate(row))
+                else:
+                    window.add_task(row.status, row.provider, row.error_class, row.item_count)
+
+        live_runs = self._live_runs(window_start, first_full_hour, watermark)
+        for run in live_runs:
+            window.run_status_counts[run.status] += 1
+            window.durations.add(0, _duration(run))
+        for _, status, provider, error_class, count in self._task_groups([run.id for run in live_runs]):
+            window.add_task(status, provider, error_class, count)
+        return window
+
+    def _get_state(self) -> DatahubMetricsRollupState:
+        state = self.db.query(DatahubMetricsRollupState).filter(DatahubMetricsRollupState.name == self.STATE_NAME).first()
+        if state is None:
+            state = DatahubMetricsRollupState(name=self.STATE_NAME, watermark=None, version=0)
+            self.db.add(state)
+            self.db.commit()
+            self.db.refresh(state)
+        return state
+
+    def _aggregate_finished(self, lower: datetime, upper: datetime) -> tuple[dict[RollupKey, DurationAggregate], int]:
+        """流式读取 (lower, upper] 内结束的作业，每 ``TASK_QUERY_CHUNK`` 个一批连同子任务累加，返回 (增量, 作业数)。
+
+        内存只与单批作业数和汇总键数（小时 × 维度组合）有关，与分段内的作业总量无关。
+        """
+        query = select(
+            DatahubJobRun.id,
+            DatahubJobRun.created_at,
+            DatahubJobRun.dataset,
+            DatahubJobRun.status,
+            DatahubJobRun.error_message,
+            DatahubJobRun.started_at,
+            DatahubJobRun.finished_at,
+        ).where(
+            DatahubJobRun.status.in_(self.FINISHED_STATUSES),
+            DatahubJobRun.finished_at > lower,
+            DatahubJobRun.finished_at <= upper,
+        )
+        deltas: dict[RollupKey, DurationAggregate] = {}
+        run_count = 0
+        result = self.db.execute(query.execution_options(yield_per=self.TASK_QUERY_CHUNK))
+        for runs in result.partitions():
+            self._aggregate(runs, deltas)
+            run_count += len(runs)
+        return deltas, run_count
+
+    def _live_runs(self, window_start: datetime, first_full_hour: datetime, watermark: Optional[datetime]) -> list:
+        """窗口内未进入小时表的作业：未结束的、首个不完整小时内的、水位之后结束的。
+
+        终态作业均带 ``finished_at``（各同步服务结束作业时写入），缺失的不计入汇总。
+        """
+        columns = (
+            DatahubJobRun.id,
+            DatahubJobRun.status,
+            DatahubJobRun.started_at,
+            DatahubJobRun.finished_at,
+        )
+        in_window = DatahubJobRun.created_at >= window_start
+        finished = DatahubJobRun.status.in_(self.FINISHED_STATUSES)
+        queries = [
+            select(*columns).where(in_window, DatahubJobRun.status.not_in(self.FINISHED_STATUSES)),
+            select(*columns).where(in_window, finished, DatahubJobRun.created_at < first_full_hour),
+        ]
+        if watermark is None:
+            queries.append(select(*columns).where(in_window, finished))
+        else:
+            queries.append(select(*columns).where(in_window, finished, DatahubJobRun.finished_at > watermark))
+        runs = {}
+        for query in queries:
+            for row in self.db.execute(query):
+                runs[row.id] = row
+        return list(runs.values())
+
+    def _task_groups(self, run_ids: list[str]) -> Iterable[tuple[str, str, str, str, int]]:
+        """按 (作业, 状态, 错误信息) 在库内聚合子任务，产出 (作业ID, 状态, 数据源, 错误分类, 数量)。"""
+        for offset in range(0, len(run_ids), self.TASK_QUERY_CHUNK):
+            chunk = run_ids[offset : offset + self.TASK_QUERY_CHUNK]
+            rows = self.db.execute(
+                select(
+                    DatahubJobTask.job_run_id,
+                    DatahubJobTask.status,
+                    DatahubJobTask.last_error,
+                    func.count(DatahubJobTask.id),
+                )
+                .where(DatahubJobTask.job_run_id.in_(chunk))
+                .group_by(DatahubJobTask.job_run_id, DatahubJobTask.status, DatahubJobTask.last_error)
+            )
+            for run_id, status, last_error, count in rows:
+                provider, error_class = classify_error(last_error)
+                yield run_id, status, provider, error_class, count
+
+    def _aggregate(self, runs: list, deltas: dict[RollupKey, DurationAggregate]) -> None:
+        run_keys: dict[str, tuple[datetime, str]] = {}
+        for run in runs:
+            bucket = hour_floor(run.created_at or run.finished_at)
+            dataset = run.dataset or ""
+            run_keys[run.id] = (bucket, dataset)
+            _, error_class = classify_error(run.error_message)
+            key = (METRIC_RUN, bucket, dataset, run.status, "", error_class)
+            deltas.setdefault(key, DurationAggregate()).add(1, _duration(run))
+        for run_id, status, provider, error_class, count in self._task_groups(list(run_keys)):
+            bucket, dataset = run_keys[run_id]
+            key = (METRIC_TASK, bucket, dataset, status, provider, error_class)
+            deltas.setdefault(key, DurationAggregate()).add(count)
+
+    def _advance(
+        self,
+        state: DatahubMetricsRollupState,
+        watermark: datetime,
+        deltas: dict[RollupKey, DurationAggregate],
+    ) -> bool:
+        """按版本条件推进水位并写入增量，同一事务提交；版本已变化时放弃并返回 False。"""
+        result = self.db.execute(
+            update(DatahubMetricsRollupState)
+            .where(DatahubMetricsRollupState.id == state.id, DatahubMetricsRollupState.version == state.version)
+            .values(watermark=watermark, version=state.version + 1)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount != 1:
+            self.db.rollback()
+            return False
+        if deltas:
+            self._merge_deltas(deltas)
+        self.db.commit()
+        self.db.refresh(state)
+        return True
+
+    def _merge_deltas(self, deltas: dict[RollupKey, DurationAggregate]) -> None:
+        buckets = {key[1] for key in deltas}
+        existing: dict[RollupKey, DatahubJobMetricsHourly] = {}
+        for row in self.db.query(DatahubJobMetricsHourly).filter(DatahubJobMetricsHourly.bucket_start.in_(buckets)):
+            existing[(row.metric, row.bucket_start, row.dataset, row.status, row.provider, row.error_class)] = row
+        for key, delta in deltas.items():
+            row = existing.get(key)
+            if row is None:
+                metric, bucket, dataset, status, provider, error_class = key
+                row = DatahubJobMetricsHourly(
+                    metric=metric,
+                    bucket_start=bucket,
+                    dataset=dataset,
+                    status=status,
+                    provider=provider,
+                    error_class=error_class,
+                )
+                self.db.add(row)
+            else:
+                delta.merge(_row_aggregate(row))
+            row.item_count = delta.item_count
+            row.duration_count = delta.duration_count
+            row.duration_sum = delta.duration_sum
+            row.duration_max = delta.duration_max
+            row.duration_histogram = {str(index): count for index, count in sorted(delta.histogram.items())} or None
+
+
+def _row_aggregate(row: DatahubJobMetricsHourly) -> DurationAggregate:
+    return DurationAggregate(
+        item_count=row.item_count or 0,
+        duration_count=row.duration_count or 0,
+        duration_sum=row.duration_sum or 0.0,
+        duration_max=row.duration_max or 0.0,
+        histogram=Counter({int(index): count for index, count in (row.duration_histogram or {}).items()}),
+    )
+
+
+def _duration(run) -> Optional[float]:
+    if run.started_at and run.finished_at:
+        return max(0.0, (run.finished_at - run.started_at).total_seconds())
+    return None
+
+
+def _before(left: datetime, right: datetime) -> bool:
+    # SQLite 取回的时间不带时区，与带时区的当前时间比较前按 UTC 对齐
+    if (left.tzinfo is None) != (right.tzinfo is None):
+        left, right = left.replace(tzinfo=left.tzinfo or timezone.utc), right.replace(tzinfo=right.tzinfo or timezone.utc)
+    return left < right
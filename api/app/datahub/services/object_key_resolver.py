@@ -0,0 +1,114 @@
+from __future__ import annotations
+
+import logging
+from typing import Callable, Optional, TypeVar
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.datahub.models import DatahubDatasetWatermark, DatahubObjectIndex
+from app.datahub.storage import MinioParquetStore, get_manifest_cache
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+def latest_manifest_key(dataset: str, symbol: Optional[str]) -> str:
+    return f"datahub/normalized/dataset={dataset}/latest/symbol={symbol or '__ALL__'}.json"
+
+
+class ObjectKeyResolver:
+    """解析数据集（可选限定 symbol）当前发布的对象路径。
+
+    优先读取进程内缓存的 latest manifest（命中时不访问对象存储）；未发布 manifest 时用一条查询
+    同时取水位表与对象索引中的候选路径，水位优先。对象按批次不可变写入，解析结果不再逐个探测存在性；
+    读取失败且对象确已不存在（被清理/裁剪删除）时，经 :meth:`resolve_after_miss` 重新解析。
+    """
+
+    # 兜底解析时最多检查的对象索引候选数
+    FALLBACK_INDEX_CANDIDATES = 5
+
+    def __init__(self, db: Session, dataset: str, *, store: Optional[MinioParquetStore] = None):
+        self.db = db
+        self.dataset = dataset
+        self.store = store or MinioParquetStore()
+
+    def resolve(self, symbol: Optional[str] = None) -> Optional[str]:
+        manifest = get_manifest_cache().get(latest_manifest_key(self.dataset, symbol), self.store)
+        if manifest and manifest.get("object_key"):
+            return str(manifest["object_key"])
+        return self._resolve_from_db(symbol)
+
+    def read(self, symbol: Optional[str], reader: Callable[[str], T]) -> Optional[T]:
+        """解析并用 ``reader`` 读取对象；对象已被删除时换用兜底候选重读一次，无已发布对象返回 None。"""
+        object_key = self.resolve(symbol)
+        if not object_key:
+            return None
+        try:
+            return reader(object_key)
+        except Exception:
+            if self.store.exists(object_key):
+                raise
+            fallback = self.resolve_after_miss(symbol, object_key)
+            if fallback is None:
+                raise
+            logger.warning(
+                "已发布对象不存在，改读兜底对象 dataset=%s symbol=%s missing=%s fallback=%s",
+                self.dataset,
+                symbol,
+                object_key,
+                fallback,
+            )
+            return reader(fallback)
+
+    def resolve_after_miss(self, symbol: Optional[str], missing_key: str) -> Optional[str]:
+        """``missing_key`` 已不存在时重新解析：失效 manifest 缓存后依次检查 manifest、水位与对象索引候选，
+        返回第一个仍存在的对象。只在读取失败时走到，逐个探测存在性的开销可以接受。"""
+        manifest_key = latest_manifest_key(self.dataset, symbol)
+        get_manifest_cache().invalidate(manifest_key)
+        manifest = get_manifest_cache().get(manifest_key, self.store)
+        candidates = [manifest.get("object_key") if manifest else None, *self._db_candidates(symbol)]
+        for object_key in dict.fromkeys(candidates):
+            if object_key and object_key != missing_key and self.store.exists(object_key):
+                return str(object_key)
+        return None
+
+    def _db_candidates(self, symbol: Optional[str]) -> list[Optional[str]]:
+        watermark_symbol = (
+            DatahubDatasetWatermark.symbol.is_(None) if symbol is None else DatahubDatasetWatermark.symbol == symbol
+        )
+        indexed_symbol = DatahubObjectIndex.symbol.is_(None) if symbol is None else DatahubObjectIndex.symbol == symbol
+        watermarked = self.db.execute(
+            select(DatahubDatasetWatermark.last_object_key)
+            .where(DatahubDatasetWatermark.dataset == self.dataset, watermark_symbol)
+            .limit(1)
+        ).scalars()
+        indexed = self.db.execute(
+            select(DatahubObjectIndex.object_key)
+            .where(DatahubObjectIndex.dataset == self.dataset, indexed_symbol)
+            .order_by(DatahubObjectIndex.end_date.desc().nullslast(), DatahubObjectIndex.created_at.desc())
+            .limit(self.FALLBACK_INDEX_CANDIDATES)
+        ).scalars()
+        return [*watermarked, *indexed]
+
+    def _resolve_from_db(self, symbol: Optional[str]) -> Optional[str]:
+        watermark_symbol = (
+            DatahubDatasetWatermark.symbol.is_(None) if symbol is None else DatahubDatasetWatermark.symbol == symbol
+        )
+        indexed_symbol = DatahubObjectIndex.symbol.is_(None) if symbol is None else DatahubObjectIndex.symbol == symbol
+        watermark_key = (
+            select(DatahubDatasetWatermark.last_object_key)
+            .where(DatahubDatasetWatermark.dataset == self.dataset, watermark_symbol)
+            .limit(1)
+            .scalar_subquery()
+        )
+        indexed_key = (
+            select(DatahubObjectIndex.object_key)
+            .where(DatahubObjectIndex.dataset == self.dataset, indexed_symbol)
+            .order_by(DatahubObjectIndex.end_date.desc().nullslast(), DatahubObjectIndex.created_at.desc())
+            .limit(1)
+            .scalar_subquery()
+        )
+        row = self.db.execute(select(watermark_key, indexed_key)).one()
+        return row[0] or row[1]
@@ -0,0 +1,401 @@
+from __future__ import annotations
+
+import atexit
+import logging
+import math
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from functools import lru_cache
+from typing import Callable, Optional
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import get_settings
+from app.datahub.models import DatahubProviderHealth
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+
+class SlidingWindowCounter:
+    """按时间分桶的环形缓冲区，统计最近 ``bucket_seconds × bucket_count`` 秒内的成功/失败次数。"""
+
+    def __init__(self, *, bucket_seconds: float, bucket_count: int):
+        self.bucket_seconds = bucket_seconds
+        self.bucket_count = bucket_count
+        self._epochs = [-1] * bucket_count
+        self._successes = [0] * bucket_count
+        self._failures = [0] * bucket_count
+
+    def add(self, now: float, *, success: bool) -> None:
+        epoch = int(now // self.bucket_seconds)
+        index = epoch % self.bucket_count
+        if self._epochs[index] != epoch:
+            self._epochs[index] = epoch
+            self._successes[index] = 0
+            self._failures[index] = 0
+        if success:
+            self._successes[index] += 1
+        else:
+            self._failures[index] += 1
+
+    def totals(self, now: float) -> tuple[int, int]:
+        oldest = int(now // self.bucket_seconds) - self.bucket_count
+        successes = failures = 0
+        for index, epoch in enumerate(self._epochs):
+            if epoch > oldest:
+                successes += self._successes[index]
+                failures += self._failures[index]
+        return successes, failures
+
+    def reset(self) -> None:
+        self._epochs = [-1] * self.bucket_count
+        self._successes = [0] * self.bucket_count
+        self._failures = [0] * self.bucket_count
+
+
+@dataclass
+class _PendingHealth:
+    """两次落库之间累积的增量。"""
+
+    success_delta: int = 0
+    failure_delta: int = 0
+    last_success_at: Optional[datetime] = None
+    last_failure_at: Optional[datetime] = None
+    last_error: Optional[str] = None
+    clear_error: bool = False
+
+
+@dataclass
+class _BreakerEntry:
+    window: SlidingWindowCounter
+    state: str = STATE_CLOSED
+    open_until: float = 0.0
+    probes: int = 0
+    probe_started_at: float = 0.0
+    last_outcome_success: bool = True
+    pending: Optional[_PendingHealth] = None
+    dirty: bool = False
+
+
+class ProviderCircuitBreaker:
+    """进程内 Provider 熔断器（closed / open / half-open）。
+
+    - closed：滑动窗口内样本数达到 ``min_samples`` 且失败率超过阈值时打开；
+    - open：冷却 ``cooldown_seconds`` 后转为 half-open；
+    - half-open：最多放行 ``half_open_max_calls`` 个探测请求，成功则关闭并清空窗口，失败则重新打开。
+
+    判定与记录只操作内存；累计计数、最近成败时间与熔断状态由后台线程按
+    ``flush_interval_seconds`` 聚合写回 ``datahub_provider_health``，启动时从该表恢复仍在冷却中的熔断。
+    """
+
+    def __init__(
+        self,
+        *,
+        window_seconds: float = 60.0,
+        bucket_seconds: float = 5.0,
+        min_samples: int = 20,
+        failure_rate_threshold: float = 0.5,
+        cooldown_seconds: float = 30.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.bucket_seconds = bucket_seconds
+        self.bucket_count = max(1, math.ceil(window_seconds / bucket_seconds))
+        self.min_samples = min_samples
+        self.failure_rate_threshold = failure_rate_threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.clock = clock
+        self._entries: dict[tuple[str, str], _BreakerEntry] = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+
+    # ---- 调用路径（纯内存） ----
+
+    def allow(self, *, provider: str, dataset: str) -> bool:
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get((provider, dataset))
+            if entry is None or entry.state == STATE_CLOSED:
+                return True
+            if entry.state == STATE_OPEN:
+                if now < entry.open_until:
+                    return False
+                self._transition(entry, STATE_HALF_OPEN)
+            # 探测请求迟迟未回报结果时，冷却期后允许新的探测
+            if entry.probes and now - entry.probe_started_at > self.cooldown_seconds:
+                entry.probes = 0
+            if entry.probes >= self.half_open_max_calls:
+                return False
+            entry.probes += 1
+            entry.probe_started_at = now
+            return True
+
+    def record_success(self, *, provider: str, dataset: str) -> None:
+        now = self.clock()
+        with self._lock:
+            entry = self._entry(provider, dataset)
+            if entry.state != STATE_CLOSED:
+                self._transition(entry, STATE_CLOSED)
+                entry.window.reset()
+            entry.window.add(now, success=True)
+            entry.last_outcome_success = True
+            pending = self._pending(entry)
+            pending.success_delta += 1
+            pending.last_success_at = self._to_datetime(now)
+            pending.last_error = None
+            pending.clear_error = True
+
+    def record_failure(self, *, provider: str, dataset: str, error: str) -> None:
+        now = self.clock()
+        with self._lock:
+            entry = self._entry(provider, dataset)
+            entry.window.add(now, success=False)
+            entry.last_outcome_success = False
+            pending = self._pending(entry)
+            pending.failure_delta += 1
+            pending.last_failure_at = self._to_datetime(now)
+            pending.last_error = error[:2000]
+            pending.clear_error = False
+
+            if entry.state == STATE_HALF_OPEN:
+                self._open(entry, now)
+            elif entry.state == STATE_CLOSED:
+                successes, failures = entry.window.totals(now)
+                total = successes + failures
+                if total >= self.min_samples and failures / total > self.failure_rate_threshold:
+                    self._open(entry, now)
+
+    def state(self, *, provider: str, dataset: str) -> str:
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get((provider, dataset))
+            if entry is None:
+                return STATE_CLOSED
+            if entry.state == STATE_OPEN and now >= entry.open_until:
+                return STATE_HALF_OPEN
+            return entry.state
+
+    # ---- 持久化 ----
+
+    def load(self, db: Session) -> int:
+        """从 ``datahub_provider_health`` 恢复仍在冷却期内的熔断，返回恢复的条数。"""
+        now = self.clock()
+        rows = (
+            db.query(DatahubProviderHealth)
+            .filter(DatahubProviderHealth.cooldown_until.isnot(None))
+            .all()
+        )
+        restored = 0
+        with self._lock:
+            for row in rows:
+                remaining = self._to_epoch(row.cooldown_until) - now
+                if remaining <= 0:
+                    continue
+                entry = self._entry(row.provider, row.dataset)
+                if entry.state == STATE_OPEN and entry.open_until >= now + remaining:
+                    continue
+                entry.state = STATE_OPEN
+                entry.open_until = now + remaining
+                entry.probes = 0
+                restored += 1
+        return restored
+
+    def attach(self, session_factory: Callable[[], Session], *, flush_interval_seconds: float) -> None:
+        """绑定落库会话工厂：加载初始状态并启动后台刷新线程（仅首次生效）。"""
+        with self._flush_lock:
+            if self._session_factory is not None:
+                return
+            self._session_factory = session_factory
+        db = session_factory()
+        try:
+            restored = self.load(db)
+            if restored:
+                logger.info("从数据库恢复 %d 个 Provider 熔断状态", restored)
+        except Exception as exc:
+            logger.warning("加载 Provider 熔断状态失败: %s", exc)
+        finally:
+            db.close()
+        if flush_interval_seconds > 0:
+            self._flusher = threading.Thread(
+                target=self._flush_loop,
+                args=(flush_interval_seconds,),
+                name="datahub-provider-health-flush",
+                daemon=True,
+            )
+            self._flusher.start()
+
+    def flush(self) -> int:
+        """把累计增量写回数据库，返回写入的 provider/dataset 条数。"""
+        if self._session_factory is None:
+            return 0
+        with self._flush_lock:
+            with self._lock:
+                batch = []
+                for key, entry in self._entries.items():
+                    if not entry.dirty:
+                        continue
+                    batch.append((key, entry.pending or _PendingHealth(), self._status(entry), self._cooldown_until(entry)))
+                    entry.pending = None
+                    entry.dirty = False
+            if not batch:
+                return 0
+
+            db = self._session_factory()
+            try:
+                for (provider, dataset), pending, status, cooldown_until in batch:
+                    row = self._get_or_create(db, provider=provider, dataset=dataset)
+                    if pending.success_delta:
+                        row.success_count = DatahubProviderHealth.success_count + pending.success_delta
+                    if pending.failure_delta:
+                        row.failure_count = DatahubProviderHealth.failure_count + pending.failure_delta
+                    if pending.last_success_at is not None:
+                        row.last_success_at = pending.last_success_at
+                    if pending.last_failure_at is not None:
+                        row.last_failure_at = pending.last_failure_at
+                    if pending.last_error is not None:
+                        row.last_error = pending.last_error
+                    elif pending.clear_error:
+                        row.last_error = None
+                    row.status = status
+                    row.cooldown_until = cooldown_until
+                db.commit()
+            except Exception:
+                db.rollback()
+                self._requeue(batch)
+                raise
+            finally:
+                db.close()
+            return len(batch)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._flusher is not None and self._flusher is not threading.current_thread():
+            self._flusher.join(timeout=5)
+        try:
+            self.flush()
+        except Exception as exc:
+            logger.warning("Provider 健康状态落库失败: %s", exc)
+
+    # ---- 内部 ----
+
+    def _flush_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.flush()
+            except Exception as exc:
+                logger.warning("Provider 健康状态落库失败，下次重试: %s", exc)
+
+    def _requeue(self, batch: list) -> None:
+        with self._lock:
+            for key, pending, _, _ in batch:
+                entry = self._entries[key]
+                current = self._pending(entry)
+                current.success_delta += pending.success_delta
+                current.failure_delta += pending.failure_delta
+                current.last_success_at = current.last_success_at or pending.last_success_at
+                current.last_failure_at = current.last_failure_at or pending.last_failure_at
+                if current.last_error is None and not current.clear_error:
+                    current.last_error = pending.last_error
+                    current.clear_error = pending.clear_error
+
+    def _entry(self, provider: str, dataset: str) -> _BreakerEntry:
+        entry = self._entries.get((provider, dataset))
+        if entry is None:
+            entry = _BreakerEntry(
+                window=SlidingWindowCounter(bucket_seconds=self.bucket_seconds, bucket_count=self.bucket_count)
+            )
+            self._entries[(provider, dataset)] = entry
+        return entry
+
+    @staticmethod
+    def _pending(entry: _BreakerEntry) -> _PendingHealth:
+        if entry.pending is None:
+            entry.pending = _PendingHealth()
+        entry.dirty = True
+        return entry.pending
+
+    def _open(self, entry: _BreakerEntry, now: float) -> None:
+        self._transition(entry, STATE_OPEN)
+        entry.open_until = now + self.cooldown_seconds
+
+    def _transition(self, entry: _BreakerEntry, state: str) -> None:
+        entry.state = state
+        entry.probes = 0
+        entry.dirty = True
+
+    def _status(self, entry: _BreakerEntry) -> str:
+        if entry.state == STATE_OPEN:
+            return "cooldown"
+        if entry.state == STATE_HALF_OPEN:
+            return "half_open"
+        return "healthy" if entry.last_outcome_success else "degraded"
+
+    def _cooldown_until(self, entry: _BreakerEntry) -> Optional[datetime]:
+        if entry.state != STATE_OPEN:
+            return None
+        return self._to_datetime(entry.open_until)
+
+    @staticmethod
+    def _to_datetime(epoch: float) -> datetime:
+        return datetime.fromtimestamp(epoch, tz=timezone.utc)
+
+    @staticmethod
+    def _to_epoch(value: datetime) -> float:
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+
+    @staticmethod
+    def _get_or_create(db: Session, *, provider: str, dataset: str) -> DatahubProviderHealth:
+        query = db.query(DatahubProviderHealth).filter(
+            DatahubProviderHealth.provider == provider,
+            DatahubProviderHealth.dataset == dataset,
+        )
+        row = query.first()
+        if row is not None:
+            return row
+        row = DatahubProviderHealth(
+            provider=provider,
+            dataset=dataset,
+            status="healthy",
+            success_count=0,
+            failure_count=0,
+        )
+        try:
+            with db.begin_nested():
+                db.add(row)
+        except IntegrityError:
+            # 其他进程已创建同一 provider/dataset 行
+            existing = query.first()
+            if existing is None:
+                raise
+            return existing
+        return row
+
+
+@lru_cache(maxsize=None)
+def get_provider_circuit_breaker(bind: Engine) -> ProviderCircuitBreaker:
+    """按数据库引擎获取进程级共享熔断器：首次获取时加载初始状态并启动后台落库线程。"""
+    settings = get_settings()
+    breaker = ProviderCircuitBreaker(
+        window_seconds=settings.DATAHUB_PROVIDER_BREAKER_WINDOW_SECONDS,
+        bucket_seconds=settings.DATAHUB_PROVIDER_BREAKER_BUCKET_SECONDS,
+    )
+    breaker.attach(
+        sessionmaker(autocommit=False, autoflush=False, bind=bind),
+        flush_interval_seconds=settings.DATAHUB_PROVIDER_HEALTH_FLUSH_SECONDS,
+    )
+    atexit.register(breaker.close)
+    return breaker
@@ -1,16 +1,20 @@
 from datetime import datetime, timezone
-from typing import Any, Optional
+from typing import TYPE_CHECKING, Any, Optional
 
 from sqlalchemy.orm import Session
 
 from app.datahub.models import DatahubQualityReport
 
+if TYPE_CHECKING:  # pragma: no cover
+    from app.datahub.services.sync_unit_of_work import SyncUnitOfWork
+
 
 class DatahubQualityService:
     CORE_DATASETS = {"market_daily", "security_master", "trading_calendar"}
 
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, unit_of_work: Optional["SyncUnitOfWork"] = None):
         self.db = db
+        self.unit_of_work = unit_of_work
 
     @classmethod
     def quality_threshold(cls, dataset: str) -> float:
@@ -29,16 +33,21 @@ class DatahubQualityService:
         severity: str,
         issues: Optional[list[dict[str, Any]]] = None,
         object_key: Optional[str] = None,
-    ) -> DatahubQualityReport:
-        row = DatahubQualityReport(
-            dataset=dataset,
-            symbol=symbol,
-            quality_score=quality_score,
-            severity=severity,
-            issues=issues or [],
-            object_key=object_key,
-            checked_at=datetime.now(timezone.utc),
-        )
+    ) -> Optional[DatahubQualityReport]:
+        """写入质量报告；挂接了写缓冲时只登记到缓冲并返回 None。"""
+        values = {
+            "dataset": dataset,
+            "symbol": symbol,
+            "quality_score": quality_score,
+            "severity": severity,
+            "issues": issues or [],
+            "object_key": object_key,
+            "checked_at": datetime.now(timezone.utc),
+        }
+        if self.unit_of_work is not None:
+            self.unit_of_work.add_quality_report(values)
+            return None
+        row = DatahubQualityReport(**values)
         self.db.add(row)
         self.db.commit()
         self.db.refresh(row)
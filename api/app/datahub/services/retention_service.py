@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, Optional
+
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from app.core.api import BusinessException, ErrorCode
+from app.core.config import get_settings
+from app.datahub.enums import DatahubTaskStatus
+from app.datahub.models import DatahubDatasetWatermark, DatahubJobRun, DatahubJobTask, DatahubObjectIndex
+from app.datahub.schemas.datahub import DatahubRetentionResult
+from app.datahub.storage import MinioParquetStore
+
+logger = logging.getLogger(__name__)
+
+
+class DatahubRetentionService:
+    """作业记录保留策略与孤儿对象清理。
+
+    删除按集合分块执行：每轮选出一批作业 ID，先以 ``DELETE ... WHERE id IN (SELECT ... LIMIT n)``
+    循环删除其子任务，再删除作业本身，每块单独提交，避免一次事务级联删除数月回填历史。
+    """
+
+    FINISHED_STATUSES = (
+        DatahubTaskStatus.SUCCESS.value,
+        DatahubTaskStatus.FAILED.value,
+        DatahubTaskStatus.SKIPPED.value,
+    )
+    # 每轮选出的作业数；其子任务再按 chunk_size 分块删除
+    RUN_BATCH_SIZE = 100
+    ORPHAN_SCAN_PAGE_SIZE = 1000
+    NORMALIZED_PREFIX = "datahub/normalized/"
+
+    def __init__(self, db: Session, *, chunk_size: Optional[int] = None):
+        self.db = db
+        self.chunk_size = max(1, chunk_size or get_settings().DATAHUB_PURGE_CHUNK_SIZE)
+
+    def purge_runs(
+        self,
+        *,
+        statuses: Iterable[str],
+        created_before: Optional[datetime] = None,
+        limit: Optional[int] = None,
+    ) -> tuple[int, int]:
+        """按状态（可选限定创建时间）删除作业及其子任务，按 created_at 由旧到新，返回 (作业数, 子任务数)。"""
+        status_list = list(statuses)
+        if DatahubTaskStatus.RUNNING.value in status_list:
+            raise BusinessException("不支持删除 running 状态的作业批量记录", code=ErrorCode.VALIDATION_ERROR)
+
+        deleted_runs = 0
+        deleted_tasks = 0
+        while limit is None or deleted_runs < limit:
+            batch_size = self.RUN_BATCH_SIZE if limit is None else min(self.RUN_BATCH_SIZE, limit - deleted_runs)
+            query = select(DatahubJobRun.id).where(DatahubJobRun.status.in_(status_list))
+            if created_before is not None:
+                query = query.where(DatahubJobRun.created_at < created_before)
+            run_ids = list(self.db.execute(query.order_by(DatahubJobRun.created_at.asc()).limit(batch_size)).scalars())
+            if not run_ids:
+                break
+            deleted_tasks += self._delete_tasks_of(run_ids)
+            self.db.execute(delete(DatahubJobRun).where(DatahubJobRun.id.in_(run_ids)).execution_options(synchronize_session=False))
+            self.db.commit()
+            deleted_runs += len(run_ids)
+        return deleted_runs, deleted_tasks
+
+    def apply_retention(
+        self,
+        *,
+        keep_days: Optional[int] = None,
+        sweep_orphans: bool = False,
+        dry_run: bool = False,
+    ) -> DatahubRetentionResult:
+        """删除超过保留期的已结束作业；可选顺带清理未被对象索引引用的批次对象。"""
+        days = keep_days if keep_days is not None else get_settings().DATAHUB_JOB_RUN_RETENTION_DAYS
+        cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+        if dry_run:
+            deleted_runs = (
+                self.db.query(DatahubJobRun)
+                .filter(DatahubJobRun.status.in_(self.FINISHED_STATUSES), DatahubJobRun.created_at < cutoff)
+                .count()
+            )
+            deleted_tasks = (
+                self.db.query(DatahubJobTask)
+                .join(DatahubJobRun, DatahubJobRun.id == DatahubJobTask.job_run_id)
+                .filter(DatahubJobRun.status.in_(self.FINISHED_STATUSES), DatahubJobRun.created_at < cutoff)
+                .count()
+            )
+        else:
+            deleted_runs, deleted_tasks = self.purge_runs(statuses=self.FINISHED_STATUSES, created_before=cutoff)
+        orphan_objects = deleted_objects = 0
+        if sweep_orphans:
+            orphan_objects, deleted_objects = self.sweep_orphan_objects(dry_run=dry_run)
+        return DatahubRetentionResult(
+            cutoff=cutoff,
+            deleted_runs=deleted_runs,
+            deleted_tasks=deleted_tasks,
+            orphan_objects=orphan_objects,
+            deleted_objects=deleted_objects,
+        )
+
+    def sweep_orphan_objects(
+        self,
+        *,
+        prefix: str = NORMALIZED_PREFIX,
+        min_age: Optional[timedelta] = None,
+        dry_run: bool = False,
+        store: Optional[MinioParquetStore] = None,
+    ) -> tuple[int, int]:
+        """删除标准层中未被引用的批次 Parquet 对象，返回 (孤儿数, 已删除数)。
+
+        引用来源：对象索引、水位，以及 ``latest/`` 下的 symbol manifest 与月度 manifest
+        （读路径按 manifest 直接取对象，即使索引行已被清理也不能删除）。
+        对象写入早于索引登记（同步服务批量落库），因此只处理早于 ``min_age`` 的对象；
+        manifest 等非 Parquet 对象不在清理范围内。任一 manifest 读取失败时只统计、不删除。
+        """
+        store = store or MinioParquetStore()
+        age = min_age if min_age is not None else timedelta(hours=get_settings().DATAHUB_ORPHAN_OBJECT_MIN_AGE_HOURS)
+        modified_before = datetime.now(timezone.utc) - age
+
+        candidates: list[str] = []
+        manifest_keys: set[str] = set()
+        manifests_complete = True
+        page: list[str] = []
+
+        def flush() -> None:
+            referenced = self._referenced_keys(page)
+            candidates.extend(object_key for object_key in page if object_key not in referenced)
+            page.clear()
+
+        # 单次遍历：批次对象按页比对数据库引用，manifest 顺带解析；未被数据库引用的候选通常很少，遍历结束后再排除 manifest 引用
+        for object_key, last_modified in store.list_objects(prefix):
+            if object_key.endswith(".json") and "/latest/" in object_key:
+                try:
+                    manifest_keys.update(self._manifest_object_keys(store.get_bytes(object_key)))
+                except Exception as exc:
+                    manifests_complete = False
+                    logger.warning("读取 manifest 失败，本次清理不删除对象 manifest_key=%s error=%s", object_key, exc)
+                continue
+            if not object_key.endswith(".parquet") or "/batch_id=" not in object_key:
+                continue
+            if last_modified is not None and last_modified > modified_before:
+                continue
+            page.append(object_key)
+            if len(page) >= self.ORPHAN_SCAN_PAGE_SIZE:
+                flush()
+        if page:
+            flush()
+
+        orphans = [object_key for object_key in candidates if object_key not in manifest_keys]
+        deleted = 0
+        if dry_run or not manifests_complete:
+            return len(orphans), deleted
+        for object_key in orphans:
+            if store.delete(object_key):
+                deleted += 1
+            else:
+                logger.warning("删除孤儿对象失败 object_key=%s", object_key)
+        return len(orphans), deleted
+
+    @staticmethod
+    def _manifest_object_keys(raw: bytes) -> set[str]:
+        """manifest 引用的对象：symbol manifest 的 ``object_key``；月度 manifest 另含各 symbol 的来源对象。"""
+        manifest = json.loads(raw)
+        keys = {manifest.get("object_key")}
+        for entry in (manifest.get("symbols") or {}).values():
+            keys.add(entry.get("source_object_key"))
+        keys.discard(None)
+        return keys
+
+    def _delete_tasks_of(self, run_ids: list[str]) -> int:
+        deleted = 0
+        while True:
+            chunk = (
+                select(DatahubJobTask.id)
+                .where(DatahubJobTask.job_run_id.in_(run_ids))
+                .limit(self.chunk_size)
+            )
+            result = self.db.execute(
+                delete(DatahubJobTask).where(DatahubJobTask.id.in_(chunk)).execution_options(synchronize_session=False)
+            )
+            self.db.commit()
+            deleted += result.rowcount or 0
+            if not result.rowcount or result.rowcount < self.chunk_size:
+                return deleted
+
+    def _referenced_keys(self, object_keys: list[str]) -> set[str]:
+        indexed = self.db.execute(
+            select(DatahubObjectIndex.object_key).where(DatahubObjectIndex.object_key.in_(object_keys))
+        ).scalars()
+        watermarked = self.db.execute(
+            select(DatahubDatasetWatermark.last_object_key).where(DatahubDatasetWatermark.last_object_key.in_(object_keys))
+        ).scalars()
+        return {*indexed, *watermarked}
@@ -1,12 +1,166 @@
 from app.datahub.catalog import CORE_DATASETS
-from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+import asyncio
+import atexit
+import inspect
+import random
+import threading
 import time
-from typing import Callable, TypeVar
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FuturesTimeoutError
+from functools import lru_cache
+from typing import Awaitable, Callable, Optional, TypeVar, Union
 
 from app.core.api import BusinessException, ErrorCode
+from app.core.config import get_settings
 
 T = TypeVar("T")
 
+
+class ProviderSaturatedError(RuntimeError):
+    """Provider 的全部槽位都被超时后仍未返回的调用占用。"""
+
+
+class ProviderExecutor:
+    """单个 Provider 的常驻有界线程池。
+
+    ``max_workers`` 个槽位限制同时占用线程的调用数。调用超时后，尚未开始的任务直接取消并归还槽位；
+    已在执行的任务无法强行中断，其槽位保留到 Provider 真正返回为止（计入 ``abandoned``），
+    因此线程总数不超过 ``max_workers``。全部槽位都被这类调用占用时，新调用立即抛
+    :class:`ProviderSaturatedError`，不再排队等待。
+    """
+
+    def __init__(self, provider: str, *, max_workers: int = 4):
+        self.provider = provider
+        self.max_workers = max(1, int(max_workers))
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix=f"datahub-router-{provider}",
+        )
+        self._slots = threading.BoundedSemaphore(self.max_workers)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.abandoned = 0
+
+    def call(self, operation: Callable[[], T], *, timeout: float) -> T:
+        """在线程池中执行 ``operation``，等待槽位与执行结果的总时长不超过 ``timeout``。"""
+        deadline = time.monotonic() + timeout
+        self._raise_if_saturated()
+        if not self._slots.acquire(timeout=timeout):
+            raise FuturesTimeoutError()
+        future, state = self._submit(operation)
+        try:
+            return future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FuturesTimeoutError:
+            self._abandon(future, state)
+            raise
+
+    async def acall(self, operation: Callable[[], Union[T, Awaitable[T]]], *, timeout: float) -> T:
+        """``call`` 的 asyncio 版本：同步函数在线程池执行，协程函数直接在当前事件循环上等待。"""
+        deadline = time.monotonic() + timeout
+        # 槽位是跨线程/跨事件循环共享的 threading 信号量，这里以非阻塞方式轮询，避免阻塞事件循环
+        while not self._slots.acquire(blocking=False):
+            self._raise_if_saturated()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise asyncio.TimeoutError()
+            await asyncio.sleep(min(0.01, remaining))
+
+        remaining = max(0.0, deadline - time.monotonic())
+        if inspect.iscoroutinefunction(operation):
+            # 协程超时会被 wait_for 真正取消，槽位随之归还
+            with self._lock:
+                self.in_flight += 1
+            timed_out = False
+            try:
+                return await asyncio.wait_for(operation(), timeout=remaining)
+            except asyncio.TimeoutError:
+                timed_out = True
+                raise
+            finally:
+                with self._lock:
+                    self.in_flight -= 1
+                    if timed_out:
+                        self.timeouts += 1
+                    else:
+                        self.completed += 1
+                self._slots.release()
+
+        future, state = self._submit(operation)  # type: ignore[arg-type]
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=remaining)
+        except asyncio.TimeoutError:
+            self._abandon(future, state)
+            raise
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "threads": len(self._executor._threads),
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "timeouts": self.timeouts,
+                "abandoned": self.abandoned,
+            }
+
+    def _raise_if_saturated(self) -> None:
+        with self._lock:
+            if self.abandoned >= self.max_workers:
+                raise ProviderSaturatedError(
+                    f"{self.provider} 的 {self.max_workers} 个槽位均被超时未返回的调用占用"
+                )
+
+    def _submit(self, operation: Callable[[], T]) -> tuple["Future[T]", dict[str, bool]]:
+        state = {"abandoned": False}
+
+        def on_done(done: Future) -> None:
+            # 任务结束（含排队中被取消）才归还槽位；超时放弃的调用不计入 completed
+            with self._lock:
+                if state["abandoned"]:
+                    self.abandoned -= 1
+                else:
+                    self.in_flight -= 1
+                    if not done.cancelled():
+                        self.completed += 1
+            self._slots.release()
+
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(operation)
+        except BaseException:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+            raise
+        future.add_done_callback(on_done)
+        return future, state
+
+    def _abandon(self, future: Future, state: dict[str, bool]) -> None:
+        with self._lock:
+            self.timeouts += 1
+        if future.cancel():
+            return
+        with self._lock:
+            if future.done():
+                return
+            state["abandoned"] = True
+            self.in_flight -= 1
+            self.abandoned += 1
+
+
+@lru_cache(maxsize=None)
+def get_provider_executor(provider: str) -> ProviderExecutor:
+    """获取进程级共享的 Provider 线程池，进程退出时关闭。"""
+    executor = ProviderExecutor(provider, max_workers=get_settings().DATAHUB_ROUTER_MAX_WORKERS_PER_PROVIDER)
+    atexit.register(executor.shutdown)
+    return executor
+
+
 class DatahubRouterService:
     """Provider 路由策略服务（第一阶段简化版）。"""
 
@@ -18,7 +172,18 @@ class DatahubRouterService:
         "security_master": 10,
         "trading_calendar": 10,
     }
-    RETRY_BACKOFF_SECONDS = [1, 2]
+    MAX_RETRIES = 2
+    RETRY_BASE_SECONDS = 1.0
+    RETRY_MAX_SECONDS = 8.0
+
+    def __init__(
+        self,
+        *,
+        executor_factory: Callable[[str], ProviderExecutor] = get_provider_executor,
+        cancel_event: Optional[threading.Event] = None,
+    ):
+        self.executor_factory = executor_factory
+        self.cancel_event = cancel_event or threading.Event()
 
     def get_provider_priority(self, dataset: str) -> list[str]:
         if dataset == "market_daily":
@@ -31,24 +196,93 @@ class DatahubRouterService:
             return ["eastmoney", "baostock", "minio_cache"]
         return ["baostock", "minio_cache"]
 
+    def cancel(self) -> None:
+        """取消在途调用的后续重试：正在退避等待的调用立即结束，之后发起的调用不受影响。"""
+        cancelled, self.cancel_event = self.cancel_event, threading.Event()
+        cancelled.set()
+
+    def backoff_seconds(self, attempt: int) -> float:
+        """指数退避 + 抖动：第 n 次重试等待 [0.5, 1] × min(上限, 基数 × 2^n) 秒。"""
+        delay = min(self.RETRY_MAX_SECONDS, self.RETRY_BASE_SECONDS * (2**attempt))
+        return delay * random.uniform(0.5, 1.0)
+
     def run_with_policy(self, *, dataset: str, provider: str, operation: Callable[[], T]) -> T:
         timeout = self.DATASET_TIMEOUT_SECONDS.get(dataset, 10)
-        retries = len(self.RETRY_BACKOFF_SECONDS)
+        executor = self.executor_factory(provider)
+        cancel_event = self.cancel_event
         last_error: Exception | None = None
-        for attempt in range(retries + 1):
+        for attempt in range(self.MAX_RETRIES + 1):
+            self._raise_if_cancelled(cancel_event, dataset=dataset, provider=provider)
             try:
-                with ThreadPoolExecutor(max_workers=1) as executor:
-                    future = executor.submit(operation)
-                    return future.result(timeout=timeout)
-            except FuturesTimeoutError as exc:
-                last_error = BusinessException(
-                    f"{provider} {dataset} 请求超时({timeout}s)",
-                    code=ErrorCode.NETWORK_ERROR,
-                )
-            except Exception as exc:  # pragma: no cover
+                return executor.call(operation, timeout=timeout)
+            except FuturesTimeoutError:
+                last_error = self._timeout_error(dataset=dataset, provider=provider, timeout=timeout)
+            except ProviderSaturatedError:
+                last_error = self._saturated_error(dataset=dataset, provider=provider)
+            except Exception as exc:
                 last_error = exc
-            if attempt < retries:
-                time.sleep(self.RETRY_BACKOFF_SECONDS[attempt])
+            if attempt < self.MAX_RETRIES and cancel_event.wait(self.backoff_seconds(attempt)):
+                break
+        self._raise_if_cancelled(cancel_event, dataset=dataset, provider=provider)
         if isinstance(last_error, Exception):
             raise last_error
         raise BusinessException(f"{provider} {dataset} 路由调用失败", code=ErrorCode.SYSTEM_ERROR)
+
+    async def arun_with_policy(
+        self,
+        *,
+        dataset: str,
+        provider: str,
+        operation: Callable[[], Union[T, Awaitable[T]]],
+    ) -> T:
+        """``run_with_policy`` 的 asyncio 版本，超时与退避等待均不阻塞事件循环。"""
+        timeout = self.DATASET_TIMEOUT_SECONDS.get(dataset, 10)
+        executor = self.executor_factory(provider)
+        cancel_event = self.cancel_event
+        last_error: Exception | None = None
+        for attempt in range(self.MAX_RETRIES + 1):
+            self._raise_if_cancelled(cancel_event, dataset=dataset, provider=provider)
+            try:
+                return await executor.acall(operation, timeout=timeout)
+            except asyncio.TimeoutError:
+                last_error = self._timeout_error(dataset=dataset, provider=provider, timeout=timeout)
+            except ProviderSaturatedError:
+                last_error = self._saturated_error(dataset=dataset, provider=provider)
+            except Exception as exc:
+                last_error = exc
+            if attempt < self.MAX_RETRIES and await self._async_backoff(self.backoff_seconds(attempt), cancel_event):
+                break
+        self._raise_if_cancelled(cancel_event, dataset=dataset, provider=provider)
+        if isinstance(last_error, Exception):
+            raise last_error
+        raise BusinessException(f"{provider} {dataset} 路由调用失败", code=ErrorCode.SYSTEM_ERROR)
+
+    @staticmethod
+    async def _async_backoff(delay: float, cancel_event: threading.Event) -> bool:
+        """等待 ``delay`` 秒，期间被取消则提前返回 True。"""
+        deadline = time.monotonic() + delay
+        while not cancel_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            await asyncio.sleep(min(0.05, remaining))
+        return True
+
+    @staticmethod
+    def _raise_if_cancelled(cancel_event: threading.Event, *, dataset: str, provider: str) -> None:
+        if cancel_event.is_set():
+            raise BusinessException(f"{provider} {dataset} 路由调用已取消", code=ErrorCode.SYSTEM_ERROR)
+
+    @staticmethod
+    def _timeout_error(*, dataset: str, provider: str, timeout: float) -> BusinessException:
+        return BusinessException(
+            f"{provider} {dataset} 请求超时({timeout}s)",
+            code=ErrorCode.NETWORK_ERROR,
+        )
+
+    @staticmethod
+    def _saturated_error(*, dataset: str, provider: str) -> BusinessException:
+        return BusinessException(
+            f"{provider} {dataset} 并发槽位均被超时未返回的调用占用",
+            code=ErrorCode.NETWORK_ERROR,
+        )
@@ -12,6 +12,7 @@ from app.datahub.services.snapshot_read_service import SnapshotDatasetReadServic
 
 class SectorMembersReadService:
     MAX_MEMBERS_FOR_CHANGE = 40
+    MEMBER_COLUMNS = ("symbol", "sector_code", "sector_name")
 
     def __init__(self, db: Session):
         self.db = db
@@ -19,12 +20,19 @@ class SectorMembersReadService:
 
     def get_symbol_sector_map(self) -> dict[str, dict[str, str]]:
         result: dict[str, dict[str, str]] = {}
-        for row in self._reader.load_rows():
-            symbol = normalize_symbol(str(row.get("symbol") or ""))
+        table = self._reader.load_table(columns=self.MEMBER_COLUMNS)
+        if table is None:
+            return result
+        columns = [
+            table.column(name).to_pylist() if name in table.column_names else [None] * table.num_rows
+            for name in self.MEMBER_COLUMNS
+        ]
+        for raw_symbol, raw_code, raw_name in zip(*columns):
+            symbol = normalize_symbol(str(raw_symbol or ""))
             if not symbol:
                 continue
-            sector_code = str(row.get("sector_code") or "").strip()
-            sector_name = str(row.get("sector_name") or sector_code).strip()
+            sector_code = str(raw_code or "").strip()
+            sector_name = str(raw_name or sector_code).strip()
             if not sector_code and not sector_name:
                 continue
             result[symbol] = {
@@ -55,32 +63,58 @@ class SectorMembersReadService:
 
         sector_symbols = self.get_sector_symbols_map()
         start_date = trade_date - timedelta(days=10)
-        result: dict[str, float] = {}
         targets = sector_codes if sector_codes is not None else set(sector_symbols.keys())
 
+        member_sectors: dict[str, str] = {}
         for sector_code in targets:
-            members = sector_symbols.get(sector_code, [])
-            if not members:
-                continue
-            changes: list[float] = []
-            for symbol in members[: self.MAX_MEMBERS_FOR_CHANGE]:
-                bars = market_reader.get_bars(symbol=symbol, start_date=start_date, end_date=trade_date)
-                if len(bars) < 2:
-                    continue
-                latest = bars[-1]
-                latest_date = latest["trade_date"]
-                if isinstance(latest_date, str):
-                    latest_date = date.fromisoformat(latest_date[:10])
-                elif not isinstance(latest_date, date):
-                    continue
-                if latest_date != trade_date:
-                    continue
-                previous = bars[-2]
-                prev_close = float(previous.get("close") or 0)
-                if not prev_close:
-                    continue
-                change_pct = (float(latest.get("close") or 0) - prev_close) / prev_close * 100
-                changes.append(change_pct)
-            if changes:
-                result[sector_code] = round(sum(changes) / len(changes), 2)
-        return result
+            for symbol in sector_symbols.get(sector_code, [])[: self.MAX_MEMBERS_FOR_CHANGE]:
+                member_sectors.setdefault(symbol, sector_code)
+        if not member_sectors:
+            return {}
+
+        tables = market_reader.get_bar_tables_many(
+            symbols=list(member_sectors),
+            start_date=start_date,
+            end_date=trade_date,
+        )
+        return self._sector_change_from_tables(tables, member_sectors, trade_date)
+
+    @staticmethod
+    def _sector_change_from_tables(
+        tables: dict,
+        member_sectors: dict[str, str],
+        trade_date: date,
+    ) -> dict[str, float]:
+        """对所有成员的窗口表做一次列式计算：取每个成员最后两根 K 线，按板块求涨跌幅均值。"""
+        import numpy as np
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        symbols = [symbol for symbol in member_sectors if symbol in tables]
+        if not symbols:
+            return {}
+        sector_index: dict[str, int] = {}
+        member_sector_ids = np.array(
+            [sector_index.setdefault(member_sectors[symbol], len(sector_index)) for symbol in symbols],
+            dtype=np.int64,
+        )
+        lengths = np.array([tables[symbol].num_rows for symbol in symbols], dtype=np.int64)
+        combined = pa.concat_tables([tables[symbol].select(["trade_date", "close"]) for symbol in symbols])
+        dates = combined.column("trade_date").to_numpy().astype("datetime64[D]")
+        # 与逐 symbol 计算一致：缺失收盘价按 0 处理，前收为 0 的成员不参与计算
+        closes = pc.fill_null(combined.column("close"), 0.0).to_numpy()
+
+        last = np.cumsum(lengths) - 1
+        valid = (lengths >= 2) & (dates[last] == np.datetime64(trade_date, "D"))
+        prev_close = closes[np.maximum(last - 1, 0)]
+        valid &= prev_close != 0
+        changes = (closes[last] - prev_close) / np.where(valid, prev_close, 1.0) * 100
+
+        sector_ids = member_sector_ids[valid]
+        totals = np.bincount(sector_ids, weights=changes[valid], minlength=len(sector_index))
+        counts = np.bincount(sector_ids, minlength=len(sector_index))
+        codes = list(sector_index)
+        return {
+            codes[index]: round(float(totals[index] / counts[index]), 2)
+            for index in np.flatnonzero(counts)
+        }
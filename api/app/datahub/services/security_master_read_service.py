@@ -1,23 +1,269 @@
 from __future__ import annotations
 
-from sqlalchemy.orm import Session
+import atexit
+import bisect
+import logging
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Iterable, Iterator, Optional
 
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, sessionmaker
+
+from app.core.config import get_settings
 from app.datahub.normalize import normalize_symbol
 from app.datahub.services.snapshot_read_service import SnapshotDatasetReadService
+from app.datahub.storage import MinioParquetStore, extract_batch_id
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class SecurityEntry:
+    symbol: str
+    name: str
+    exchange: Optional[str] = None
+    status: Optional[str] = None
+
+
+class SecurityIndex:
+    """某一 security_master 快照批次的只读内存索引：代码/名称精确查找 O(1)，代码/名称前缀与交易所检索。"""
+
+    def __init__(self, entries: Iterable[SecurityEntry], *, version: Optional[str] = None):
+        self.version = version
+        self._by_symbol: dict[str, SecurityEntry] = {}
+        for entry in entries:
+            self._by_symbol[entry.symbol] = entry
+        self.name_map: dict[str, str] = {symbol: entry.name for symbol, entry in self._by_symbol.items() if entry.name}
+        self._symbols = sorted(self._by_symbol)
+        self._names = sorted((entry.name, entry.symbol) for entry in self._by_symbol.values() if entry.name)
+        self._name_keys = [name for name, _ in self._names]
+        self._by_name: dict[str, list[str]] = {}
+        self._by_exchange: dict[str, list[str]] = {}
+        for symbol in self._symbols:
+            entry = self._by_symbol[symbol]
+            if entry.name:
+                self._by_name.setdefault(entry.name, []).append(symbol)
+            for exchange in self._exchange_keys(entry):
+                self._by_exchange.setdefault(exchange, []).append(symbol)
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[dict[str, Any]], *, version: Optional[str] = None) -> "SecurityIndex":
+        entries = []
+        for row in rows:
+            symbol = normalize_symbol(str(row.get("symbol") or ""))
+            if not symbol:
+                continue
+            entries.append(
+                SecurityEntry(
+                    symbol=symbol,
+                    name=str(row.get("name") or "").strip(),
+                    exchange=(str(row.get("exchange") or "").strip().upper() or None),
+                    status=row.get("status"),
+                )
+            )
+        return cls(entries, version=version)
+
+    def __len__(self) -> int:
+        return len(self._by_symbol)
+
+    def get(self, symbol: str) -> Optional[SecurityEntry]:
+        return self._by_symbol.get(normalize_symbol(symbol))
+
+    def lookup_name(self, symbol: str) -> Optional[str]:
+        return self.name_map.get(normalize_symbol(symbol))
+
+    def find_by_name(self, name: str) -> list[SecurityEntry]:
+        return [self._by_symbol[symbol] for symbol in self._by_name.get(name.strip(), [])]
+
+    def list_exchange(self, exchange: str) -> list[SecurityEntry]:
+        """按交易所列出证券，支持 SSE/SZSE 或代码后缀 SH/SZ。"""
+        return [self._by_symbol[symbol] for symbol in self._by_exchange.get(exchange.strip().upper(), [])]
+
+    def search(self, query: str, *, exchange: Optional[str] = None, limit: int = 20) -> list[SecurityEntry]:
+        """代码前缀优先、名称前缀其次的检索，可按交易所过滤。"""
+        text = query.strip()
+        if not text or limit <= 0:
+            return []
+        exchange_key = exchange.strip().upper() if exchange else None
+        results: list[SecurityEntry] = []
+        seen: set[str] = set()
+        candidates = (
+            *self._prefix_range(self._symbols, text.upper()),
+            *(self._names[index][1] for index in self._prefix_indexes(self._name_keys, text)),
+        )
+        for symbol in candidates:
+            if symbol in seen:
+                continue
+            entry = self._by_symbol[symbol]
+            if exchange_key is not None and exchange_key not in self._exchange_keys(entry):
+                continue
+            seen.add(symbol)
+            results.append(entry)
+            if len(results) >= limit:
+                break
+        return results
+
+    def _prefix_range(self, keys: list[str], prefix: str) -> Iterator[str]:
+        for index in self._prefix_indexes(keys, prefix):
+            yield keys[index]
+
+    @staticmethod
+    def _prefix_indexes(keys: list[str], prefix: str) -> Iterator[int]:
+        index = bisect.bisect_left(keys, prefix)
+        while index < len(keys) and keys[index].startswith(prefix):
+            yield index
+            index += 1
+
+    @staticmethod
+    def _exchange_keys(entry: SecurityEntry) -> tuple[str, ...]:
+        suffix = entry.symbol.rsplit(".", 1)[1] if "." in entry.symbol else None
+        return tuple(key for key in (entry.exchange, suffix) if key)
+
+
+EMPTY_SECURITY_INDEX = SecurityIndex([], version=None)
+
+
+class SecurityIndexRegistry:
+    """进程内共享的 security_master 索引。
+
+    首次读取时从 MinIO 快照同步加载；之后由后台线程按 ``refresh_interval_seconds`` 检查 latest manifest，
+    发现新的批次（batch_id/ETag）才重新加载并原子替换。读取路径只访问内存，从不调用数据源 provider。
+    """
+
+    def __init__(self, *, loader: Optional[Callable[..., tuple[Optional[str], Optional[list[dict]]]]] = None):
+        self._loader = loader or _load_latest_snapshot
+        self._index = EMPTY_SECURITY_INDEX
+        self._loaded = False
+        self._lock = threading.Lock()
+        self._session_factory: Optional[Callable[[], Session]] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        self.loads = 0
+
+    def current(self, db: Optional[Session] = None) -> SecurityIndex:
+        if not self._loaded:
+            self._initial_load(db)
+        return self._index
+
+    def refresh(self, db: Optional[Session] = None) -> bool:
+        """检查最新快照批次，版本变化时重新加载，返回是否替换了索引。"""
+        own_session = db is None
+        if own_session:
+            if self._session_factory is None:
+                return False
+            db = self._session_factory()
+        try:
+            version, rows = self._loader(db, current_version=self._index.version)
+        finally:
+            if own_session:
+                db.close()
+        with self._lock:
+            self._loaded = True
+            if version is None or version == self._index.version or rows is None:
+                return False
+            self._index = SecurityIndex.from_rows(rows, version=version)
+            self.loads += 1
+        logger.info("security_master 索引已加载 version=%s symbols=%d", version, len(self._index))
+        return True
+
+    def notify_changed(self) -> None:
+        """本进程发布了新快照时唤醒后台线程立即检查。"""
+        self._wake.set()
+
+    def attach(self, session_factory: Callable[[], Session], *, refresh_interval_seconds: float) -> None:
+        """绑定会话工厂并启动后台刷新线程（仅首次生效）。"""
+        with self._lock:
+            if self._session_factory is not None:
+                return
+            self._session_factory = session_factory
+        if refresh_interval_seconds > 0:
+            self._refresher = threading.Thread(
+                target=self._refresh_loop,
+                args=(refresh_interval_seconds,),
+                name="datahub-security-index-refresh",
+                daemon=True,
+            )
+            self._refresher.start()
+
+    def close(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._refresher is not None and self._refresher is not threading.current_thread():
+            self._refresher.join(timeout=5)
+
+    def _initial_load(self, db: Optional[Session]) -> None:
+        with self._lock:
+            if self._loaded:
+                return
+        try:
+            self.refresh(db)
+        except Exception as exc:
+            # 快照暂不可读时按空索引服务，后台线程稍后重试
+            logger.warning("security_master 索引加载失败: %s", exc)
+            with self._lock:
+                self._loaded = True
+
+    def _refresh_loop(self, interval: float) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(interval)
+            self._wake.clear()
+            if self._stop.is_set():
+                return
+            try:
+                self.refresh()
+            except Exception as exc:
+                logger.warning("security_master 索引刷新失败，下次重试: %s", exc)
+
+
+def _load_latest_snapshot(db: Session, *, current_version: Optional[str] = None) -> tuple[Optional[str], Optional[list[dict]]]:
+    """解析最新 security_master 快照；版本未变化时不读取对象内容，返回 ``(version, None)``。"""
+    reader = SnapshotDatasetReadService(db, "security_master")
+    object_key = reader.resolve_object_key()
+    if not object_key:
+        return None, None
+    if _snapshot_version(object_key) == current_version:
+        return current_version, None
+    # 已发布对象被清理时会改读兜底对象，版本按实际读取的对象计算
+    loaded = reader.load_snapshot()
+    if loaded is None:
+        return None, None
+    object_key, table = loaded
+    return _snapshot_version(object_key), table.to_pylist()
+
+
+def _snapshot_version(object_key: str) -> str:
+    return f"{object_key}#{extract_batch_id(object_key) or MinioParquetStore().get_etag(object_key) or ''}"
+
+
+@lru_cache(maxsize=None)
+def get_security_index_registry(bind: Engine) -> SecurityIndexRegistry:
+    """按数据库引擎获取进程级共享索引：首次获取时启动后台刷新线程。"""
+    registry = SecurityIndexRegistry()
+    registry.attach(
+        sessionmaker(autocommit=False, autoflush=False, bind=bind),
+        refresh_interval_seconds=get_settings().DATAHUB_SECURITY_INDEX_REFRESH_SECONDS,
+    )
+    atexit.register(registry.close)
+    return registry
 
 
 class SecurityMasterReadService:
-    def __init__(self, db: Session):
-        self._reader = SnapshotDatasetReadService(db, "security_master")
+    def __init__(self, db: Session, registry: Optional[SecurityIndexRegistry] = None):
+        self.db = db
+        self.registry = registry or get_security_index_registry(db.get_bind())
+
+    def index(self) -> SecurityIndex:
+        return self.registry.current(self.db)
 
     def get_name_map(self) -> dict[str, str]:
-        result: dict[str, str] = {}
-        for row in self._reader.load_rows():
-            symbol = normalize_symbol(str(row.get("symbol") or ""))
-            name = str(row.get("name") or "").strip()
-            if symbol and name:
-                result[symbol] = name
-        return result
+        """symbol -> name 映射（索引内共享的只读字典，调用方不要修改）。"""
+        return self.index().name_map
 
     def lookup_name(self, symbol: str) -> str | None:
-        return self.get_name_map().get(normalize_symbol(symbol))
+        return self.index().lookup_name(symbol)
+
+    def search(self, query: str, *, exchange: Optional[str] = None, limit: int = 20) -> list[SecurityEntry]:
+        return self.index().search(query, exchange=exchange, limit=limit)
@@ -8,6 +8,7 @@ from app.datahub.enums import DatahubTaskStatus
 from app.datahub.models import DatahubObjectIndex
 from app.datahub.models import DatahubDatasetWatermark, DatahubJobRun, DatahubJobTask
 from app.datahub.providers import BaoStockProvider
+from app.datahub.quality import evaluate_quality, to_arrow_table
 from app.datahub.schemas.datahub import TriggerBackfillRequest, TriggerDailyIncrementalRequest
 from app.datahub.services.market_daily_backfill_service import MarketDailyBackfillService
 from app.datahub.services.provider_health_service import DatahubProviderHealthService
@@ -43,7 +44,8 @@ class SecurityMasterSyncService:
             rows, biz_date = self._load_security_master_rows()
             if not rows:
                 raise BusinessException("security_master 未获取到数据", code=ErrorCode.BUSINESS_ERROR)
-            parquet_bytes = MarketDailyBackfillService._to_parquet_bytes(rows)
+            table = to_arrow_table(rows)
+            parquet_bytes = MarketDailyBackfillService._to_parquet_bytes(table)
             object_key = (
                 "datahub/normalized/"
                 f"dataset=security_master/year={biz_date.year}/month={biz_date.month:02d}/"
@@ -51,16 +53,7 @@ class SecurityMasterSyncService:
             )
             MinioParquetStore().put_bytes(object_key=object_key, data=parquet_bytes, content_type="application/octet-stream")
 
-            missing_symbol = sum(1 for row in rows if not row.get("symbol"))
-            missing_name = sum(1 for row in rows if not row.get("name"))
-            issue_count = missing_symbol + missing_name
-            score = max(0.0, 100.0 - (issue_count / max(len(rows), 1)) * 100.0)
-            severity = "p0" if issue_count > max(1, int(len(rows) * 0.1)) else ("p1" if issue_count > 0 else "p2")
-            issues = []
-            if missing_symbol > 0:
-                issues.append({"rule": "symbol_required", "count": missing_symbol})
-            if missing_name > 0:
-                issues.append({"rule": "name_required", "count": missing_name})
+            score, issues, severity = evaluate_quality("security_master", table)
 
             self.storage_service.upsert_object_index(
                 bucket=get_settings().MINIO_BUCKET_NAME,
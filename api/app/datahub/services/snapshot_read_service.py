@@ -1,61 +1,125 @@
 from __future__ import annotations
 
-import json
 from datetime import date, datetime
 from io import BytesIO
-from typing import Any
+from typing import Any, Iterator, Sequence
 
 from sqlalchemy.orm import Session
 
-from app.datahub.models import DatahubDatasetWatermark, DatahubObjectIndex
-from app.datahub.storage import MinioParquetStore
+from app.datahub.services.object_key_resolver import ObjectKeyResolver
+from app.datahub.storage import MinioParquetStore, extract_batch_id, get_parquet_table_cache
 
 
 class SnapshotDatasetReadService:
-    """从 MinIO 读取全量快照类数据集（security_master、sector_members 等）。"""
+    """从 MinIO 读取全量快照类数据集（security_master、sector_members 等）。
+
+    ``load_table`` 返回进程内共享的已解码表（按快照 batch_id 缓存），需要按快照版本判断是否变化的调用方
+    用 ``resolve_object_key`` / ``load_snapshot``；``iter_batches`` 按批流式读取，
+    支持列投影与 ``pyarrow.compute.Expression`` 过滤，只需一个板块或少量 symbol 的调用方不必物化全量行。
+    """
+
+    DEFAULT_BATCH_SIZE = 64 * 1024
 
     def __init__(self, db: Session, dataset: str):
         self.db = db
         self.dataset = dataset
         self.store = MinioParquetStore()
 
-    def load_rows(self) -> list[dict[str, Any]]:
-        object_key = self._resolve_object_key()
-        if not object_key:
+    def load_rows(
+        self,
+        *,
+        columns: Sequence[str] | None = None,
+        filter_expr: Any = None,
+    ) -> list[dict[str, Any]]:
+        table = self.load_table(columns=columns, filter_expr=filter_expr)
+        if table is None:
             return []
-        return self._read_parquet_rows(object_key)
-
-    def _resolve_object_key(self) -> str | None:
-        manifest_key = f"datahub/normalized/dataset={self.dataset}/latest/symbol=__ALL__.json"
-        if self.store.exists(manifest_key):
-            payload = json.loads(self.store.get_bytes(manifest_key).decode("utf-8"))
-            object_key = payload.get("object_key")
-            if object_key and self.store.exists(object_key):
-                return str(object_key)
-
-        watermark = (
-            self.db.query(DatahubDatasetWatermark)
-            .filter(
-                DatahubDatasetWatermark.dataset == self.dataset,
-                DatahubDatasetWatermark.symbol.is_(None),
-            )
-            .first()
-        )
-        if watermark and watermark.last_object_key and self.store.exists(watermark.last_object_key):
-            return watermark.last_object_key
-
-        indexed = (
-            self.db.query(DatahubObjectIndex)
-            .filter(
-                DatahubObjectIndex.dataset == self.dataset,
-                DatahubObjectIndex.symbol.is_(None),
-            )
-            .order_by(DatahubObjectIndex.end_date.desc().nullslast(), DatahubObjectIndex.created_at.desc())
-            .first()
+        return table.to_pylist()
+
+    def load_table(self, *, columns: Sequence[str] | None = None, filter_expr: Any = None):
+        """读取当前快照的 Arrow 表；完整表在进程内按对象版本只下载、解码一次，投影与过滤不修改缓存表。"""
+        loaded = self.load_snapshot()
+        if loaded is None:
+            return None
+        _, table = loaded
+        if filter_expr is not None:
+            table = table.filter(filter_expr)
+        if columns is not None:
+            table = table.select([name for name in columns if name in table.column_names])
+        return table
+
+    def iter_batches(
+        self,
+        *,
+        columns: Sequence[str] | None = None,
+        filter_expr: Any = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+    ) -> Iterator[Any]:
+        """按 RecordBatch 流式读取快照，跳过过滤后为空的批次。
+
+        已缓存的快照直接切片缓存表；否则逐行组解码，不写入共享缓存，峰值内存约为一个批次。
+        过滤表达式可以引用未投影的列。
+        """
+
+        def open_batches(object_key: str):
+            cached = get_parquet_table_cache().get(object_key, self._object_version(object_key))
+            if cached is not None:
+                return self._iter_cached_batches(cached, columns, filter_expr, batch_size)
+            return self._iter_parquet_batches(self.store.get_bytes(object_key), columns, filter_expr, batch_size)
+
+        batches = self._resolver().read(None, open_batches)
+        if batches is None:
+            return
+        for batch in batches:
+            if batch.num_rows:
+                yield batch
+
+    def resolve_object_key(self) -> str | None:
+        """解析当前已发布的快照对象路径（不读取对象内容），无快照时返回 None。"""
+        return self._resolver().resolve()
+
+    def load_snapshot(self) -> tuple[str, Any] | None:
+        """读取当前快照的完整缓存表，返回 ``(实际读取的对象路径, 表)``；已发布对象被清理时为兜底对象。"""
+        return self._resolver().read(None, lambda object_key: (object_key, self._load_cached_table(object_key)))
+
+    def _resolver(self) -> ObjectKeyResolver:
+        return ObjectKeyResolver(self.db, self.dataset, store=self.store)
+
+    def _load_cached_table(self, object_key: str):
+        return get_parquet_table_cache().get_or_load(
+            object_key,
+            self._object_version(object_key),
+            lambda: self._decode_table(self.store.get_bytes(object_key)),
         )
-        if indexed and self.store.exists(indexed.object_key):
-            return indexed.object_key
-        return None
+
+    def _object_version(self, object_key: str) -> str:
+        return extract_batch_id(object_key) or self.store.get_etag(object_key) or ""
+
+    @staticmethod
+    def _decode_table(raw: bytes):
+        import pyarrow.parquet as pq
+
+        return pq.read_table(BytesIO(raw))
+
+    @staticmethod
+    def _iter_cached_batches(table, columns: Sequence[str] | None, filter_expr: Any, batch_size: int):
+        if filter_expr is not None:
+            table = table.filter(filter_expr)
+        if columns is not None:
+            table = table.select([name for name in columns if name in table.column_names])
+        return table.to_batches(max_chunksize=batch_size)
+
+    @staticmethod
+    def _iter_parquet_batches(raw: bytes, columns: Sequence[str] | None, filter_expr: Any, batch_size: int):
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+
+        # 单文件 fragment 与 ParquetFile.iter_batches 同一读取路径，额外支持按行组统计裁剪与未投影列上的过滤
+        fragment = ds.ParquetFileFormat().make_fragment(pa.BufferReader(raw))
+        if columns is not None:
+            present = set(fragment.physical_schema.names)
+            columns = [name for name in columns if name in present]
+        return fragment.to_batches(columns=columns, filter=filter_expr, batch_size=batch_size)
 
     @staticmethod
     def _read_parquet_rows(object_key: str) -> list[dict[str, Any]]:
@@ -1,17 +1,21 @@
 import hashlib
 import json
 from datetime import date
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 from sqlalchemy.orm import Session
 
 from app.datahub.models import DatahubObjectIndex
-from app.datahub.storage import MinioParquetStore
+from app.datahub.storage import MinioParquetStore, get_manifest_cache, get_parquet_table_cache
+
+if TYPE_CHECKING:  # pragma: no cover
+    from app.datahub.services.sync_unit_of_work import SyncUnitOfWork
 
 
 class DatahubStorageService:
-    def __init__(self, db: Session):
+    def __init__(self, db: Session, unit_of_work: Optional["SyncUnitOfWork"] = None):
         self.db = db
+        self.unit_of_work = unit_of_work
 
     def upsert_object_index(
         self,
@@ -28,7 +32,26 @@ class DatahubStorageService:
         schema_version: str = "1.0",
         content_hash: Optional[str] = None,
         quality_score: Optional[float] = None,
-    ) -> DatahubObjectIndex:
+    ) -> Optional[DatahubObjectIndex]:
+        """写入对象索引；挂接了写缓冲时只登记到缓冲并返回 None，由同步服务批量落库。"""
+        if self.unit_of_work is not None:
+            self.unit_of_work.add_object_index(
+                {
+                    "bucket": bucket,
+                    "object_key": object_key,
+                    "dataset": dataset,
+                    "layer": layer,
+                    "provider": provider,
+                    "symbol": symbol,
+                    "start_date": start_date,
+                    "end_date": end_date,
+                    "row_count": row_count,
+                    "schema_version": schema_version,
+                    "content_hash": content_hash or hashlib.sha256(object_key.encode("utf-8")).hexdigest(),
+                    "quality_score": quality_score,
+                }
+            )
+            return None
         row = (
             self.db.query(DatahubObjectIndex)
             .filter(
@@ -64,6 +87,7 @@ class DatahubStorageService:
         start_date: date | None,
         end_date: date | None,
     ) -> str:
+        """写入 latest manifest；挂接了写缓冲时登记到缓冲，待对象索引与水位提交后再写入对象存储。"""
         symbol_part = symbol or "__ALL__"
         manifest_key = f"datahub/normalized/dataset={dataset}/latest/symbol={symbol_part}.json"
         payload = {
@@ -75,9 +99,21 @@ class DatahubStorageService:
             "start_date": start_date.isoformat() if start_date else None,
             "end_date": end_date.isoformat() if end_date else None,
         }
-        MinioParquetStore().put_bytes(
-            object_key=manifest_key,
-            data=json.dumps(payload, ensure_ascii=True).encode("utf-8"),
-            content_type="application/json",
-        )
+        def write() -> None:
+            MinioParquetStore().put_bytes(
+                object_key=manifest_key,
+                data=json.dumps(payload, ensure_ascii=True).encode("utf-8"),
+                content_type="application/json",
+            )
+            get_parquet_table_cache().invalidate(dataset=dataset, symbol=symbol)
+            get_manifest_cache().invalidate(manifest_key)
+            if dataset == "security_master":
+                from app.datahub.services.security_master_read_service import get_security_index_registry
+
+                get_security_index_registry(self.db.get_bind()).notify_changed()
+
+        if self.unit_of_work is not None:
+            self.unit_of_work.add_manifest(manifest_key, write)
+        else:
+            write()
         return manifest_key
@@ -0,0 +1,249 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Optional
+
+from sqlalchemy import and_, func, insert, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
+
+from app.common.deps.uuid_utils import generate_uuid
+from app.core.config import get_settings
+from app.datahub.models import DatahubDatasetWatermark, DatahubJobTask, DatahubObjectIndex, DatahubQualityReport
+
+_TASK_FIELDS = ("status", "attempts", "last_error", "locked_at")
+_OBJECT_INDEX_FIELDS = (
+    "dataset",
+    "layer",
+    "provider",
+    "symbol",
+    "start_date",
+    "end_date",
+    "row_count",
+    "schema_version",
+    "content_hash",
+    "quality_score",
+)
+_WATERMARK_FIELDS = ("last_success_date", "last_quality_score", "last_object_key", "last_batch_id")
+# 单条多行 INSERT 的行数上限，避免触及 SQLite/PostgreSQL 的绑定参数个数限制
+_INSERT_CHUNK_ROWS = 500
+
+
+class SyncUnitOfWork:
+    """同步作业写缓冲：合并任务状态流转、对象索引、质量报告与水位，按行数或时间批量落库。
+
+    每次 ``flush`` 在同一事务内依次写入对象索引、质量报告、任务状态与水位并提交一次，
+    水位永远不会先于它指向的对象索引落库；latest manifest 在提交成功后才写入对象存储，
+    读路径不会先于索引与水位看到新对象；进程中途崩溃时，已提交批次内的任务为 success、
+    水位可用，未提交批次的任务保持 pending/running，重新执行同一作业即可从最后落库的水位续跑。
+
+    登记接口线程安全（并发回填时工作线程会登记对象索引与质量报告），
+    ``flush``/``maybe_flush`` 只应由持有 ``db`` 的线程调用。
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        *,
+        max_pending_rows: Optional[int] = None,
+        max_delay_seconds: Optional[float] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        settings = get_settings()
+        self.db = db
+        self.max_pending_rows = max(1, max_pending_rows or settings.DATAHUB_SYNC_FLUSH_MAX_ROWS)
+        self.max_delay_seconds = (
+            settings.DATAHUB_SYNC_FLUSH_INTERVAL_SECONDS if max_delay_seconds is None else max_delay_seconds
+        )
+        self.clock = clock
+        self._lock = threading.Lock()
+        self._tasks: dict[str, dict[str, Any]] = {}
+        self._object_index: dict[tuple[str, str], dict[str, Any]] = {}
+        self._quality_reports: list[dict[str, Any]] = []
+        self._watermarks: dict[tuple[str, Optional[str]], dict[str, Any]] = {}
+        self._manifests: dict[str, Callable[[], Any]] = {}
+        self._first_pending_at: Optional[float] = None
+
+    # ---- 登记 ----
+
+    def add_task_transition(self, task: DatahubJobTask, **changes: Any) -> None:
+        """登记任务状态变更；同时把新值写入 ORM 对象的已提交状态，避免会话再单独 UPDATE。"""
+        with self._lock:
+            entry = self._tasks.get(task.id)
+            if entry is None:
+                entry = {
+                    "id": task.id,
+                    "job_run_id": task.job_run_id,
+                    "dataset": task.dataset,
+                    "symbol": task.symbol,
+                    "start_date": task.start_date,
+                    "end_date": task.end_date,
+                    **{field: getattr(task, field) for field in _TASK_FIELDS},
+                }
+                self._tasks[task.id] = entry
+            entry.update(changes)
+            self._touch()
+        for field, value in changes.items():
+            set_committed_value(task, field, value)
+
+    def add_object_index(self, values: dict[str, Any]) -> None:
+        with self._lock:
+            self._object_index[(values["bucket"], values["object_key"])] = values
+            self._touch()
+
+    def add_quality_report(self, values: dict[str, Any]) -> None:
+        with self._lock:
+            self._quality_reports.append(values)
+            self._touch()
+
+    def add_watermark(self, *, dataset: str, symbol: Optional[str], **values: Any) -> None:
+        with self._lock:
+            self._watermarks[(dataset, symbol)] = {"dataset": dataset, "symbol": symbol, **values}
+            self._touch()
+
+    def add_manifest(self, manifest_key: str, publish: Callable[[], Any]) -> None:
+        """登记 manifest 发布动作，同一 manifest 以最后一次登记为准；不计入行数阈值。"""
+        with self._lock:
+            self._manifests.pop(manifest_key, None)
+            self._manifests[manifest_key] = publish
+            self._touch()
+
+    @property
+    def pending_rows(self) -> int:
+        with self._lock:
+            return self._pending_rows()
+
+    # ---- 落库 ----
+
+    def maybe_flush(self) -> bool:
+        """缓冲行数或最早一条的滞留时间超过阈值时落库，返回是否执行了落库。"""
+        with self._lock:
+            if self._first_pending_at is None:
+                return False
+            due = (
+                self._pending_rows() >= self.max_pending_rows
+                or self.clock() - self._first_pending_at >= self.max_delay_seconds
+            )
+        if not due:
+            return False
+        self.flush()
+        return True
+
+    def flush(self) -> int:
+        """在一个事务内写入全部缓冲并提交，再发布本批 manifest，返回写入的行数；落库失败时回滚并把缓冲放回。"""
+        with self._lock:
+            tasks, self._tasks = self._tasks, {}
+            object_index, self._object_index = self._object_index, {}
+            quality_reports, self._quality_reports = self._quality_reports, []
+            watermarks, self._watermarks = self._watermarks, {}
+            manifests, self._manifests = self._manifests, {}
+            first_pending_at, self._first_pending_at = self._first_pending_at, None
+        total = len(tasks) + len(object_index) + len(quality_reports) + len(watermarks)
+        if total:
+            self._write_rows(tasks, object_index, quality_reports, watermarks, manifests, first_pending_at)
+        self._publish_manifests(manifests)
+        return total
+
+    # ---- 内部 ----
+
+    def _write_rows(self, tasks, object_index, quality_reports, watermarks, manifests, first_pending_at) -> None:
+        try:
+            self._upsert(
+                DatahubObjectIndex,
+                [{"id": generate_uuid(), **values} for values in object_index.values()],
+                keys=("bucket", "object_key"),
+                fields=_OBJECT_INDEX_FIELDS,
+            )
+            self._insert(DatahubQualityReport, [{"id": generate_uuid(), **values} for values in quality_reports])
+            self._upsert(DatahubJobTask, list(tasks.values()), keys=("id",), fields=_TASK_FIELDS)
+            self._upsert(
+                DatahubDatasetWatermark,
+                [{"id": generate_uuid(), **values} for values in watermarks.values()],
+                keys=("dataset", "symbol"),
+                fields=_WATERMARK_FIELDS,
+            )
+            self.db.commit()
+        except Exception:
+            self.db.rollback()
+            self._requeue(tasks, object_index, quality_reports, watermarks, manifests, first_pending_at)
+            raise
+
+    def _publish_manifests(self, manifests: dict[str, Callable[[], Any]]) -> None:
+        """按登记顺序发布 manifest；失败时未发布的放回缓冲，下次 flush 重试（对应行已提交，不再重复写入）。"""
+        pending = list(manifests.items())
+        for index, (_, publish) in enumerate(pending):
+            try:
+                publish()
+            except Exception:
+                with self._lock:
+                    self._manifests = {**dict(pending[index:]), **self._manifests}
+                    self._touch()
+                raise
+
+    def _touch(self) -> None:
+        if self._first_pending_at is None:
+            self._first_pending_at = self.clock()
+
+    def _pending_rows(self) -> int:
+        return len(self._tasks) + len(self._object_index) + len(self._quality_reports) + len(self._watermarks)
+
+    def _requeue(self, tasks, object_index, quality_reports, watermarks, manifests, first_pending_at) -> None:
+        """落库失败时把批次放回缓冲，期间新登记的同键数据优先。"""
+        with self._lock:
+            for task_id, entry in tasks.items():
+                if task_id in self._tasks:
+                    self._tasks[task_id] = {**entry, **self._tasks[task_id]}
+                else:
+                    self._tasks[task_id] = entry
+            self._object_index = {**object_index, **self._object_index}
+            self._quality_reports = quality_reports + self._quality_reports
+            self._watermarks = {**watermarks, **self._watermarks}
+            self._manifests = {**manifests, **self._manifests}
+            if first_pending_at is not None:
+                self._first_pending_at = min(first_pending_at, self._first_pending_at or first_pending_at)
+
+    def _insert(self, model, rows: list[dict[str, Any]]) -> None:
+        for start in range(0, len(rows), _INSERT_CHUNK_ROWS):
+            self.db.execute(insert(model).values(rows[start : start + _INSERT_CHUNK_ROWS]))
+
+    def _upsert(self, model, rows: list[dict[str, Any]], *, keys: tuple[str, ...], fields: tuple[str, ...]) -> None:
+        """``INSERT ... ON CONFLICT DO UPDATE`` 批量写入；唯一键含 NULL 或方言不支持时逐行更新/插入。"""
+        if not rows:
+            return
+        dialect_insert = self._dialect_insert()
+        if dialect_insert is None:
+            batched, single = [], rows
+        else:
+            # NULL 不参与唯一约束冲突判断，这类行走逐行路径
+            batched = [row for row in rows if all(row.get(key) is not None for key in keys)]
+            single = [row for row in rows if any(row.get(key) is None for key in keys)]
+        for start in range(0, len(batched), _INSERT_CHUNK_ROWS):
+            stmt = dialect_insert(model).values(batched[start : start + _INSERT_CHUNK_ROWS])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=list(keys),
+                set_={**{field: getattr(stmt.excluded, field) for field in fields}, "updated_at": func.now()},
+            )
+            self.db.execute(stmt)
+        for row in single:
+            condition = and_(
+                *(
+                    getattr(model, key).is_(None) if row.get(key) is None else getattr(model, key) == row[key]
+                    for key in keys
+                )
+            )
+            result = self.db.execute(
+                update(model).where(condition).values(**{field: row.get(field) for field in fields})
+            )
+            if result.rowcount == 0:
+                self.db.execute(insert(model).values(**row))
+
+    def _dialect_insert(self):
+        dialect = self.db.get_bind().dialect.name
+        if dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        elif dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            return None
+        return dialect_insert
@@ -8,6 +8,7 @@ from app.datahub.enums import DatahubTaskStatus
 from app.datahub.models import DatahubObjectIndex
 from app.datahub.models import DatahubDatasetWatermark, DatahubJobRun, DatahubJobTask
 from app.datahub.providers import BaoStockProvider
+from app.datahub.quality import evaluate_quality, to_arrow_table
 from app.datahub.schemas.datahub import TriggerBackfillRequest, TriggerDailyIncrementalRequest
 from app.datahub.services.market_daily_backfill_service import MarketDailyBackfillService
 from app.datahub.services.provider_health_service import DatahubProviderHealthService
@@ -63,7 +64,8 @@ class TradingCalendarSyncService:
             self.provider_health_service.record_success(provider=provider_name, dataset="trading_calendar")
             if not rows:
                 raise BusinessException("trading_calendar 未获取到数据", code=ErrorCode.BUSINESS_ERROR)
-            parquet_bytes = MarketDailyBackfillService._to_parquet_bytes(rows)
+            table = to_arrow_table(rows)
+            parquet_bytes = MarketDailyBackfillService._to_parquet_bytes(table)
             object_key = (
                 "datahub/normalized/"
                 f"dataset=trading_calendar/year={end_date.year}/month={end_date.month:02d}/"
@@ -71,10 +73,7 @@ class TradingCalendarSyncService:
             )
             MinioParquetStore().put_bytes(object_key=object_key, data=parquet_bytes, content_type="application/octet-stream")
 
-            missing_trade_date = sum(1 for row in rows if not row.get("trade_date"))
-            score = max(0.0, 100.0 - (missing_trade_date / max(len(rows), 1)) * 100.0)
-            severity = "p0" if missing_trade_date > max(1, int(len(rows) * 0.1)) else ("p1" if missing_trade_date > 0 else "p2")
-            issues = [{"rule": "trade_date_required", "count": missing_trade_date}] if missing_trade_date > 0 else []
+            score, issues, severity = evaluate_quality("trading_calendar", table)
 
             self.storage_service.upsert_object_index(
                 bucket=get_settings().MINIO_BUCKET_NAME,
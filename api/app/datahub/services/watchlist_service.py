@@ -4,9 +4,14 @@ from sqlalchemy.orm import Session
 
 from app.core.api import BusinessException, ErrorCode
 from app.datahub.catalog import get_dataset_label
-from app.datahub.models import DatahubDatasetWatermark, DatahubObjectIndex, DatahubQualityReport, DatahubWatchlistItem
+from app.datahub.models import (
+    DatahubBoardSnapshot,
+    DatahubDatasetWatermark,
+    DatahubObjectIndex,
+    DatahubQualityReport,
+    DatahubWatchlistItem,
+)
 from app.datahub.normalize import normalize_symbol
-from app.datahub.providers import BaoStockProvider
 from app.datahub.schemas.datahub import (
     DatahubWatchlistCreate,
     DatahubWatchlistInfo,
@@ -21,6 +26,17 @@ from app.datahub.services.sector_members_read_service import SectorMembersReadSe
 from app.datahub.services.security_master_read_service import SecurityMasterReadService
 
 
+def invalidate_board_snapshots(db: Session) -> int:
+    """标记全部看板快照待重算并递增版本号（不提交，随调用方事务生效），返回影响的快照数。"""
+    return (
+        db.query(DatahubBoardSnapshot)
+        .update(
+            {DatahubBoardSnapshot.version: DatahubBoardSnapshot.version + 1, DatahubBoardSnapshot.is_stale: True},
+            synchronize_session=False,
+        )
+    )
+
+
 class DatahubWatchlistService:
     def __init__(self, db: Session):
         self.db = db
@@ -37,6 +53,7 @@ class DatahubWatchlistService:
             if self._apply_resolved_name(row, name_map):
                 changed = True
         if changed:
+            invalidate_board_snapshots(self.db)
             self.db.commit()
         return [self._to_info(row) for row in rows]
 
@@ -62,6 +79,7 @@ class DatahubWatchlistService:
             note=(payload.note or "").strip() or None,
         )
         self.db.add(row)
+        invalidate_board_snapshots(self.db)
         self.db.commit()
         self.db.refresh(row)
         return self._to_info(row)
@@ -77,6 +95,7 @@ class DatahubWatchlistService:
         if "note" in data:
             row.note = (data["note"] or "").strip() or None
 
+        invalidate_board_snapshots(self.db)
         self.db.commit()
         self.db.refresh(row)
         return self._to_info(row)
@@ -86,6 +105,7 @@ class DatahubWatchlistService:
         if row is None:
             raise BusinessException("自选股不存在", code=ErrorCode.NOT_FOUND)
         self.db.delete(row)
+        invalidate_board_snapshots(self.db)
         self.db.commit()
 
     def get_symbol_summary(self, symbol: str) -> DatahubWatchlistSymbolSummary:
@@ -95,6 +115,7 @@ class DatahubWatchlistService:
             resolved = self._lookup_security_name(normalized)
             if resolved:
                 item.name = resolved
+                invalidate_board_snapshots(self.db)
                 self.db.commit()
                 self.db.refresh(item)
 
@@ -166,20 +187,8 @@ class DatahubWatchlistService:
         )
 
     def _load_security_name_map(self) -> dict[str, str]:
-        name_map = SecurityMasterReadService(self.db).get_name_map()
-        if name_map:
-            return name_map
-        try:
-            rows = BaoStockProvider().get_security_master(day=date.today())
-        except Exception:
-            return {}
-        result: dict[str, str] = {}
-        for row in rows:
-            symbol = normalize_symbol(str(row.get("symbol") or ""))
-            name = str(row.get("name") or "").strip()
-            if symbol and name:
-                result[symbol] = name
-        return result
+        # 只读进程内 security_master 索引，请求路径不再回退调用 baostock
+        return SecurityMasterReadService(self.db).get_name_map()
 
     def _lookup_security_name(self, symbol: str) -> str | None:
         return self._load_security_name_map().get(normalize_symbol(symbol))
@@ -196,8 +205,14 @@ class DatahubWatchlistService:
         board_trade_date: date | None = None
         needed_sector_codes: set[str] = set()
 
+        bars_by_symbol = reader.get_bars_many(
+            symbols=[item.symbol for item in items],
+            start_date=start_date,
+            end_date=end_date,
+        )
+
         for item in items:
-            bars = reader.get_bars(symbol=item.symbol, start_date=start_date, end_date=end_date)
+            bars = bars_by_symbol.get(normalize_symbol(item.symbol), [])
             latest = bars[-1] if bars else None
             previous = bars[-2] if len(bars) >= 2 else None
             change_amount = None
@@ -1,3 +1,12 @@
+from .manifest_cache import ManifestCache, get_manifest_cache
 from .minio_parquet_store import MinioParquetStore
+from .parquet_table_cache import ParquetTableCache, extract_batch_id, get_parquet_table_cache
 
-__all__ = ["MinioParquetStore"]
+__all__ = [
+    "ManifestCache",
+    "MinioParquetStore",
+    "ParquetTableCache",
+    "extract_batch_id",
+    "get_manifest_cache",
+    "get_parquet_table_cache",
+]
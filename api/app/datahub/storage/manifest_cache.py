@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+import json
+import threading
+import time
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Optional
+
+from app.core.config import get_settings
+
+
+@dataclass
+class _ManifestEntry:
+    payload: Optional[dict[str, Any]]
+    etag: Optional[str]
+    validated_at: float
+
+
+class ManifestCache:
+    """进程内 latest manifest 缓存，按 manifest 对象路径缓存解析后的内容与 ETag。
+
+    有效期（``ttl_seconds``）内直接命中，不访问 MinIO；过期后先读 ETag 做条件校验，未变化时只续期，
+    变化时才重新下载。本进程发布 manifest 时立即失效对应条目，其他进程发布的变更最迟在一个有效期后可见。
+    不存在的 manifest 同样缓存（负缓存），避免未发布的 symbol 每次都探测对象存储。
+    """
+
+    def __init__(self, ttl_seconds: float, *, clock: Callable[[], float] = time.monotonic):
+        self.ttl_seconds = max(0.0, float(ttl_seconds))
+        self.clock = clock
+        self._entries: dict[str, _ManifestEntry] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.revalidations = 0
+        self.loads = 0
+
+    def get(self, manifest_key: str, store) -> Optional[dict[str, Any]]:
+        """返回 manifest 内容，不存在时返回 None。``store`` 需提供 ``get_etag``/``get_bytes``。"""
+        now = self.clock()
+        with self._lock:
+            entry = self._entries.get(manifest_key)
+            if entry is not None and now - entry.validated_at < self.ttl_seconds:
+                self.hits += 1
+                return entry.payload
+
+        etag = store.get_etag(manifest_key)
+        if entry is not None and etag == entry.etag:
+            with self._lock:
+                self.revalidations += 1
+                entry.validated_at = now
+            return entry.payload
+
+        payload = None
+        if etag is not None:
+            payload = json.loads(store.get_bytes(manifest_key).decode("utf-8"))
+        with self._lock:
+            self.loads += 1
+            self._entries[manifest_key] = _ManifestEntry(payload=payload, etag=etag, validated_at=now)
+        return payload
+
+    def invalidate(self, manifest_key: str) -> bool:
+        with self._lock:
+            return self._entries.pop(manifest_key, None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.revalidations = 0
+            self.loads = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "revalidations": self.revalidations,
+                "loads": self.loads,
+            }
+
+
+@lru_cache()
+def get_manifest_cache() -> ManifestCache:
+    """获取进程级共享 manifest 缓存单例。"""
+    return ManifestCache(ttl_seconds=get_settings().DATAHUB_MANIFEST_CACHE_TTL_SECONDS)
@@ -1,4 +1,5 @@
-from typing import Optional
+from datetime import datetime
+from typing import Iterator, Optional
 
 from app.core.minio_client import get_minio_client
 
@@ -16,3 +17,12 @@ class MinioParquetStore:
 
     def get_bytes(self, object_key: str) -> bytes:
         return self.minio.get_object_bytes(object_name=object_key)
+
+    def delete(self, object_key: str) -> bool:
+        return self.minio.delete_file(object_name=object_key)
+
+    def get_etag(self, object_key: str) -> Optional[str]:
+        return self.minio.get_object_etag(object_name=object_key)
+
+    def list_objects(self, prefix: str) -> Iterator[tuple[str, Optional[datetime]]]:
+        return self.minio.list_objects(prefix=prefix)
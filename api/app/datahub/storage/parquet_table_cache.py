@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import re
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Callable
+
+from app.core.config import get_settings
+
+_BATCH_ID_PATTERN = re.compile(r"/batch_id=([^/]+)\.parquet$")
+
+
+def extract_batch_id(object_key: str) -> str | None:
+    """从标准层对象路径中解析 batch_id（对象按批次不可变写入）。"""
+    matched = _BATCH_ID_PATTERN.search(object_key)
+    return matched.group(1) if matched else None
+
+
+class ParquetTableCache:
+    """进程内已解码 Parquet 表缓存，按对象路径 + 版本（batch_id/ETag）命中，按字节预算 LRU 淘汰。"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: OrderedDict[tuple[str, str], Any] = OrderedDict()
+        self._sizes: dict[tuple[str, str], int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, object_key: str, version: str) -> Any | None:
+        key = (object_key, version)
+        with self._lock:
+            table = self._entries.get(key)
+            if table is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return table
+
+    def put(self, object_key: str, version: str, table: Any) -> None:
+        size = int(getattr(table, "nbytes", 0) or 0)
+        if size > self.max_bytes:
+            return
+        key = (object_key, version)
+        with self._lock:
+            if key in self._entries:
+                self._total_bytes -= self._sizes.pop(key)
+                del self._entries[key]
+            self._entries[key] = table
+            self._sizes[key] = size
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes and self._entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._total_bytes -= self._sizes.pop(evicted_key)
+                self.evictions += 1
+
+    def get_or_load(self, object_key: str, version: str, loader: Callable[[], Any]) -> Any:
+        table = self.get(object_key, version)
+        if table is not None:
+            return table
+        table = loader()
+        self.put(object_key, version, table)
+        return table
+
+    def invalidate(self, *, dataset: str, symbol: str | None = None) -> int:
+        """删除某数据集（可选限定 symbol）的全部缓存条目，返回删除条数。"""
+        dataset_part = f"/dataset={dataset}/"
+        symbol_part = f"/symbol={symbol}/" if symbol else None
+        with self._lock:
+            targets = [
+                key
+                for key in self._entries
+                if dataset_part in key[0] and (symbol_part is None or symbol_part in key[0])
+            ]
+            for key in targets:
+                del self._entries[key]
+                self._total_bytes -= self._sizes.pop(key)
+        return len(targets)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._sizes.clear()
+            self._total_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "total_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+@lru_cache()
+def get_parquet_table_cache() -> ParquetTableCache:
+    """获取进程级共享 Parquet 表缓存单例。"""
+    return ParquetTableCache(max_bytes=get_settings().DATAHUB_PARQUET_CACHE_MAX_BYTES)
@@ -10,6 +10,7 @@ from sqlalchemy import text
 
 from app.system.models.system import SystemSettings as SystemSettingsModel
 from app.system.schemas.system import SystemSettingsUpdate, SystemSettingsResponse, SystemSettings as SystemSettingsSchema
+from app.common.deps.database import get_pool_metrics
 from app.common.deps.uuid_utils import system_id
 from app.core.api import BusinessException, ErrorCode
 
@@ -115,6 +116,7 @@ class SystemService:
             "components": {
                 "database": db_status,
             },
+            "database_pools": get_pool_metrics(),
             "timestamp": datetime.now().isoformat()
         }
         
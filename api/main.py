@@ -16,6 +16,7 @@ from app.common.deps.database import create_initial_roles, create_initial_system
 
 # 导入新的WebSocket和Redis组件
 from app.core.redis_client import redis_manager, get_redis_client
+from app.ai.runtime.task_registry import get_agent_task_registry
 from app.websocket.broadcasting_factory import cleanup_broadcasting_services
 from app.websocket.websocket_factory import cleanup_websocket_services
 # MessageBroadcaster会在需要时自动初始化
@@ -86,6 +87,9 @@ async def lifespan(app: FastAPI):
         await cleanup_websocket_services()
         logger.info("WebSocket连接管理器已清理")
         
+        # 停止 Agent 任务取消监听与心跳
+        await get_agent_task_registry().close()
+
         # 关闭Redis连接
         await redis_manager.close()
         logger.info("Redis连接已关闭")
@@ -0,0 +1,45 @@
+"""add_claim_lease_to_datahub_job_runs
+
+Revision ID: a7b8c9d0e1f2
+Revises: f6a7b8c9d0e1
+Create Date: 2026-10-16 10:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+
+revision: str = "a7b8c9d0e1f2"
+down_revision: Union[str, None] = "f6a7b8c9d0e1"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        ALTER TABLE datahub_job_runs
+        ADD COLUMN IF NOT EXISTS claimed_by VARCHAR(100),
+        ADD COLUMN IF NOT EXISTS lease_expires_at TIMESTAMP WITH TIME ZONE
+        """
+    )
+    op.execute("COMMENT ON COLUMN datahub_job_runs.claimed_by IS '认领该作业的 Worker'")
+    op.execute("COMMENT ON COLUMN datahub_job_runs.lease_expires_at IS '认领租约到期时间'")
+    op.execute(
+        """
+        CREATE INDEX IF NOT EXISTS idx_datahub_job_runs_status_created_at
+        ON datahub_job_runs (status, created_at)
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_datahub_job_runs_status_created_at")
+    op.execute(
+        """
+        ALTER TABLE datahub_job_runs
+        DROP COLUMN IF EXISTS lease_expires_at,
+        DROP COLUMN IF EXISTS claimed_by
+        """
+    )
@@ -0,0 +1,57 @@
+"""add_datahub_board_snapshots
+
+Revision ID: b8c9d0e1f2a3
+Revises: a7b8c9d0e1f2
+Create Date: 2026-10-16 12:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b8c9d0e1f2a3"
+down_revision: Union[str, None] = "a7b8c9d0e1f2"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table("datahub_board_snapshots"):
+        op.create_table(
+            "datahub_board_snapshots",
+            sa.Column("id", sa.String(length=36), nullable=False),
+            sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+            sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+            sa.Column("created_by", sa.String(length=36), nullable=True, comment="创建人ID"),
+            sa.Column("updated_by", sa.String(length=36), nullable=True, comment="修改人ID"),
+            sa.Column("limit_days", sa.Integer(), nullable=False, comment="看板回看天数"),
+            sa.Column(
+                "version",
+                sa.Integer(),
+                nullable=False,
+                server_default="0",
+                comment="版本号：每次失效 +1，重算按版本条件写回",
+            ),
+            sa.Column("is_stale", sa.Boolean(), nullable=False, server_default=sa.true(), comment="是否待重算"),
+            sa.Column("as_of_date", sa.Date(), nullable=True, comment="快照计算所在自然日"),
+            sa.Column("payload", sa.JSON(), nullable=True, comment="看板内容"),
+            sa.Column("computed_at", sa.DateTime(timezone=True), nullable=True, comment="最近计算时间"),
+            sa.ForeignKeyConstraint(["created_by"], ["users.id"], ondelete="SET NULL"),
+            sa.ForeignKeyConstraint(["updated_by"], ["users.id"], ondelete="SET NULL"),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("limit_days", name="uq_datahub_board_snapshots_limit_days"),
+            comment="DataHub 自选股看板物化快照",
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if inspector.has_table("datahub_board_snapshots"):
+        op.drop_table("datahub_board_snapshots")
@@ -0,0 +1,36 @@
+"""add_datahub_job_runs_finished_at_index
+
+Revision ID: b9c0d1e2f3a4
+Revises: b8c9d0e1f2a3
+Create Date: 2026-10-16 15:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "b9c0d1e2f3a4"
+down_revision: Union[str, None] = "b8c9d0e1f2a3"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    # 作业保留按 finished_at 分块清理超期的已结束作业
+    existing_indexes = {index["name"] for index in inspector.get_indexes("datahub_job_runs")}
+    if "idx_datahub_job_runs_finished_at" not in existing_indexes:
+        op.create_index("idx_datahub_job_runs_finished_at", "datahub_job_runs", ["finished_at"], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    existing_indexes = {index["name"] for index in inspector.get_indexes("datahub_job_runs")}
+    if "idx_datahub_job_runs_finished_at" in existing_indexes:
+        op.drop_index("idx_datahub_job_runs_finished_at", table_name="datahub_job_runs")
@@ -0,0 +1,105 @@
+"""add_datahub_job_metrics_rollup
+
+Revision ID: c9d0e1f2a3b4
+Revises: b9c0d1e2f3a4
+Create Date: 2026-10-16 18:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+revision: str = "c9d0e1f2a3b4"
+down_revision: Union[str, None] = "b9c0d1e2f3a4"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _audit_columns() -> list[sa.Column]:
+    return [
+        sa.Column("id", sa.String(length=36), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=True),
+        sa.Column("created_by", sa.String(length=36), nullable=True, comment="创建人ID"),
+        sa.Column("updated_by", sa.String(length=36), nullable=True, comment="修改人ID"),
+    ]
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if not inspector.has_table("datahub_job_metrics_hourly"):
+        op.create_table(
+            "datahub_job_metrics_hourly",
+            *_audit_columns(),
+            sa.Column("metric", sa.String(length=20), nullable=False, comment="指标对象：run/task"),
+            sa.Column("bucket_start", sa.DateTime(timezone=True), nullable=False, comment="所属小时（按作业创建时间取整）"),
+            sa.Column("dataset", sa.String(length=100), nullable=False, server_default="", comment="数据集"),
+            sa.Column("status", sa.String(length=20), nullable=False, comment="终态"),
+            sa.Column(
+                "provider",
+                sa.String(length=50),
+                nullable=False,
+                server_default="",
+                comment="数据源（由错误信息识别，未知为空）",
+            ),
+            sa.Column("error_class", sa.String(length=50), nullable=False, server_default="", comment="错误分类，无错误为空"),
+            sa.Column("item_count", sa.Integer(), nullable=False, server_default="0", comment="记录数"),
+            sa.Column("duration_count", sa.Integer(), nullable=False, server_default="0", comment="有耗时的记录数"),
+            sa.Column("duration_sum", sa.Float(), nullable=False, server_default="0", comment="耗时合计（秒）"),
+            sa.Column("duration_max", sa.Float(), nullable=False, server_default="0", comment="最大耗时（秒）"),
+            sa.Column("duration_histogram", sa.JSON(), nullable=True, comment="耗时对数分桶计数，用于估算分位数"),
+            sa.ForeignKeyConstraint(["created_by"], ["users.id"], ondelete="SET NULL"),
+            sa.ForeignKeyConstraint(["updated_by"], ["users.id"], ondelete="SET NULL"),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint(
+                "metric",
+                "bucket_start",
+                "dataset",
+                "status",
+                "provider",
+                "error_class",
+                name="uq_datahub_job_metrics_hourly_key",
+            ),
+            comment="DataHub 作业/子任务小时级指标汇总",
+        )
+        op.create_index(
+            "idx_datahub_job_metrics_hourly_metric_bucket",
+            "datahub_job_metrics_hourly",
+            ["metric", "bucket_start"],
+            unique=False,
+        )
+
+    if not inspector.has_table("datahub_metrics_rollup_state"):
+        op.create_table(
+            "datahub_metrics_rollup_state",
+            *_audit_columns(),
+            sa.Column("name", sa.String(length=50), nullable=False, comment="汇总名称"),
+            sa.Column("watermark", sa.DateTime(timezone=True), nullable=True, comment="已汇总的作业结束时间上界"),
+            sa.Column(
+                "version",
+                sa.Integer(),
+                nullable=False,
+                server_default="0",
+                comment="版本号：每次推进 +1，按版本条件写回",
+            ),
+            sa.ForeignKeyConstraint(["created_by"], ["users.id"], ondelete="SET NULL"),
+            sa.ForeignKeyConstraint(["updated_by"], ["users.id"], ondelete="SET NULL"),
+            sa.PrimaryKeyConstraint("id"),
+            sa.UniqueConstraint("name", name="uq_datahub_metrics_rollup_state_name"),
+            comment="DataHub 指标汇总水位",
+        )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    inspector = sa.inspect(bind)
+
+    if inspector.has_table("datahub_metrics_rollup_state"):
+        op.drop_table("datahub_metrics_rollup_state")
+    if inspector.has_table("datahub_job_metrics_hourly"):
+        op.drop_index("idx_datahub_job_metrics_hourly_metric_bucket", table_name="datahub_job_metrics_hourly")
+        op.drop_table("datahub_job_metrics_hourly")
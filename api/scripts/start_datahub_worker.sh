@@ -3,14 +3,16 @@ set -euo pipefail
 
 # 用法：
 # ./scripts/start_datahub_worker.sh
-# WORKER_NAME=datahub-default-worker POLL_SECONDS=5 BATCH_SIZE=5 ./scripts/start_datahub_worker.sh
+# WORKER_NAME=datahub-default-worker PROCESSES=4 POLL_SECONDS=5 BATCH_SIZE=1 LEASE_SECONDS=60 ./scripts/start_datahub_worker.sh
 
 SCRIPT_DIR="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 API_DIR="$(cd "${SCRIPT_DIR}/.." && pwd)"
 
 WORKER_NAME="${WORKER_NAME:-datahub-default-worker}"
 POLL_SECONDS="${POLL_SECONDS:-5}"
-BATCH_SIZE="${BATCH_SIZE:-5}"
+BATCH_SIZE="${BATCH_SIZE:-1}"
+PROCESSES="${PROCESSES:-1}"
+LEASE_SECONDS="${LEASE_SECONDS:-60}"
 
 cd "${API_DIR}"
 
@@ -21,9 +23,11 @@ fi
 
 echo "[DataHub] starting worker..."
 echo "[DataHub] api_dir=${API_DIR}"
-echo "[DataHub] worker_name=${WORKER_NAME} poll_seconds=${POLL_SECONDS} batch_size=${BATCH_SIZE}"
+echo "[DataHub] worker_name=${WORKER_NAME} processes=${PROCESSES} poll_seconds=${POLL_SECONDS} batch_size=${BATCH_SIZE} lease_seconds=${LEASE_SECONDS}"
 
 python -m app.datahub.jobs.worker \
   --worker-name "${WORKER_NAME}" \
   --poll-seconds "${POLL_SECONDS}" \
-  --batch-size "${BATCH_SIZE}"
+  --batch-size "${BATCH_SIZE}" \
+  --processes "${PROCESSES}" \
+  --lease-seconds "${LEASE_SECONDS}"
@@ -8,3 +8,85 @@ API_DIR = Path(__file__).resolve().parents[1]
 if str(API_DIR) not in sys.path:
     sys.path.insert(0, str(API_DIR))
 
+
+from collections import Counter
+from datetime import datetime, timezone
+import hashlib
+
+import pytest
+
+
+class InMemoryMinioClient:
+    """MinioClient 的内存替身，记录每个对象的读取、探测与 ETag 查询次数。"""
+
+    bucket_name = "datahub-test"
+
+    def __init__(self) -> None:
+        self.objects: dict[str, bytes] = {}
+        self.get_calls: Counter[str] = Counter()
+        self.exists_calls: Counter[str] = Counter()
+        self.etag_calls: Counter[str] = Counter()
+        # 直接写入 objects 的对象没有修改时间，列举时视为足够旧
+        self.modified_at: dict[str, datetime] = {}
+
+    def upload_file_data(self, object_name: str, file_data: bytes, content_type: str | None = None) -> str:
+        self.objects[object_name] = bytes(file_data)
+        self.modified_at[object_name] = datetime.now(timezone.utc)
+        return f"memory://{self.bucket_name}/{object_name}"
+
+    def file_exists(self, object_name: str) -> bool:
+        self.exists_calls[object_name] += 1
+        return object_name in self.objects
+
+    def get_object_etag(self, object_name: str) -> str | None:
+        self.etag_calls[object_name] += 1
+        data = self.objects.get(object_name)
+        return hashlib.md5(data).hexdigest() if data is not None else None
+
+    def get_object_bytes(self, object_name: str) -> bytes:
+        self.get_calls[object_name] += 1
+        if object_name not in self.objects:
+            raise KeyError(object_name)
+        return self.objects[object_name]
+
+    def delete_file(self, object_name: str) -> bool:
+        self.modified_at.pop(object_name, None)
+        return self.objects.pop(object_name, None) is not None
+
+    def list_objects(self, prefix: str):
+        for object_name in sorted(self.objects):
+            if object_name.startswith(prefix):
+                yield object_name, self.modified_at.get(object_name)
+
+
+@pytest.fixture
+def fake_minio(monkeypatch: pytest.MonkeyPatch) -> InMemoryMinioClient:
+    from app.datahub.storage import get_manifest_cache, get_parquet_table_cache, minio_parquet_store
+
+    client = InMemoryMinioClient()
+    monkeypatch.setattr(minio_parquet_store, "get_minio_client", lambda: client)
+    get_parquet_table_cache().clear()
+    get_manifest_cache().clear()
+    yield client
+    get_parquet_table_cache().clear()
+    get_manifest_cache().clear()
+
+
+@pytest.fixture
+def datahub_session_factory(tmp_path):
+    """基于临时 SQLite 文件的 DataHub 表会话工厂，可跨线程使用。"""
+    from sqlalchemy import create_engine
+    from sqlalchemy.orm import sessionmaker
+
+    import app.datahub.models  # noqa: F401
+    import app.identity_access.models.user  # noqa: F401
+    from app.common.deps.database import Base
+
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'datahub.db'}",
+        connect_args={"check_same_thread": False, "timeout": 30},
+    )
+    tables = [table for name, table in Base.metadata.tables.items() if name.startswith("datahub_") or name == "users"]
+    Base.metadata.create_all(engine, tables=tables)
+    yield sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    engine.dispose()
@@ -0,0 +1,170 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from itertools import cycle
+
+import pytest
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage
+from langchain_openai import ChatOpenAI
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import app.ai.models  # noqa: F401
+import app.identity_access.models.user  # noqa: F401
+import app.mcp.models  # noqa: F401
+from app.ai.models.agent_config import AgentConfig
+from app.ai.runtime import agent_runner as agent_runner_module
+from app.ai.runtime import mcp_tools
+from app.ai.runtime.agent_cache import AgentGraphCache
+from app.ai.runtime.agent_runner import AgentRunner
+from app.ai.runtime.capabilities import AgentCapabilities
+from app.ai.runtime.task_registry import AgentTaskRegistry
+from app.common.deps.database import Base
+from app.mcp.models.mcp import MCPTool, MCPToolGroup
+
+TOOL_GROUPS = 2
+TOOLS_PER_GROUP = 10
+REQUESTS = 20
+
+
+class FakeToolChatModel(GenericFakeChatModel):
+    """固定回复的流式假模型，忽略工具绑定。"""
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+
+@pytest.fixture
+def agent_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'agent.db'}", connect_args={"check_same_thread": False})
+    tables = [
+        Base.metadata.tables[name]
+        for name in ("users", "agent_configs", "agent_knowledge_bases", "mcp_tool_groups", "mcp_tools")
+    ]
+    Base.metadata.create_all(engine, tables=tables)
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    db = factory()
+
+    config = AgentConfig(id="agent-1", environment="test", app_id="app-1", app_name="bench", base_url="http://fake")
+    config.api_key = "sk-test"
+    db.add(config)
+    for group_index in range(TOOL_GROUPS):
+        group = MCPToolGroup(
+            id=f"group-{group_index}",
+            name=f"group-{group_index}",
+            server_code=f"srv{group_index}",
+            _api_key=f"mcp_key_{group_index}",
+        )
+        db.add(group)
+        for tool_index in range(TOOLS_PER_GROUP):
+            db.add(
+                MCPTool(
+                    id=f"tool-{group_index}-{tool_index}",
+                    group_id=group.id,
+                    tool_name=f"tool_{group_index}_{tool_index}",
+                    config_data={
+                        "inputSchema": {
+                            "type": "object",
+                            "properties": {
+                                f"arg{arg}": {"type": ["string", "integer", "number", "boolean"][arg % 4]}
+                                for arg in range(6)
+                            },
+                            "required": ["arg0"],
+                        }
+                    },
+                )
+            )
+    db.commit()
+    yield db, factory
+    db.close()
+    engine.dispose()
+
+
+@pytest.fixture
+def fake_llm(monkeypatch):
+    def create_chat_model(agent_config, capabilities, *, streaming=False):
+        # 保留真实 ChatOpenAI 的构造开销，实际输出交给假模型
+        ChatOpenAI(model=capabilities.model, api_key=agent_config.api_key, base_url=agent_config.base_url)
+        return FakeToolChatModel(messages=cycle([AIMessage(content="你好 这里是 回答")]))
+
+    monkeypatch.setattr(agent_runner_module.LLMFactory, "create_chat_model", staticmethod(create_chat_model))
+
+
+def _capabilities() -> AgentCapabilities:
+    return AgentCapabilities(
+        system_prompt="bench",
+        enable_tools=True,
+        mcp_tool_groups=[f"group-{index}" for index in range(TOOL_GROUPS)],
+    )
+
+
+async def _time_to_first_token(runner: AgentRunner, config: AgentConfig) -> float:
+    started = time.perf_counter()
+    elapsed = None
+    async for chunk in runner.stream_chat(
+        agent_config=config,
+        capabilities=_capabilities(),
+        history=[],
+        query="hi",
+        conversation_id="c1",
+        message_id="m1",
+    ):
+        if elapsed is None and b'"message"' in chunk:
+            elapsed = time.perf_counter() - started
+    assert elapsed is not None
+    return elapsed
+
+
+@pytest.mark.benchmark
+def test_cached_agent_graph_reduces_time_to_first_token(agent_db, fake_llm) -> None:
+    db, factory = agent_db
+    config = db.get(AgentConfig, "agent-1")
+    runner = AgentRunner(db, session_factory=factory, task_registry=AgentTaskRegistry())
+    runner.agent_cache = AgentGraphCache()
+
+    async def measure(rebuild: bool) -> float:
+        samples = []
+        for _ in range(REQUESTS):
+            if rebuild:
+                runner.agent_cache.invalidate()
+                mcp_tools._ARGS_MODEL_CACHE.clear()
+            samples.append(await _time_to_first_token(runner, config))
+        return sorted(samples)[len(samples) // 2]
+
+    uncached = asyncio.run(measure(rebuild=True))
+    cached = asyncio.run(measure(rebuild=False))
+
+    assert len(runner._get_compiled_agent(config, _capabilities()).tools) == TOOL_GROUPS * TOOLS_PER_GROUP
+    assert cached < uncached
+
+
+def test_cache_invalidates_on_config_and_tool_changes(agent_db, fake_llm) -> None:
+    db, factory = agent_db
+    config = db.get(AgentConfig, "agent-1")
+    runner = AgentRunner(db, session_factory=factory, task_registry=AgentTaskRegistry())
+    runner.agent_cache = AgentGraphCache()
+    capabilities = _capabilities()
+
+    first = runner._get_compiled_agent(config, capabilities)
+    assert runner._get_compiled_agent(config, capabilities) is first
+
+    later = datetime.now(timezone.utc) + timedelta(minutes=1)
+    config.updated_at = later
+    db.commit()
+    second = runner._get_compiled_agent(config, capabilities)
+    assert second is not first
+
+    tool = db.get(MCPTool, "tool-0-0")
+    tool.updated_at = later + timedelta(minutes=1)
+    db.commit()
+    third = runner._get_compiled_agent(config, capabilities)
+    assert third is not second
+
+    db.delete(db.get(MCPTool, "tool-1-9"))
+    db.commit()
+    fourth = runner._get_compiled_agent(config, capabilities)
+    assert len(fourth.tools) == TOOL_GROUPS * TOOLS_PER_GROUP - 1
+
+    assert runner._get_compiled_agent(config, capabilities.model_copy(update={"temperature": 0.1})) is not fourth
+    assert runner.agent_cache.stats()["entries"] == 1
@@ -0,0 +1,103 @@
+import json
+import random
+
+from app.ai.runtime.sse_emitter import (
+    AgentThoughtEvent,
+    ErrorEvent,
+    MessageChunkEvent,
+    MessageEndEvent,
+    encode_sse,
+)
+from app.ai.utils.stream_buffer import StreamBuffer
+
+TOKENS = 10_000
+
+
+def _tokens(count: int) -> list[str]:
+    rng = random.Random(7)
+    words = ["你好", "市场", " data", " 分析", "，", "。", " the", " price", "\n", " 指标"]
+    tokens = [rng.choice(words) for _ in range(count)]
+    # 穿插被拆开的思考标签
+    tokens[10:13] = ["<th", "ink>", "思考"]
+    tokens[200:203] = ["中", "</thi", "nk>"]
+    return tokens
+
+
+def _decode(frame: bytes) -> dict:
+    assert frame.startswith(b"data: ") and frame.endswith(b"\n\n")
+    return json.loads(frame[len(b"data: ") : -2])
+
+
+def _legacy_pipeline(tokens: list[str]) -> tuple[str, str]:
+    """改造前：每块 json.dumps，出口再子串匹配 + json.loads 重建答案，字符串 += 累积。"""
+    buffer = StreamBuffer()
+    full_answer = ""
+    persisted = []
+    for token in tokens:
+        full_answer += token
+        normal, _ = buffer.process(token)
+        if normal:
+            chunk = f"data: {json.dumps({'event': 'message', 'answer': normal, 'id': 'm1'}, ensure_ascii=False)}\n\n"
+            if '"event": "message"' in chunk:
+                payload = json.loads(chunk.split("data: ", 1)[1].strip().split("\n")[0])
+                persisted.append(payload["answer"])
+    normal, _ = buffer.flush()
+    persisted.append(normal)
+    return full_answer, "".join(persisted)
+
+
+def _typed_pipeline(tokens: list[str]) -> tuple[str, str]:
+    buffer = StreamBuffer()
+    answer_parts = []
+    persisted = []
+    for token in tokens:
+        answer_parts.append(token)
+        normal, think = buffer.process(token)
+        if normal:
+            event = MessageChunkEvent(answer=normal, conversation_id="c1", message_id="m1", task_id="t1")
+            persisted.append(event.answer)
+            encode_sse(event)
+        if think:
+            encode_sse(AgentThoughtEvent(thought=think, conversation_id="c1", message_id="m1", task_id="t1"))
+    normal, _ = buffer.flush()
+    persisted.append(normal)
+    return "".join(answer_parts), "".join(persisted)
+
+
+def test_encode_sse_round_trips_event_payloads() -> None:
+    events = [
+        MessageChunkEvent(answer="你好 \"world\"", conversation_id="c1", message_id="m1", task_id="t1"),
+        AgentThoughtEvent(thought="思考", conversation_id="c1", message_id="m1", task_id="t1"),
+        MessageEndEvent(conversation_id="c1", message_id="m1", task_id="t1", metadata={"answer": "你好"}),
+        ErrorEvent(message="boom", status=500),
+    ]
+    for event in events:
+        assert _decode(encode_sse(event)) == event.to_payload()
+    assert "metadata" not in _decode(encode_sse(MessageEndEvent(conversation_id="c1", message_id="m1", task_id="t1")))
+
+
+def test_stream_buffer_fast_path_preserves_tag_splitting() -> None:
+    tokens = _tokens(400)
+    buffer = StreamBuffer()
+    normal_parts, think_parts = [], []
+    for token in tokens:
+        normal, think = buffer.process(token)
+        normal_parts.append(normal)
+        think_parts.append(think)
+    normal, think = buffer.flush()
+    normal_parts.append(normal)
+    think_parts.append(think)
+
+    text = "".join(tokens)
+    start, end = text.index("<think>"), text.index("</think>")
+    assert "".join(think_parts) == text[start + len("<think>") : end]
+    assert "".join(normal_parts) == text[:start] + text[end + len("</think>") :]
+
+
+def test_typed_pipeline_matches_legacy_output() -> None:
+    tokens = _tokens(TOKENS)
+
+    legacy_full, legacy_persisted = _legacy_pipeline(tokens)
+    typed_full, typed_persisted = _typed_pipeline(tokens)
+
+    assert (typed_full, typed_persisted) == (legacy_full, legacy_persisted)
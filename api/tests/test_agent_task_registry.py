@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+
+import fakeredis
+
+from app.ai.runtime.task_registry import RedisAgentTaskRegistry, iterate_until_cancelled
+from app.core.redis_client import RedisClient
+
+TASK_ID = "task-1"
+CANCEL_BOUND_SECONDS = 0.5
+
+
+def _registry(server: fakeredis.FakeServer, *, heartbeat_ttl: int = 30) -> RedisAgentTaskRegistry:
+    client = RedisClient()
+    client._client = fakeredis.aioredis.FakeRedis(server=server)
+    return RedisAgentTaskRegistry(client, heartbeat_ttl=heartbeat_ttl)
+
+
+async def _stalled_llm_stream():
+    """先输出一块，随后长时间阻塞，模拟卡住的上游模型。"""
+    yield "你好"
+    await asyncio.sleep(60)
+    yield "不会到达"
+
+
+def test_cancel_from_another_worker_stops_stream_within_bound() -> None:
+    server = fakeredis.FakeServer()
+    registered = threading.Event()
+    result = {}
+
+    def owner_worker() -> None:
+        async def run() -> None:
+            registry = _registry(server, heartbeat_ttl=1)
+            cancel_event = await registry.register(TASK_ID)
+            chunks = []
+            try:
+                async for chunk in iterate_until_cancelled(_stalled_llm_stream(), cancel_event):
+                    chunks.append(chunk)
+                    registered.set()
+            finally:
+                result["stopped_at"] = time.perf_counter()
+                result["chunks"] = chunks
+                result["remote_cancels"] = registry.remote_cancels_received
+                await registry.unregister(TASK_ID)
+                await registry.close()
+
+        asyncio.run(run())
+
+    owner = threading.Thread(target=owner_worker)
+    owner.start()
+    assert registered.wait(5)
+
+    async def cancel_from_other_worker() -> None:
+        registry = _registry(server)
+        # 超过心跳 TTL 仍持有归属键，说明心跳在续期
+        await asyncio.sleep(1.5)
+        assert await registry.owner_of(TASK_ID) is not None
+        result["cancelled_at"] = time.perf_counter()
+        assert await registry.cancel(TASK_ID) is True
+        assert await registry.cancel("unknown-task") is False
+
+    asyncio.run(cancel_from_other_worker())
+    owner.join(5)
+    assert not owner.is_alive()
+
+    latency = result["stopped_at"] - result["cancelled_at"]
+    assert result["chunks"] == ["你好"]
+    assert result["remote_cancels"] == 1
+    assert latency < CANCEL_BOUND_SECONDS
+
+    async def check_cleanup() -> None:
+        assert await _registry(server).owner_of(TASK_ID) is None
+
+    asyncio.run(check_cleanup())
+
+
+def test_owner_key_expires_without_heartbeat() -> None:
+    async def scenario() -> None:
+        server = fakeredis.FakeServer()
+        crashed, other = _registry(server, heartbeat_ttl=1), _registry(server)
+        await crashed.register(TASK_ID)
+        assert await other.owner_of(TASK_ID) == crashed.instance_id
+
+        # 模拟 worker 崩溃：后台心跳停止，归属键不再续期
+        crashed._heartbeat_task.cancel()
+        await asyncio.sleep(1.2)
+        assert await other.owner_of(TASK_ID) is None
+        assert await other.cancel(TASK_ID) is False
+
+        # 本进程内的任务无需经过 Redis
+        assert await crashed.cancel(TASK_ID) is True
+        assert crashed.is_cancelled(TASK_ID)
+        await crashed.close()
+
+    asyncio.run(scenario())
@@ -0,0 +1,143 @@
+import asyncio
+import subprocess
+import sys
+import time
+
+import fakeredis
+
+from app.ai import gateway, interfaces
+from app.ai.gateway import AICache, CacheConfig, InMemoryLRUBackend, RedisCacheBackend
+from app.ai.interfaces import AIProvider, AIRequest, AIResponse, AIScenario, ChatContext, SentimentResponse
+from app.core.redis_client import RedisClient
+
+
+def _redis_client(server: fakeredis.FakeServer) -> RedisClient:
+    client = RedisClient()
+    client._client = fakeredis.aioredis.FakeRedis(server=server)
+    return client
+
+
+def _cache(server: fakeredis.FakeServer, *, ttl_seconds: int = 300, max_size: int = 100) -> AICache:
+    config = CacheConfig(
+        ttl_seconds=ttl_seconds,
+        max_size=max_size,
+        cache_scenarios=[AIScenario.GENERAL_CHAT, AIScenario.SENTIMENT_ANALYSIS],
+    )
+    return AICache(config, shared_backend=RedisCacheBackend(_redis_client(server), max_size=max_size))
+
+
+def _response(content: str, scenario: AIScenario = AIScenario.GENERAL_CHAT) -> AIResponse:
+    return AIResponse(request_id="r1", content=content, provider=AIProvider.AGENT, scenario=scenario)
+
+
+def test_cache_key_is_stable_across_processes() -> None:
+    request = AIRequest(
+        scenario=AIScenario.GENERAL_CHAT,
+        message={"b": 1, "a": "你好"},
+        parameters={"top_p": 0.9, "user": "u1"},
+    )
+    # 直接按文件加载 interfaces，避免在子进程里初始化整个 app.ai 包
+    script = (
+        "import importlib.util, sys;"
+        f"spec = importlib.util.spec_from_file_location('interfaces', {interfaces.__file__!r});"
+        "module = importlib.util.module_from_spec(spec); sys.modules['interfaces'] = module;"
+        "spec.loader.exec_module(module);"
+        "print(module.AIRequest(scenario=module.AIScenario.GENERAL_CHAT, message={'a': '你好', 'b': 1},"
+        " parameters={'user': 'u1', 'top_p': 0.9}).cache_key)"
+    )
+    other = subprocess.run([sys.executable, "-c", script], capture_output=True, text=True, check=True)
+    assert other.stdout.strip() == request.cache_key
+    assert request.cache_key != AIRequest(
+        scenario=AIScenario.GENERAL_CHAT, message={"b": 1, "a": "你好"}, parameters={"top_p": 0.9, "user": "u1"}, temperature=0.2
+    ).cache_key
+
+
+def test_cache_key_separates_users_and_sessions() -> None:
+    def key(**context) -> str:
+        return AIRequest(
+            scenario=AIScenario.GENERAL_CHAT, message="我的持仓怎么样", context=ChatContext(**context)
+        ).cache_key
+
+    base = key(user_id="u1", session_id="s1")
+    assert base == key(user_id="u1", session_id="s1")
+    assert base != key(user_id="u2", session_id="s1")
+    assert base != key(user_id="u1", session_id="s2")
+    assert base != key(user_id="u1", session_id="s1", user_profile={"risk": "low"})
+    assert base != key(user_id="u1", session_id="s1", conversation_history=[{"role": "user", "content": "hi"}])
+    assert base != AIRequest(scenario=AIScenario.GENERAL_CHAT, message="我的持仓怎么样").cache_key
+
+
+def test_redis_tier_serves_hits_across_instances() -> None:
+    async def scenario() -> None:
+        server = fakeredis.FakeServer()
+        worker_a, worker_b = _cache(server), _cache(server)
+        key = AIRequest(scenario=AIScenario.SENTIMENT_ANALYSIS, message="很满意").cache_key
+        sentiment = SentimentResponse(
+            request_id="r1",
+            content="positive",
+            provider=AIProvider.AGENT,
+            scenario=AIScenario.SENTIMENT_ANALYSIS,
+            sentiment_score=0.8,
+            emotions={"joy": 0.7},
+        )
+
+        assert await worker_b.get(key) is None
+        await worker_a.set(key, sentiment)
+        cached = await worker_b.get(key)
+
+        assert cached == sentiment
+        assert isinstance(cached, SentimentResponse)
+        assert (worker_b.hits, worker_b.misses, worker_b.hit_rate) == (1, 1, 0.5)
+        assert await worker_b.size() == 1
+
+    asyncio.run(scenario())
+
+
+def test_redis_tier_expires_entries_and_bounds_size() -> None:
+    async def scenario() -> None:
+        server = fakeredis.FakeServer()
+        writer, reader = _cache(server, ttl_seconds=1, max_size=3), _cache(server, ttl_seconds=1, max_size=3)
+        for index in range(5):
+            await writer.set(f"k{index}", _response(f"v{index}"))
+        assert await writer.size() == 3
+        assert await reader.get("k0") is None
+        assert (await reader.get("k4")).content == "v4"
+
+        await asyncio.sleep(1.1)
+        assert await writer.size() == 0
+        assert await _cache(server).get("k4") is None
+
+    asyncio.run(scenario())
+
+
+def test_shared_hit_refills_local_tier_with_remaining_ttl() -> None:
+    async def scenario() -> None:
+        server = fakeredis.FakeServer()
+        writer, reader = _cache(server, ttl_seconds=300), _cache(server, ttl_seconds=300)
+        await writer.set("k", _response("v"))
+        await (await _redis_client(server).get_client()).pexpire("ai:cache:entry:k", 2000)
+
+        assert (await reader.get("k")).content == "v"
+        expires_at, _ = reader.local._entries["k"]
+        assert expires_at - time.monotonic() <= 2
+
+    asyncio.run(scenario())
+
+
+def test_local_lru_evicts_least_recently_used_and_honours_multi_day_ttl(monkeypatch) -> None:
+    async def scenario() -> None:
+        backend = InMemoryLRUBackend(max_size=2)
+        await backend.set("a", _response("a"), ttl_seconds=2 * 86400)
+        await backend.set("b", _response("b"), ttl_seconds=2 * 86400)
+        await backend.get("a")
+        await backend.set("c", _response("c"), ttl_seconds=2 * 86400)
+        assert await backend.get("b") is None
+        assert (await backend.get("a")).content == "a"
+
+        # 旧实现用 timedelta.seconds 判断过期，跨天后会被误判为未过期
+        now = time.monotonic()
+        monkeypatch.setattr(gateway.time, "monotonic", lambda: now + 3 * 86400)
+        assert await backend.get("a") is None
+        assert await backend.size() == 1
+
+    asyncio.run(scenario())
@@ -0,0 +1,126 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlalchemy import create_engine, event, exc, text
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+from app.common.deps import database
+from app.common.deps.database import create_profile_engine
+from app.core.config import get_settings
+
+# 以 SQLite 文件库代替 PostgreSQL，并在建连时加入固定延迟模拟 TCP/认证握手开销
+CONNECT_LATENCY_SECONDS = 0.005
+REQUESTS = 200
+CONCURRENCY = 8
+
+
+def _simulate_handshake(engine) -> list[int]:
+    connects = [0]
+    lock = threading.Lock()
+
+    @event.listens_for(engine, "do_connect")
+    def _slow_connect(*_args, **_kwargs):
+        with lock:
+            connects[0] += 1
+        time.sleep(CONNECT_LATENCY_SECONDS)
+
+    return connects
+
+
+def _run_requests(engine) -> None:
+    factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+    def handle(_index: int) -> int:
+        db = factory()
+        try:
+            return db.execute(text("SELECT 1")).scalar_one()
+        finally:
+            db.close()
+
+    with ThreadPoolExecutor(max_workers=CONCURRENCY) as executor:
+        assert sum(executor.map(handle, range(REQUESTS))) == REQUESTS
+
+
+def test_pooled_engine_reuses_connections_under_load(tmp_path) -> None:
+    url = f"sqlite:///{tmp_path / 'pool.db'}"
+    null_engine = create_engine(url, poolclass=NullPool, connect_args={"check_same_thread": False})
+    null_connects = _simulate_handshake(null_engine)
+    pooled_engine = create_profile_engine("api", url)
+    pooled_connects = _simulate_handshake(pooled_engine)
+    try:
+        _run_requests(null_engine)
+        _run_requests(pooled_engine)
+    finally:
+        null_engine.dispose()
+        pooled_engine.dispose()
+
+    assert null_connects[0] == REQUESTS
+    assert pooled_connects[0] <= CONCURRENCY
+    metrics = pooled_engine.pool.metrics.snapshot()
+    # pre_ping 每次签出都会校验连接，但不会新建连接
+    assert metrics["checkouts"] == REQUESTS
+    assert metrics["connects"] == pooled_connects[0]
+
+
+def test_pool_metrics_report_overflow_and_wait(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(get_settings(), "DB_POOL_MAX_OVERFLOW", 1)
+    engine = create_profile_engine("worker", f"sqlite:///{tmp_path / 'pool.db'}")
+    pool = engine.pool
+    try:
+        first = engine.connect()
+        second = engine.connect()
+        assert pool.checkedout() == 2
+        assert pool.overflow() == 1
+
+        def release_later() -> None:
+            time.sleep(0.05)
+            second.close()
+
+        releaser = threading.Thread(target=release_later)
+        releaser.start()
+        third = engine.connect()
+        releaser.join()
+        third.close()
+        first.close()
+    finally:
+        engine.dispose()
+
+    metrics = pool.metrics.snapshot()
+    assert metrics["checkouts"] == 3
+    assert metrics["timeouts"] == 0
+    assert metrics["wait_seconds_max"] >= 0.04
+
+
+def test_pool_metrics_count_only_checkout_timeouts(tmp_path, monkeypatch) -> None:
+    monkeypatch.setattr(get_settings(), "DB_POOL_SIZE", 1)
+    monkeypatch.setattr(get_settings(), "DB_POOL_MAX_OVERFLOW", 0)
+    monkeypatch.setattr(get_settings(), "DB_POOL_TIMEOUT", 0.05)
+    engine = create_profile_engine("worker", f"sqlite:///{tmp_path / 'pool.db'}")
+    monkeypatch.setattr(database, "_engines", {"worker": engine})
+    try:
+        # 池未填满时 QueuePool.overflow() 为负，对外报告 0
+        assert engine.pool.overflow() < 0
+        assert database.get_pool_metrics()["worker"]["overflow"] == 0
+
+        held = engine.connect()
+        with pytest.raises(exc.TimeoutError):
+            engine.connect()
+        held.close()
+
+        @event.listens_for(engine, "do_connect")
+        def _refuse(*_args, **_kwargs):
+            raise ConnectionRefusedError("db down")
+
+        engine.pool.dispose()
+        with pytest.raises(ConnectionRefusedError):
+            engine.connect()
+    finally:
+        engine.dispose()
+
+    metrics = database.get_pool_metrics()["worker"]
+    assert metrics["timeouts"] == 1
+    assert metrics["overflow"] == 0
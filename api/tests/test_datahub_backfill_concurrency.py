@@ -0,0 +1,120 @@
+import threading
+import time
+from datetime import date, timedelta
+
+from app.datahub.enums import DatahubTaskStatus
+from app.datahub.models import DatahubDatasetWatermark, DatahubJobRun, DatahubJobTask
+from app.datahub.schemas.datahub import TriggerBackfillRequest
+from app.datahub.services.market_daily_backfill_service import MarketDailyBackfillService
+
+LATENCY_SECONDS = 0.1
+SYMBOLS = [f"{600000 + index:06d}.SH" for index in range(8)]
+
+
+class SlowProvider:
+    """固定延迟的假 provider，记录最大并发数。"""
+
+    def __init__(self) -> None:
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def get_daily_bars(self, symbol: str, start_date: date, end_date: date) -> list[dict]:
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(LATENCY_SECONDS)
+            if symbol.endswith("7.SH"):
+                return []
+            return [
+                {
+                    "symbol": symbol,
+                    "trade_date": start_date + timedelta(days=offset),
+                    "open": 10.0,
+                    "high": 11.0,
+                    "low": 9.0,
+                    "close": 10.5,
+                    "volume": 1000.0,
+                    "amount": 10500.0,
+                    "turnover_rate": 1.0,
+                }
+                for offset in range((end_date - start_date).days + 1)
+            ]
+        finally:
+            with self._lock:
+                self.active -= 1
+
+
+def _create_run(db) -> str:
+    run = DatahubJobRun(job_type="backfill", dataset="market_daily", status=DatahubTaskStatus.PENDING.value)
+    db.add(run)
+    db.flush()
+    db.add(DatahubJobTask(job_run_id=run.id, dataset="market_daily", status=DatahubTaskStatus.PENDING.value, attempts=0))
+    db.commit()
+    return run.id
+
+
+def _run_backfill(session_factory, *, max_workers: int, provider_limit: int) -> tuple[float, SlowProvider, dict, dict]:
+    db = session_factory()
+    try:
+        run_id = _create_run(db)
+        service = MarketDailyBackfillService(
+            db,
+            max_workers=max_workers,
+            provider_limits={"eastmoney": provider_limit},
+            session_factory=session_factory,
+        )
+        provider = SlowProvider()
+        # baostock 客户端非线程安全、上限固定为 1；并发扩展走 eastmoney（baostock 未接入时回退到它）
+        service.providers = {"eastmoney": provider}
+        payload = TriggerBackfillRequest(
+            dataset="market_daily",
+            start_date=date(2026, 6, 1),
+            end_date=date(2026, 6, 5),
+            symbols=SYMBOLS,
+        )
+        started = time.perf_counter()
+        try:
+            service.execute(run_id, payload)
+        except Exception:
+            pass
+        elapsed = time.perf_counter() - started
+
+        statuses = {
+            row.symbol: (row.status, row.attempts)
+            for row in db.query(DatahubJobTask).filter(DatahubJobTask.job_run_id == run_id).all()
+        }
+        watermarks = {
+            row.symbol: (row.last_success_date, row.last_quality_score, row.last_object_key.rsplit("/batch_id=", 1)[0])
+            for row in db.query(DatahubDatasetWatermark).all()
+        }
+        return elapsed, provider, statuses, watermarks
+    finally:
+        db.close()
+
+
+def test_concurrent_backfill_matches_serial_and_scales_with_limit(fake_minio, datahub_session_factory) -> None:
+    serial_elapsed, serial_provider, serial_statuses, serial_watermarks = _run_backfill(
+        datahub_session_factory, max_workers=1, provider_limit=4
+    )
+    parallel_elapsed, parallel_provider, parallel_statuses, parallel_watermarks = _run_backfill(
+        datahub_session_factory, max_workers=4, provider_limit=4
+    )
+
+    assert serial_provider.max_active == 1
+    assert parallel_provider.max_active == 4
+    assert parallel_statuses == serial_statuses
+    assert parallel_watermarks == serial_watermarks
+    assert serial_statuses[SYMBOLS[7]] == (DatahubTaskStatus.FAILED.value, 1)
+    assert len(serial_watermarks) == len(SYMBOLS) - 1
+    assert serial_elapsed >= len(SYMBOLS) * LATENCY_SECONDS
+    assert parallel_elapsed < serial_elapsed / 2
+
+
+def test_provider_limit_caps_concurrency_below_worker_count(fake_minio, datahub_session_factory) -> None:
+    elapsed, provider, statuses, _ = _run_backfill(datahub_session_factory, max_workers=8, provider_limit=2)
+
+    assert provider.max_active == 2
+    assert elapsed >= (len(SYMBOLS) / 2) * LATENCY_SECONDS
+    assert sum(1 for status, _ in statuses.values() if status == DatahubTaskStatus.SUCCESS.value) == len(SYMBOLS) - 1
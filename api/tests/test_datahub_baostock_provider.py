@@ -0,0 +1,236 @@
+import sys
+import threading
+import time
+import types
+from datetime import date, datetime, timedelta
+
+import pytest
+
+from app.datahub.providers import BaoStockProvider, BaoStockSessionManager
+
+QUERIES = 1000
+
+
+class FakeResultData:
+    def __init__(self, records: list[list[str]], error_code: str = "0", error_msg: str = "success"):
+        self.records = records
+        self.error_code = error_code
+        self.error_msg = error_msg
+        self._cursor = 0
+
+    def next(self) -> bool:
+        return self._cursor < len(self.records)
+
+    def get_row_data(self) -> list[str]:
+        row = self.records[self._cursor]
+        self._cursor += 1
+        return row
+
+
+class FakeBaostock(types.ModuleType):
+    """baostock 替身：记录登录次数，并检测是否存在并发访问全局会话。"""
+
+    def __init__(self) -> None:
+        super().__init__("baostock")
+        self.logins = 0
+        self.logouts = 0
+        self.logged_in = False
+        self.drop_session_at: set[int] = set()
+        self.queries = 0
+        self.active = 0
+        self.max_active = 0
+
+    def login(self):
+        self.logins += 1
+        self.logged_in = True
+        return FakeResultData([])
+
+    def logout(self):
+        self.logouts += 1
+        self.logged_in = False
+        return FakeResultData([])
+
+    def _run(self, records: list[list[str]]) -> FakeResultData:
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            time.sleep(0)
+            self.queries += 1
+            if self.queries in self.drop_session_at:
+                self.logged_in = False
+            if not self.logged_in:
+                return FakeResultData([], error_code="10001001", error_msg="用户未登陆")
+            return FakeResultData(records)
+        finally:
+            self.active -= 1
+
+    def query_history_k_data_plus(self, code, fields, start_date, end_date, frequency, adjustflag):
+        return self._run(_daily_records(code, date.fromisoformat(start_date), date.fromisoformat(end_date)))
+
+    def query_all_stock(self, day):
+        return self._run(
+            [
+                ["sh.600000", "浦发银行", "1", "1999-11-10", ""],
+                ["sz.000001", "平安银行", "0", "1991-04-03", "2030-01-01"],
+                ["bj.430047", "诺思兰德", ""],
+                ["000002", "万科A"],
+            ]
+        )
+
+    def query_trade_dates(self, start_date, end_date):
+        return self._run([["2026-06-29", "1"], ["2026-06-28", "0"], ["", "1"], ["2026-06-30"]])
+
+
+def _daily_records(code: str, start: date, end: date) -> list[list[str]]:
+    records = []
+    day = start
+    while day <= end:
+        offset = (day - start).days
+        records.append(
+            [
+                day.isoformat(),
+                code,
+                f"{10 + offset * 0.01:.4f}",
+                f"{10.5 + offset * 0.01:.4f}",
+                "" if offset % 11 == 3 else f"{9.5 + offset * 0.01:.4f}",
+                f"{10.2 + offset * 0.013:.4f}",
+                str(100000 + offset),
+                f"{1234567.891 + offset:.3f}",
+                "" if offset % 7 == 0 else f"{0.3 + offset * 0.001:.6f}",
+            ]
+        )
+        day += timedelta(days=1)
+    return records
+
+
+def _legacy_daily_bars(records: list[list[str]], symbol: str) -> list[dict]:
+    """改造前的逐行解析，作为一致性基线。"""
+
+    def to_float(value: str) -> float:
+        if value == "" or value is None:
+            return 0.0
+        return float(value)
+
+    return [
+        {
+            "symbol": symbol,
+            "trade_date": datetime.strptime(record[0], "%Y-%m-%d").date(),
+            "open": to_float(record[2]),
+            "high": to_float(record[3]),
+            "low": to_float(record[4]),
+            "close": to_float(record[5]),
+            "volume": to_float(record[6]),
+            "amount": to_float(record[7]),
+            "turnover_rate": to_float(record[8]),
+        }
+        for record in records
+    ]
+
+
+@pytest.fixture
+def fake_baostock(monkeypatch):
+    module = FakeBaostock()
+    monkeypatch.setitem(sys.modules, "baostock", module)
+    return module
+
+
+def test_session_is_reused_across_queries_and_reconnects_on_drop(fake_baostock) -> None:
+    provider = BaoStockProvider(session_manager=BaoStockSessionManager())
+    fake_baostock.drop_session_at = {500}
+
+    for index in range(QUERIES):
+        rows = provider.get_daily_bars("600000.SH", date(2026, 6, 1), date(2026, 6, 5))
+        assert len(rows) == 5, index
+
+    stats = provider.session_manager.stats()
+    assert fake_baostock.logins == 2
+    assert (stats["logins"], stats["reconnects"], stats["queries"]) == (2, 1, QUERIES)
+
+
+def test_session_relogs_after_idle_and_serializes_threads(fake_baostock) -> None:
+    manager = BaoStockSessionManager(max_idle_seconds=0.05)
+    provider = BaoStockProvider(session_manager=manager)
+
+    provider.get_trading_calendar(date(2026, 6, 1), date(2026, 6, 30))
+    time.sleep(0.1)
+    provider.get_trading_calendar(date(2026, 6, 1), date(2026, 6, 30))
+    assert fake_baostock.logins == 2
+
+    manager.max_idle_seconds = 300
+    threads = [
+        threading.Thread(
+            target=lambda: [provider.get_daily_bars("000001.SZ", date(2026, 1, 1), date(2026, 1, 20)) for _ in range(50)]
+        )
+        for _ in range(8)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert fake_baostock.max_active == 1
+    assert fake_baostock.logins == 2
+
+    manager.close()
+    assert fake_baostock.logouts == 2
+
+
+def test_columnar_parsing_matches_row_parsing(fake_baostock) -> None:
+    provider = BaoStockProvider(session_manager=BaoStockSessionManager())
+    start, end = date(2000, 1, 1), date(2026, 6, 30)
+    records = _daily_records("sh.600000", start, end)
+    provider.get_daily_bars("600000.SH", start, start)
+
+    legacy = _legacy_daily_bars(records, "600000.SH")
+    columnar = BaoStockProvider._parse_daily_bars(records, "600000.SH")
+
+    assert provider.get_daily_bars("600000.SH", start, end) == columnar == legacy
+
+    assert provider.get_security_master(day=date(2026, 6, 30)) == [
+        {
+            "symbol": "600000.SH",
+            "exchange": "SSE",
+            "name": "浦发银行",
+            "list_date": date(1999, 11, 10),
+            "delist_date": None,
+            "status": "active",
+            "industry": None,
+            "source_provider": "baostock",
+        },
+        {
+            "symbol": "000001.SZ",
+            "exchange": "SZSE",
+            "name": "平安银行",
+            "list_date": date(1991, 4, 3),
+            "delist_date": date(2030, 1, 1),
+            "status": "inactive",
+            "industry": None,
+            "source_provider": "baostock",
+        },
+        {
+            "symbol": "BJ.430047",
+            "exchange": "UNKNOWN",
+            "name": "诺思兰德",
+            "list_date": None,
+            "delist_date": None,
+            "status": "inactive",
+            "industry": None,
+            "source_provider": "baostock",
+        },
+        {
+            "symbol": "000002.SZ",
+            "exchange": "UNKNOWN",
+            "name": "万科A",
+            "list_date": None,
+            "delist_date": None,
+            "status": "active",
+            "industry": None,
+            "source_provider": "baostock",
+        },
+    ]
+
+    calendar = provider.get_trading_calendar(date(2026, 6, 28), date(2026, 6, 30))
+    assert [(row["trade_date"], row["is_open"], row["previous_trade_date"]) for row in calendar] == [
+        (date(2026, 6, 29), True, None),
+        (date(2026, 6, 28), False, None),
+        (date(2026, 6, 30), False, None),
+    ]
@@ -0,0 +1,166 @@
+import time
+from datetime import date, timedelta
+
+import pytest
+
+from app.datahub.enums import DatahubTaskStatus
+from app.datahub.jobs.async_executor import _execute_daily_with_db, _refresh_board_snapshots
+from app.datahub.models import DatahubBoardSnapshot, DatahubJobRun
+from app.datahub.schemas.datahub import DatahubWatchlistCreate, DatahubWatchlistUpdate
+from app.datahub.services import DatahubService
+from app.datahub.services.board_snapshot_service import DatahubBoardSnapshotService
+from app.datahub.services.context_export_service import ContextExportService
+from app.datahub.services.daily_brief_service import DailyBriefService
+from app.datahub.services.extended_dataset_sync_service import ExtendedDatasetSyncService
+from app.datahub.services.market_daily_incremental_service import MarketDailyIncrementalService
+from app.datahub.services.watchlist_service import DatahubWatchlistService, invalidate_board_snapshots
+
+REQUESTS = 20
+
+
+@pytest.fixture
+def board_builds(monkeypatch: pytest.MonkeyPatch) -> list[int]:
+    """统计看板实际计算次数，并跳过 security_master 名称映射读取。"""
+    builds: list[int] = []
+    build_board = DatahubWatchlistService.get_board
+
+    def counting_get_board(self, *, limit_days: int = 30):
+        builds.append(limit_days)
+        return build_board(self, limit_days=limit_days)
+
+    monkeypatch.setattr(DatahubWatchlistService, "get_board", counting_get_board)
+    monkeypatch.setattr(DatahubWatchlistService, "_load_security_name_map", lambda self: {})
+    return builds
+
+
+def _seed_watchlist(db, count: int) -> DatahubWatchlistService:
+    watchlist = DatahubWatchlistService(db)
+    for index in range(count):
+        watchlist.add_item(DatahubWatchlistCreate(symbol=f"{600000 + index:06d}.SH", name=f"股票{index}"))
+    return watchlist
+
+
+def test_snapshot_is_served_until_watchlist_or_daily_job_invalidates(
+    fake_minio, datahub_session_factory, board_builds
+) -> None:
+    db = datahub_session_factory()
+    watchlist = _seed_watchlist(db, 2)
+    service = DatahubBoardSnapshotService(db)
+
+    first = service.get_board(limit_days=10)
+    second = service.get_board(limit_days=10)
+    assert len(board_builds) == 1
+    assert (second.rows, second.snapshot_version) == (first.rows, first.snapshot_version)
+    assert (second.snapshot_version, len(second.rows)) == (0, 2)
+
+    added = watchlist.add_item(DatahubWatchlistCreate(symbol="000001.SZ", name="平安银行"))
+    board = service.get_board(limit_days=10)
+    assert (len(board_builds), board.snapshot_version, len(board.rows)) == (2, 1, 3)
+
+    watchlist.update_item(added.id, DatahubWatchlistUpdate(name="平安"))
+    assert service.get_board(limit_days=10).snapshot_version == 2
+    watchlist.delete_item(added.id)
+    board = service.get_board(limit_days=10)
+    assert (len(board_builds), board.snapshot_version, len(board.rows)) == (4, 3, 2)
+    service.get_board(limit_days=10)
+    assert len(board_builds) == 4
+
+    # 日线增量完成：已物化的看板立即重算，读路径不再计算
+    _refresh_board_snapshots(DatahubService(db), recompute=True)
+    assert len(board_builds) == 5
+    service.get_board(limit_days=10)
+    assert len(board_builds) == 5
+
+    # 回填完成只标记失效；跨自然日的快照同样在首次读取时重算
+    _refresh_board_snapshots(DatahubService(db), recompute=False)
+    service.get_board(limit_days=10)
+    assert len(board_builds) == 6
+    db.query(DatahubBoardSnapshot).update({DatahubBoardSnapshot.as_of_date: date.today() - timedelta(days=1)})
+    db.commit()
+    service.get_board(limit_days=10)
+    assert len(board_builds) == 7
+    db.close()
+
+
+def test_invalidation_during_rebuild_keeps_snapshot_stale(fake_minio, datahub_session_factory, board_builds) -> None:
+    db = datahub_session_factory()
+    _seed_watchlist(db, 1)
+
+    class RacingWatchlistService(DatahubWatchlistService):
+        def get_board(self, *, limit_days: int = 30):
+            board = super().get_board(limit_days=limit_days)
+            other = datahub_session_factory()
+            invalidate_board_snapshots(other)
+            other.commit()
+            other.close()
+            return board
+
+    racing = DatahubBoardSnapshotService(db, watchlist_service=RacingWatchlistService(db))
+    board = racing.get_board(limit_days=10)
+    assert board.snapshot_version is None
+    row = db.query(DatahubBoardSnapshot).one()
+    db.refresh(row)
+    assert (row.is_stale, row.version) == (True, 1)
+
+    board = DatahubBoardSnapshotService(db).get_board(limit_days=10)
+    assert board.snapshot_version == 1
+    db.close()
+
+
+@pytest.mark.parametrize(
+    ("dataset", "status", "expected"),
+    [
+        ("market_daily", DatahubTaskStatus.SUCCESS, "refresh"),
+        ("market_daily", DatahubTaskStatus.FAILED, "invalidate"),
+        ("sector_members", DatahubTaskStatus.SUCCESS, "invalidate"),
+    ],
+)
+def test_daily_run_recomputes_boards_only_after_successful_market_daily(
+    datahub_session_factory, monkeypatch: pytest.MonkeyPatch, dataset, status, expected
+) -> None:
+    db = datahub_session_factory()
+    run = DatahubJobRun(job_type="daily_incremental", dataset=dataset, status=DatahubTaskStatus.RUNNING.value)
+    db.add(run)
+    db.commit()
+
+    def finish(self, run_id, payload):
+        self.db.query(DatahubJobRun).filter(DatahubJobRun.id == run_id).update({DatahubJobRun.status: status.value})
+        self.db.commit()
+
+    calls: list[str] = []
+    monkeypatch.setattr(MarketDailyIncrementalService, "execute", finish)
+    monkeypatch.setattr(ExtendedDatasetSyncService, "execute_daily_incremental", finish)
+    monkeypatch.setattr(DatahubBoardSnapshotService, "refresh", lambda self: calls.append("refresh"))
+    monkeypatch.setattr(DatahubBoardSnapshotService, "invalidate", lambda self: calls.append("invalidate"))
+
+    _execute_daily_with_db(run.id, {"dataset": dataset}, DatahubService(db))
+    assert calls == [expected]
+    db.close()
+
+
+@pytest.mark.benchmark
+def test_benchmark_daily_context_latency(fake_minio, datahub_session_factory, board_builds) -> None:
+    db = datahub_session_factory()
+    watchlist = _seed_watchlist(db, 30)
+
+    # 改造前：get_today_context 先取看板，get_readiness 内再计算一次
+    legacy = DailyBriefService(db=db, board_service=watchlist)
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        board = watchlist.get_board(limit_days=10)
+        legacy.get_readiness(board=None)
+    legacy_seconds = (time.perf_counter() - started) / REQUESTS
+    assert len(board_builds) == REQUESTS * 2
+    assert len(board.rows) == 30
+
+    export = ContextExportService(db=db)
+    export.get_opencode_context()
+    board_builds.clear()
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        context = export.get_opencode_context()
+    snapshot_seconds = (time.perf_counter() - started) / REQUESTS
+    assert board_builds == []
+    assert len(context["context"]["watchlist"]) == 30
+    assert snapshot_seconds < legacy_seconds
+    db.close()
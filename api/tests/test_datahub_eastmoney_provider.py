@@ -0,0 +1,207 @@
+import sys
+import types
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from app.datahub.models import DatahubDatasetWatermark
+from app.datahub.providers import EastMoneyProvider, ProviderResponseCache
+from app.datahub.services.extended_dataset_sync_service import ExtendedDatasetSyncService
+from app.datahub.services.snapshot_read_service import SnapshotDatasetReadService
+
+HISTORY_DAYS = 500
+REPORTS = 40
+METRICS = 30
+TODAY = date(2026, 6, 30)
+
+
+class FakeAkshare(types.ModuleType):
+    """akshare 替身：资金流返回全部历史，财务摘要每行一个报告期。"""
+
+    def __init__(self) -> None:
+        super().__init__("akshare")
+        self.calls = 0
+        self.today = TODAY
+        # 源站事后修订的资金流：日期 -> 主力净流入
+        self.revised: dict[date, float] = {}
+
+    def stock_individual_fund_flow(self, stock, market):
+        self.calls += 1
+        days = [self.today - timedelta(days=offset) for offset in range(HISTORY_DAYS)][::-1]
+        # 数值只取决于日期，保证“明天”的响应与今天在重叠日期上一致
+        seeds = [day.toordinal() % 1000 for day in days]
+        return pd.DataFrame(
+            {
+                "日期": [day.isoformat() for day in days],
+                "收盘价": np.linspace(10, 20, len(days)),
+                "主力净流入-净额": [
+                    self.revised.get(day, np.nan if seed % 17 == 0 else seed * 1000.5) for day, seed in zip(days, seeds)
+                ],
+                "超大单净流入-净额": ["-" if seed % 13 == 0 else f"{seed * 1234.25:,.2f}" for seed in seeds],
+                "中单净流入-净额": [None if seed % 11 == 0 else f"{seed * 0.5}%" for seed in seeds],
+                "小单净流入-净额": [str(-seed) for seed in seeds],
+            }
+        )
+
+    def stock_financial_abstract(self, symbol):
+        self.calls += 1
+        periods = []
+        year, month = self.today.year, (self.today.month - 1) // 3 * 3
+        for _ in range(REPORTS):
+            if month == 0:
+                year, month = year - 1, 12
+            periods.append(date(year, month, 31 if month in (3, 12) else 30))
+            month -= 3
+        frame = pd.DataFrame(
+            {
+                "选项": "常用指标",
+                "报告期": [period.strftime("%Y%m%d") for period in periods],
+                "公告日期": [None if index % 5 == 0 else (period + timedelta(days=30)).isoformat() for index, period in enumerate(periods)],
+            }
+        )
+        for metric in range(METRICS):
+            values = [f"{index * metric * 1.5:,.2f}" if metric % 3 else index * metric / 7 for index in range(REPORTS)]
+            if metric % 4 == 0:
+                values[metric % REPORTS] = "--"
+            frame[f"指标{metric}"] = values
+        return frame
+
+
+def _legacy_money_flow(frame: pd.DataFrame, symbol: str, start_date: date, end_date: date) -> list[dict]:
+    """改造前的逐行实现，作为一致性基线。"""
+    p = EastMoneyProvider
+    rows = []
+    for item in frame.to_dict("records"):
+        trade_date = p._to_date(p._pick(item, "日期", "trade_date"))
+        if trade_date is None or trade_date < start_date or trade_date > end_date:
+            continue
+        rows.append(
+            {
+                "symbol": symbol,
+                "trade_date": trade_date,
+                "main_net_inflow": p._to_float(p._pick(item, "主力净流入-净额", "主力净流入净额")),
+                "large_net_inflow": p._to_float(p._pick(item, "超大单净流入-净额", "大单净流入-净额")),
+                "medium_net_inflow": p._to_float(p._pick(item, "中单净流入-净额")),
+                "small_net_inflow": p._to_float(p._pick(item, "小单净流入-净额")),
+            }
+        )
+    return rows
+
+
+def _legacy_financial(frame: pd.DataFrame, symbol: str, start_date: date, end_date: date) -> list[dict]:
+    p = EastMoneyProvider
+    records = []
+    for item in frame.to_dict("records"):
+        report_date = p._to_date(p._pick(item, "报告期", "report_date"))
+        if report_date is None or report_date < start_date or report_date > end_date:
+            continue
+        pub_date = p._to_date(p._pick(item, "公告日期", "最新公告日期")) or report_date
+        for key, value in item.items():
+            if key in {"选项", "报告期", "公告日期", "最新公告日期"}:
+                continue
+            records.append(
+                {
+                    "symbol": symbol,
+                    "report_date": report_date,
+                    "pub_date": pub_date,
+                    "metric_name": str(key),
+                    "metric_value": p._to_float(value),
+                    "metric_group": "financial_abstract",
+                }
+            )
+    return records
+
+
+@pytest.fixture
+def fake_akshare(monkeypatch):
+    module = FakeAkshare()
+    monkeypatch.setitem(sys.modules, "akshare", module)
+    return module
+
+
+def _provider() -> EastMoneyProvider:
+    return EastMoneyProvider(response_cache=ProviderResponseCache())
+
+
+def test_vectorized_conversion_matches_row_loop(fake_akshare) -> None:
+    provider = _provider()
+    start = TODAY - timedelta(days=90)
+
+    money_flow = provider.get_money_flow("600000.SH", start, TODAY)
+    assert money_flow == _legacy_money_flow(fake_akshare.stock_individual_fund_flow("600000", "sh"), "600000.SH", start, TODAY)
+    assert provider.rows_processed == 91
+
+    financial = provider.get_financial_statement("600000.SH", date(2020, 1, 1), TODAY)
+    legacy = _legacy_financial(fake_akshare.stock_financial_abstract("600000"), "600000.SH", date(2020, 1, 1), TODAY)
+    assert financial == legacy
+    assert all(type(row["metric_value"]) is float for row in financial)
+
+
+def test_since_bounds_rows_processed_and_responses_are_cached(fake_akshare) -> None:
+    provider = _provider()
+    start = TODAY - timedelta(days=90)
+    since = TODAY - timedelta(days=3)
+
+    full = provider.get_money_flow("600000.SH", start, TODAY)
+    provider.rows_processed = 0
+    incremental = provider.get_money_flow("600000.SH", start, TODAY, since=since)
+
+    assert incremental == [row for row in full if row["trade_date"] > since]
+    assert provider.rows_processed == 3
+    assert fake_akshare.calls == 1
+
+    provider.rows_processed = 0
+    financial = provider.get_financial_statement("600000.SH", date(2020, 1, 1), TODAY, since=TODAY - timedelta(days=100))
+    frame = fake_akshare.stock_financial_abstract("600000")
+    # 公告日期早于 since 的报告被跳过；缺公告日期的报告无法判断，全部保留
+    undated = {
+        report_date
+        for report_date, published in zip(pd.to_datetime(frame["报告期"]).dt.date, frame["公告日期"])
+        if published is None and report_date >= date(2020, 1, 1)
+    }
+    assert {row["report_date"] for row in financial} == undated
+    assert date(2026, 3, 31) in undated and date(2025, 12, 31) not in undated
+    assert provider.rows_processed == len(undated)
+    provider.get_financial_statement("600000.SH", date(2020, 1, 1), TODAY)
+    assert fake_akshare.calls == 3
+
+
+def test_sync_merges_increment_into_previous_object(fake_akshare, fake_minio, datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    service = ExtendedDatasetSyncService(db)
+    provider = _provider()
+    service.providers["eastmoney"] = provider
+
+    day1 = TODAY
+    score, object_key, _, watermark_date, can_publish = service._process_task(
+        dataset="money_flow", symbol="600000.SH", start_date=day1 - timedelta(days=60), end_date=day1, batch_prefix="daily"
+    )
+    assert can_publish
+    service._upsert_watermark(
+        dataset="money_flow",
+        symbol="600000.SH",
+        end_date=watermark_date,
+        quality_score=score,
+        object_key=object_key,
+        batch_prefix="daily",
+    )
+    service.unit_of_work.flush()
+    assert provider.rows_processed == 61
+
+    fake_akshare.today = day2 = TODAY + timedelta(days=1)
+    # 水位前两天的行被源站修订，落在重叠窗口内应被重新采集
+    fake_akshare.revised = {day1 - timedelta(days=2): 42.0}
+    provider.rows_processed = 0
+    _, object_key, _, _, _ = service._process_task(
+        dataset="money_flow", symbol="600000.SH", start_date=day2 - timedelta(days=60), end_date=day2, batch_prefix="daily"
+    )
+    assert provider.rows_processed == ExtendedDatasetSyncService.INCREMENTAL_OVERLAP_DAYS["money_flow"] + 1
+
+    stored = sorted(SnapshotDatasetReadService._read_parquet_rows(object_key), key=lambda row: row["trade_date"])
+    expected = _provider().get_money_flow("600000.SH", day2 - timedelta(days=60), day2)
+    assert stored == expected
+    assert next(row for row in stored if row["trade_date"] == day1 - timedelta(days=2))["main_net_inflow"] == 42.0
+    assert db.query(DatahubDatasetWatermark).filter(DatahubDatasetWatermark.dataset == "money_flow").count() == 1
+    db.close()
@@ -0,0 +1,440 @@
+import json
+import random
+from datetime import date, timedelta
+from io import BytesIO
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.core.api import BusinessException
+from app.datahub.models import DatahubDatasetWatermark, DatahubJobRun, DatahubObjectIndex
+from app.datahub.providers import BaoStockProvider
+from app.datahub.schemas.datahub import MarketDailyGapRange, TriggerBackfillRequest
+from app.datahub.services.datahub_service import DatahubService
+from app.datahub.services.market_daily_backfill_service import MarketDailyBackfillService
+from app.datahub.services.market_daily_gap_service import MarketDailyGapService
+from app.datahub.services.market_daily_read_service import MarketDailyReadService
+
+WINDOW_START = date(2026, 1, 1)
+WINDOW_END = date(2026, 6, 30)
+HOLIDAYS = {date(2026, 1, 1), date(2026, 2, 16), date(2026, 2, 17), date(2026, 2, 18), date(2026, 4, 6), date(2026, 5, 1)}
+
+
+def _calendar_days(start: date, end: date) -> list[date]:
+    days = [start + timedelta(days=offset) for offset in range((end - start).days + 1)]
+    return [day for day in days if day.weekday() < 5 and day not in HOLIDAYS]
+
+
+def _parquet(rows: list[dict]) -> bytes:
+    sink = BytesIO()
+    pq.write_table(pa.Table.from_pylist(rows), sink)
+    return sink.getvalue()
+
+
+def _index(
+    db,
+    *,
+    dataset: str,
+    object_key: str,
+    symbol: str | None,
+    start_date: date,
+    end_date: date,
+    row_count: int = 0,
+) -> None:
+    db.add(
+        DatahubObjectIndex(
+            bucket="datahub-test",
+            object_key=object_key,
+            dataset=dataset,
+            layer="normalized",
+            symbol=symbol,
+            start_date=start_date,
+            end_date=end_date,
+            row_count=row_count,
+        )
+    )
+
+
+def _publish_latest(fake_minio, db, symbol: str, ranges: list[tuple[date, date]], *, batch: str = "latest") -> None:
+    """把 ranges 内的交易日写成 symbol 的 latest 对象，并登记对象索引与水位。"""
+    days = sorted({day for start, end in ranges for day in _calendar_days(start, end)})
+    if not days:
+        return
+    object_key = f"datahub/normalized/dataset=market_daily/symbol={symbol}/batch_id={batch}.parquet"
+    fake_minio.objects[object_key] = _parquet([{"symbol": symbol, "trade_date": day, "close": 1.0} for day in days])
+    _index(
+        db,
+        dataset="market_daily",
+        object_key=object_key,
+        symbol=symbol,
+        start_date=min(start for start, _ in ranges),
+        end_date=max(end for _, end in ranges),
+        row_count=len(days),
+    )
+    db.add(
+        DatahubDatasetWatermark(
+            dataset="market_daily",
+            symbol=symbol,
+            last_success_date=days[-1],
+            last_quality_score=100.0,
+            last_object_key=object_key,
+        )
+    )
+
+
+def _publish_calendar(fake_minio, db, start: date, end: date, *, split: date | None = None) -> None:
+    """日历按两段对象入库，覆盖多对象拼接；is_open=False 的日期不是交易日。"""
+    pieces = [(start, end)] if split is None else [(start, split), (split + timedelta(days=1), end)]
+    for index, (piece_start, piece_end) in enumerate(pieces):
+        rows = [
+            {"exchange": "SSE", "trade_date": piece_start + timedelta(days=offset), "is_open": False}
+            for offset in range((piece_end - piece_start).days + 1)
+        ]
+        open_days = set(_calendar_days(piece_start, piece_end))
+        for row in rows:
+            row["is_open"] = row["trade_date"] in open_days
+        object_key = f"datahub/normalized/dataset=trading_calendar/year=2026/month=06/batch_id=cal{index}.parquet"
+        fake_minio.objects[object_key] = _parquet(rows)
+        _index(db, dataset="trading_calendar", object_key=object_key, symbol=None, start_date=piece_start, end_date=piece_end)
+
+
+def _publish_security_master(fake_minio, rows: list[dict]) -> None:
+    object_key = "datahub/normalized/dataset=security_master/year=2026/month=06/batch_id=sm1.parquet"
+    fake_minio.objects[object_key] = _parquet(rows)
+    fake_minio.objects["datahub/normalized/dataset=security_master/latest/symbol=__ALL__.json"] = json.dumps(
+        {"object_key": object_key}
+    ).encode("utf-8")
+
+
+def _security(symbol: str, *, list_date: date = date(2000, 1, 1), delist_date: date | None = None, status: str = "active") -> dict:
+    return {"symbol": symbol, "name": symbol, "status": status, "list_date": list_date, "delist_date": delist_date}
+
+
+def _reference_gaps(universe: dict[str, tuple[date, date]], coverage: dict[str, list[tuple[date, date]]], days: list[date]):
+    """逐日比较的参考实现，用于校验列式反连接与区间合并。"""
+    result = []
+    for symbol in sorted(universe):
+        first, last = universe[symbol]
+        current: list[date] = []
+        for day in days:
+            expected = first <= day <= last
+            covered = any(start <= day <= end for start, end in coverage.get(symbol, []))
+            if expected and not covered:
+                current.append(day)
+            elif current:
+                result.append((symbol, current[0], current[-1], len(current)))
+                current = []
+        if current:
+            result.append((symbol, current[0], current[-1], len(current)))
+    return result
+
+
+def _as_tuples(ranges: list[MarketDailyGapRange]):
+    return [(item.symbol, item.start_date, item.end_date, item.trading_days) for item in ranges]
+
+
+@pytest.fixture
+def no_provider_calls(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fail(*args, **kwargs):
+        raise AssertionError("gap scan must not call providers")
+
+    for name in ("get_security_master", "get_trading_calendar", "get_market_daily"):
+        monkeypatch.setattr(BaoStockProvider, name, fail, raising=False)
+
+
+@pytest.fixture
+def gap_db(fake_minio, datahub_session_factory, no_provider_calls):
+    db = datahub_session_factory()
+    _publish_calendar(fake_minio, db, date(2025, 12, 1), date(2026, 7, 31), split=date(2026, 3, 31))
+    _publish_security_master(
+        fake_minio,
+        [
+            _security("600000.SH"),
+            _security("600001.SH", list_date=date(2026, 4, 1)),
+            _security("600002.SH", delist_date=date(2026, 5, 15), status="delisted"),
+            _security("600003.SH", status="suspended"),
+            _security("600004.SH"),
+        ],
+    )
+    coverage = {
+        "600000.SH": [(date(2025, 1, 1), date(2026, 3, 10)), (date(2026, 3, 20), date(2026, 6, 30))],
+        "600001.SH": [(date(2026, 4, 1), date(2026, 6, 30))],
+        "600002.SH": [(date(2025, 1, 1), date(2026, 4, 30))],
+        "600003.SH": [],
+    }
+    for symbol, ranges in coverage.items():
+        _publish_latest(fake_minio, db, symbol, ranges)
+    # 已登记但未发布为 latest 的批次对象，读取端看不到，不计入覆盖
+    _index(
+        db,
+        dataset="market_daily",
+        object_key="datahub/normalized/dataset=market_daily/symbol=600004.SH/batch_id=unpublished.parquet",
+        symbol="600004.SH",
+        start_date=WINDOW_START,
+        end_date=WINDOW_END,
+        row_count=len(_calendar_days(WINDOW_START, WINDOW_END)),
+    )
+    db.commit()
+    yield db
+    db.close()
+
+
+def test_scan_finds_coalesced_gaps_in_served_latest_objects(gap_db) -> None:
+    result = MarketDailyGapService(gap_db).scan(start_date=WINDOW_START, end_date=WINDOW_END)
+    days = _calendar_days(WINDOW_START, WINDOW_END)
+
+    assert result.trading_days == len(days)
+    assert result.expected_count == 4  # 暂停上市且未退市的证券不纳入
+    assert _as_tuples(result.ranges) == [
+        ("600000.SH", date(2026, 3, 11), date(2026, 3, 19), 7),
+        ("600002.SH", date(2026, 5, 4), date(2026, 5, 15), 10),
+        ("600004.SH", days[0], days[-1], len(days)),
+    ]
+    assert result.missing_symbol_count == 3
+    assert result.missing_days == 7 + 10 + len(days)
+
+
+def test_scan_matches_reference_on_random_holes(fake_minio, datahub_session_factory, no_provider_calls, monkeypatch) -> None:
+    db = datahub_session_factory()
+    _publish_calendar(fake_minio, db, WINDOW_START, WINDOW_END)
+    rng = random.Random(7)
+    days = _calendar_days(WINDOW_START, WINDOW_END)
+    securities, universe, coverage = [], {}, {}
+    for index in range(240):
+        symbol = f"{index:06d}.SZ"
+        list_date = rng.choice([date(2000, 1, 1), days[rng.randrange(len(days))]])
+        securities.append(_security(symbol, list_date=list_date))
+        universe[symbol] = (max(WINDOW_START, list_date), WINDOW_END)
+        # 随机切出 0~4 个洞，其余日期由若干对象覆盖（对象之间可重叠）
+        cuts = sorted(rng.sample(range(len(days)), rng.randrange(0, 9)))
+        ranges, cursor = [], 0
+        for hole_start, hole_end in zip(cuts[::2], cuts[1::2]):
+            if cursor < hole_start:
+                ranges.append((days[cursor], days[hole_start - 1]))
+            cursor = hole_end + 1
+        if cursor < len(days) and rng.random() < 0.9:
+            ranges.append((days[cursor], days[-1]))
+        coverage[symbol] = ranges
+        _publish_latest(fake_minio, db, symbol, ranges)
+    db.commit()
+    _publish_security_master(fake_minio, securities)
+    monkeypatch.setattr(MarketDailyGapService, "SCAN_CHUNK_SYMBOLS", 64)
+
+    result = MarketDailyGapService(db).scan(start_date=WINDOW_START, end_date=WINDOW_END)
+
+    assert _as_tuples(result.ranges) == _reference_gaps(universe, coverage, days)
+    db.close()
+
+
+def test_scan_resumes_from_checkpoint_after_interruption(gap_db, monkeypatch) -> None:
+    monkeypatch.setattr(MarketDailyGapService, "SCAN_CHUNK_SYMBOLS", 2)
+    expected = MarketDailyGapService(gap_db).scan(start_date=WINDOW_START, end_date=WINDOW_END, resume=False)
+
+    scanned_chunks: list[list[str]] = []
+    original = MarketDailyGapService._scan_chunk
+
+    def interrupted(self, chunk, universe, trading_days):
+        scanned_chunks.append(list(chunk))
+        if len(scanned_chunks) == 2:
+            raise RuntimeError("worker killed")
+        return original(self, chunk, universe, trading_days)
+
+    monkeypatch.setattr(MarketDailyGapService, "_scan_chunk", interrupted)
+    with pytest.raises(RuntimeError):
+        MarketDailyGapService(gap_db).scan(start_date=WINDOW_START, end_date=WINDOW_END, resume=False)
+    monkeypatch.setattr(MarketDailyGapService, "_scan_chunk", original)
+
+    resumed = MarketDailyGapService(gap_db).scan(start_date=WINDOW_START, end_date=WINDOW_END)
+
+    assert resumed.resumed_from == 2
+    assert resumed.ranges == expected.ranges
+    # 已完成的扫描不再续跑，下一次从头开始
+    assert MarketDailyGapService(gap_db).scan(start_date=WINDOW_START, end_date=WINDOW_END).resumed_from == 0
+
+
+def test_scan_ignores_checkpoint_when_inputs_changed(gap_db, monkeypatch) -> None:
+    monkeypatch.setattr(MarketDailyGapService, "SCAN_CHUNK_SYMBOLS", 2)
+    service = MarketDailyGapService(gap_db)
+    checkpoint_key = service.checkpoint_key(WINDOW_START, WINDOW_END)
+    service.store.put_bytes(
+        object_key=checkpoint_key,
+        data=json.dumps({"fingerprint": "stale", "cursor": 2, "completed": False, "ranges": []}).encode("utf-8"),
+    )
+
+    result = service.scan(start_date=WINDOW_START, end_date=WINDOW_END)
+
+    assert result.resumed_from == 0
+    assert len(result.ranges) == 3
+
+
+def test_scan_rejects_window_without_calendar_coverage(gap_db) -> None:
+    with pytest.raises(BusinessException):
+        MarketDailyGapService(gap_db).scan(start_date=date(2025, 6, 1), end_date=WINDOW_END)
+
+
+def test_plan_sizes_runs_by_estimated_cost_and_bridges_small_gaps(gap_db) -> None:
+    service = MarketDailyGapService(gap_db)
+    days = _calendar_days(WINDOW_START, WINDOW_END)
+    overhead = service.REQUEST_OVERHEAD_DAYS
+
+    def gap(symbol: str, first: int, last: int) -> MarketDailyGapRange:
+        return MarketDailyGapRange(symbol=symbol, start_date=days[first], end_date=days[last], trading_days=last - first + 1)
+
+    ranges = [gap(f"{index:06d}.SH", 0, len(days) - 1) for index in range(10)]
+    ranges += [gap(f"{index:06d}.SZ", 10, 14) for index in range(30)]
+    # 两个洞之间只隔 3 个已覆盖交易日：合并为一次请求；隔得远的保持独立
+    ranges += [gap("300001.SZ", 40, 44), gap("300001.SZ", 48, 50), gap("300001.SZ", 100, 101)]
+
+    full_cost = overhead + len(days)
+    runs = service.plan_fill_runs(ranges, days, max_run_cost=full_cost * 4)
+
+    full_runs = [run for run in runs if run.start_date == days[0] and run.end_date == days[-1]]
+    assert [len(run.symbols) for run in full_runs] == [4, 4, 2]
+    short_runs = [run for run in runs if run.start_date == days[10]]
+    # 短窗口单 symbol 成本低，同一预算下单个作业容纳更多 symbol
+    per_run = (full_cost * 4) // (overhead + 5)
+    assert [len(run.symbols) for run in short_runs] == [per_run, 30 - per_run]
+    assert short_runs[0].estimated_cost == per_run * (overhead + 5)
+    # 同一 symbol 的全部缺口合并为一个窗口，避免多个作业并发覆盖其 latest 对象
+    bridged = [(run.start_date, run.end_date) for run in runs if run.symbols == ["300001.SZ"]]
+    assert bridged == [(days[40], days[101])]
+    assert all(run.estimated_cost <= full_cost * 4 for run in runs)
+
+    capped = service.plan_fill_runs(ranges, days, max_run_cost=full_cost * 4, max_symbols_per_run=8)
+    assert max(len(run.symbols) for run in capped) == 8
+
+
+def test_fill_missing_enqueues_cost_sized_backfill_runs(gap_db) -> None:
+    result = DatahubService(gap_db).fill_market_daily_missing(start_date=WINDOW_START, end_date=WINDOW_END)
+
+    assert result.symbols == ["600000.SH", "600002.SH", "600004.SH"]
+    assert result.created_runs == len(result.runs) == 3
+    params = sorted(
+        (row.job_params["start_date"], row.job_params["end_date"], tuple(row.job_params["symbols"]))
+        for row in gap_db.query(DatahubJobRun).filter(DatahubJobRun.trigger_source == "auto-fill-missing").all()
+    )
+    assert params == [
+        ("2026-01-02", "2026-06-30", ("600004.SH",)),
+        ("2026-03-11", "2026-03-19", ("600000.SH",)),
+        ("2026-05-04", "2026-05-15", ("600002.SH",)),
+    ]
+    assert all(
+        row.job_params["merge_latest"]
+        for row in gap_db.query(DatahubJobRun).filter(DatahubJobRun.trigger_source == "auto-fill-missing").all()
+    )
+
+    summary = DatahubService(gap_db).scan_market_daily_missing(start_date=WINDOW_START, end_date=WINDOW_END, limit=2)
+    assert summary.missing_count == 3 and summary.existing_count == 1
+    assert summary.missing_symbols == ["600000.SH", "600002.SH"]
+    assert len(summary.missing_ranges) == 2
+
+
+class CalendarProvider:
+    """按交易日历返回日线的假 provider，可跳过指定日期模拟源站缺数。"""
+
+    def __init__(self, skip: set[date] | None = None) -> None:
+        self.skip = skip or set()
+
+    def get_daily_bars(self, symbol: str, start_date: date, end_date: date) -> list[dict]:
+        return [
+            {
+                "symbol": symbol,
+                "trade_date": day,
+                "open": 10.0,
+                "high": 11.0,
+                "low": 9.0,
+                "close": 10.5,
+                "volume": 1000.0,
+                "amount": 10500.0,
+                "turnover_rate": 1.0,
+            }
+            for day in _calendar_days(start_date, end_date)
+            if day not in self.skip
+        ]
+
+
+def _execute_backfill(db, payload: TriggerBackfillRequest, provider: CalendarProvider) -> None:
+    run = DatahubService(db).create_backfill_job(payload)
+    service = MarketDailyBackfillService(db, max_workers=1)
+    service.providers = {"baostock": provider}
+    service.execute(run.id, payload)
+
+
+def test_gap_fill_merges_into_latest_object_without_moving_watermark_back(gap_db) -> None:
+    symbol = "600004.SH"
+    hole = set(_calendar_days(date(2026, 3, 11), date(2026, 3, 19)))
+    _execute_backfill(
+        gap_db,
+        TriggerBackfillRequest(dataset="market_daily", start_date=WINDOW_START, end_date=WINDOW_END, symbols=[symbol]),
+        CalendarProvider(skip=hole),
+    )
+    scan = MarketDailyGapService(gap_db).scan(start_date=WINDOW_START, end_date=WINDOW_END, resume=False)
+    assert [item for item in _as_tuples(scan.ranges) if item[0] == symbol] == [
+        (symbol, date(2026, 3, 11), date(2026, 3, 19), len(hole))
+    ]
+
+    DatahubService(gap_db).fill_market_daily_missing(start_date=WINDOW_START, end_date=WINDOW_END, resume=False)
+    fill_run = next(
+        row
+        for row in gap_db.query(DatahubJobRun).filter(DatahubJobRun.trigger_source == "auto-fill-missing").all()
+        if symbol in row.job_params["symbols"]
+    )
+    payload = TriggerBackfillRequest(**fill_run.job_params)
+    service = MarketDailyBackfillService(gap_db, max_workers=1)
+    service.providers = {"baostock": CalendarProvider()}
+    service.execute(fill_run.id, payload)
+
+    bars = MarketDailyReadService(gap_db).get_bars(symbol=symbol, start_date=WINDOW_START, end_date=WINDOW_END)
+    assert [bar["trade_date"] for bar in bars] == _calendar_days(WINDOW_START, WINDOW_END)
+    watermark = gap_db.query(DatahubDatasetWatermark).filter(DatahubDatasetWatermark.symbol == symbol).one()
+    assert watermark.last_success_date == _calendar_days(WINDOW_START, WINDOW_END)[-1]
+    rescan = MarketDailyGapService(gap_db).scan(start_date=WINDOW_START, end_date=WINDOW_END, resume=False)
+    assert symbol not in {item.symbol for item in rescan.ranges}
+
+
+def test_benchmark_scan_5000_symbols(fake_minio, datahub_session_factory, no_provider_calls) -> None:
+    db = datahub_session_factory()
+    window_start = date(2021, 1, 4)
+    _publish_calendar(fake_minio, db, date(2021, 1, 1), WINDOW_END)
+    _publish_security_master(fake_minio, [_security(f"{index:06d}.SH") for index in range(5000)])
+    full_days = len(_calendar_days(window_start, WINDOW_END))
+    # 大多数 symbol 的 latest 对象行数与区间交易日数一致，只按对象索引判定；每 50 个有一个带洞，需读对象
+    holed = {index for index in range(0, 5000, 50)}
+    for index in holed:
+        _publish_latest(
+            fake_minio,
+            db,
+            f"{index:06d}.SH",
+            [(window_start, date(2023, 6, 30)), (date(2023, 7, 1 + index % 20), WINDOW_END)],
+        )
+    full = [index for index in range(5000) if index not in holed]
+    db.bulk_insert_mappings(
+        DatahubObjectIndex,
+        [
+            {
+                "bucket": "datahub-test",
+                "object_key": f"k/{index}",
+                "dataset": "market_daily",
+                "layer": "normalized",
+                "symbol": f"{index:06d}.SH",
+                "start_date": window_start,
+                "end_date": WINDOW_END,
+                "row_count": full_days,
+                "schema_version": "1.0",
+            }
+            for index in full
+        ],
+    )
+    db.bulk_insert_mappings(
+        DatahubDatasetWatermark,
+        [{"dataset": "market_daily", "symbol": f"{index:06d}.SH", "last_object_key": f"k/{index}"} for index in full],
+    )
+    db.commit()
+
+    result = MarketDailyGapService(db).scan(start_date=window_start, end_date=WINDOW_END)
+
+    assert result.expected_count == 5000
+    assert {item.symbol for item in result.ranges} == {f"{index:06d}.SH" for index in holed if index % 20 != 0}
+    assert not any(key.startswith("k/") for key in fake_minio.get_calls)
+    db.close()
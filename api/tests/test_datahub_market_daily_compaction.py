@@ -0,0 +1,240 @@
+import json
+from datetime import date, timedelta
+from io import BytesIO
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.core.config import get_settings
+from app.datahub.models import DatahubDatasetWatermark, DatahubObjectIndex
+from app.datahub.services.market_daily_compaction_service import MarketDailyCompactionService
+from app.datahub.services.market_daily_read_service import MarketDailyReadService
+from app.datahub.services.storage_service import DatahubStorageService
+from app.datahub.storage import MinioParquetStore, get_manifest_cache, get_parquet_table_cache
+
+SYMBOLS = ["000001.SZ", "000002.SZ", "300750.SZ", "600000.SH", "600519.SH", "688981.SH"]
+RANGES = [
+    (date(2026, 3, 1), date(2026, 6, 30)),
+    (date(2026, 4, 10), date(2026, 5, 3)),
+    (date(2026, 6, 1), date(2026, 6, 30)),
+    (date(2026, 5, 31), date(2026, 5, 31)),
+]
+
+
+def _publish(db, symbol: str, batch_id: str, start: date, days: int, base: float = 10.0) -> str:
+    rows = [
+        {
+            "symbol": symbol,
+            "trade_date": start + timedelta(days=offset),
+            "open": base + offset,
+            "high": base + offset + 1,
+            "low": base + offset - 1,
+            "close": base + offset + 0.5,
+            "volume": 1000.0 + offset,
+            "amount": 10000.0 + offset,
+            "turnover_rate": None if offset % 7 == 0 else 1.5,
+        }
+        for offset in range(days)
+        if (start + timedelta(days=offset)).weekday() < 5
+    ]
+    object_key = f"datahub/normalized/dataset=market_daily/year=2026/month=06/symbol={symbol}/batch_id={batch_id}.parquet"
+    sink = BytesIO()
+    pq.write_table(pa.Table.from_pylist(rows), sink)
+    MinioParquetStore().put_bytes(object_key, sink.getvalue())
+    storage = DatahubStorageService(db)
+    storage.upsert_object_index(
+        bucket="datahub-test",
+        object_key=object_key,
+        dataset="market_daily",
+        layer="normalized",
+        symbol=symbol,
+        start_date=start,
+        end_date=start + timedelta(days=days - 1),
+        row_count=len(rows),
+    )
+    storage.publish_latest_manifest(
+        dataset="market_daily",
+        symbol=symbol,
+        object_key=object_key,
+        schema_version="1.0",
+        quality_score=100.0,
+        start_date=start,
+        end_date=start + timedelta(days=days - 1),
+    )
+    return object_key
+
+
+def _read_all(db) -> dict:
+    reader = MarketDailyReadService(db)
+    return {
+        (symbol, start, end): reader.get_bars(symbol=symbol, start_date=start, end_date=end)
+        for symbol in SYMBOLS
+        for start, end in RANGES
+    }
+
+
+@pytest.fixture
+def monthly_layout(monkeypatch):
+    def switch(layout: str) -> None:
+        monkeypatch.setattr(get_settings(), "DATAHUB_MARKET_DAILY_LAYOUT", layout)
+        get_parquet_table_cache().clear()
+
+    yield switch
+
+
+def test_monthly_layout_reads_match_per_symbol_layout(fake_minio, datahub_session_factory, monthly_layout) -> None:
+    db = datahub_session_factory()
+    per_symbol_keys = {}
+    for index, symbol in enumerate(SYMBOLS):
+        # 第 4 个 symbol 在 2026-05 起才上市，覆盖“某月无数据”的情况
+        start = date(2026, 5, 4) if index == 3 else date(2026, 3, 16)
+        per_symbol_keys[symbol] = _publish(db, symbol, f"backfill-2026062000000{index}", start, 90, base=10.0 * (index + 1))
+
+    monthly_layout("per_symbol")
+    expected = _read_all(db)
+
+    result = MarketDailyCompactionService(db).compact(start_date=date(2026, 3, 1), end_date=date(2026, 6, 30))
+    assert result.symbol_count == 0  # 无水位时不会隐式扫描全部对象
+
+    # 2026-02 无任何数据，不写空的月度对象
+    result = MarketDailyCompactionService(db).compact(
+        start_date=date(2026, 2, 1),
+        end_date=date(2026, 6, 30),
+        symbols=SYMBOLS,
+    )
+    assert result.symbol_count == len(SYMBOLS)
+    assert result.month_count == 4
+    assert MarketDailyReadService.monthly_manifest_key(2026, 2) not in fake_minio.objects
+    assert not any("month=02" in key for key in fake_minio.objects if "layout=monthly" in key)
+
+    monthly_layout("monthly")
+    fake_minio.get_calls.clear()
+    assert _read_all(db) == expected
+    assert all(fake_minio.get_calls[key] == 0 for key in per_symbol_keys.values())
+    assert sum(count for key, count in fake_minio.get_calls.items() if key.endswith(".parquet")) == result.month_count
+
+    june = json.loads(fake_minio.objects[MarketDailyReadService.monthly_manifest_key(2026, 6)])
+    metadata = pq.ParquetFile(BytesIO(fake_minio.objects[june["object_key"]])).metadata
+    assert metadata.row_group(0).column(0).statistics.has_min_max
+    assert list(june["symbols"]) == sorted(SYMBOLS)
+    lock_row = (
+        db.query(DatahubDatasetWatermark)
+        .filter(DatahubDatasetWatermark.dataset == "market_daily_monthly", DatahubDatasetWatermark.symbol == "2026-06")
+        .one()
+    )
+    assert lock_row.last_object_key == june["object_key"]
+
+
+def test_stale_partition_falls_back_and_incremental_compaction_merges(
+    fake_minio, datahub_session_factory, monthly_layout
+) -> None:
+    db = datahub_session_factory()
+    for index, symbol in enumerate(SYMBOLS):
+        _publish(db, symbol, f"backfill-2026062000000{index}", date(2026, 3, 16), 90, base=10.0 * (index + 1))
+    service = MarketDailyCompactionService(db)
+    service.compact(start_date=date(2026, 3, 1), end_date=date(2026, 6, 30), symbols=SYMBOLS)
+    old_month_keys = {
+        json.loads(fake_minio.objects[MarketDailyReadService.monthly_manifest_key(2026, month)])["object_key"]
+        for month in range(3, 7)
+    }
+
+    old_key = json.loads(
+        fake_minio.objects["datahub/normalized/dataset=market_daily/latest/symbol=600000.SH.json"]
+    )["object_key"]
+    _publish(db, "600000.SH", "daily-20260621000000", date(2026, 3, 16), 96, base=99.0)
+
+    monthly_layout("per_symbol")
+    expected = _read_all(db)
+    monthly_layout("monthly")
+    assert _read_all(db) == expected
+
+    result = service.compact(
+        start_date=date(2026, 3, 1),
+        end_date=date(2026, 6, 30),
+        symbols=["600000.SH"],
+        prune_superseded=True,
+    )
+    # 显式清理：被最新批次完全覆盖的单 symbol 批次 + 被替换下来的 4 个旧月度对象
+    assert result.pruned_objects == 1 + len(old_month_keys)
+    assert old_key not in fake_minio.objects
+    assert not old_month_keys & set(fake_minio.objects)
+    assert db.query(DatahubObjectIndex).filter(DatahubObjectIndex.object_key == old_key).count() == 0
+
+    monthly_layout("monthly")
+    fake_minio.get_calls.clear()
+    assert _read_all(db) == expected
+    assert all("symbol=" not in key for key, count in fake_minio.get_calls.items() if key.endswith(".parquet") and count)
+
+
+def test_month_merge_rereads_manifest_written_by_other_process(
+    fake_minio, datahub_session_factory, monthly_layout
+) -> None:
+    db = datahub_session_factory()
+    for index, symbol in enumerate(SYMBOLS):
+        _publish(db, symbol, f"backfill-2026062000000{index}", date(2026, 6, 1), 30, base=10.0 * (index + 1))
+    manifest_key = MarketDailyReadService.monthly_manifest_key(2026, 6)
+    MarketDailyCompactionService(db).compact(start_date=date(2026, 6, 1), end_date=date(2026, 6, 30), symbols=SYMBOLS[:3])
+    reader = MarketDailyReadService(db)
+    assert list(reader.load_monthly_manifest(2026, 6)["symbols"]) == SYMBOLS[:3]
+    stale_entry = get_manifest_cache()._entries[manifest_key]
+
+    # 其他进程合并了另外 3 个 symbol；本进程的 manifest 缓存仍停留在旧版本
+    MarketDailyCompactionService(datahub_session_factory()).compact(
+        start_date=date(2026, 6, 1), end_date=date(2026, 6, 30), symbols=SYMBOLS[3:]
+    )
+    get_manifest_cache()._entries[manifest_key] = stale_entry
+
+    MarketDailyCompactionService(db).compact(start_date=date(2026, 6, 1), end_date=date(2026, 6, 30), symbols=SYMBOLS[:1])
+    assert list(json.loads(fake_minio.objects[manifest_key])["symbols"]) == sorted(SYMBOLS)
+
+
+def test_compaction_keeps_history_by_default_and_never_prunes_uncovered_batches(
+    fake_minio, datahub_session_factory
+) -> None:
+    db = datahub_session_factory()
+    backfill_key = _publish(db, "600000.SH", "backfill-20260620000000", date(2026, 3, 16), 90)
+    service = MarketDailyCompactionService(db)
+    service.compact(start_date=date(2026, 3, 1), end_date=date(2026, 6, 30), symbols=["600000.SH"])
+
+    # 日常增量只写出最近几天的窄对象，不能替代更宽的历史回填
+    _publish(db, "600000.SH", "daily-20260621000000", date(2026, 6, 15), 5, base=99.0)
+    result = service.compact(start_date=date(2026, 6, 1), end_date=date(2026, 6, 30), symbols=["600000.SH"])
+    assert result.pruned_objects == 0
+    assert backfill_key in fake_minio.objects
+
+    service.compact(
+        start_date=date(2026, 6, 1), end_date=date(2026, 6, 30), symbols=["600000.SH"], prune_superseded=True
+    )
+    assert backfill_key in fake_minio.objects
+    assert db.query(DatahubObjectIndex).filter(DatahubObjectIndex.object_key == backfill_key).count() == 1
+
+
+def test_manifest_lagging_committed_month_object_is_rebuilt_from_it(
+    fake_minio, datahub_session_factory, monkeypatch
+) -> None:
+    db = datahub_session_factory()
+    for index, symbol in enumerate(SYMBOLS):
+        _publish(db, symbol, f"backfill-2026062000000{index}", date(2026, 6, 1), 30, base=10.0 * (index + 1))
+    manifest_key = MarketDailyReadService.monthly_manifest_key(2026, 6)
+    MarketDailyCompactionService(db).compact(start_date=date(2026, 6, 1), end_date=date(2026, 6, 30), symbols=SYMBOLS[:3])
+    published = json.loads(fake_minio.objects[manifest_key])
+
+    # 另一进程提交了对象索引与水位行后、发布 manifest 前中断
+    crashed = MarketDailyCompactionService(datahub_session_factory())
+    monkeypatch.setattr(crashed, "_publish_month_manifest", lambda *args: None)
+    crashed.compact(start_date=date(2026, 6, 1), end_date=date(2026, 6, 30), symbols=SYMBOLS[3:])
+    assert json.loads(fake_minio.objects[manifest_key]) == published
+    committed_key = (
+        db.query(DatahubDatasetWatermark)
+        .filter(DatahubDatasetWatermark.dataset == "market_daily_monthly", DatahubDatasetWatermark.symbol == "2026-06")
+        .one()
+        .last_object_key
+    )
+    assert committed_key != published["object_key"]
+    assert db.query(DatahubObjectIndex).filter(DatahubObjectIndex.object_key == committed_key).count() == 1
+
+    MarketDailyCompactionService(db).compact(start_date=date(2026, 6, 1), end_date=date(2026, 6, 30), symbols=SYMBOLS[:1])
+    manifest = json.loads(fake_minio.objects[manifest_key])
+    assert list(manifest["symbols"]) == sorted(SYMBOLS)
+    assert manifest["symbols"]["600000.SH"]["source_object_key"] is None
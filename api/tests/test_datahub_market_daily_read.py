@@ -0,0 +1,128 @@
+import os
+import time
+from datetime import date, datetime, timedelta
+from io import BytesIO
+from typing import Any
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytest
+
+from app.datahub.services.market_daily_read_service import MarketDailyReadService
+
+
+def _legacy_get_bars(raw: bytes, symbol: str, start_date: date, end_date: date) -> list[dict[str, Any]]:
+    """改造前的逐行实现，作为一致性与性能基线。"""
+
+    def to_date(value: Any) -> date | None:
+        if value is None:
+            return None
+        if isinstance(value, datetime):
+            return value.date()
+        if isinstance(value, date):
+            return value
+        if isinstance(value, str):
+            return datetime.strptime(value[:10], "%Y-%m-%d").date()
+        return None
+
+    filtered = []
+    for row in pq.read_table(BytesIO(raw)).to_pylist():
+        trade_date = to_date(row.get("trade_date"))
+        if trade_date is None or trade_date < start_date or trade_date > end_date:
+            continue
+        filtered.append(
+            {
+                "symbol": symbol,
+                "trade_date": trade_date,
+                "open": float(row.get("open") or 0),
+                "high": float(row.get("high") or 0),
+                "low": float(row.get("low") or 0),
+                "close": float(row.get("close") or 0),
+                "volume": float(row.get("volume") or 0),
+                "amount": float(row.get("amount") or 0),
+                "turnover_rate": float(row.get("turnover_rate") or 0) if row.get("turnover_rate") not in (None, "") else None,
+            }
+        )
+    filtered.sort(key=lambda item: item["trade_date"])
+    return filtered
+
+
+def _to_parquet(table: pa.Table) -> bytes:
+    sink = BytesIO()
+    pq.write_table(table, sink, compression="snappy")
+    return sink.getvalue()
+
+
+def _synthetic_symbol_bytes(symbol: str, days: int) -> bytes:
+    start = date(2016, 1, 1)
+    return _to_parquet(
+        pa.table(
+            {
+                "symbol": [symbol] * days,
+                "trade_date": [start + timedelta(days=offset) for offset in range(days)],
+                "open": [10.0 + offset * 0.01 for offset in range(days)],
+                "high": [10.5 + offset * 0.01 for offset in range(days)],
+                "low": [9.5 + offset * 0.01 for offset in range(days)],
+                "close": [10.2 + offset * 0.01 for offset in range(days)],
+                "volume": [1000.0 + offset for offset in range(days)],
+                "amount": [10200.0 + offset for offset in range(days)],
+                "turnover_rate": [1.5] * days,
+            }
+        )
+    )
+
+
+def test_vectorized_read_matches_legacy_row_path() -> None:
+    raw = _to_parquet(
+        pa.table(
+            {
+                "symbol": ["600000.SH"] * 6,
+                "trade_date": ["2026-06-19", "2026-06-17 00:00:00", None, "2026-06-18", "2026-06-17", "2026-05-01"],
+                "open": ["10.1", "9.9", "1", "", None, "8"],
+                "high": [11.0, 10.0, 1.0, 10.5, 10.2, 8.5],
+                "low": [9.0, 9.5, 1.0, 9.8, 9.7, 7.5],
+                "close": [10.5, 9.8, 1.0, 10.2, 9.9, 8.0],
+                "volume": [1000, 900, 1, 950, None, 800],
+                "amount": [10500.0, 8800.0, 1.0, 9700.0, 9000.0, 6400.0],
+                "turnover_rate": ["2.1", "", "1", None, "0", "1.2"],
+            }
+        )
+    )
+    table = MarketDailyReadService._load_normalized_table(raw)
+
+    for start_date, end_date in [(date(2026, 6, 1), date(2026, 6, 30)), (date(2026, 1, 1), date(2026, 12, 31))]:
+        dates = table.column("trade_date")
+        window = table.filter(
+            pc.and_(pc.greater_equal(dates, start_date), pc.less_equal(dates, end_date))
+        )
+        assert MarketDailyReadService._to_bar_dicts(window, "600000.SH") == _legacy_get_bars(
+            raw, "600000.SH", start_date, end_date
+        )
+
+
+@pytest.mark.benchmark
+def test_vectorized_read_throughput_against_legacy() -> None:
+    """10 年日线、多 symbol 合成数据的 rows/s 对比；DATAHUB_BENCH_SYMBOLS=5000 可跑全量规模。"""
+    symbol_count = int(os.getenv("DATAHUB_BENCH_SYMBOLS", "20"))
+    days = 3650
+    payloads = [_synthetic_symbol_bytes(f"{600000 + index:06d}.SH", days) for index in range(symbol_count)]
+    start_date, end_date = date(2024, 1, 1), date(2024, 3, 31)
+
+    started = time.perf_counter()
+    legacy = [_legacy_get_bars(raw, "X", start_date, end_date) for raw in payloads]
+    legacy_elapsed = time.perf_counter() - started
+
+    started = time.perf_counter()
+    vectorized = []
+    for raw in payloads:
+        table = MarketDailyReadService._load_normalized_table(raw)
+        dates = table.column("trade_date")
+        window = table.filter(
+            pc.and_(pc.greater_equal(dates, start_date), pc.less_equal(dates, end_date))
+        )
+        vectorized.append(MarketDailyReadService._to_bar_dicts(window, "X"))
+    vectorized_elapsed = time.perf_counter() - started
+
+    assert vectorized == legacy
+    assert vectorized_elapsed < legacy_elapsed
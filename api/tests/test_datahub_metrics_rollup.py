@@ -0,0 +1,317 @@
+import math
+import random
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import insert
+
+from app.datahub.models import DatahubJobMetricsHourly, DatahubJobRun, DatahubJobTask
+from app.datahub.services.datahub_service import DatahubService
+from app.datahub.services.metrics_rollup_service import DatahubMetricsRollupService, classify_error, hour_floor
+from app.datahub.services.retention_service import DatahubRetentionService
+
+WINDOW_DAYS = 7
+BENCHMARK_RUNS = 50_000
+TASK_ERRORS = [
+    None,
+    "market_daily 获取失败: baostock 获取失败: read timed out | eastmoney 处于熔断冷却",
+    "market_daily 获取失败: eastmoney 查询结果为空 | minio_cache 无可用稳定快照",
+    "未获取到任何 market_daily 数据",
+]
+
+
+def _legacy_run_metrics(db, window_days: int) -> dict:
+    """改造前 get_metrics_summary 的作业口径：加载窗口内全部作业后在 Python 中统计。"""
+    window_start = datetime.now(timezone.utc) - timedelta(days=window_days)
+    runs = db.query(DatahubJobRun).filter(DatahubJobRun.created_at >= window_start).all()
+    durations = sorted(
+        max(0.0, (row.finished_at - row.started_at).total_seconds()) for row in runs if row.started_at and row.finished_at
+    )
+    p95 = durations[min(len(durations) - 1, max(0, math.ceil(len(durations) * 0.95) - 1))] if durations else 0.0
+    statuses = Counter(row.status for row in runs)
+    return {
+        "total_runs": len(runs),
+        "success_runs": statuses["success"],
+        "failed_runs": statuses["failed"],
+        "running_runs": statuses["running"],
+        "avg_duration_seconds": (sum(durations) / len(durations)) if durations else 0.0,
+        "p95_duration_seconds": p95,
+        "run_ids": {row.id for row in runs},
+    }
+
+
+def _legacy_task_metrics(db, run_ids: set[str]) -> tuple[Counter, Counter, Counter]:
+    statuses: Counter = Counter()
+    by_class: Counter = Counter()
+    by_provider: Counter = Counter()
+    for task in db.query(DatahubJobTask).filter(DatahubJobTask.job_run_id.in_(run_ids)).all():
+        statuses[task.status] += 1
+        if task.status == "failed":
+            provider, error_class = classify_error(task.last_error)
+            by_class[error_class or "other"] += 1
+            if provider:
+                by_provider[provider] += 1
+    return statuses, by_class, by_provider
+
+
+def _seed_history(
+    db,
+    rng: random.Random,
+    count: int,
+    *,
+    now: datetime,
+    tasks_per_run: int = 3,
+    finished_after: datetime | None = None,
+) -> None:
+    """finished_after：模拟汇总之后才结束的作业，结束时间全部晚于该时刻。"""
+    run_rows = []
+    task_rows = []
+    for index in range(count):
+        run_id = str(uuid.uuid4())
+        status = rng.choice(["success", "success", "success", "failed", "skipped", "running", "pending"])
+        if status in {"running", "pending"}:
+            created_at = now - timedelta(minutes=rng.randint(5, 600))
+            started_at = created_at if status == "running" else None
+            finished_at = None
+        else:
+            created_at = now - timedelta(minutes=rng.randint(180, (WINDOW_DAYS + 3) * 24 * 60))
+            started_at = created_at + timedelta(seconds=rng.randint(0, 60))
+            finished_at = started_at + timedelta(seconds=rng.uniform(0.5, 3600))
+            if finished_after is not None and finished_at <= finished_after:
+                finished_at = finished_after + timedelta(seconds=rng.uniform(0.5, 3600))
+                started_at = finished_at - timedelta(seconds=rng.uniform(0.5, 3600))
+        run_rows.append(
+            {
+                "id": run_id,
+                "job_type": "backfill",
+                "dataset": rng.choice(["market_daily", "money_flow"]),
+                "status": status,
+                "created_at": created_at,
+                "started_at": started_at,
+                "finished_at": finished_at,
+                "error_message": "partial_failed: success=1, failed=2" if status == "failed" else None,
+                "task_total": tasks_per_run,
+                "task_success": 0,
+                "task_failed": 0,
+            }
+        )
+        for task_index in range(tasks_per_run):
+            task_status = "failed" if status == "failed" and task_index else rng.choice(["success", status])
+            task_rows.append(
+                {
+                    "id": str(uuid.uuid4()),
+                    "job_run_id": run_id,
+                    "dataset": "market_daily",
+                    "symbol": f"{index:06d}.SH",
+                    "status": task_status,
+                    "attempts": 1,
+                    "last_error": rng.choice(TASK_ERRORS[1:]) if task_status == "failed" else None,
+                }
+            )
+    db.execute(insert(DatahubJobRun), run_rows)
+    if task_rows:
+        db.execute(insert(DatahubJobTask), task_rows)
+    db.commit()
+
+
+def _assert_summary_matches_legacy(db) -> None:
+    legacy = _legacy_run_metrics(db, WINDOW_DAYS)
+    summary = DatahubService(db).get_metrics_summary(window_days=WINDOW_DAYS)
+
+    assert summary.total_runs == legacy["total_runs"]
+    assert summary.success_runs == legacy["success_runs"]
+    assert summary.failed_runs == legacy["failed_runs"]
+    assert summary.running_runs == legacy["running_runs"]
+    assert math.isclose(summary.avg_duration_seconds, legacy["avg_duration_seconds"], rel_tol=1e-9)
+    # 直方图分位数：不低于真实值，相对误差不超过一个桶宽
+    assert legacy["p95_duration_seconds"] <= summary.p95_duration_seconds <= legacy["p95_duration_seconds"] * 1.05 + 1e-9
+
+    statuses, by_class, by_provider = _legacy_task_metrics(db, legacy["run_ids"])
+    assert summary.task_status_counts == dict(statuses)
+    assert summary.failed_tasks_by_error_class == dict(by_class)
+    assert summary.failed_tasks_by_provider == dict(by_provider)
+
+
+def test_classify_error_picks_first_provider_segment() -> None:
+    assert classify_error(None) == ("", "")
+    assert classify_error(TASK_ERRORS[1]) == ("baostock", "timeout")
+    assert classify_error(TASK_ERRORS[2]) == ("eastmoney", "empty_result")
+    assert classify_error("market_daily 获取失败: eastmoney 处于熔断冷却 | baostock 获取失败: boom") == (
+        "eastmoney",
+        "cooldown",
+    )
+    assert classify_error("partial_failed: success=3, failed=1") == ("", "partial_failed")
+    assert classify_error(TASK_ERRORS[3]) == ("", "other")
+
+
+def test_rollup_summary_matches_on_demand_computation(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    rng = random.Random(7)
+    _seed_history(db, rng, 400, now=datetime.now(timezone.utc))
+
+    # 尚未汇总：全部走实时尾部
+    _assert_summary_matches_legacy(db)
+
+    service = DatahubMetricsRollupService(db, lag=timedelta(0), step=timedelta(hours=30))
+    rolled = service.refresh()
+    assert rolled == db.query(DatahubJobRun).filter(DatahubJobRun.finished_at.is_not(None)).count()
+    assert db.query(DatahubJobMetricsHourly).count() > 0
+    _assert_summary_matches_legacy(db)
+
+    # 水位之后新结束的作业由尾部补齐，刷新后并入小时表且不重复计数
+    _seed_history(db, rng, 50, now=datetime.now(timezone.utc), finished_after=datetime.now(timezone.utc))
+    _assert_summary_matches_legacy(db)
+    assert service.refresh(now=datetime.now(timezone.utc) + timedelta(hours=2)) > 0
+    _assert_summary_matches_legacy(db)
+    assert service.refresh(now=datetime.now(timezone.utc) + timedelta(hours=2)) == 0
+    _assert_summary_matches_legacy(db)
+    db.close()
+
+
+def test_backfill_rebuilds_same_rollup_as_incremental_refresh(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    rng = random.Random(11)
+    _seed_history(db, rng, 200, now=datetime.now(timezone.utc))
+    service = DatahubMetricsRollupService(db, lag=timedelta(0), step=timedelta(hours=6))
+    service.refresh()
+    _seed_history(db, rng, 100, now=datetime.now(timezone.utc), finished_after=datetime.now(timezone.utc))
+    service.refresh(now=datetime.now(timezone.utc) + timedelta(hours=2))
+
+    def snapshot() -> dict:
+        return {
+            (row.metric, row.bucket_start, row.dataset, row.status, row.provider, row.error_class): (
+                row.item_count,
+                row.duration_count,
+                round(row.duration_sum, 6),
+                row.duration_histogram,
+            )
+            for row in db.query(DatahubJobMetricsHourly).all()
+        }
+
+    incremental = snapshot()
+    assert service.backfill(now=datetime.now(timezone.utc) + timedelta(hours=2)) == db.query(DatahubJobRun).filter(DatahubJobRun.finished_at.is_not(None)).count()
+    assert snapshot() == incremental
+    _assert_summary_matches_legacy(db)
+    db.close()
+
+
+def test_backfill_after_purge_keeps_buckets_older_than_remaining_runs(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    _seed_history(db, random.Random(13), 300, now=datetime.now(timezone.utc))
+    service = DatahubMetricsRollupService(db, lag=timedelta(0), step=timedelta(hours=12))
+    # 分批小于分段内作业数，覆盖流式多批累加
+    service.TASK_QUERY_CHUNK = 7
+    service.refresh()
+
+    def run_totals() -> dict:
+        totals: Counter = Counter()
+        for row in db.query(DatahubJobMetricsHourly).filter(DatahubJobMetricsHourly.metric == "run").all():
+            totals[row.bucket_start] += row.item_count
+        return totals
+
+    before = run_totals()
+    finished = db.query(DatahubJobRun).filter(DatahubJobRun.finished_at.is_not(None)).count()
+    assert sum(before.values()) == finished
+
+    cutoff = hour_floor(datetime.now(timezone.utc) - timedelta(days=WINDOW_DAYS + 1))
+    purged, _ = DatahubRetentionService(db).purge_runs(statuses=["success", "failed", "skipped"], created_before=cutoff)
+    assert purged > 0
+
+    assert service.backfill() == finished - purged
+    after = run_totals()
+    # 已被清理作业所在的小时行不再有源数据，重建时原样保留，历史总量不变
+    assert sum(after.values()) == finished
+    assert after == before
+    _assert_summary_matches_legacy(db)
+    db.close()
+
+
+def test_concurrent_refresh_applies_each_run_once(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    other_db = datahub_session_factory()
+    _seed_history(db, random.Random(3), 60, now=datetime.now(timezone.utc))
+    service = DatahubMetricsRollupService(db, lag=timedelta(0))
+    stale_state = service._get_state()
+    stale_version = stale_state.version
+
+    DatahubMetricsRollupService(other_db, lag=timedelta(0)).refresh()
+    db.expire_all()
+    stale_state.version = stale_version
+    deltas, _ = service._aggregate_finished(datetime(2000, 1, 1, tzinfo=timezone.utc), datetime.now(timezone.utc))
+
+    assert service._advance(stale_state, datetime.now(timezone.utc), deltas) is False
+    _assert_summary_matches_legacy(db)
+    other_db.close()
+    db.close()
+
+
+def test_retry_failed_tasks_groups_failures_in_sql(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    run = DatahubJobRun(job_type="backfill", dataset="market_daily", status="failed")
+    db.add(run)
+    db.commit()
+    specs = [
+        ("600000.SH", date(2026, 1, 1), date(2026, 1, 31), "timeout", 1),
+        ("600001.SH", date(2026, 1, 1), date(2026, 1, 31), "timeout", 1),
+        ("600002.SH", date(2026, 1, 1), date(2026, 1, 31), "empty", 2),
+        ("600003.SH", date(2026, 2, 1), date(2026, 2, 28), None, 1),
+        ("600004.SH", date(2026, 2, 1), date(2026, 2, 28), "timeout", 3),
+        ("600005.SH", None, None, "timeout", 1),
+    ]
+    for symbol, start_date, end_date, error, attempts in specs:
+        db.add(
+            DatahubJobTask(
+                job_run_id=run.id,
+                dataset="market_daily",
+                symbol=symbol,
+                start_date=start_date,
+                end_date=end_date,
+                status="failed",
+                attempts=attempts,
+                last_error=error,
+            )
+        )
+    db.add(DatahubJobTask(job_run_id=run.id, dataset="market_daily", symbol="600006.SH", status="success", attempts=1))
+    db.commit()
+    service = DatahubService(db)
+
+    by_error = service.retry_failed_tasks(run.id, strategy="by_error")
+    assert (by_error.created_runs, by_error.retried_tasks, by_error.skipped_tasks) == (3, 5, 2)
+    assert by_error.retried_symbols == ["600000.SH", "600001.SH", "600002.SH", "600003.SH"]
+
+    immediate = service.retry_failed_tasks(run.id)
+    assert (immediate.created_runs, immediate.retried_tasks, immediate.skipped_tasks) == (2, 5, 2)
+    retried = sorted(
+        (row.job_params["start_date"], tuple(row.job_params["symbols"]))
+        for row in db.query(DatahubJobRun).filter(DatahubJobRun.trigger_source == f"retry:{run.id}").all()
+    )
+    assert retried == [
+        ("2026-01-01", ("600000.SH", "600001.SH")),
+        ("2026-01-01", ("600000.SH", "600001.SH", "600002.SH")),
+        ("2026-01-01", ("600002.SH",)),
+        ("2026-02-01", ("600003.SH",)),
+        ("2026-02-01", ("600003.SH",)),
+    ]
+    db.close()
+
+
+@pytest.mark.benchmark
+def test_benchmark_summary_from_rollup_vs_on_demand(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    _seed_history(db, random.Random(5), BENCHMARK_RUNS, now=datetime.now(timezone.utc), tasks_per_run=0)
+    DatahubMetricsRollupService(db, lag=timedelta(0)).refresh()
+
+    started = time.perf_counter()
+    legacy = _legacy_run_metrics(db, WINDOW_DAYS)
+    legacy_seconds = time.perf_counter() - started
+    db.expire_all()
+    started = time.perf_counter()
+    summary = DatahubService(db).get_metrics_summary(window_days=WINDOW_DAYS)
+    rollup_seconds = time.perf_counter() - started
+
+    assert summary.total_runs == legacy["total_runs"]
+    assert rollup_seconds < legacy_seconds
+    db.close()
@@ -0,0 +1,220 @@
+import json
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app.datahub.models import DatahubDatasetWatermark, DatahubObjectIndex
+from app.datahub.services.object_key_resolver import ObjectKeyResolver, latest_manifest_key
+from app.datahub.services.storage_service import DatahubStorageService
+from app.datahub.storage import ManifestCache, MinioParquetStore, get_manifest_cache
+
+SYMBOL = "600000.SH"
+OBJECT_KEY = "datahub/normalized/dataset=market_daily/symbol=600000.SH/batch_id=daily-20260630.parquet"
+
+
+def _legacy_resolve(db, symbol: str) -> str | None:
+    """改造前：manifest exists + get + 对象 exists，再依次探测水位与对象索引。"""
+    store = MinioParquetStore()
+    manifest_key = latest_manifest_key("market_daily", symbol)
+    if store.exists(manifest_key):
+        payload = json.loads(store.get_bytes(manifest_key).decode("utf-8"))
+        object_key = payload.get("object_key")
+        if object_key and store.exists(object_key):
+            return str(object_key)
+    watermark = (
+        db.query(DatahubDatasetWatermark)
+        .filter(DatahubDatasetWatermark.dataset == "market_daily", DatahubDatasetWatermark.symbol == symbol)
+        .first()
+    )
+    if watermark and watermark.last_object_key and store.exists(watermark.last_object_key):
+        return watermark.last_object_key
+    indexed = (
+        db.query(DatahubObjectIndex)
+        .filter(DatahubObjectIndex.dataset == "market_daily", DatahubObjectIndex.symbol == symbol)
+        .order_by(DatahubObjectIndex.end_date.desc().nullslast(), DatahubObjectIndex.created_at.desc())
+        .first()
+    )
+    if indexed and store.exists(indexed.object_key):
+        return indexed.object_key
+    return None
+
+
+def _store_calls(fake_minio) -> int:
+    return sum(fake_minio.get_calls.values()) + sum(fake_minio.exists_calls.values()) + sum(fake_minio.etag_calls.values())
+
+
+def _reset_calls(fake_minio) -> None:
+    fake_minio.get_calls.clear()
+    fake_minio.exists_calls.clear()
+    fake_minio.etag_calls.clear()
+
+
+@pytest.fixture
+def db_statements(datahub_session_factory) -> list[str]:
+    statements: list[str] = []
+    engine = datahub_session_factory.kw["bind"]
+
+    def on_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", on_execute)
+    yield statements
+    event.remove(engine, "before_cursor_execute", on_execute)
+
+
+def _publish(db) -> None:
+    MinioParquetStore().put_bytes(object_key=OBJECT_KEY, data=b"parquet")
+    DatahubStorageService(db).publish_latest_manifest(
+        dataset="market_daily",
+        symbol=SYMBOL,
+        object_key=OBJECT_KEY,
+        schema_version="1.0",
+        quality_score=100.0,
+        start_date=date(2026, 6, 30),
+        end_date=date(2026, 6, 30),
+    )
+
+
+def test_manifest_resolution_store_calls_cold_and_warm(fake_minio, datahub_session_factory, db_statements) -> None:
+    db = datahub_session_factory()
+    _publish(db)
+    resolver = ObjectKeyResolver(db, "market_daily")
+
+    _reset_calls(fake_minio)
+    assert _legacy_resolve(db, SYMBOL) == OBJECT_KEY
+    legacy_calls = _store_calls(fake_minio)
+    assert legacy_calls == 3
+
+    # 冷缓存：ETag + GET 各一次；热缓存：不访问对象存储也不查库
+    _reset_calls(fake_minio)
+    assert resolver.resolve(SYMBOL) == OBJECT_KEY
+    assert _store_calls(fake_minio) == 2
+    _reset_calls(fake_minio)
+    db_statements.clear()
+    for _ in range(100):
+        assert resolver.resolve(SYMBOL) == OBJECT_KEY
+    assert (_store_calls(fake_minio), db_statements) == (0, [])
+
+    # 本进程重新发布 manifest 时立即失效
+    new_key = OBJECT_KEY.replace("20260630", "20260701")
+    MinioParquetStore().put_bytes(object_key=new_key, data=b"parquet")
+    DatahubStorageService(db).publish_latest_manifest(
+        dataset="market_daily",
+        symbol=SYMBOL,
+        object_key=new_key,
+        schema_version="1.0",
+        quality_score=100.0,
+        start_date=date(2026, 7, 1),
+        end_date=date(2026, 7, 1),
+    )
+    assert resolver.resolve(SYMBOL) == new_key
+    db.close()
+
+
+def test_db_fallback_is_a_single_query(fake_minio, datahub_session_factory, db_statements) -> None:
+    db = datahub_session_factory()
+    indexed_key = OBJECT_KEY.replace("daily-", "backfill-")
+    MinioParquetStore().put_bytes(object_key=indexed_key, data=b"parquet")
+    db.add(
+        DatahubObjectIndex(
+            bucket="datahub-test",
+            object_key=indexed_key,
+            dataset="market_daily",
+            layer="normalized",
+            symbol=SYMBOL,
+            end_date=date(2026, 6, 30),
+        )
+    )
+    db.commit()
+    resolver = ObjectKeyResolver(db, "market_daily")
+
+    _reset_calls(fake_minio)
+    db_statements.clear()
+    assert _legacy_resolve(db, SYMBOL) == indexed_key
+    legacy = (_store_calls(fake_minio), len(db_statements))
+    assert legacy == (2, 2)
+
+    _reset_calls(fake_minio)
+    db_statements.clear()
+    assert resolver.resolve(SYMBOL) == indexed_key
+    assert (_store_calls(fake_minio), len(db_statements)) == (1, 1)
+
+    # 水位优先于对象索引；manifest 不存在的结果被负缓存，不再探测对象存储
+    MinioParquetStore().put_bytes(object_key=OBJECT_KEY, data=b"parquet")
+    db.add(DatahubDatasetWatermark(dataset="market_daily", symbol=SYMBOL, last_object_key=OBJECT_KEY))
+    db.commit()
+    _reset_calls(fake_minio)
+    db_statements.clear()
+    assert resolver.resolve(SYMBOL) == OBJECT_KEY
+    assert (_store_calls(fake_minio), len(db_statements)) == (0, 1)
+    assert resolver.resolve("000001.SZ") is None
+    db.close()
+
+
+def test_read_falls_back_when_published_object_was_deleted(fake_minio, datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    _publish(db)
+    older_key = OBJECT_KEY.replace("daily-20260630", "backfill-20260629")
+    MinioParquetStore().put_bytes(object_key=older_key, data=b"older")
+    db.add(
+        DatahubObjectIndex(
+            bucket="datahub-test",
+            object_key=older_key,
+            dataset="market_daily",
+            layer="normalized",
+            symbol=SYMBOL,
+            end_date=date(2026, 6, 29),
+        )
+    )
+    db.commit()
+    store = MinioParquetStore()
+    resolver = ObjectKeyResolver(db, "market_daily", store=store)
+    assert resolver.read(SYMBOL, store.get_bytes) == b"parquet"
+
+    # 清理删除了 manifest 指向的对象：换读仍存在的索引候选，不把已删除的键再返回
+    store.delete(OBJECT_KEY)
+    assert resolver.resolve(SYMBOL) == OBJECT_KEY
+    assert resolver.read(SYMBOL, store.get_bytes) == b"older"
+    assert resolver.resolve_after_miss(SYMBOL, OBJECT_KEY) == older_key
+
+    # 对象仍存在时的读取错误照常抛出
+    def broken(object_key: str) -> bytes:
+        raise ValueError("corrupt")
+
+    store.put_bytes(object_key=OBJECT_KEY, data=b"parquet")
+    with pytest.raises(ValueError, match="corrupt"):
+        resolver.read(SYMBOL, broken)
+
+    store.delete(OBJECT_KEY)
+    store.delete(older_key)
+    with pytest.raises(KeyError):
+        resolver.read(SYMBOL, store.get_bytes)
+    db.close()
+
+
+def test_expired_entries_revalidate_by_etag(fake_minio) -> None:
+    now = [0.0]
+    cache = ManifestCache(ttl_seconds=30, clock=lambda: now[0])
+    store = MinioParquetStore()
+    manifest_key = latest_manifest_key("market_daily", SYMBOL)
+    store.put_bytes(object_key=manifest_key, data=json.dumps({"object_key": OBJECT_KEY}).encode("utf-8"))
+
+    assert cache.get(manifest_key, store) == {"object_key": OBJECT_KEY}
+    now[0] = 29
+    assert cache.get(manifest_key, store) == {"object_key": OBJECT_KEY}
+    assert (fake_minio.etag_calls[manifest_key], fake_minio.get_calls[manifest_key]) == (1, 1)
+
+    # 过期但未变化：只做一次 ETag 校验
+    now[0] = 31
+    assert cache.get(manifest_key, store) == {"object_key": OBJECT_KEY}
+    assert (fake_minio.etag_calls[manifest_key], fake_minio.get_calls[manifest_key]) == (2, 1)
+
+    # 其他进程改写 manifest：过期后按 ETag 发现变化并重新下载
+    store.put_bytes(object_key=manifest_key, data=json.dumps({"object_key": "other"}).encode("utf-8"))
+    assert cache.get(manifest_key, store) == {"object_key": OBJECT_KEY}
+    now[0] = 62
+    assert cache.get(manifest_key, store) == {"object_key": "other"}
+    assert (fake_minio.etag_calls[manifest_key], fake_minio.get_calls[manifest_key]) == (3, 2)
+    assert cache.stats() == {"entries": 1, "hits": 2, "revalidations": 1, "loads": 2}
+    assert get_manifest_cache().stats()["entries"] == 0
@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+from io import BytesIO
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from app.datahub.services.market_daily_read_service import MarketDailyReadService
+from app.datahub.services.storage_service import DatahubStorageService
+from app.datahub.storage import ParquetTableCache, get_parquet_table_cache
+
+
+def _bar_rows(symbol: str, start: date, days: int) -> list[dict]:
+    return [
+        {
+            "symbol": symbol,
+            "trade_date": start + timedelta(days=offset),
+            "open": 10.0 + offset,
+            "high": 11.0 + offset,
+            "low": 9.0 + offset,
+            "close": 10.5 + offset,
+            "volume": 1000.0,
+            "amount": 10500.0,
+            "turnover_rate": 2.1,
+        }
+        for offset in range(days)
+    ]
+
+
+def _publish(fake_minio, symbol: str, batch_id: str, rows: list[dict]) -> str:
+    object_key = (
+        "datahub/normalized/dataset=market_daily/year=2026/month=06/"
+        f"symbol={symbol}/batch_id={batch_id}.parquet"
+    )
+    sink = BytesIO()
+    pq.write_table(pa.Table.from_pylist(rows), sink, compression="snappy")
+    fake_minio.upload_file_data(object_key, sink.getvalue())
+    DatahubStorageService(db=None).publish_latest_manifest(  # type: ignore[arg-type]
+        dataset="market_daily",
+        symbol=symbol,
+        object_key=object_key,
+        schema_version="1.0",
+        quality_score=100.0,
+        start_date=rows[0]["trade_date"],
+        end_date=rows[-1]["trade_date"],
+    )
+    return object_key
+
+
+def test_repeated_get_bars_downloads_and_decodes_once(fake_minio, monkeypatch) -> None:
+    object_key = _publish(fake_minio, "600000.SH", "backfill-20260620000000", _bar_rows("600000.SH", date(2016, 1, 1), 2500))
+    decode_calls = 0
+    original_load = MarketDailyReadService._load_normalized_table.__func__
+
+    def counting_load(cls, raw: bytes):
+        nonlocal decode_calls
+        decode_calls += 1
+        return original_load(cls, raw)
+
+    monkeypatch.setattr(MarketDailyReadService, "_load_normalized_table", classmethod(counting_load))
+    reader = MarketDailyReadService(db=None)  # type: ignore[arg-type]
+
+    for _ in range(50):
+        bars = reader.get_bars(symbol="600000", start_date=date(2020, 1, 1), end_date=date(2020, 1, 31))
+
+    assert len(bars) == 31
+    assert reader.get_latest_bar(symbol="600000")["trade_date"] == date(2016, 1, 1) + timedelta(days=2499)
+    assert fake_minio.get_calls[object_key] == 1
+    assert decode_calls == 1
+    assert get_parquet_table_cache().stats()["hits"] == 50
+
+
+def test_publish_latest_manifest_invalidates_cached_tables(fake_minio) -> None:
+    old_key = _publish(fake_minio, "000001.SZ", "daily-20260619000000", _bar_rows("000001.SZ", date(2026, 6, 1), 10))
+    reader = MarketDailyReadService(db=None)  # type: ignore[arg-type]
+    reader.get_bars(symbol="000001.SZ", start_date=date(2026, 6, 1), end_date=date(2026, 6, 30))
+    assert get_parquet_table_cache().stats()["entries"] == 1
+
+    new_key = _publish(fake_minio, "000001.SZ", "daily-20260620000000", _bar_rows("000001.SZ", date(2026, 6, 1), 12))
+    assert get_parquet_table_cache().stats()["entries"] == 0
+
+    bars = reader.get_bars(symbol="000001.SZ", start_date=date(2026, 6, 1), end_date=date(2026, 6, 30))
+    assert len(bars) == 12
+    assert fake_minio.get_calls[old_key] == 1
+    assert fake_minio.get_calls[new_key] == 1
+
+
+def test_cache_evicts_least_recently_used_by_bytes() -> None:
+    table = pa.table({"value": list(range(1000))})
+    cache = ParquetTableCache(max_bytes=table.nbytes * 2)
+    cache.put("a", "v1", table)
+    cache.put("b", "v1", table)
+    assert cache.get("a", "v1") is not None
+    cache.put("c", "v1", table)
+
+    assert cache.get("b", "v1") is None
+    assert cache.get("a", "v1") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["total_bytes"] == table.nbytes * 2
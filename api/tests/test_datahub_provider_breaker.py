@@ -0,0 +1,172 @@
+import time
+from datetime import datetime, timezone
+
+import pytest
+
+from app.datahub.models import DatahubProviderHealth
+from app.datahub.services.provider_circuit_breaker import (
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    ProviderCircuitBreaker,
+)
+from app.datahub.services.provider_health_service import DatahubProviderHealthService
+
+CALLS = 2000
+
+
+class FakeClock:
+    def __init__(self, now: float = 1_780_000_000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
+
+
+def _breaker(clock: FakeClock) -> ProviderCircuitBreaker:
+    return ProviderCircuitBreaker(
+        window_seconds=60,
+        bucket_seconds=5,
+        min_samples=10,
+        failure_rate_threshold=0.5,
+        cooldown_seconds=30,
+        clock=clock,
+    )
+
+
+def _legacy_is_available(db, provider: str, dataset: str) -> bool:
+    """改造前逐次查库的判定，作为开销基线。"""
+    row = (
+        db.query(DatahubProviderHealth)
+        .filter(DatahubProviderHealth.provider == provider, DatahubProviderHealth.dataset == dataset)
+        .first()
+    )
+    return row is None or row.cooldown_until is None or row.cooldown_until <= datetime.now(timezone.utc)
+
+
+def _legacy_record_success(db, provider: str, dataset: str) -> None:
+    row = (
+        db.query(DatahubProviderHealth)
+        .filter(DatahubProviderHealth.provider == provider, DatahubProviderHealth.dataset == dataset)
+        .first()
+    )
+    if row is None:
+        row = DatahubProviderHealth(provider=provider, dataset=dataset, status="healthy", success_count=0, failure_count=0)
+        db.add(row)
+    row.success_count = row.success_count + 1
+    row.status = "healthy"
+    row.last_success_at = datetime.now(timezone.utc)
+    db.commit()
+
+
+def test_state_transitions_under_simulated_clock() -> None:
+    clock = FakeClock()
+    breaker = _breaker(clock)
+    key = {"provider": "eastmoney", "dataset": "money_flow"}
+
+    # 上个月的大量成功不应掩盖当前的故障：窗口滑过后只统计最近 60 秒
+    for _ in range(1000):
+        breaker.record_success(**key)
+    clock.advance(120)
+    for _ in range(9):
+        breaker.record_failure(**key, error="timeout")
+    assert breaker.state(**key) == STATE_CLOSED  # 样本不足
+    breaker.record_failure(**key, error="timeout")
+    assert breaker.state(**key) == STATE_OPEN
+    assert not breaker.allow(**key)
+
+    clock.advance(29)
+    assert not breaker.allow(**key)
+    clock.advance(1)
+    assert breaker.state(**key) == STATE_HALF_OPEN
+    assert breaker.allow(**key)  # 唯一的探测请求
+    assert not breaker.allow(**key)
+
+    breaker.record_failure(**key, error="still down")
+    assert breaker.state(**key) == STATE_OPEN
+    clock.advance(30)
+    assert breaker.allow(**key)
+    breaker.record_success(**key)
+    assert breaker.state(**key) == STATE_CLOSED
+
+    # 关闭后窗口已清空，少量失败不会立即再次熔断
+    for _ in range(5):
+        breaker.record_failure(**key, error="blip")
+    assert breaker.allow(**key)
+
+    # 失败分散在窗口之外时不累计
+    other = {"provider": "baostock", "dataset": "market_daily"}
+    for _ in range(20):
+        breaker.record_failure(**other, error="x")
+        breaker.record_success(**other)
+        clock.advance(10)
+    assert breaker.state(**other) == STATE_CLOSED
+
+
+def test_flush_aggregates_counters_and_load_restores_open_breakers(datahub_session_factory) -> None:
+    clock = FakeClock(datetime.now(timezone.utc).timestamp())
+    breaker = _breaker(clock)
+    breaker.attach(datahub_session_factory, flush_interval_seconds=0)
+    key = {"provider": "eastmoney", "dataset": "money_flow"}
+
+    for _ in range(4):
+        breaker.record_success(**key)
+    for _ in range(10):
+        breaker.record_failure(**key, error="timeout")
+    assert breaker.flush() == 1
+    assert breaker.flush() == 0
+
+    db = datahub_session_factory()
+    row = db.query(DatahubProviderHealth).filter_by(provider="eastmoney", dataset="money_flow").one()
+    assert (row.success_count, row.failure_count, row.status, row.last_error) == (4, 10, "cooldown", "timeout")
+    assert row.cooldown_until is not None
+
+    restarted = _breaker(FakeClock(clock.now + 10))
+    assert restarted.load(db) == 1
+    assert restarted.state(**key) == STATE_OPEN
+    restarted.clock.advance(20)
+    assert restarted.state(**key) == STATE_HALF_OPEN
+
+    clock.advance(30)
+    assert breaker.allow(**key)
+    breaker.record_success(**key)
+    breaker.flush()
+    db.expire_all()
+    row = db.query(DatahubProviderHealth).filter_by(provider="eastmoney", dataset="money_flow").one()
+    assert (row.success_count, row.failure_count, row.status, row.last_error, row.cooldown_until) == (
+        5,
+        10,
+        "healthy",
+        None,
+        None,
+    )
+    db.close()
+    breaker.close()
+
+
+@pytest.mark.benchmark
+def test_per_call_overhead_against_db_round_trips(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    service = DatahubProviderHealthService(db, breaker=ProviderCircuitBreaker())
+    service.breaker.attach(datahub_session_factory, flush_interval_seconds=0)
+
+    started = time.perf_counter()
+    for _ in range(CALLS // 10):
+        _legacy_is_available(db, "baostock", "market_daily")
+        _legacy_record_success(db, "baostock", "market_daily")
+    legacy_seconds = (time.perf_counter() - started) * 10
+
+    started = time.perf_counter()
+    for _ in range(CALLS):
+        assert service.is_available(provider="baostock", dataset="security_master")
+        service.record_success(provider="baostock", dataset="security_master")
+    breaker_seconds = time.perf_counter() - started
+    assert service.flush() == 1
+
+    row = db.query(DatahubProviderHealth).filter_by(provider="baostock", dataset="security_master").one()
+    assert row.success_count == CALLS
+    assert breaker_seconds < legacy_seconds
+    db.close()
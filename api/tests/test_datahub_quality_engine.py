@@ -0,0 +1,197 @@
+import random
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pyarrow as pa
+import pytest
+
+from app.datahub.quality import QualityRuleSet, evaluate_quality, to_arrow_table
+
+BENCHMARK_ROWS = 1_000_000
+LEGACY_SAMPLE_ROWS = 200_000
+
+
+def _legacy_market_daily(rows: list[dict]) -> tuple[float, list[dict], str]:
+    """改造前 MarketDailyBackfillService._quality_check 的逐行实现，作为一致性基线。"""
+    issues: list[dict] = []
+    invalid_price_count = 0
+    for row in rows:
+        if row["open"] <= 0 or row["high"] <= 0 or row["low"] <= 0 or row["close"] <= 0:
+            invalid_price_count += 1
+    if invalid_price_count > 0:
+        issues.append({"rule": "price_positive_check", "message": "存在价格小于等于0的记录", "count": invalid_price_count})
+    total = len(rows)
+    score = max(0.0, 100.0 - (invalid_price_count / total) * 100.0)
+    if invalid_price_count == 0:
+        return score, issues, "p2"
+    if invalid_price_count <= max(1, int(total * 0.05)):
+        return score, issues, "p1"
+    return score, issues, "p0"
+
+
+def _legacy_extended(rows: list[dict]) -> tuple[float, list[dict], str]:
+    total = len(rows)
+    missing = 0
+    for item in rows:
+        for value in item.values():
+            if value in (None, "", "NaN"):
+                missing += 1
+    score = max(0.0, 100.0 - (missing / max(total, 1)))
+    issues = [{"rule": "missing_values", "count": missing}] if missing > 0 else []
+    if missing == 0:
+        severity = "p2"
+    elif missing <= max(5, total // 10):
+        severity = "p1"
+    else:
+        severity = "p0"
+    return score, issues, severity
+
+
+def _legacy_security_master(rows: list[dict]) -> tuple[float, list[dict], str]:
+    missing_symbol = sum(1 for row in rows if not row.get("symbol"))
+    missing_name = sum(1 for row in rows if not row.get("name"))
+    issue_count = missing_symbol + missing_name
+    score = max(0.0, 100.0 - (issue_count / max(len(rows), 1)) * 100.0)
+    severity = "p0" if issue_count > max(1, int(len(rows) * 0.1)) else ("p1" if issue_count > 0 else "p2")
+    issues = []
+    if missing_symbol > 0:
+        issues.append({"rule": "symbol_required", "count": missing_symbol})
+    if missing_name > 0:
+        issues.append({"rule": "name_required", "count": missing_name})
+    return score, issues, severity
+
+
+def _legacy_trading_calendar(rows: list[dict]) -> tuple[float, list[dict], str]:
+    missing_trade_date = sum(1 for row in rows if not row.get("trade_date"))
+    score = max(0.0, 100.0 - (missing_trade_date / max(len(rows), 1)) * 100.0)
+    severity = "p0" if missing_trade_date > max(1, int(len(rows) * 0.1)) else ("p1" if missing_trade_date > 0 else "p2")
+    issues = [{"rule": "trade_date_required", "count": missing_trade_date}] if missing_trade_date > 0 else []
+    return score, issues, severity
+
+
+def _market_daily_rows(count: int, bad_ratio: float, rng: random.Random) -> list[dict]:
+    start = date(2000, 1, 1)
+    rows = []
+    for index in range(count):
+        prices = [10.0 + index % 7, 11.0 + index % 7, 9.0 + index % 7, 10.5 + index % 7]
+        if rng.random() < bad_ratio:
+            prices[rng.randrange(4)] = rng.choice([0.0, -1.0])
+        if rng.random() < 0.01:
+            prices[rng.randrange(4)] = float("nan")
+        rows.append(
+            {
+                "symbol": "600000.SH",
+                "trade_date": start + timedelta(days=index),
+                "open": prices[0],
+                "high": prices[1],
+                "low": prices[2],
+                "close": prices[3],
+                "volume": float(index),
+            }
+        )
+    return rows
+
+
+@pytest.mark.parametrize("count,bad_ratio", [(1, 0.0), (1, 1.0), (20, 0.05), (100, 0.05), (400, 0.02), (400, 0.3)])
+def test_market_daily_parity(count: int, bad_ratio: float) -> None:
+    rows = _market_daily_rows(count, bad_ratio, random.Random(count))
+    assert evaluate_quality("market_daily", rows) == _legacy_market_daily(rows)
+    assert evaluate_quality("market_daily", to_arrow_table(rows)) == _legacy_market_daily(rows)
+
+
+@pytest.mark.parametrize("seed", range(6))
+def test_extended_security_master_and_calendar_parity(seed: int) -> None:
+    rng = random.Random(seed)
+    count = rng.choice([3, 10, 57, 300])
+    blanks = [None, "", "NaN", float("nan"), "nan", 0, 0.0, "x", 1.5]
+    extended_rows = [
+        {
+            "symbol": rng.choice(["600000.SH", "", None]),
+            "trade_date": rng.choice([date(2026, 6, 30), None]),
+            "main_net_inflow": rng.choice([1.0, None, float("nan"), 0.0]),
+            "metric_name": rng.choice(["营业收入", "NaN", "", None]),
+            # 同列混合数值与字符串：按字符串列检查
+            "metric_value": rng.choice(blanks),
+        }
+        for _ in range(count)
+    ]
+    assert evaluate_quality("money_flow", extended_rows) == _legacy_extended(extended_rows)
+    assert evaluate_quality("financial_summary", extended_rows) == _legacy_extended(extended_rows)
+
+    security_rows = [
+        {
+            "symbol": rng.choice(["600000.SH", "", None]) if rng.random() < 0.2 else "000001.SZ",
+            "name": rng.choice(["", None]) if rng.random() < 0.1 else "平安银行",
+            "industry": None,
+        }
+        for _ in range(count)
+    ]
+    assert evaluate_quality("security_master", security_rows) == _legacy_security_master(security_rows)
+
+    calendar_rows = [
+        {"trade_date": None if rng.random() < 0.05 else date(2026, 1, 1) + timedelta(days=index), "is_open": True}
+        for index in range(count)
+    ]
+    assert evaluate_quality("trading_calendar", calendar_rows) == _legacy_trading_calendar(calendar_rows)
+
+
+def test_declarative_inversion_and_duplicate_rules() -> None:
+    rule_set = QualityRuleSet.from_config(
+        {
+            "rules": [
+                {"rule": "high_low_inversion", "check": "not_greater", "columns": ["low", "high"]},
+                {"rule": "duplicate_trade_date", "check": "unique", "columns": ["symbol", "trade_date"]},
+                {"rule": "close_required", "check": "required", "columns": ["close"]},
+            ],
+            "p1_ratio": 0.5,
+        }
+    )
+    rows = [
+        {"symbol": "600000.SH", "trade_date": date(2026, 6, 29), "low": 9.0, "high": 10.0, "close": 9.5},
+        {"symbol": "600000.SH", "trade_date": date(2026, 6, 30), "low": 11.0, "high": 10.0, "close": 10.0},
+        {"symbol": "600000.SH", "trade_date": date(2026, 6, 30), "low": None, "high": 10.0, "close": None},
+        {"symbol": "000001.SZ", "trade_date": date(2026, 6, 30), "low": 9.0, "high": 10.0, "close": 0.0},
+    ]
+    score, issues, severity = evaluate_quality(rule_set, rows)
+    assert issues == [
+        {"rule": "high_low_inversion", "count": 1},
+        {"rule": "duplicate_trade_date", "count": 1},
+        {"rule": "close_required", "count": 2},
+    ]
+    assert (score, severity) == (0.0, "p0")
+    with pytest.raises(ValueError):
+        QualityRuleSet.from_config({"rules": [{"rule": "x", "check": "regex"}]})
+
+
+@pytest.mark.benchmark
+def test_benchmark_columnar_engine_on_one_million_rows() -> None:
+    rng = np.random.default_rng(7)
+    prices = rng.uniform(5, 50, size=(4, BENCHMARK_ROWS))
+    bad = rng.choice(BENCHMARK_ROWS, size=BENCHMARK_ROWS // 100, replace=False)
+    prices[rng.integers(0, 4, size=bad.size), bad] = 0.0
+    table = pa.table(
+        {
+            "symbol": pa.array(["600000.SH"] * BENCHMARK_ROWS),
+            "trade_date": pa.array(np.arange(BENCHMARK_ROWS, dtype="int32"), type=pa.int32()).cast(pa.date32()),
+            "open": prices[0],
+            "high": prices[1],
+            "low": prices[2],
+            "close": prices[3],
+        }
+    )
+
+    started = time.perf_counter()
+    score, issues, severity = evaluate_quality("market_daily", table)
+    columnar_seconds = time.perf_counter() - started
+    assert issues[0]["count"] == bad.size
+    assert severity == "p1"
+
+    sample = table.slice(0, LEGACY_SAMPLE_ROWS)
+    sample_rows = sample.to_pylist()
+    started = time.perf_counter()
+    legacy = _legacy_market_daily(sample_rows)
+    legacy_seconds = (time.perf_counter() - started) * (BENCHMARK_ROWS / LEGACY_SAMPLE_ROWS)
+    assert evaluate_quality("market_daily", sample) == legacy
+
+    assert columnar_seconds < legacy_seconds
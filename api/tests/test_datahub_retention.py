@@ -0,0 +1,198 @@
+import json
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import func, insert
+
+from app.core.api import BusinessException
+from app.datahub.models import DatahubDatasetWatermark, DatahubJobRun, DatahubJobTask, DatahubObjectIndex
+from app.datahub.services.datahub_service import DatahubService
+from app.datahub.services.retention_service import DatahubRetentionService
+from app.datahub.storage import MinioParquetStore
+
+NOW = datetime.now(timezone.utc)
+BENCHMARK_RUNS = 1000
+BENCHMARK_TASKS_PER_RUN = 1000
+LEGACY_SAMPLE_RUNS = 10
+
+
+def _seed_runs(db, specs: list[tuple[str, int, int]]) -> list[str]:
+    """specs: (status, 创建于几天前, 子任务数)。"""
+    run_ids = []
+    for status, age_days, task_count in specs:
+        run_id = str(uuid.uuid4())
+        run_ids.append(run_id)
+        db.add(
+            DatahubJobRun(
+                id=run_id,
+                job_type="backfill",
+                dataset="market_daily",
+                status=status,
+                created_at=NOW - timedelta(days=age_days),
+            )
+        )
+        for index in range(task_count):
+            db.add(DatahubJobTask(job_run_id=run_id, dataset="market_daily", symbol=f"{index:06d}.SH", status=status))
+    db.commit()
+    return run_ids
+
+
+def _counts(db) -> tuple[int, int]:
+    return db.query(func.count(DatahubJobRun.id)).scalar(), db.query(func.count(DatahubJobTask.id)).scalar()
+
+
+def test_purge_job_runs_deletes_oldest_runs_with_their_tasks(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    run_ids = _seed_runs(
+        db,
+        [("failed", 50, 3), ("failed", 40, 0), ("failed", 30, 7), ("failed", 1, 2), ("success", 60, 4)],
+    )
+
+    result = DatahubService(db).purge_job_runs(status="failed", limit=3)
+
+    assert (result.deleted_count, result.deleted_task_count) == (3, 10)
+    remaining = {row.id for row in db.query(DatahubJobRun.id).all()}
+    assert remaining == {run_ids[3], run_ids[4]}
+    assert {row.job_run_id for row in db.query(DatahubJobTask.job_run_id).all()} == remaining
+    with pytest.raises(BusinessException):
+        DatahubService(db).purge_job_runs(status="running", limit=10)
+    db.close()
+
+
+def test_retention_deletes_expired_finished_runs_in_chunks(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    run_ids = _seed_runs(
+        db,
+        [
+            ("success", 120, 5),
+            ("failed", 100, 3),
+            ("skipped", 95, 0),
+            ("running", 200, 2),
+            ("pending", 150, 1),
+            ("success", 10, 4),
+        ],
+    )
+    service = DatahubRetentionService(db, chunk_size=2)
+
+    preview = service.apply_retention(keep_days=90, dry_run=True)
+    assert (preview.deleted_runs, preview.deleted_tasks) == (3, 8)
+    assert _counts(db) == (6, 15)
+
+    result = service.apply_retention(keep_days=90)
+
+    assert (result.deleted_runs, result.deleted_tasks) == (3, 8)
+    assert {row.id for row in db.query(DatahubJobRun.id).all()} == set(run_ids[3:])
+    assert _counts(db) == (3, 7)
+    assert service.apply_retention(keep_days=90).deleted_runs == 0
+    db.close()
+
+
+def test_sweep_orphan_objects_keeps_referenced_and_recent_objects(fake_minio, datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    prefix = "datahub/normalized/dataset=market_daily/year=2026/month=06"
+    indexed = f"{prefix}/symbol=600000.SH/batch_id=backfill-1.parquet"
+    watermarked = f"{prefix}/symbol=600001.SH/batch_id=daily-2.parquet"
+    orphan = f"{prefix}/symbol=600002.SH/batch_id=backfill-3.parquet"
+    # 只被 manifest 引用（索引与水位行已被清理）的对象仍在读路径上
+    latest_only = f"{prefix}/symbol=600004.SH/batch_id=backfill-5.parquet"
+    monthly_layout = "datahub/normalized/dataset=market_daily/layout=monthly"
+    compacted = f"{monthly_layout}/year=2026/month=06/batch_id=compact-6.parquet"
+    monthly_source = f"{prefix}/symbol=600005.SH/batch_id=backfill-7.parquet"
+    manifest = "datahub/normalized/dataset=market_daily/latest/symbol=600004.SH.json"
+    monthly_manifest = f"{monthly_layout}/latest/year=2026/month=06.json"
+    for object_key in (indexed, watermarked, orphan, latest_only, compacted, monthly_source):
+        fake_minio.objects[object_key] = b"parquet"
+    fake_minio.objects[manifest] = json.dumps({"symbol": "600004.SH", "object_key": latest_only}).encode()
+    fake_minio.objects[monthly_manifest] = json.dumps(
+        {"object_key": compacted, "symbols": {"600005.SH": {"source_object_key": monthly_source}}}
+    ).encode()
+    fresh_orphan = f"{prefix}/symbol=600003.SH/batch_id=daily-4.parquet"
+    fake_minio.upload_file_data(fresh_orphan, b"parquet")
+    db.add(DatahubObjectIndex(bucket="datahub-test", object_key=indexed, dataset="market_daily", layer="normalized"))
+    db.add(DatahubDatasetWatermark(dataset="market_daily", symbol="600001.SH", last_object_key=watermarked))
+    db.commit()
+    service = DatahubRetentionService(db)
+
+    assert service.sweep_orphan_objects(dry_run=True) == (1, 0)
+    assert orphan in fake_minio.objects
+
+    assert service.sweep_orphan_objects() == (1, 1)
+    assert set(fake_minio.objects) == {
+        indexed,
+        watermarked,
+        latest_only,
+        compacted,
+        monthly_source,
+        manifest,
+        monthly_manifest,
+        fresh_orphan,
+    }
+    assert service.sweep_orphan_objects(min_age=timedelta(0)) == (1, 1)
+    assert fresh_orphan not in fake_minio.objects
+    assert MinioParquetStore().exists(indexed)
+
+    # manifest 无法解析时无法确认引用关系，只统计不删除
+    fake_minio.objects[orphan] = b"parquet"
+    fake_minio.objects[manifest] = b"{broken"
+    assert service.sweep_orphan_objects() == (2, 0)
+    assert latest_only in fake_minio.objects and orphan in fake_minio.objects
+    db.close()
+
+
+def _bulk_seed(db, runs: int, tasks_per_run: int) -> None:
+    run_rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "job_type": "backfill",
+            "dataset": "market_daily",
+            "status": "success",
+            "task_total": tasks_per_run,
+            "task_success": tasks_per_run,
+            "task_failed": 0,
+            "created_at": NOW - timedelta(days=365, minutes=index),
+        }
+        for index in range(runs)
+    ]
+    db.execute(insert(DatahubJobRun), run_rows)
+    for run in run_rows:
+        db.execute(
+            insert(DatahubJobTask),
+            [
+                {
+                    "id": f"{run['id'][:24]}{index:012d}",
+                    "job_run_id": run["id"],
+                    "dataset": "market_daily",
+                    "symbol": f"{index:06d}.SH",
+                    "status": "success",
+                    "attempts": 1,
+                }
+                for index in range(tasks_per_run)
+            ],
+        )
+    db.commit()
+
+
+@pytest.mark.benchmark
+def test_benchmark_retention_deletes_1m_task_rows(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    _bulk_seed(db, LEGACY_SAMPLE_RUNS, BENCHMARK_TASKS_PER_RUN)
+    started = time.perf_counter()
+    for task in db.query(DatahubJobTask).all():
+        db.delete(task)
+    for run in db.query(DatahubJobRun).all():
+        db.delete(run)
+    db.commit()
+    legacy_seconds = (time.perf_counter() - started) * BENCHMARK_RUNS / LEGACY_SAMPLE_RUNS
+
+    _bulk_seed(db, BENCHMARK_RUNS, BENCHMARK_TASKS_PER_RUN)
+    assert _counts(db) == (BENCHMARK_RUNS, BENCHMARK_RUNS * BENCHMARK_TASKS_PER_RUN)
+    started = time.perf_counter()
+    result = DatahubRetentionService(db, chunk_size=5000).apply_retention(keep_days=90)
+    elapsed = time.perf_counter() - started
+
+    assert (result.deleted_runs, result.deleted_tasks) == (BENCHMARK_RUNS, BENCHMARK_RUNS * BENCHMARK_TASKS_PER_RUN)
+    assert _counts(db) == (0, 0)
+    assert elapsed < legacy_seconds
+    db.close()
@@ -0,0 +1,163 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.core.api import BusinessException
+from app.datahub.services.router_service import DatahubRouterService, ProviderExecutor
+
+CALLS = 10_000
+
+
+class SleepingProvider:
+    """按需阻塞的 Provider 替身，记录调用次数。"""
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.calls = 0
+        self.release = threading.Event()
+
+    def fetch(self) -> list[dict]:
+        self.calls += 1
+        if self.delay:
+            self.release.wait(self.delay)
+        return [{"symbol": "600000.SH"}]
+
+    async def afetch(self) -> list[dict]:
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return [{"symbol": "600000.SH"}]
+
+
+def _router(executor: ProviderExecutor, timeout: float = 10) -> DatahubRouterService:
+    router = DatahubRouterService(executor_factory=lambda provider: executor)
+    router.DATASET_TIMEOUT_SECONDS = {"market_daily": timeout}
+    router.RETRY_BASE_SECONDS = 0.01
+    return router
+
+
+def test_thread_count_is_stable_across_calls() -> None:
+    executor = ProviderExecutor("baostock", max_workers=4)
+    router = _router(executor)
+    provider = SleepingProvider()
+    baseline_threads = threading.active_count()
+
+    peak_threads = 0
+    for index in range(CALLS):
+        assert router.run_with_policy(dataset="market_daily", provider="baostock", operation=provider.fetch)
+        if index % 500 == 0:
+            peak_threads = max(peak_threads, threading.active_count())
+
+    assert provider.calls == CALLS
+    assert peak_threads <= baseline_threads + executor.max_workers
+    assert executor.stats()["threads"] <= executor.max_workers
+    assert executor.stats()["in_flight"] == 0
+    executor.shutdown()
+
+
+def _wait_until(predicate, timeout: float = 2.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+
+
+def test_hung_call_keeps_its_slot_and_saturated_provider_fails_fast() -> None:
+    executor = ProviderExecutor("eastmoney", max_workers=1)
+    router = _router(executor, timeout=0.05)
+    slow = SleepingProvider(delay=5)
+
+    started = time.perf_counter()
+    with pytest.raises(BusinessException, match="槽位均被超时未返回的调用占用"):
+        router.run_with_policy(dataset="market_daily", provider="eastmoney", operation=slow.fetch)
+    elapsed = time.perf_counter() - started
+
+    # 首次调用 50ms 超时后线程仍挂着，槽位不归还；后两次重试直接快速失败，不再提交新任务
+    assert elapsed < 1.0
+    assert slow.calls == 1
+    assert executor.stats() == {
+        "max_workers": 1,
+        "threads": 1,
+        "in_flight": 0,
+        "completed": 0,
+        "timeouts": 1,
+        "abandoned": 1,
+    }
+
+    slow.release.set()
+    _wait_until(lambda: executor.stats()["abandoned"] == 0)
+    fast = SleepingProvider()
+    assert router.run_with_policy(dataset="market_daily", provider="eastmoney", operation=fast.fetch)
+    assert executor.stats()["completed"] == 1
+    assert executor.stats()["threads"] == 1
+    executor.shutdown()
+
+
+def test_provider_errors_are_retried_and_reraised() -> None:
+    executor = ProviderExecutor("baostock", max_workers=2)
+    router = _router(executor)
+    attempts = []
+
+    def failing() -> list[dict]:
+        attempts.append(1)
+        raise ValueError("boom")
+
+    with pytest.raises(ValueError, match="boom"):
+        router.run_with_policy(dataset="market_daily", provider="baostock", operation=failing)
+    assert len(attempts) == router.MAX_RETRIES + 1
+    assert executor.stats()["in_flight"] == 0
+    executor.shutdown()
+
+
+def test_cancel_interrupts_backoff_wait_and_only_affects_calls_in_flight() -> None:
+    executor = ProviderExecutor("eastmoney", max_workers=2)
+    router = _router(executor, timeout=0.05)
+    router.RETRY_BASE_SECONDS = 30
+    slow = SleepingProvider(delay=1)
+
+    threading.Timer(0.2, router.cancel).start()
+    started = time.perf_counter()
+    with pytest.raises(BusinessException, match="已取消"):
+        router.run_with_policy(dataset="market_daily", provider="eastmoney", operation=slow.fetch)
+    assert time.perf_counter() - started < 1.0
+    slow.release.set()
+
+    fast = SleepingProvider()
+    assert router.run_with_policy(dataset="market_daily", provider="eastmoney", operation=fast.fetch)
+    executor.shutdown()
+
+
+def test_arun_with_policy_times_out_without_blocking_loop() -> None:
+    executor = ProviderExecutor("eastmoney", max_workers=4)
+    router = _router(executor, timeout=0.05)
+
+    async def scenario() -> None:
+        ticks = 0
+
+        async def heartbeat() -> None:
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(heartbeat())
+        slow_sync, slow_async = SleepingProvider(delay=5), SleepingProvider(delay=5)
+        with pytest.raises(BusinessException, match="请求超时"):
+            await router.arun_with_policy(dataset="market_daily", provider="eastmoney", operation=slow_sync.fetch)
+        with pytest.raises(BusinessException, match="请求超时"):
+            await router.arun_with_policy(dataset="market_daily", provider="eastmoney", operation=slow_async.afetch)
+        slow_sync.release.set()
+        await asyncio.to_thread(_wait_until, lambda: executor.stats()["abandoned"] == 0)
+
+        fast = SleepingProvider()
+        assert await router.arun_with_policy(dataset="market_daily", provider="eastmoney", operation=fast.fetch)
+        assert await router.arun_with_policy(dataset="market_daily", provider="eastmoney", operation=fast.afetch)
+        ticker.cancel()
+        # 超时与退避期间事件循环持续调度其它协程
+        assert ticks >= 20
+
+    asyncio.run(scenario())
+    assert executor.stats()["in_flight"] == 0
+    assert executor.stats()["timeouts"] == 6
+    assert executor.stats()["completed"] == 2
+    executor.shutdown()
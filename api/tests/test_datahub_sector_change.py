@@ -0,0 +1,204 @@
+import json
+from contextlib import contextmanager
+from datetime import date, timedelta
+from io import BytesIO
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+from sqlalchemy import event
+
+from app.datahub.models import DatahubDatasetWatermark
+from app.datahub.services.market_daily_read_service import MarketDailyReadService
+from app.datahub.services.sector_members_read_service import SectorMembersReadService
+from app.datahub.storage import get_parquet_table_cache
+
+SECTORS = 20
+MEMBERS_PER_SECTOR = 40
+TRADE_DATE = date(2026, 6, 30)
+
+
+def _parquet(rows: list[dict]) -> bytes:
+    sink = BytesIO()
+    pq.write_table(pa.Table.from_pylist(rows), sink)
+    return sink.getvalue()
+
+
+def _manifest(object_key: str) -> bytes:
+    return json.dumps({"object_key": object_key}).encode("utf-8")
+
+
+def _bars(symbol: str, seed: int) -> list[dict]:
+    days = [TRADE_DATE - timedelta(days=offset) for offset in range(20)]
+    rows = [
+        {
+            "symbol": symbol,
+            "trade_date": day.isoformat(),
+            "open": 10.0 + seed % 13,
+            "high": 11.0 + seed % 13,
+            "low": 9.0 + seed % 13,
+            "close": 10.0 + (seed * 7 + day.day) % 17 / 3,
+            "volume": 1000.0,
+            "amount": 10000.0,
+            "turnover_rate": 1.2,
+        }
+        for day in sorted(days)
+        if day.weekday() < 5
+    ]
+    if seed % 37 == 5:
+        rows = rows[:-1]  # 停牌：最新 K 线早于交易日
+    elif seed % 53 == 7:
+        rows = rows[-1:]  # 新股：窗口内只有一根 K 线
+    elif seed % 61 == 11:
+        rows[-2]["close"] = 0.0  # 前收缺失
+    return rows
+
+
+@pytest.fixture
+def sector_board(fake_minio, datahub_session_factory):
+    db = datahub_session_factory()
+    members = []
+    for sector in range(SECTORS):
+        for member in range(MEMBERS_PER_SECTOR):
+            seed = sector * MEMBERS_PER_SECTOR + member
+            symbol = f"{600000 + seed:06d}.SH"
+            object_key = (
+                f"datahub/normalized/dataset=market_daily/year=2026/month=06/symbol={symbol}/batch_id=b{seed}.parquet"
+            )
+            fake_minio.objects[object_key] = _parquet(_bars(symbol, seed))
+            fake_minio.objects[f"datahub/normalized/dataset=market_daily/latest/symbol={symbol}.json"] = _manifest(
+                object_key
+            )
+            # 最后一个成员只有 manifest 没有水位，覆盖批量解析的回退路径
+            if seed != SECTORS * MEMBERS_PER_SECTOR - 1:
+                db.add(DatahubDatasetWatermark(dataset="market_daily", symbol=symbol, last_object_key=object_key))
+            members.append({"symbol": symbol, "sector_code": f"BK{sector:04d}", "sector_name": f"板块{sector}"})
+    db.commit()
+
+    snapshot_key = "datahub/normalized/dataset=sector_members/year=2026/batch_id=s1.parquet"
+    fake_minio.objects[snapshot_key] = _parquet(members)
+    fake_minio.objects["datahub/normalized/dataset=sector_members/latest/symbol=__ALL__.json"] = _manifest(snapshot_key)
+
+    yield db
+    db.close()
+
+
+@contextmanager
+def _count_queries(db):
+    counter = {"queries": 0}
+
+    def before_cursor_execute(*_args) -> None:
+        counter["queries"] += 1
+
+    engine = db.get_bind()
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def _legacy_sector_change_map(service: SectorMembersReadService, reader: MarketDailyReadService) -> dict[str, float]:
+    """改造前的逐成员实现，作为一致性与性能基线。"""
+    start_date = TRADE_DATE - timedelta(days=10)
+    result: dict[str, float] = {}
+    for sector_code, members in service.get_sector_symbols_map().items():
+        changes = []
+        for symbol in members[: service.MAX_MEMBERS_FOR_CHANGE]:
+            bars = reader.get_bars(symbol=symbol, start_date=start_date, end_date=TRADE_DATE)
+            if len(bars) < 2 or bars[-1]["trade_date"] != TRADE_DATE:
+                continue
+            prev_close = float(bars[-2].get("close") or 0)
+            if not prev_close:
+                continue
+            changes.append((float(bars[-1].get("close") or 0) - prev_close) / prev_close * 100)
+        if changes:
+            result[sector_code] = round(sum(changes) / len(changes), 2)
+    return result
+
+
+def test_batched_sector_change_matches_per_symbol_reads(sector_board, fake_minio) -> None:
+    service = SectorMembersReadService(sector_board)
+    service.get_sector_symbols_map()
+
+    get_parquet_table_cache().clear()
+    fake_minio.get_calls.clear()
+    fake_minio.exists_calls.clear()
+    legacy = _legacy_sector_change_map(service, MarketDailyReadService(sector_board))
+    legacy_round_trips = sum(fake_minio.get_calls.values()) + sum(fake_minio.exists_calls.values())
+
+    get_parquet_table_cache().clear()
+    fake_minio.get_calls.clear()
+    fake_minio.exists_calls.clear()
+    with _count_queries(sector_board) as batched_db:
+        batched = service.compute_sector_change_map(
+            trade_date=TRADE_DATE,
+            market_reader=MarketDailyReadService(sector_board),
+        )
+    batched_round_trips = sum(fake_minio.get_calls.values()) + sum(fake_minio.exists_calls.values())
+
+    assert len(batched) == SECTORS
+    assert batched == legacy
+    members = SECTORS * MEMBERS_PER_SECTOR
+    # 批量路径：水位按块一次解析，每个成员对象只下载一次；无水位的成员多读一次 latest manifest
+    assert batched_db["queries"] == -(-members // MarketDailyReadService.RESOLVE_CHUNK_SIZE)
+    assert sum(fake_minio.exists_calls.values()) == 0
+    assert batched_round_trips == members + 1
+    assert batched_round_trips < legacy_round_trips
+
+
+def test_get_bars_many_matches_get_bars(sector_board) -> None:
+    reader = MarketDailyReadService(sector_board)
+    symbols = ["600000.SH", "600005.SH", "600799.SH", "000000.SZ", "600000.SH"]
+    start_date, end_date = TRADE_DATE - timedelta(days=7), TRADE_DATE
+
+    many = reader.get_bars_many(symbols=symbols, start_date=start_date, end_date=end_date)
+
+    assert list(many) == ["600000.SH", "600005.SH", "600799.SH"]
+    for symbol in many:
+        assert many[symbol] == reader.get_bars(symbol=symbol, start_date=start_date, end_date=end_date)
+
+
+def test_sector_change_treats_null_closes_like_per_symbol_path() -> None:
+    def table(closes: list) -> pa.Table:
+        return pa.table(
+            {
+                "trade_date": pa.array([TRADE_DATE - timedelta(days=1), TRADE_DATE], pa.date32()),
+                "close": pa.array(closes, pa.float64()),
+            }
+        )
+
+    members = {"600000.SH": "BK0001", "600001.SH": "BK0001"}
+    compute = SectorMembersReadService._sector_change_from_tables
+
+    # 最新收盘缺失按 0 计（-100%），与另一成员的 +10% 取均值
+    assert compute({"600000.SH": table([10.0, 11.0]), "600001.SH": table([10.0, None])}, members, TRADE_DATE) == {
+        "BK0001": -45.0
+    }
+    # 前收缺失的成员不参与计算
+    assert compute({"600000.SH": table([10.0, 11.0]), "600001.SH": table([None, 12.0])}, members, TRADE_DATE) == {
+        "BK0001": 10.0
+    }
+
+
+def test_get_bars_many_logs_unexpected_read_errors(sector_board, fake_minio, caplog) -> None:
+    reader = MarketDailyReadService(sector_board)
+    missing_key, corrupt_key = reader.resolve_object_keys(["600000.SH", "600001.SH"]).values()
+    del fake_minio.objects[missing_key]
+    fake_minio.objects[corrupt_key] = b"not parquet"
+    get_parquet_table_cache().clear()
+    start_date = TRADE_DATE - timedelta(days=7)
+
+    # 对象已被删除是预期的失效路径，不告警
+    with caplog.at_level("WARNING", logger="app.datahub.services.market_daily_read_service"):
+        with pytest.raises(KeyError):
+            reader.get_bars_many(symbols=["600000.SH"], start_date=start_date, end_date=TRADE_DATE)
+    assert not caplog.records
+
+    # 对象仍存在但读取失败：记录告警，回退的逐个读取抛出原始错误
+    with caplog.at_level("WARNING", logger="app.datahub.services.market_daily_read_service"):
+        with pytest.raises(Exception):
+            reader.get_bars_many(symbols=["600001.SH"], start_date=start_date, end_date=TRADE_DATE)
+    assert [record.getMessage() for record in caplog.records] == [
+        f"批量读取 market_daily 失败 symbol=600001.SH object_key={corrupt_key}"
+    ]
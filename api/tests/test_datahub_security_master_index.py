@@ -0,0 +1,186 @@
+import io
+import time
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import pytest
+
+from app.datahub.normalize import normalize_symbol
+from app.datahub.providers import BaoStockProvider
+from app.datahub.services.security_master_read_service import SecurityIndexRegistry, SecurityMasterReadService
+from app.datahub.services.snapshot_read_service import SnapshotDatasetReadService
+from app.datahub.services.storage_service import DatahubStorageService
+from app.datahub.services.watchlist_service import DatahubWatchlistService
+from app.datahub.storage import MinioParquetStore, get_manifest_cache, get_parquet_table_cache
+
+SYMBOL_COUNT = 6000
+LEGACY_LOOKUPS = 20
+INDEX_LOOKUPS = 60000
+
+
+def _snapshot_rows(*, name_prefix: str = "证券") -> list[dict]:
+    rows = []
+    for index in range(SYMBOL_COUNT):
+        if index % 2 == 0:
+            symbol, exchange = f"{600000 + index:06d}.SH", "SSE"
+        else:
+            symbol, exchange = f"{index:06d}.SZ", "SZSE"
+        rows.append(
+            {
+                "symbol": symbol,
+                "exchange": exchange,
+                "name": f"{name_prefix}{index:04d}",
+                "list_date": date(2000, 1, 1),
+                "delist_date": None,
+                "status": "active",
+                "industry": None,
+                "source_provider": "baostock",
+            }
+        )
+    return rows
+
+
+def _publish_snapshot(db, batch_id: str, rows: list[dict]) -> str:
+    buffer = io.BytesIO()
+    pq.write_table(pa.Table.from_pylist(rows), buffer)
+    object_key = f"datahub/normalized/dataset=security_master/year=2026/month=06/batch_id={batch_id}.parquet"
+    MinioParquetStore().put_bytes(object_key=object_key, data=buffer.getvalue())
+    DatahubStorageService(db).publish_latest_manifest(
+        dataset="security_master",
+        symbol=None,
+        object_key=object_key,
+        schema_version="1.0",
+        quality_score=100.0,
+        start_date=date(2026, 6, 30),
+        end_date=date(2026, 6, 30),
+    )
+    return object_key
+
+
+def _registry(session_factory, *, refresh_interval_seconds: float = 0) -> SecurityIndexRegistry:
+    registry = SecurityIndexRegistry()
+    registry.attach(session_factory, refresh_interval_seconds=refresh_interval_seconds)
+    return registry
+
+
+def _legacy_lookup_name(db, symbol: str) -> str | None:
+    """改造前：每次查询都从快照重新读取全量行并构建映射。"""
+    name_map = {}
+    for row in SnapshotDatasetReadService(db, "security_master").load_rows():
+        name_map[normalize_symbol(str(row.get("symbol") or ""))] = str(row.get("name") or "").strip()
+    return name_map.get(normalize_symbol(symbol))
+
+
+@pytest.fixture
+def no_provider_calls(monkeypatch: pytest.MonkeyPatch) -> None:
+    def fail(*args, **kwargs):
+        raise AssertionError("request path must not call providers")
+
+    monkeypatch.setattr(BaoStockProvider, "get_security_master", fail)
+
+
+def test_index_supports_symbol_name_exchange_and_prefix_search(
+    fake_minio, datahub_session_factory, no_provider_calls
+) -> None:
+    db = datahub_session_factory()
+    _publish_snapshot(db, "daily-20260630", _snapshot_rows())
+    service = SecurityMasterReadService(db, registry=_registry(datahub_session_factory))
+
+    assert service.lookup_name("600000") == "证券0000"
+    assert service.lookup_name("000001.sz") == "证券0001"
+    assert len(service.get_name_map()) == SYMBOL_COUNT
+
+    index = service.index()
+    assert [entry.symbol for entry in index.find_by_name("证券0003")] == ["000003.SZ"]
+    assert len(index.list_exchange("SSE")) == len(index.list_exchange("sh")) == SYMBOL_COUNT // 2
+
+    assert [entry.symbol for entry in service.search("60001", limit=3)] == ["600010.SH", "600012.SH", "600014.SH"]
+    assert [entry.symbol for entry in service.search("证券001", exchange="SZSE", limit=3)] == [
+        "000011.SZ",
+        "000013.SZ",
+        "000015.SZ",
+    ]
+    assert service.search("  ") == []
+    db.close()
+
+
+def test_index_reloads_only_when_manifest_batch_changes(fake_minio, datahub_session_factory, no_provider_calls) -> None:
+    db = datahub_session_factory()
+    _publish_snapshot(db, "daily-20260630", _snapshot_rows())
+    registry = _registry(datahub_session_factory)
+    service = SecurityMasterReadService(db, registry=registry)
+    first = service.index()
+    assert registry.loads == 1
+    # 索引加载走快照读取的 batch_id 表缓存，其他快照读取方不再下载同一对象
+    get_calls = sum(fake_minio.get_calls.values())
+    assert SnapshotDatasetReadService(db, "security_master").load_table(columns=["symbol"]).num_rows == SYMBOL_COUNT
+    assert sum(fake_minio.get_calls.values()) == get_calls
+
+    # 版本未变：manifest 命中进程内缓存，不重新读取 Parquet
+    get_calls = sum(fake_minio.get_calls.values())
+    assert registry.refresh() is False
+    assert sum(fake_minio.get_calls.values()) == get_calls
+    assert service.index() is first
+
+    _publish_snapshot(db, "daily-20260701", _snapshot_rows(name_prefix="新"))
+    assert registry.refresh() is True
+    assert registry.loads == 2
+    assert service.lookup_name("600000.SH") == "新0000"
+    assert first.lookup_name("600000.SH") == "证券0000"
+
+    # 没有快照时按空索引服务，请求路径也不会回退到 provider
+    empty = SecurityMasterReadService(db, registry=SecurityIndexRegistry())
+    fake_minio.objects.clear()
+    get_manifest_cache().clear()
+    get_parquet_table_cache().clear()
+    assert empty.get_name_map() == {}
+    db.close()
+
+
+def test_background_refresh_swaps_index_on_notify(fake_minio, datahub_session_factory, no_provider_calls) -> None:
+    db = datahub_session_factory()
+    _publish_snapshot(db, "daily-20260630", _snapshot_rows())
+    registry = _registry(datahub_session_factory, refresh_interval_seconds=3600)
+    try:
+        assert registry.current(db).lookup_name("600000.SH") == "证券0000"
+        _publish_snapshot(db, "daily-20260701", _snapshot_rows(name_prefix="新"))
+        registry.notify_changed()
+        deadline = time.monotonic() + 5
+        while registry.loads < 2 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert registry.current(db).lookup_name("600000.SH") == "新0000"
+    finally:
+        registry.close()
+    db.close()
+
+
+def test_watchlist_names_come_from_index_without_provider(
+    fake_minio, datahub_session_factory, no_provider_calls
+) -> None:
+    db = datahub_session_factory()
+    # 快照尚未发布时名称为空，而不是同步调用 baostock
+    assert DatahubWatchlistService(db)._lookup_security_name("600000.SH") is None
+    db.close()
+
+
+@pytest.mark.benchmark
+def test_benchmark_lookup_throughput(fake_minio, datahub_session_factory, no_provider_calls) -> None:
+    db = datahub_session_factory()
+    _publish_snapshot(db, "daily-20260630", _snapshot_rows())
+    symbols = [row["symbol"] for row in _snapshot_rows()]
+
+    started = time.perf_counter()
+    for index in range(LEGACY_LOOKUPS):
+        assert _legacy_lookup_name(db, symbols[index]) is not None
+    legacy_rate = LEGACY_LOOKUPS / (time.perf_counter() - started)
+
+    service = SecurityMasterReadService(db, registry=_registry(datahub_session_factory))
+    service.index()
+    started = time.perf_counter()
+    for index in range(INDEX_LOOKUPS):
+        assert service.lookup_name(symbols[index % SYMBOL_COUNT]) is not None
+    index_rate = INDEX_LOOKUPS / (time.perf_counter() - started)
+
+    assert index_rate > legacy_rate * 100
+    db.close()
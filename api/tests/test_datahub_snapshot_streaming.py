@@ -0,0 +1,164 @@
+import time
+import tracemalloc
+from datetime import date
+from io import BytesIO
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+import pytest
+
+from app.datahub.services.sector_members_read_service import SectorMembersReadService
+from app.datahub.services.snapshot_read_service import SnapshotDatasetReadService
+from app.datahub.services.storage_service import DatahubStorageService
+from app.datahub.storage import get_parquet_table_cache
+
+BENCHMARK_ROWS = 500_000
+BENCHMARK_SECTORS = 500
+
+
+def _sector_rows(count: int, sectors: int) -> pa.Table:
+    return pa.table(
+        {
+            "symbol": [f"{600000 + index % 5000:06d}.SH" for index in range(count)],
+            "sector_code": [f"BK{index % sectors:04d}" for index in range(count)],
+            "sector_name": [f"板块{index % sectors}" for index in range(count)],
+            "source_provider": ["eastmoney"] * count,
+        }
+    )
+
+
+def _publish(fake_minio, table: pa.Table, batch_id: str = "s1", *, row_group_size: int | None = None) -> str:
+    sink = BytesIO()
+    pq.write_table(table, sink, row_group_size=row_group_size)
+    object_key = f"datahub/normalized/dataset=sector_members/year=2026/month=06/batch_id={batch_id}.parquet"
+    fake_minio.upload_file_data(object_key, sink.getvalue())
+    DatahubStorageService(db=None).publish_latest_manifest(  # type: ignore[arg-type]
+        dataset="sector_members",
+        symbol=None,
+        object_key=object_key,
+        schema_version="1.0",
+        quality_score=100.0,
+        start_date=date(2026, 6, 30),
+        end_date=date(2026, 6, 30),
+    )
+    return object_key
+
+
+@pytest.fixture
+def reader(fake_minio) -> SnapshotDatasetReadService:
+    return SnapshotDatasetReadService(db=None, dataset="sector_members")  # type: ignore[arg-type]
+
+
+def test_iter_batches_projects_and_filters_on_unprojected_column(fake_minio, reader) -> None:
+    _publish(fake_minio, _sector_rows(1000, 10), row_group_size=100)
+
+    batches = list(
+        reader.iter_batches(columns=["symbol"], filter_expr=pc.field("sector_code") == "BK0003", batch_size=32)
+    )
+
+    assert all(batch.schema.names == ["symbol"] for batch in batches)
+    assert all(0 < batch.num_rows <= 32 for batch in batches)
+    symbols = [symbol for batch in batches for symbol in batch.column("symbol").to_pylist()]
+    assert symbols == [f"{600000 + index:06d}.SH" for index in range(3, 1000, 10)]
+    # 流式读取不写入共享缓存
+    assert get_parquet_table_cache().stats()["entries"] == 0
+
+
+def test_iter_batches_serves_cached_snapshot_without_download(fake_minio, reader) -> None:
+    object_key = _publish(fake_minio, _sector_rows(1000, 10))
+    expected = reader.load_rows(columns=["symbol", "sector_name"], filter_expr=pc.field("sector_code") == "BK0007")
+
+    streamed = [
+        row
+        for batch in reader.iter_batches(
+            columns=["symbol", "sector_name"], filter_expr=pc.field("sector_code") == "BK0007"
+        )
+        for row in batch.to_pylist()
+    ]
+
+    assert streamed == expected
+    assert len(expected) == 100 and set(expected[0]) == {"symbol", "sector_name"}
+    assert fake_minio.get_calls[object_key] == 1
+
+
+def test_load_table_is_shared_per_batch_and_reloaded_after_publish(fake_minio, reader) -> None:
+    first_key = _publish(fake_minio, _sector_rows(100, 5), "s1")
+    first = reader.load_table()
+    reader.load_table(columns=["symbol"])
+    SnapshotDatasetReadService(db=None, dataset="sector_members").load_rows()  # type: ignore[arg-type]
+    assert first.num_rows == 100
+    assert fake_minio.get_calls[first_key] == 1
+
+    second_key = _publish(fake_minio, _sector_rows(40, 5), "s2")
+    assert reader.load_table().num_rows == 40
+    assert fake_minio.get_calls[second_key] == 1
+
+
+def test_missing_snapshot_and_unknown_columns(fake_minio, reader, datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    empty = SnapshotDatasetReadService(db, "sector_members")
+    assert empty.load_rows() == []
+    assert empty.load_table() is None
+    assert list(empty.iter_batches()) == []
+    db.close()
+
+    _publish(fake_minio, _sector_rows(10, 2))
+    assert [batch.schema.names for batch in reader.iter_batches(columns=["symbol", "industry"])] == [["symbol"]]
+    assert reader.load_table(columns=["industry", "sector_code"]).column_names == ["sector_code"]
+
+
+def test_sector_map_reads_projected_columns(fake_minio) -> None:
+    _publish(fake_minio, _sector_rows(30, 3))
+    service = SectorMembersReadService(db=None)  # type: ignore[arg-type]
+
+    mapping = service.get_symbol_sector_map()
+
+    assert mapping["600000.SH"] == {"sector_code": "BK0000", "sector_name": "板块0"}
+    assert sorted(service.get_sector_symbols_map()["BK0001"]) == [f"{600000 + i:06d}.SH" for i in range(1, 30, 3)]
+
+
+def _measure(fn, *, trace: bool = True):
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    peak = 0
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return result, elapsed, peak
+
+
+@pytest.mark.benchmark
+def test_benchmark_single_sector_on_500k_row_snapshot(fake_minio, reader) -> None:
+    snapshot = _sector_rows(BENCHMARK_ROWS, BENCHMARK_SECTORS)
+    object_key = _publish(fake_minio, snapshot, row_group_size=64 * 1024)
+    target = "BK0042"
+
+    # 全量物化在 tracemalloc 下极慢：耗时不开追踪测量，内存按 1/10 切片的峰值外推
+    legacy, legacy_seconds, _ = _measure(
+        lambda: [row for row in SnapshotDatasetReadService._read_parquet_rows(object_key) if row["sector_code"] == target],
+        trace=False,
+    )
+    _, _, sample_peak = _measure(lambda: snapshot.slice(0, BENCHMARK_ROWS // 10).to_pylist())
+    legacy_peak = sample_peak * 10
+    streamed, stream_seconds, stream_peak = _measure(
+        lambda: [
+            symbol
+            for batch in reader.iter_batches(columns=["symbol"], filter_expr=pc.field("sector_code") == target)
+            for symbol in batch.column("symbol").to_pylist()
+        ]
+    )
+    reader.load_table()
+    cached, cached_seconds, cached_peak = _measure(
+        lambda: reader.load_table(columns=["symbol"], filter_expr=pc.field("sector_code") == target)
+        .column("symbol")
+        .to_pylist()
+    )
+
+    assert streamed == cached == [row["symbol"] for row in legacy]
+    assert len(streamed) == BENCHMARK_ROWS // BENCHMARK_SECTORS
+    assert stream_peak * 100 < legacy_peak
+    assert stream_seconds < legacy_seconds and cached_seconds < legacy_seconds
@@ -0,0 +1,204 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app.datahub.enums import DatahubTaskStatus
+from app.datahub.models import DatahubDatasetWatermark, DatahubJobRun, DatahubJobTask, DatahubObjectIndex, DatahubQualityReport
+from app.datahub.schemas.datahub import TriggerBackfillRequest
+from app.datahub.services.market_daily_backfill_service import MarketDailyBackfillService
+from app.datahub.services.object_key_resolver import latest_manifest_key
+from app.datahub.services.sync_unit_of_work import SyncUnitOfWork
+
+SYMBOLS = [f"{600000 + index:06d}.SH" for index in range(500)]
+# 每个 symbol 缓冲 4 行（任务、对象索引、质量报告、水位），即每 100 个 symbol 落库一次
+MAX_PENDING_ROWS = 400
+PAYLOAD = TriggerBackfillRequest(
+    dataset="market_daily",
+    start_date=date(2026, 6, 29),
+    end_date=date(2026, 6, 30),
+    symbols=SYMBOLS,
+)
+
+
+class SimulatedCrash(BaseException):
+    """模拟进程被杀：不被业务代码的 ``except Exception`` 捕获。"""
+
+
+class FakeProvider:
+    def __init__(self, crash_on_call: int | None = None) -> None:
+        self.calls = 0
+        self.crash_on_call = crash_on_call
+
+    def get_daily_bars(self, symbol: str, start_date: date, end_date: date) -> list[dict]:
+        self.calls += 1
+        if self.calls == self.crash_on_call:
+            raise SimulatedCrash()
+        return [
+            {
+                "symbol": symbol,
+                "trade_date": end_date,
+                "open": 10.0,
+                "high": 11.0,
+                "low": 9.0,
+                "close": 10.5,
+                "volume": 1000.0,
+            }
+        ]
+
+
+def _create_run(db) -> str:
+    run = DatahubJobRun(job_type="backfill", dataset="market_daily", status=DatahubTaskStatus.PENDING.value)
+    db.add(run)
+    db.flush()
+    db.add(
+        DatahubJobTask(
+            job_run_id=run.id,
+            dataset="market_daily",
+            symbol=SYMBOLS[0],
+            status=DatahubTaskStatus.PENDING.value,
+            attempts=0,
+        )
+    )
+    db.commit()
+    return run.id
+
+
+def _service(db, session_factory, provider: FakeProvider) -> MarketDailyBackfillService:
+    service = MarketDailyBackfillService(
+        db,
+        max_workers=1,
+        session_factory=session_factory,
+        unit_of_work=SyncUnitOfWork(db, max_pending_rows=MAX_PENDING_ROWS, max_delay_seconds=3600),
+    )
+    service.providers = {"baostock": provider}
+    return service
+
+
+def _count_commits(db) -> list[int]:
+    commits = [0]
+
+    def on_commit(_session) -> None:
+        commits[0] += 1
+
+    event.listen(db, "after_commit", on_commit)
+    return commits
+
+
+def test_500_symbol_backfill_commits_once_per_batch(fake_minio, datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    run_id = _create_run(db)
+    service = _service(db, datahub_session_factory, FakeProvider())
+    commits = _count_commits(db)
+
+    service.execute(run_id, PAYLOAD)
+
+    # 准备任务、准备作业、结束作业各 1 次 + 每 100 个 symbol 1 次批量落库（改造前每个 symbol 提交 5 次：
+    # running、对象索引、质量报告、水位、success）
+    assert commits[0] == 3 + len(SYMBOLS) // 100
+    tasks = db.query(DatahubJobTask).filter(DatahubJobTask.job_run_id == run_id).all()
+    assert len(tasks) == len(SYMBOLS)
+    assert {(task.status, task.attempts) for task in tasks} == {(DatahubTaskStatus.SUCCESS.value, 1)}
+    assert db.query(DatahubDatasetWatermark).count() == len(SYMBOLS)
+    assert db.query(DatahubObjectIndex).count() == len(SYMBOLS)
+    assert db.query(DatahubQualityReport).count() == len(SYMBOLS)
+    run = db.query(DatahubJobRun).filter(DatahubJobRun.id == run_id).one()
+    assert (run.status, run.task_success, run.task_failed) == (DatahubTaskStatus.SUCCESS.value, len(SYMBOLS), 0)
+    db.close()
+
+
+def test_crash_keeps_last_flushed_batch_and_rerun_resumes(fake_minio, datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    run_id = _create_run(db)
+    crashing = _service(db, datahub_session_factory, FakeProvider(crash_on_call=250))
+    with pytest.raises(SimulatedCrash):
+        crashing.execute(run_id, PAYLOAD)
+    db.close()
+
+    # 只保留已提交的两批：200 个 symbol 的任务、对象索引与水位一致，其余任务未开始
+    db = datahub_session_factory()
+    tasks = db.query(DatahubJobTask).filter(DatahubJobTask.job_run_id == run_id).all()
+    succeeded = {task.symbol for task in tasks if task.status == DatahubTaskStatus.SUCCESS.value}
+    assert succeeded == set(SYMBOLS[:200])
+    assert {task.status for task in tasks if task.symbol not in succeeded} == {DatahubTaskStatus.PENDING.value}
+    watermarks = db.query(DatahubDatasetWatermark).all()
+    assert {row.symbol for row in watermarks} == succeeded
+    indexed = {row.object_key for row in db.query(DatahubObjectIndex).all()}
+    assert all(row.last_object_key in indexed for row in watermarks)
+    # latest manifest 只在所在批次提交后发布：未落库批次的对象不会出现在读路径上
+    published = {key for key in fake_minio.objects if "/latest/" in key}
+    assert published == {latest_manifest_key("market_daily", symbol) for symbol in succeeded}
+
+    provider = FakeProvider()
+    _service(db, datahub_session_factory, provider).execute(run_id, PAYLOAD)
+
+    assert provider.calls == len(SYMBOLS) - 200
+    db.expire_all()
+    tasks = db.query(DatahubJobTask).filter(DatahubJobTask.job_run_id == run_id).all()
+    assert len(tasks) == len(SYMBOLS)
+    assert {(task.status, task.attempts) for task in tasks} == {(DatahubTaskStatus.SUCCESS.value, 1)}
+    assert db.query(DatahubDatasetWatermark).count() == len(SYMBOLS)
+    run = db.query(DatahubJobRun).filter(DatahubJobRun.id == run_id).one()
+    assert (run.status, run.task_success, run.task_failed) == (DatahubTaskStatus.SUCCESS.value, len(SYMBOLS), 0)
+    db.close()
+
+
+def test_time_threshold_flushes_small_batches(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    now = [0.0]
+    unit_of_work = SyncUnitOfWork(db, max_pending_rows=100, max_delay_seconds=2, clock=lambda: now[0])
+    assert not unit_of_work.maybe_flush()
+
+    unit_of_work.add_watermark(dataset="money_flow", symbol="600000.SH", last_success_date=date(2026, 6, 29))
+    now[0] = 1.5
+    unit_of_work.add_watermark(dataset="money_flow", symbol="600000.SH", last_success_date=date(2026, 6, 30))
+    assert not unit_of_work.maybe_flush()
+    now[0] = 2.0
+    assert unit_of_work.maybe_flush()
+    assert unit_of_work.pending_rows == 0
+
+    # 唯一键含 NULL 的行逐行更新，重复落库不会产生重复水位
+    for _ in range(2):
+        unit_of_work.add_watermark(dataset="sector_members", symbol=None, last_success_date=date(2026, 6, 30))
+        unit_of_work.flush()
+    rows = db.query(DatahubDatasetWatermark).order_by(DatahubDatasetWatermark.dataset).all()
+    assert [(row.dataset, row.symbol, row.last_success_date) for row in rows] == [
+        ("money_flow", "600000.SH", date(2026, 6, 30)),
+        ("sector_members", None, date(2026, 6, 30)),
+    ]
+    db.close()
+
+
+def test_manifests_publish_after_commit_and_retry_on_failure(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    unit_of_work = SyncUnitOfWork(db, max_pending_rows=100, max_delay_seconds=3600)
+    published: list[tuple[str, int]] = []
+    attempts = {"b": 0}
+
+    def publish(key: str):
+        def run() -> None:
+            # 发布时对应水位已提交、其他会话可见
+            other = datahub_session_factory()
+            committed = other.query(DatahubDatasetWatermark).count()
+            other.close()
+            if key == "b":
+                attempts["b"] += 1
+                if attempts["b"] == 1:
+                    raise ConnectionError("minio down")
+            published.append((key, committed))
+
+        return run
+
+    unit_of_work.add_watermark(dataset="money_flow", symbol="600000.SH", last_success_date=date(2026, 6, 30))
+    unit_of_work.add_manifest("a", publish("a"))
+    unit_of_work.add_manifest("b", publish("b"))
+    assert published == []
+    with pytest.raises(ConnectionError):
+        unit_of_work.flush()
+    assert published == [("a", 1)]
+    assert db.query(DatahubDatasetWatermark).count() == 1
+
+    # 行已提交，重试只补发未成功的 manifest
+    assert unit_of_work.flush() == 0
+    assert published == [("a", 1), ("b", 1)]
+    db.close()
@@ -0,0 +1,193 @@
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from app.datahub.enums import DatahubTaskStatus
+from app.datahub.jobs.worker import DatahubWorker
+from app.datahub.models import DatahubJobRun, DatahubWorkerHeartbeat
+from app.datahub.schemas.datahub import TriggerBackfillRequest
+from app.datahub.services import DatahubService
+
+RUNS = 120
+WORKERS = 8
+
+
+def _seed_runs(session_factory, count: int) -> list[str]:
+    db = session_factory()
+    base = datetime(2026, 6, 30, tzinfo=timezone.utc)
+    runs = [
+        DatahubJobRun(
+            job_type="backfill",
+            dataset="market_daily",
+            status=DatahubTaskStatus.PENDING.value,
+            job_params={},
+            created_at=base + timedelta(seconds=index),
+        )
+        for index in range(count)
+    ]
+    db.add_all(runs)
+    db.commit()
+    run_ids = [run.id for run in runs]
+    db.close()
+    return run_ids
+
+
+class RecordingExecutor:
+    """执行器替身：记录每个作业被执行的次数，并像真实执行器一样把作业置为终态。"""
+
+    def __init__(self, session_factory):
+        self.session_factory = session_factory
+        self.executed: Counter[str] = Counter()
+        self._lock = threading.Lock()
+
+    def __call__(self, run_id: str) -> None:
+        with self._lock:
+            self.executed[run_id] += 1
+        time.sleep(0.001)
+        db = self.session_factory()
+        try:
+            run = db.query(DatahubJobRun).filter(DatahubJobRun.id == run_id).one()
+            run.status = DatahubTaskStatus.SUCCESS.value
+            db.commit()
+        finally:
+            db.close()
+
+
+def test_concurrent_workers_never_execute_a_run_twice(datahub_session_factory) -> None:
+    run_ids = _seed_runs(datahub_session_factory, RUNS)
+    executor = RecordingExecutor(datahub_session_factory)
+    start = threading.Barrier(WORKERS)
+    errors: list[Exception] = []
+
+    def drain(index: int) -> None:
+        worker = DatahubWorker(
+            worker_name=f"worker-{index}",
+            batch_size=3,
+            session_factory=datahub_session_factory,
+            executor=executor,
+        )
+        db = datahub_session_factory()
+        try:
+            start.wait()
+            deadline = time.monotonic() + 30
+            while len(executor.executed) < RUNS and time.monotonic() < deadline:
+                if not worker.run_once(db):
+                    time.sleep(0.001)
+        except Exception as exc:  # pragma: no cover
+            errors.append(exc)
+        finally:
+            db.close()
+
+    threads = [threading.Thread(target=drain, args=(index,)) for index in range(WORKERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not errors
+    assert set(executor.executed) == set(run_ids)
+    assert max(executor.executed.values()) == 1
+
+    db = datahub_session_factory()
+    runs = db.query(DatahubJobRun).all()
+    assert all(run.status == DatahubTaskStatus.SUCCESS.value for run in runs)
+    assert all(run.claimed_by and run.lease_expires_at is None for run in runs)
+    assert len({run.claimed_by for run in runs}) > 1
+    db.close()
+
+
+def test_expired_lease_is_reclaimed_and_heartbeat_renews_live_lease(datahub_session_factory) -> None:
+    stale_id, live_id = _seed_runs(datahub_session_factory, 2)
+    db = datahub_session_factory()
+    service = DatahubService(db)
+
+    assert service.claim_runs(worker_name="crashed", limit=1, lease_seconds=60) == [stale_id]
+    assert service.claim_runs(worker_name="alive", limit=1, lease_seconds=60) == [live_id]
+    assert service.claim_runs(worker_name="other", limit=5, lease_seconds=60) == []
+
+    # 认领者崩溃：作业停在 running 且租约过期
+    stale = db.query(DatahubJobRun).filter(DatahubJobRun.id == stale_id).one()
+    stale.status = DatahubTaskStatus.RUNNING.value
+    stale.lease_expires_at = datetime.now(timezone.utc) - timedelta(seconds=1)
+    live = db.query(DatahubJobRun).filter(DatahubJobRun.id == live_id).one()
+    live.lease_expires_at = datetime.now(timezone.utc) + timedelta(seconds=1)
+    db.commit()
+
+    # 存活 Worker 的一次心跳在同一事务里写心跳并续租
+    worker = DatahubWorker(worker_name="alive", session_factory=datahub_session_factory, lease_seconds=120)
+    worker._update_state(status="running", last_run_id=live_id, held_run_ids=[live_id], processed=2)
+    heartbeat_db = datahub_session_factory()
+    worker._beat(heartbeat_db)
+    heartbeat_db.close()
+
+    db.expire_all()
+    assert service.claim_runs(worker_name="other", limit=5, lease_seconds=60) == [stale_id]
+    live = db.query(DatahubJobRun).filter(DatahubJobRun.id == live_id).one()
+    assert live.claimed_by == "alive"
+    lease_expires_at = live.lease_expires_at.replace(tzinfo=live.lease_expires_at.tzinfo or timezone.utc)
+    assert lease_expires_at > datetime.now(timezone.utc) + timedelta(seconds=100)
+    heartbeat = db.query(DatahubWorkerHeartbeat).filter(DatahubWorkerHeartbeat.worker_name == "alive").one()
+    assert (heartbeat.status, heartbeat.last_run_id, heartbeat.processed_count) == ("running", live_id, 2)
+    db.close()
+
+
+def test_cli_created_run_is_held_by_its_creator_and_not_claimed_again(datahub_session_factory) -> None:
+    db = datahub_session_factory()
+    run = DatahubService(db).create_backfill_job(
+        TriggerBackfillRequest(dataset="market_daily", start_date="2026-06-01", end_date="2026-06-30", symbol="600000.SH"),
+        trigger_source="cli",
+        claimed_by="cli-host-1",
+        lease_seconds=60,
+    )
+    assert DatahubService(db).claim_runs(worker_name="worker-0", limit=5, lease_seconds=60) == []
+
+    executor = RecordingExecutor(datahub_session_factory)
+    DatahubWorker(worker_name="cli-host-1", session_factory=datahub_session_factory, executor=executor).run_claimed(run.id)
+
+    assert executor.executed == Counter({run.id: 1})
+    db.expire_all()
+    row = db.query(DatahubJobRun).filter(DatahubJobRun.id == run.id).one()
+    assert (row.status, row.claimed_by, row.lease_expires_at) == (DatahubTaskStatus.SUCCESS.value, "cli-host-1", None)
+    assert DatahubService(db).claim_runs(worker_name="worker-0", limit=5, lease_seconds=60) == []
+    db.close()
+
+
+def test_stop_request_keeps_renewing_lease_until_in_flight_run_finishes(datahub_session_factory) -> None:
+    (run_id,) = _seed_runs(datahub_session_factory, 1)
+    renewed: list[bool] = []
+
+    def lease_of(db) -> datetime:
+        db.expire_all()
+        value = db.query(DatahubJobRun).filter(DatahubJobRun.id == run_id).one().lease_expires_at
+        return value.replace(tzinfo=value.tzinfo or timezone.utc)
+
+    def executor(claimed_id: str) -> None:
+        # 模拟执行期间收到 SIGTERM：之后心跳仍需为本作业续租
+        worker.request_stop()
+        db = datahub_session_factory()
+        try:
+            before = lease_of(db)
+            time.sleep(1.5)
+            renewed.append(lease_of(db) > before)
+            run = db.query(DatahubJobRun).filter(DatahubJobRun.id == claimed_id).one()
+            run.status = DatahubTaskStatus.SUCCESS.value
+            db.commit()
+        finally:
+            db.close()
+
+    worker = DatahubWorker(
+        worker_name="worker-0",
+        lease_seconds=3,
+        session_factory=datahub_session_factory,
+        executor=executor,
+        metrics_rollup_seconds=0,
+    )
+    worker.run_forever()
+
+    assert renewed == [True]
+    assert not worker._heartbeat_thread.is_alive()
+    db = datahub_session_factory()
+    row = db.query(DatahubJobRun).filter(DatahubJobRun.id == run_id).one()
+    assert (row.status, row.claimed_by, row.lease_expires_at) == (DatahubTaskStatus.SUCCESS.value, "worker-0", None)
+    db.close()
@@ -0,0 +1,121 @@
+import asyncio
+import json
+import random
+
+import fakeredis
+
+from app.core.redis_client import RedisClient
+from app.core.websocket.message_router import MessageRouter
+from app.core.websocket.websocket_coordinator import WebSocketCoordinator
+
+USERS_PER_NODE = 4
+MESSAGES = 64
+
+
+class FakeWebSocket:
+    """只记录下发内容的 WebSocket 替身。"""
+
+    def __init__(self) -> None:
+        self.sent: list[dict] = []
+
+    async def accept(self) -> None:
+        return None
+
+    async def send_json(self, payload: dict) -> None:
+        self.sent.append(payload)
+
+
+def _redis_client(server: fakeredis.FakeServer) -> RedisClient:
+    client = RedisClient()
+    client._client = fakeredis.aioredis.FakeRedis(server=server)
+    return client
+
+
+async def _wait_until(predicate, timeout: float = 5.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        if asyncio.get_running_loop().time() > deadline:
+            raise AssertionError("timed out waiting for delivery")
+        await asyncio.sleep(0.01)
+
+
+async def _run_cluster(node_count: int) -> tuple[list[int], int]:
+    server = fakeredis.FakeServer()
+    nodes = [WebSocketCoordinator(_redis_client(server)) for _ in range(node_count)]
+    publisher = WebSocketCoordinator(_redis_client(server))
+    for coordinator in [*nodes, publisher]:
+        await coordinator.initialize()
+
+    sockets: dict[str, FakeWebSocket] = {}
+    try:
+        for node_index, coordinator in enumerate(nodes):
+            for user_index in range(USERS_PER_NODE):
+                user_id = f"user-{node_index}-{user_index}"
+                sockets[user_id] = FakeWebSocket()
+                assert await coordinator.connect(user_id, sockets[user_id])
+
+        rng = random.Random(node_count)
+        targets = [rng.choice(sorted(sockets)) for _ in range(MESSAGES)]
+        for index, user_id in enumerate(targets):
+            await publisher.send_to_user(user_id, {"action": "test", "data": {"id": index}})
+
+        def delivered() -> list[dict]:
+            return [item for socket in sockets.values() for item in socket.sent if item.get("action") == "test"]
+
+        await _wait_until(lambda: len(delivered()) == MESSAGES)
+        for user_id, socket in sockets.items():
+            received = [item["data"]["id"] for item in socket.sent if item.get("action") == "test"]
+            assert received == [index for index, target in enumerate(targets) if target == user_id]
+        return [node.broadcast_messages_processed for node in nodes], len(delivered())
+    finally:
+        for coordinator in [*nodes, publisher]:
+            await coordinator.cleanup()
+
+
+def test_messages_processed_per_node_shrinks_with_cluster_size() -> None:
+    results = {node_count: asyncio.run(_run_cluster(node_count)) for node_count in (1, 2, 4, 8)}
+
+    for node_count, (processed, delivered) in results.items():
+        assert delivered == MESSAGES
+        # 全局频道下每个节点都要处理全部消息；分片后只处理本地用户所在分片的消息
+        assert sum(processed) <= MESSAGES * 1.25
+    assert max(results[8][0]) < MESSAGES / 2
+
+
+def test_shard_subscription_follows_user_connections() -> None:
+    async def scenario() -> None:
+        server = fakeredis.FakeServer()
+        coordinator = WebSocketCoordinator(_redis_client(server), shard_count=16)
+        await coordinator.initialize()
+        redis = fakeredis.aioredis.FakeRedis(server=server)
+        channel = coordinator.message_router.channel_for_user("alice")
+        try:
+            first, second = FakeWebSocket(), FakeWebSocket()
+            await coordinator.connect("alice", first)
+            await coordinator.connect("alice", second)
+            assert coordinator.get_subscribed_shards() == {channel}
+            assert (await redis.pubsub_numsub(channel))[0][1] == 1
+
+            await coordinator.disconnect(first)
+            assert coordinator.get_subscribed_shards() == {channel}
+            await coordinator.disconnect(second)
+            assert coordinator.get_subscribed_shards() == set()
+            assert (await redis.pubsub_numsub(channel))[0][1] == 0
+
+            # 设备定向消息仍走全局频道
+            await redis.publish(
+                coordinator.message_router.broadcast_channel,
+                json.dumps({"target_connection_id": "missing", "payload": {"action": "noop"}}),
+            )
+            await _wait_until(lambda: coordinator.broadcast_messages_processed == 1)
+        finally:
+            await coordinator.cleanup()
+
+    asyncio.run(scenario())
+
+
+def test_channel_for_user_is_stable_across_instances() -> None:
+    first = MessageRouter(redis_client=None, shard_count=64)
+    second = MessageRouter(redis_client=None, shard_count=64)
+    assert all(first.channel_for_user(f"u{i}") == second.channel_for_user(f"u{i}") for i in range(100))
+    assert len({first.channel_for_user(f"u{i}") for i in range(1000)}) == 64